@@ -0,0 +1,154 @@
+import os
+os.environ['QT_API'] = 'PySide2'
+import sys
+import json
+from time import perf_counter_ns, time, strftime
+from asyncio import set_event_loop, sleep, create_task
+from asyncqt import QEventLoop
+from PySide2.QtWidgets import QApplication, QWidget, QGridLayout
+from RSCompanionAsync.Devices.DRT.View.drt_graph import DRTGraph
+from RSCompanionAsync.Devices.DRT.Resources.drt_strings import strings, StringsEnum, LangEnum
+
+
+"""
+Compare the graph backends drawing DRT graphs: matplotlib blitting on the event loop ("blit"), matplotlib drawn off
+screen ("offscreen") and pyqtgraph ("pyqtgraph", skipped if not installed).
+    Throughput: each frame adds batch points to every graph then renders and repaints them straight away, giving
+    points drawn per second and the frame time. For "offscreen" that is only the event loop's share, the frames are
+    drawn by the RENDER executor and renders asked for while one is drawing are folded into the next.
+    Streaming: the graphs get rate points a second each through the normal render scheduler while a probe measures
+    how late the event loop runs a 5ms timer, which is what serial reads and button presses would feel.
+Needs a display, the render scheduler skips graphs that can not be seen.
+Run with python -m Dev_Tools.graph_bench
+"""
+
+backends = ["blit", "offscreen", "pyqtgraph"]  # Change to the backends to compare.
+num_graphs = 8                                 # Change to the number of device windows.
+batch = 10                                     # Change to points per graph per frame in the throughput test.
+frames = 200                                   # Change to frames per throughput test.
+rate = 50                                      # Change to points per second per graph in the streaming test.
+run_time = 10                                  # Change to seconds per streaming test.
+probe_interval = .005                          # Seconds the event loop probe sleeps.
+out_path = "graph_bench_" + strftime("%Y%m%d_%H%M%S") + ".json"  # Change to where to write results.
+
+
+def percentiles(values: [float]) -> dict:
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    return {"count": len(values), "p50_ms": values[len(values) // 2], "p95_ms": values[int(len(values) * .95)],
+            "p99_ms": values[int(len(values) * .99)], "max_ms": values[-1]}
+
+
+def make_graphs(backend: str, window: QWidget) -> list:
+    if backend == "pyqtgraph":
+        from RSCompanionAsync.Devices.DRT.View.drt_fast_graph import DRTFastGraph as Graph
+    else:
+        Graph = DRTGraph
+    layout = window.layout()
+    graphs = list()
+    for i in range(num_graphs):
+        graph = Graph(window)
+        graph.set_lang(LangEnum.ENG)
+        graph.set_offscreen(backend == "offscreen")
+        graph.setMinimumSize(300, 200)
+        layout.addWidget(graph, i // 4, i % 4)
+        graphs.append(graph)
+    return graphs
+
+
+def add_point(graph, t: float, i: int) -> None:
+    names = strings[LangEnum.ENG]
+    graph.add_data([[names[StringsEnum.PLOT_NAME_RT], t, -1 if i % 13 == 0 else 250 + i % 400],
+                    [names[StringsEnum.PLOT_NAME_CLICKS], t, i % 5]])
+
+
+async def probe(lags: list) -> None:
+    # Record how late the loop wakes this task.
+    while True:
+        start = perf_counter_ns()
+        await sleep(probe_interval)
+        lags.append((perf_counter_ns() - start) / 1E6 - probe_interval * 1000)
+
+
+async def throughput(graphs: list, app: QApplication) -> dict:
+    frame_ms = list()
+    t = time()
+    i = 0
+    start = perf_counter_ns()
+    for frame in range(frames):
+        frame_start = perf_counter_ns()
+        for j in range(batch):
+            t += .02
+            i += 1
+            for graph in graphs:
+                add_point(graph, t, i)
+        for graph in graphs:
+            graph.render()
+            graph.repaint()
+        app.processEvents()
+        frame_ms.append((perf_counter_ns() - frame_start) / 1E6)
+        await sleep(0)
+    elapsed = (perf_counter_ns() - start) / 1E9
+    return {"points_per_s": frames * batch * len(graphs) / elapsed, "frame": percentiles(frame_ms)}
+
+
+async def streaming(graphs: list) -> dict:
+    lags = list()
+    probe_task = create_task(probe(lags))
+    t = time()
+    i = 0
+    end = perf_counter_ns() + int(run_time * 1E9)
+    while perf_counter_ns() < end:
+        t += 1 / rate
+        i += 1
+        for graph in graphs:
+            add_point(graph, t, i)
+        await sleep(1 / rate)
+    await sleep(.5)
+    probe_task.cancel()
+    stats = [graph.get_render_stats() for graph in graphs]
+    return {"loop_lag": percentiles(lags),
+            "renders": sum(x["renders"] for x in stats),
+            "render_ms_mean": sum(x["render_ms_mean"] for x in stats) / len(stats),
+            "render_ms_max": max(x["render_ms_max"] for x in stats)}
+
+
+async def main(app: QApplication) -> None:
+    results = dict()
+    for backend in backends:
+        window = QWidget()
+        window.setLayout(QGridLayout(window))
+        try:
+            graphs = make_graphs(backend, window)
+        except ImportError as e:
+            print("Skipping " + backend + ": " + str(e))
+            continue
+        window.show()
+        await sleep(.5)
+        res = {"throughput": await throughput(graphs, app)}
+        for graph in graphs:
+            graph.clear_graph()
+        res["streaming"] = await streaming(graphs)
+        for graph in graphs:
+            graph.cleanup()
+        window.close()
+        results[backend] = res
+        print("{}: {:.0f} points/s, frame p50 {:.1f}ms p99 {:.1f}ms, streaming loop lag p50 {:.2f}ms p99 {:.2f}ms, "
+              "render mean {:.1f}ms".format(backend, res["throughput"]["points_per_s"],
+                                            res["throughput"]["frame"]["p50_ms"], res["throughput"]["frame"]["p99_ms"],
+                                            res["streaming"]["loop_lag"].get("p50_ms", 0),
+                                            res["streaming"]["loop_lag"].get("p99_ms", 0),
+                                            res["streaming"]["render_ms_mean"]))
+    with open(out_path, "w") as f:
+        json.dump({"num_graphs": num_graphs, "batch": batch, "frames": frames, "rate": rate, "run_time_s": run_time,
+                   "results": results}, f, indent=2)
+    print("Wrote " + out_path)
+
+
+if __name__ == '__main__':
+    app = QApplication(sys.argv)
+    loop = QEventLoop(app)
+    set_event_loop(loop)
+    with loop:
+        loop.run_until_complete(main(app))
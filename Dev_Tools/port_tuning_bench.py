@@ -0,0 +1,51 @@
+from serial import Serial
+from serial.serialutil import SerialException
+from serial.tools.list_ports import comports
+from RSCompanionAsync.Model.rs_port_tuning import measure_rtt, tune_port, format_tuning
+from RSCompanionAsync.Devices.DRT.Model import drt_defs
+from RSCompanionAsync.Devices.VOG.Model import vog_defs
+
+
+"""
+Time the command round trip of every connected DRT and VOG before and after their profile's port tuning, see
+RSCompanionAsync/Model/rs_port_tuning.py. Close the app first, each port is opened here.
+The app applies the tuning when it connects a device but does not time it, this shows whether the tuning helps.
+Run with python -m Dev_Tools.port_tuning_bench
+"""
+
+count = 20  # Change to the round trips timed before and after tuning.
+
+profiles = dict()
+for defs in (drt_defs, vog_defs):
+    profiles.update(defs.profile)
+
+
+def main() -> None:
+    found = False
+    for port in comports():
+        for dev_type, profile in profiles.items():
+            if port.vid != profile["vid"] or port.pid != profile["pid"]:
+                continue
+            found = True
+            tuning = profile["tuning"]
+            try:
+                conn = Serial(port.device)
+            except SerialException as e:
+                print(dev_type + " on " + port.device + ": could not open, " + str(e))
+                break
+            try:
+                before = measure_rtt(conn, tuning["probe"], tuning["probe_answer"], count)
+                result = tune_port(conn, tuning)
+                after = measure_rtt(conn, tuning["probe"], tuning["probe_answer"], count)
+            finally:
+                conn.close()
+            print("{} on {}: {}, round trip {} -> {}".format(
+                dev_type, port.device, format_tuning(result),
+                *["n/a" if x is None else "{:.2f}ms".format(x) for x in (before, after)]))
+            break
+    if not found:
+        print("No DRT or VOG connected")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,402 @@
+import os
+import pty
+import tty
+import random
+import selectors
+from abc import ABC, abstractmethod
+from heapq import heappush, heappop
+from threading import Thread, Lock, Event
+from time import perf_counter_ns, sleep
+from serial.tools.list_ports_common import ListPortInfo
+from RSCompanionAsync.Devices.DRT.Model import drt_defs
+from RSCompanionAsync.Devices.VOG.Model import vog_defs
+
+
+"""
+Simulated DRT and VOG devices on pseudo terminals, for running the app without hardware. Linux only.
+Each device answers get/set commands the way the hardware does and sends trial data at a chosen rate while running.
+Use SimBank.list_ports as the port lister for RSDeviceCommScanner/AppModel so the app finds the simulated devices.
+Run directly to start some devices and print their ports.
+"""
+
+
+class SimDevice(ABC):
+    """ Base simulated device. Subclasses handle commands and make data lines. """
+    dev_type = str()
+    profile = dict()
+
+    def __init__(self, rate: float = None):
+        """
+        :param rate: Data lines per second while running. None to use a rate like the real device's.
+        """
+        self.rate = rate
+        self.noise = 0.0         # Chance that a sent line is corrupted.
+        self.running = False
+        self.lines_sent = 0
+        self.lines_dropped = 0    # Lines not sent because the app was not reading fast enough.
+        self.cmds_received = 0
+        self.line_hook = None     # Called with (device, line, perf_counter_ns) after each data line is written.
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)  # No echo or line ending translation.
+        os.set_blocking(self._master, False)
+        self.port = os.ttyname(self._slave)
+        self._in_buf = bytearray()
+        self._connected = True
+
+    @property
+    def fd(self) -> int:
+        """
+        :return int: The pty master this device reads commands from and writes lines to.
+        """
+        return self._master
+
+    @property
+    def connected(self) -> bool:
+        """
+        :return bool: Whether this device is still plugged in.
+        """
+        return self._connected
+
+    def port_info(self) -> ListPortInfo:
+        """
+        :return ListPortInfo: This device's port as a port lister would report it, with the real device's ids.
+        """
+        info = ListPortInfo(self.port, skip_link_detection=True)
+        info.vid = self.profile["vid"]
+        info.pid = self.profile["pid"]
+        info.description = "Simulated " + self.dev_type
+        return info
+
+    def period_ns(self) -> int:
+        """
+        :return int: Nanoseconds between data lines while running.
+        """
+        return int(1E9 / (self.rate if self.rate else self.default_rate()))
+
+    def default_rate(self) -> float:
+        """
+        :return float: Data lines per second when no rate is given.
+        """
+        return 1.0
+
+    def disconnect(self) -> None:
+        """
+        Close the pty so reads on the port fail. Use SimBank.remove to unplug a device.
+        :return None:
+        """
+        if self._connected:
+            self._connected = False
+            self.running = False
+            os.close(self._master)
+            os.close(self._slave)
+
+    def on_readable(self) -> None:
+        """
+        Read what the app wrote and handle each complete command.
+        :return None:
+        """
+        try:
+            data = os.read(self._master, 4096)
+        except OSError as e:
+            return
+        self._in_buf += data
+        while True:
+            end = self._in_buf.find(b"\n")
+            if end < 0:
+                break
+            cmd = bytes(self._in_buf[:end]).decode("utf-8", "replace").strip()
+            del self._in_buf[:end + 1]
+            if cmd:
+                self.cmds_received += 1
+                self.handle_cmd(cmd)
+
+    @abstractmethod
+    def handle_cmd(self, cmd: str) -> None:
+        """
+        Answer a command the way the device does.
+        :param cmd: The command without its line ending.
+        :return None:
+        """
+        pass
+
+    @abstractmethod
+    def make_data_line(self) -> str:
+        """
+        :return str: The next data line, without its line ending.
+        """
+        pass
+
+    def send_data(self) -> None:
+        """
+        Write the next data line and report it to line_hook.
+        :return None:
+        """
+        line = self.make_data_line()
+        if self.write_line(line):
+            if self.line_hook:
+                self.line_hook(self, line, perf_counter_ns())
+
+    def write_line(self, line: str) -> bool:
+        """
+        Write a line to the app, corrupting it first at the noise rate.
+        :param line: The line without its line ending.
+        :return bool: Whether the line was written, False if the app is not reading fast enough or the device is gone.
+        """
+        if not self._connected:
+            return False
+        data = (line + "\r\n").encode()
+        if self.noise and random.random() < self.noise:
+            data = self._corrupt(data)
+        try:
+            os.write(self._master, data)
+        except BlockingIOError as e:
+            self.lines_dropped += 1
+            return False
+        except OSError as e:
+            return False
+        self.lines_sent += 1
+        return True
+
+    @staticmethod
+    def _corrupt(data: bytes) -> bytes:
+        choice = random.randrange(4)
+        if choice == 0:  # Flip a byte.
+            i = random.randrange(len(data) - 2)
+            return data[:i] + bytes([random.randrange(256)]) + data[i + 1:]
+        if choice == 1:  # Lose the end of the line.
+            return data[:random.randrange(1, len(data) - 1)] + b"\r\n"
+        if choice == 2:  # Lose the line ending so two lines run together.
+            return data[:-2]
+        return bytes(random.randrange(256) for i in range(random.randrange(1, 20))) + b"\r\n"  # Garbage.
+
+
+class SimDRT(SimDevice):
+    """ Simulated DRT. Data lines are trials with a random response time, some missed. """
+    dev_type = "DRT"
+    profile = drt_defs.profile["DRT"]
+
+    def __init__(self, rate: float = None):
+        """
+        :param rate: Data lines per second while running. None to use the rate the device's ISI gives.
+        """
+        super().__init__(rate)
+        self.config = {"lowerISI": 3000, "upperISI": 5000, "stimDur": 1000, "intensity": 255}
+        self._trial = 0
+        self._start_ns = perf_counter_ns()
+
+    def default_rate(self) -> float:
+        return 2000 / (self.config["lowerISI"] + self.config["upperISI"])
+
+    def handle_cmd(self, cmd: str) -> None:
+        name, sep, arg = cmd.partition(" ")
+        if name == "get_config":
+            self.write_line("cfg>" + ", ".join([k + ":" + str(v) for k, v in self.config.items()]) +
+                            ", name:SIM_DRT, version:sim, battery:100, clicks:0, state:" + str(int(self.running)))
+        elif name.startswith("get_") and name[4:] in self.config:
+            self.write_line("cfg>" + name[4:] + ":" + str(self.config[name[4:]]))
+        elif name.startswith("set_") and name[4:] in self.config and arg.strip().isdigit():
+            self.config[name[4:]] = int(arg)
+            self.write_line("cfg>" + name[4:] + ":" + str(self.config[name[4:]]))
+        elif name == "exp_start":
+            self.running = True
+            self._trial = 0
+            self._start_ns = perf_counter_ns()
+        elif name == "exp_stop":
+            self.running = False
+
+    def make_data_line(self) -> str:
+        self._trial += 1
+        rt = random.randrange(200, 900) if random.random() < .9 else -1
+        start = max(0, (perf_counter_ns() - self._start_ns) // 1000000 - max(rt, 0))  # Sent on response.
+        return "trl>" + str(start) + ", " + str(self._trial) + ", " + str(0 if rt < 0 else 1) + ", " + str(rt)
+
+
+class SimVOG(SimDevice):
+    """ Simulated VOG. Data lines are trials with random open and close times. """
+    dev_type = "VOG"
+    profile = vog_defs.profile["VOG"]
+
+    def __init__(self, rate: float = None):
+        """
+        :param rate: Data lines per second while running. None to use the rate the device's open and close times give.
+        """
+        super().__init__(rate)
+        self.config = {"Name": "SIM_VOG", "MaxOpen": "1500", "MaxClose": "1500", "Debounce": "20", "ClickMode": "1"}
+        self.button_control = "0"
+        self._trial = 0
+
+    def default_rate(self) -> float:
+        return 1000 / (int(self.config["MaxOpen"]) + int(self.config["MaxClose"]))
+
+    def handle_cmd(self, cmd: str) -> None:
+        if not (cmd.startswith(">") and cmd.endswith("<<")):
+            return
+        name, sep, arg = cmd[1:-2].partition("|")
+        if name == "get_configButtonControl":
+            self.write_line("buttonControl|" + self.button_control)
+        elif name == "set_configButtonControl":
+            self.button_control = arg  # The device does not echo this one.
+        elif name.startswith("get_config") and name[10:] in self.config:
+            self.write_line("config" + name[10:] + "|" + self.config[name[10:]])
+        elif name.startswith("set_config") and name[10:] in self.config:
+            self.config[name[10:]] = arg
+            self.write_line("config" + name[10:] + "|" + arg)
+        elif name == "do_trialStart":
+            self.running = True
+        elif name == "do_trialStop":
+            self.running = False
+        elif name == "do_expStart":
+            self._trial = 0
+        elif name == "do_expStop":
+            self.running = False
+        elif name == "do_peekOpen":
+            self.write_line("peekOpen")
+        elif name == "do_peekClose":
+            self.write_line("peekClose")
+
+    def make_data_line(self) -> str:
+        self._trial += 1
+        return "data|" + str(self._trial) + "," + str(random.randrange(0, int(self.config["MaxOpen"]) + 1)) + "," + \
+               str(random.randrange(0, int(self.config["MaxClose"]) + 1))
+
+
+class SimBank:
+    """ A set of simulated devices served by one background thread. """
+    def __init__(self):
+        self._devs = list()
+        self._lock = Lock()
+        self._selector = selectors.DefaultSelector()
+        self._stop = Event()
+        self._wake_r, self._wake_w = os.pipe()
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, dev: SimDevice) -> SimDevice:
+        """
+        Plug in a device.
+        :param dev: The device.
+        :return SimDevice: The device.
+        """
+        with self._lock:
+            self._devs.append(dev)
+            self._selector.register(dev.fd, selectors.EVENT_READ, dev)
+        self._wake()
+        return dev
+
+    def remove(self, dev: SimDevice) -> None:
+        """
+        Unplug a device.
+        :param dev: The device.
+        :return None:
+        """
+        with self._lock:
+            if dev in self._devs:
+                self._devs.remove(dev)
+                try:
+                    self._selector.unregister(dev.fd)
+                except (KeyError, ValueError) as e:
+                    pass
+        dev.disconnect()
+
+    def devices(self) -> [SimDevice]:
+        """
+        :return [SimDevice]: The devices plugged in.
+        """
+        with self._lock:
+            return list(self._devs)
+
+    def list_ports(self) -> [ListPortInfo]:
+        """
+        Port lister for RSDeviceCommScanner.
+        :return [ListPortInfo]: The ports of the devices plugged in.
+        """
+        return [dev.port_info() for dev in self.devices()]
+
+    def set_rate(self, rate: float) -> None:
+        """
+        :param rate: Data lines per second per device while running, None for hardware like rates.
+        :return None:
+        """
+        for dev in self.devices():
+            dev.rate = rate
+        self._wake()
+
+    def set_noise(self, noise: float) -> None:
+        """
+        :param noise: The chance that each line a device sends is corrupted.
+        :return None:
+        """
+        for dev in self.devices():
+            dev.noise = noise
+
+    def close(self) -> None:
+        """
+        Stop serving and unplug every device.
+        :return None:
+        """
+        self._stop.set()
+        self._wake()
+        self._thread.join()
+        for dev in self.devices():
+            self.remove(dev)
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+
+    def _wake(self) -> None:
+        try:
+            os.write(self._wake_w, b"x")
+        except OSError as e:
+            pass
+
+    def _run(self) -> None:
+        schedule = list()  # Heap of (next send time, id, device).
+        scheduled = set()
+        while not self._stop.is_set():
+            now = perf_counter_ns()
+            with self._lock:
+                for dev in self._devs:
+                    if dev.running and id(dev) not in scheduled:
+                        heappush(schedule, (now + dev.period_ns(), id(dev), dev))
+                        scheduled.add(id(dev))
+            while schedule and schedule[0][0] <= now:
+                due, key, dev = heappop(schedule)
+                scheduled.discard(key)
+                if dev.running and dev.connected:
+                    dev.send_data()
+                    heappush(schedule, (due + dev.period_ns(), key, dev))
+                    scheduled.add(key)
+            timeout = max(0.0, (schedule[0][0] - perf_counter_ns()) / 1E9) if schedule else 0.05
+            for key, mask in self._selector.select(min(timeout, 0.05)):
+                if key.data is None:
+                    os.read(self._wake_r, 4096)
+                else:
+                    with self._lock:
+                        if key.data in self._devs:
+                            key.data.on_readable()
+
+
+def main():
+    num_drt = 2      # Change to the number of simulated DRTs.
+    num_vog = 2      # Change to the number of simulated VOGs.
+    rate = None      # Change to data lines per second per device, None for hardware like rates.
+    noise = 0.0      # Change to the chance of a corrupted line.
+    bank = SimBank()
+    for i in range(num_drt):
+        bank.add(SimDRT(rate))
+    for i in range(num_vog):
+        bank.add(SimVOG(rate))
+    bank.set_noise(noise)
+    for dev in bank.devices():
+        print(dev.dev_type, dev.port)
+    try:
+        while True:
+            sleep(5)
+            print(", ".join([dev.dev_type + " " + dev.port + " sent " + str(dev.lines_sent) + " dropped " +
+                             str(dev.lines_dropped) for dev in bank.devices()]))
+    except KeyboardInterrupt:
+        bank.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+import os
+os.environ['QT_API'] = 'PySide2'
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')  # No window needed.
+import sys
+import json
+import platform
+import resource
+import tempfile
+from shutil import rmtree
+from os.path import basename
+from statistics import median
+from multiprocessing import Process, Pipe
+from asyncio import set_event_loop, sleep, wait_for, TimeoutError
+from time import perf_counter_ns, process_time, strftime
+from asyncqt import QEventLoop
+from PySide2.QtWidgets import QApplication
+from serial.tools.list_ports_common import ListPortInfo
+from RSCompanionAsync.Model.app_model import AppModel
+from RSCompanionAsync.Model import app_defs
+from Dev_Tools.serial_device_sim import SimBank, SimDRT, SimVOG
+
+
+"""
+Headless end to end load test of the real AppModel stack against simulated DRT/VOG devices. Linux only.
+For each device count the simulator runs in its own process and records when each data line hits the port. In the app
+the time each line reaches the controller's message handler, is queued for the graph, is drawn by the graph and reaches
+the CSV file on disk is recorded, giving latency percentiles per stage along with throughput, cpu and memory use of the
+app process. Graphs are drawn off screen as if their windows were open.
+Results are printed and written as JSON so releases can be compared.
+Run with python -m Dev_Tools.serial_load_test
+"""
+
+device_counts = [1, 2, 4, 8, 16, 32]  # Change to the numbers of devices to test.
+vog_share = .5                         # Change to the fraction of devices that are VOGs, the rest are DRTs.
+rate = 20                              # Change to data lines per second per device.
+run_time = 20                          # Change to seconds of data per device count.
+connect_timeout = 30                   # Seconds to wait for the app to connect to every device.
+settle_time = 2                        # Seconds to let the app finish writing after the devices stop.
+out_path = "serial_load_test_" + strftime("%Y%m%d_%H%M%S") + ".json"  # Change to where to write results.
+
+stamps = dict()  # Stage: {(device name, trial): perf_counter_ns} for the current run.
+
+
+def sim_process(conn, num_drt: int, num_vog: int, dev_rate: float) -> None:
+    # Run the simulated devices, then send back when each data line was written.
+    bank = SimBank()
+    written = dict()
+
+    def hook(dev, line, t):
+        written[(dev.dev_type + "_" + basename(dev.port), data_key(line))] = t
+
+    for i in range(num_drt):
+        bank.add(SimDRT(dev_rate)).line_hook = hook
+    for i in range(num_vog):
+        bank.add(SimVOG(dev_rate)).line_hook = hook
+    conn.send([(dev.dev_type, dev.port, dev.profile["vid"], dev.profile["pid"]) for dev in bank.devices()])
+    conn.recv()  # Stop.
+    devs = bank.devices()
+    bank.close()
+    conn.send({"written": written,
+               "sent": sum([dev.lines_sent for dev in devs]),
+               "dropped": sum([dev.lines_dropped for dev in devs])})
+
+
+def data_key(line: str) -> str:
+    # Trial number of a sim data line, which is what the app sees as trial/trialCounter.
+    if line.startswith("trl>"):
+        return line.split(", ")[1]
+    return line[5:].split(",")[0]
+
+
+def percentiles(values: [int]) -> dict:
+    if not values:
+        return {"count": 0}
+    values = sorted(values)
+    pick = lambda p: values[min(len(values) - 1, int(len(values) * p))] / 1E6
+    return {"count": len(values), "p50_ms": pick(.5), "p95_ms": pick(.95), "p99_ms": pick(.99),
+            "max_ms": values[-1] / 1E6}
+
+
+def current_rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def instrument(model: AppModel) -> None:
+    # Record stage times with the app's timing hooks. A graph render stamps the lines queued before it took its data.
+    queued = dict()  # Device name: [(perf_counter_ns, key)] of lines queued for the graph and not yet drawn.
+
+    def stage_hook(dev_name, stage, values):
+        key = (dev_name, str(values["trial" if dev_name.startswith("DRT") else "trialCounter"]))
+        t = perf_counter_ns()
+        stamps[stage][key] = t
+        if stage == "view_queued":
+            queued.setdefault(dev_name, list()).append((t, key))
+
+    def frame_hook(dev_name, data_ns):
+        t = perf_counter_ns()
+        waiting = queued.get(dev_name, list())
+        drawn = 0
+        while drawn < len(waiting) and waiting[drawn][0] <= data_ns:
+            stamps["graph"][waiting[drawn][1]] = t
+            drawn += 1
+        del waiting[:drawn]
+
+    model.set_stage_hook(stage_hook)
+    model.set_frame_hook(frame_hook, render_hidden=True)
+
+
+async def run_count(n: int) -> dict:
+    num_vog = int(round(n * vog_share))
+    num_drt = n - num_vog
+    parent_conn, child_conn = Pipe()
+    sim = Process(target=sim_process, args=(child_conn, num_drt, num_vog, rate), daemon=True)
+    sim.start()
+    ports = list()
+    for dev_type, port, vid, pid in parent_conn.recv():
+        info = ListPortInfo(port, skip_link_detection=True)
+        info.vid, info.pid = vid, pid
+        ports.append(info)
+
+    model = AppModel(port_lister=lambda: ports)
+    model.start()
+    model.set_cams_active(False)
+    connect_start = perf_counter_ns()
+    views = 0
+    try:
+        while views < n:
+            await wait_for(model.await_new_view(), connect_timeout)
+            while model.get_next_new_view()[0]:
+                views += 1
+    except TimeoutError as e:
+        print("Only " + str(views) + " of " + str(n) + " devices connected")
+    connect_s = (perf_counter_ns() - connect_start) / 1E9
+    ready_ms = list(model.get_ready_times().values())  # Per port time to ready.
+
+    stamps.clear()
+    stamps.update({"handler": dict(), "view_queued": dict(), "graph": dict(), "disk": dict()})
+    instrument(model)
+    save_dir = tempfile.mkdtemp(prefix="rs_load_")
+    model.signal_create_exp(save_dir, "load test", "")
+    await sleep(.5)
+    cpu_start = process_time()
+    wall_start = perf_counter_ns()
+    model.signal_start_exp("load test")
+    await sleep(run_time)
+    model.signal_stop_exp()
+    await sleep(settle_time)
+    wall_s = (perf_counter_ns() - wall_start) / 1E9
+    cpu_s = process_time() - cpu_start
+    rss_mb = current_rss_mb()
+    model.signal_end_exp()
+    await sleep(settle_time)
+    await model.cleanup()
+
+    parent_conn.send("stop")
+    sim_res = parent_conn.recv()
+    sim.join()
+    rmtree(save_dir, ignore_errors=True)
+
+    written = sim_res["written"]
+    res = {"devices": n, "drt": num_drt, "vog": num_vog, "connected": views, "connect_s": connect_s,
+           "ready_median_ms": median(ready_ms) if ready_ms else 0, "ready_max_ms": max(ready_ms, default=0),
+           "lines_sent": sim_res["sent"], "lines_dropped_by_sim": sim_res["dropped"]}
+    for stage in ("handler", "view_queued", "graph", "disk"):
+        res[stage] = percentiles([t - written[k] for k, t in stamps[stage].items() if k in written])
+    res["lines_saved"] = res["disk"]["count"]
+    res["throughput_lps"] = res["lines_saved"] / wall_s
+    res["cpu_s"] = cpu_s
+    res["cpu_pct"] = 100 * cpu_s / wall_s
+    res["rss_mb"] = rss_mb
+    res["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return res
+
+
+async def main() -> None:
+    results = list()
+    for n in device_counts:
+        res = await run_count(n)
+        results.append(res)
+        print("{} devices: {:.0f} lines/s, disk latency p50 {:.2f}ms p95 {:.2f}ms p99 {:.2f}ms, cpu {:.0f}%, "
+              "rss {:.0f}MB".format(n, res["throughput_lps"], res["disk"].get("p50_ms", 0),
+                                    res["disk"].get("p95_ms", 0), res["disk"].get("p99_ms", 0), res["cpu_pct"],
+                                    res["rss_mb"]))
+    report = {"app_version": app_defs.version_number,
+              "python": sys.version,
+              "platform": platform.platform(),
+              "rate_per_device": rate,
+              "run_time_s": run_time,
+              "results": results}
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print("Wrote " + out_path)
+
+
+if __name__ == '__main__':
+    app = QApplication(sys.argv)
+    loop = QEventLoop(app)
+    set_event_loop(loop)
+    with loop:
+        loop.run_until_complete(main())
@@ -0,0 +1,94 @@
+import os
+import pty
+from asyncio import run, sleep, create_task, get_running_loop
+from statistics import median
+from threading import Thread, Event
+from time import perf_counter_ns, process_time, sleep as tsleep
+from aioserial import AioSerial
+from RSCompanionAsync.Model.rs_serial_reader import SerialLineReader
+
+
+"""
+Compare per line executor reads (the old DRT/VOG get_msg) against SerialLineReader using pseudo terminals. Linux only.
+Each line carries the perf_counter_ns it was written at so latency from write to handling can be measured.
+"""
+
+
+def writer(masters: [int], rate: float, run_time: float, stop: Event) -> None:
+    # Write one trl> line per device per period.
+    period = 1 / rate
+    end = perf_counter_ns() + int(run_time * 1E9)
+    trial = 0
+    while perf_counter_ns() < end and not stop.is_set():
+        trial += 1
+        for fd in masters:
+            os.write(fd, ("trl>" + str(perf_counter_ns()) + ", " + str(trial) + ", 1, 250\r\n").encode())
+        tsleep(period)
+
+
+def record(line: bytes, latencies: list) -> None:
+    latencies.append(perf_counter_ns() - int(line[4:line.index(b',')]))
+
+
+async def read_executor(conn: AioSerial, latencies: list) -> None:
+    loop = get_running_loop()
+    while True:
+        line = await loop.run_in_executor(None, conn.readline)
+        record(line, latencies)
+
+
+async def read_reader(conn: AioSerial, latencies: list) -> None:
+    reader = SerialLineReader(conn)
+    try:
+        while True:
+            for line, timestamp in await reader.get_lines():
+                record(line, latencies)
+    finally:
+        reader.cleanup()
+
+
+async def run_mode(mode, num_devs: int, rate: float, run_time: float) -> dict:
+    pairs = [pty.openpty() for i in range(num_devs)]
+    conns = list()
+    for master, slave in pairs:
+        conn = AioSerial(port=os.ttyname(slave))
+        conns.append(conn)
+    latencies = list()
+    tasks = [create_task(mode(conn, latencies)) for conn in conns]
+    stop = Event()
+    t = Thread(target=writer, args=([p[0] for p in pairs], rate, run_time, stop), daemon=True)
+    cpu_start = process_time()
+    t.start()
+    while t.is_alive():
+        await sleep(.1)
+    await sleep(.2)
+    cpu = process_time() - cpu_start
+    for task in tasks:
+        task.cancel()
+    for master, slave in pairs:  # Unblock any executor thread still inside readline.
+        os.write(master, b"\n")
+    await sleep(.1)
+    for conn in conns:
+        conn.close()
+    for master, slave in pairs:
+        os.close(master)
+        os.close(slave)
+    latencies.sort()
+    return {"lines": len(latencies),
+            "median_us": median(latencies) / 1000 if latencies else 0,
+            "p99_us": latencies[int(len(latencies) * .99)] / 1000 if latencies else 0,
+            "cpu_s": cpu}
+
+
+async def main():
+    num_devs = 12     # Change to the number of simulated devices.
+    rate = 50         # Change to lines per second per device.
+    run_time = 5      # Change to seconds per mode.
+    for name, mode in (("executor readline", read_executor), ("SerialLineReader", read_reader)):
+        res = await run_mode(mode, num_devs, rate, run_time)
+        print(name + ": " + str(res["lines"]) + " lines, median latency {:.1f}us, p99 latency {:.1f}us, cpu {:.2f}s"
+              .format(res["median_us"], res["p99_us"], res["cpu_s"]))
+
+
+if __name__ == '__main__':
+    run(main())
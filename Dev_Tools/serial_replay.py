@@ -0,0 +1,183 @@
+import os
+os.environ['QT_API'] = 'PySide2'
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')  # No window needed.
+import sys
+import pty
+import tty
+import cProfile
+import tempfile
+from shutil import rmtree
+from threading import Thread
+from select import select
+from asyncio import set_event_loop, sleep, wait_for, TimeoutError
+from time import perf_counter_ns, process_time, sleep as thread_sleep
+from asyncqt import QEventLoop
+from PySide2.QtWidgets import QApplication
+from serial.tools.list_ports_common import ListPortInfo
+from RSCompanionAsync.Model.app_model import AppModel
+from RSCompanionAsync.Model.rs_capture import read_capture
+from RSCompanionAsync.Model.rs_protocol import compile_parser
+from RSCompanionAsync.Devices.DRT.Model import drt_defs
+from RSCompanionAsync.Devices.VOG.Model import vog_defs
+
+
+"""
+Replay raw serial captures through the real app: port scanner, reader, parser, controllers, graphs and saver. Linux
+only. Captures are recorded by the app when the serial_capture/active setting is True and are saved in each
+experiment's raw_capture folder.
+Each capture is served on its own pseudo terminal, either with its original timing or as fast as the app reads it.
+In real time the captures also keep their timing relative to each other, all starting from the earliest one.
+Prints how long the app took to take in and save every data line, and optionally writes a cProfile of the run.
+Run with python -m Dev_Tools.serial_replay
+"""
+
+capture_paths = []      # Change to the .rscap files to replay together.
+real_time = False       # Change to True to keep the captured timing, False to replay as fast as possible.
+connect_timeout = 30    # Seconds to wait for the app to connect to every replayed device.
+drain_timeout = 600     # Most seconds to wait for the app to save every data line.
+profile_path = None     # Change to a .prof path to profile the replay, view with Dev_Tools/show_profile.py.
+
+dev_defs = {"DRT": drt_defs, "VOG": vog_defs}
+saved_rows = [0]
+
+
+class ReplayPort:
+    """ A pseudo terminal that plays back one capture. """
+    def __init__(self, path: str):
+        self.header, self.chunks = read_capture(path)
+        self.dev_type = self.header["dev_name"].split("_")[0]
+        if self.dev_type not in dev_defs:
+            raise ValueError(path + " is from a " + self.dev_type + ", only DRT and VOG captures can be replayed")
+        defs = dev_defs[self.dev_type]
+        parse = compile_parser(defs.protocol)
+        lines = b"".join([chunk for timestamp, chunk in self.chunks]).split(b"\n")
+        self.data_lines = len([x for x in lines if parse(x).get('type') == "data"])
+        self.bytes = sum([len(chunk) for timestamp, chunk in self.chunks])
+        # Chunk times are the recording process's perf_counter_ns, put them on the wall clock to line captures up.
+        self._wall_offset = self.header["anchor_wall_ns"] - self.header["anchor_mono_ns"]
+        self.first_ns = self.chunks[0][0] + self._wall_offset if self.chunks else None
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)
+        os.set_blocking(self._master, False)
+        self.port = os.ttyname(self._slave)
+        self.done_ns = 0
+        self._thread = None
+
+    def port_info(self) -> ListPortInfo:
+        info = ListPortInfo(self.port, skip_link_detection=True)
+        profile = dev_defs[self.dev_type].profile[self.dev_type]
+        info.vid = profile["vid"]
+        info.pid = profile["pid"]
+        return info
+
+    def start(self, start_ns: int, first_ns: int) -> None:
+        # Play chunks relative to first_ns, the earliest first chunk of all the captures, from start_ns.
+        self._thread = Thread(target=self._feed, args=(start_ns, first_ns), daemon=True)
+        self._thread.start()
+
+    def join(self) -> None:
+        self._thread.join()
+
+    def close(self) -> None:
+        os.close(self._master)
+        os.close(self._slave)
+
+    def _drain(self) -> None:
+        # Throw away commands from the app so its writes never block.
+        try:
+            while os.read(self._master, 4096):
+                pass
+        except OSError as e:
+            pass
+
+    def _feed(self, start_ns: int, first_ns: int) -> None:
+        if not self.chunks:
+            return
+        for timestamp, chunk in self.chunks:
+            if real_time:
+                wait = start_ns + timestamp + self._wall_offset - first_ns - perf_counter_ns()
+                if wait > 0:
+                    thread_sleep(wait / 1E9)
+            view = memoryview(chunk)
+            while view:
+                self._drain()
+                try:
+                    view = view[os.write(self._master, view):]
+                except BlockingIOError as e:
+                    select([self._master], [self._master], [], .05)
+        self.done_ns = perf_counter_ns()
+
+
+def count_save(dev_name: str, stage: str, values: dict) -> None:
+    # Count data rows the devices write.
+    if stage == "disk":
+        saved_rows[0] += 1
+
+
+async def main() -> None:
+    if not capture_paths:
+        print("Set capture_paths to the captures to replay.")
+        return
+    ports = [ReplayPort(path) for path in capture_paths]
+    expected = sum([port.data_lines for port in ports])
+    model = AppModel(port_lister=lambda: [port.port_info() for port in ports])
+    model.start()
+    model.set_cams_active(False)
+    model.set_stage_hook(count_save)
+    views = 0
+    try:
+        while views < len(ports):
+            await wait_for(model.await_new_view(), connect_timeout)
+            while model.get_next_new_view()[0]:
+                views += 1
+    except TimeoutError as e:
+        print("Only " + str(views) + " of " + str(len(ports)) + " devices connected")
+    save_dir = tempfile.mkdtemp(prefix="rs_replay_")
+    model.signal_create_exp(save_dir, "replay", "")
+    model.signal_start_exp("replay")
+    await sleep(.5)  # Let the devices' start commands go out.
+
+    saved_rows[0] = 0
+    profiler = cProfile.Profile() if profile_path else None
+    if profiler:
+        profiler.enable()
+    cpu_start = process_time()
+    first = min([port.first_ns for port in ports if port.chunks], default=0)
+    start = perf_counter_ns()
+    for port in ports:
+        port.start(start, first)
+    deadline = start + drain_timeout * 1E9
+    while saved_rows[0] < expected and perf_counter_ns() < deadline:
+        await sleep(.01)
+    ingest_s = (perf_counter_ns() - start) / 1E9
+    cpu_s = process_time() - cpu_start
+    model.signal_stop_exp()
+    save_start = perf_counter_ns()
+    model.signal_end_exp()
+    await model.await_saved()
+    save_s = (perf_counter_ns() - save_start) / 1E9
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(profile_path)
+    await model.cleanup()
+    for port in ports:
+        port.join()
+        port.close()
+    rmtree(save_dir, ignore_errors=True)
+
+    feed_s = (max([port.done_ns for port in ports]) - start) / 1E9
+    print("Replayed " + str(len(ports)) + " captures, " + str(sum([port.bytes for port in ports])) + " bytes, " +
+          str(expected) + " data lines" + (" in real time" if real_time else " as fast as possible"))
+    print("Fed in {:.2f}s, saved {} of {} lines in {:.2f}s ({:.0f} lines/s, cpu {:.0f}%), experiment save {:.2f}s"
+          .format(feed_s, saved_rows[0], expected, ingest_s, saved_rows[0] / max(ingest_s, 1E-9),
+                  100 * cpu_s / max(ingest_s, 1E-9), save_s))
+    if profile_path:
+        print("Wrote " + profile_path)
+
+
+if __name__ == '__main__':
+    app = QApplication(sys.argv)
+    loop = QEventLoop(app)
+    set_event_loop(loop)
+    with loop:
+        loop.run_until_complete(main())
@@ -24,12 +24,16 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
+import os
 import logging
 from logging import ERROR
 from datetime import datetime
-from asyncio import create_task, sleep
+from tempfile import gettempdir
+from asyncio import create_task, sleep, get_running_loop
 from aioserial import AioSerial
-from RSCompanionAsync.Model.logging_queue import setup_logging_queue
+from RSCompanionAsync.Model.logging_queue import setup_logging_queue, stop_logging_queue
+from RSCompanionAsync.Model import rs_tracing
+from RSCompanionAsync.Model.rs_executors import ExecEnum, get_executor
 from PySide2.QtWidgets import QFileDialog
 from PySide2.QtGui import QKeyEvent, QDesktopServices
 from PySide2.QtCore import QSettings, QSize, QUrl, QDir
@@ -66,25 +70,25 @@ class AppController:
         self._settings.beginGroup("logging")
         if not self._settings.contains("level"):
             self._settings.setValue("level", ERROR)
-        log_level = self._settings.value('level')
+        log_level = int(self._settings.value('level'))
         self._settings.endGroup()
 
-        log_file = setup_log_file(self._strings[StringsEnum.LOG_OUT_NAME], self._strings[StringsEnum.PROG_OUT_HDR])
-        logging.basicConfig(filename=log_file, filemode='w', level=log_level, format=log_format)
-        self._logger = logging.getLogger(__name__)
-        self.log_output = OutputWindow(self._lang)
         self.formatter = logging.Formatter(log_format)
+        self.file_lh = setup_log_file(self._strings[StringsEnum.LOG_OUT_NAME],
+                                      self._strings[StringsEnum.PROG_OUT_HDR])
+        self.file_lh.setLevel(log_level)
+        self.file_lh.setFormatter(self.formatter)
+        self.log_output = OutputWindow(self._lang)
         self.app_lh = logging.StreamHandler(self.log_output)
         self.app_lh.setLevel(log_level)
         self.app_lh.setFormatter(self.formatter)
         self.stderr_lh = logging.StreamHandler()
         self.stderr_lh.setLevel(logging.WARNING)
         self.stderr_lh.setFormatter(self.formatter)
-        log_handlers = [self.app_lh]  # , self.stderr_lh]  # TODO: Remove self.stderr_lh from list for builds.
-        for h in log_handlers:
-            self._logger.addHandler(h)
+        handlers = [self.file_lh, self.app_lh]  # , self.stderr_lh]  # TODO: Remove self.stderr_lh from list for builds.
+        setup_logging_queue(handlers, log_level)
+        self._logger = logging.getLogger(__name__)
         self._logger.info(self._strings[StringsEnum.LOG_VER_ID] + str(version_number))
-        setup_logging_queue()
 
         self._logger.debug("Initializing")
 
@@ -97,23 +101,38 @@ class AppController:
         note_box_size = QSize(250, 120)
         drive_info_box_size = QSize(200, 120)
         mdi_area_min_size = QSize(1, 1)
-        self.main_window = AppMainWindow(ui_min_size, self._lang, log_handlers)
-        self.menu_bar = AppMenuBar(self.main_window, self._lang, log_handlers)
-        self.button_box = ButtonBox(self.main_window, button_box_size, self._lang, log_handlers)
-        self.layout_box = LayoutBox(self.main_window, layout_box_size, self._lang, log_handlers)
-        self.info_box = InfoBox(self.main_window, info_box_size, self._lang, log_handlers)
-        self.d_info_box = DriveInfoBox(self.main_window, drive_info_box_size, self._lang, log_handlers)
-        self.flag_box = FlagBox(self.main_window, flag_box_size, self._lang, log_handlers)
-        self.note_box = NoteBox(self.main_window, note_box_size, self._lang, log_handlers)
-        self.mdi_area = MDIArea(self.main_window, mdi_area_min_size, log_handlers)
+        self.main_window = AppMainWindow(ui_min_size, self._lang)
+        self.menu_bar = AppMenuBar(self.main_window, self._lang)
+        self.button_box = ButtonBox(self.main_window, button_box_size, self._lang)
+        self.layout_box = LayoutBox(self.main_window, layout_box_size, self._lang)
+        self.info_box = InfoBox(self.main_window, info_box_size, self._lang)
+        self.d_info_box = DriveInfoBox(self.main_window, drive_info_box_size, self._lang)
+        self.flag_box = FlagBox(self.main_window, flag_box_size, self._lang)
+        self.note_box = NoteBox(self.main_window, note_box_size, self._lang)
+        self.mdi_area = MDIArea(self.main_window, mdi_area_min_size)
         self._file_dialog = QFileDialog(self.main_window)
 
         if not self._settings.contains("cam_scanner/active"):
             self._settings.setValue("cam_scanner/active", "True")
+        if not self._settings.contains("serial_capture/active"):
+            self._settings.setValue("serial_capture/active", "False")
+        if not self._settings.contains("serial_io_process/active"):
+            self._settings.setValue("serial_io_process/active", "False")
+        if not self._settings.contains("graph/render"):
+            self._settings.setValue("graph/render", "blit")
+        if not self._settings.contains("tracing/active"):
+            self._settings.setValue("tracing/active", "False")
+        if not self._settings.contains("tracing/sample_every"):
+            self._settings.setValue("tracing/sample_every", 1)
+        if eval(self._settings.value("tracing/active")):
+            rs_tracing.enable(int(self._settings.value("tracing/sample_every")))
 
         # Model
-        self._model = AppModel(self._lang, log_handlers)
+        self._model = AppModel(self._lang)
         self._model.set_cams_active(eval(self._settings.value("cam_scanner/active")))
+        self._model.set_raw_capture(eval(self._settings.value("serial_capture/active")))
+        self._model.set_io_process(eval(self._settings.value("serial_io_process/active")))
+        self._model.set_graph_render(self._settings.value("graph/render"))
 
         self._save_file_name = str()
         self._save_dir = str()
@@ -219,6 +238,9 @@ class AppController:
             while ret:
                 self.mdi_area.add_window(view)
                 ret, view = self._model.get_next_new_view()
+            for dev_type, names in self._model.get_presets().items():
+                for name in names:
+                    self.menu_bar.add_preset_action(dev_type, name)
 
     async def remove_device_view_handler(self) -> None:
         """
@@ -241,6 +263,32 @@ class AppController:
             await self._model.await_dev_con_err()
             self.main_window.show_help_window("Error", self._strings[StringsEnum.DEV_CON_ERR])
 
+    def preset_handler(self, dev_type: str, name: str) -> None:
+        """
+        Handler for the preset menu. Applies a preset to every device of a type.
+        :param dev_type: The device type.
+        :param name: The preset name.
+        :return None:
+        """
+        self._logger.debug("running")
+        create_task(self._apply_preset(dev_type, name))
+        self._logger.debug("done")
+
+    async def _apply_preset(self, dev_type: str, name: str) -> None:
+        """
+        Apply a preset to every device of a type and tell the user which devices were slow or failed to confirm it.
+        :param dev_type: The device type.
+        :param name: The preset name.
+        :return None:
+        """
+        self._logger.debug("running")
+        result = await self._model.apply_preset(dev_type, name)
+        if result["stragglers"]:
+            self.main_window.show_help_window(self._strings[StringsEnum.PRESET_HDR],
+                                              self._strings[StringsEnum.PRESET_STRAGGLERS]
+                                              + ", ".join(result["stragglers"]))
+        self._logger.debug("done")
+
     def post_handler(self) -> None:
         """
         Handler for post button.
@@ -540,6 +588,7 @@ class AppController:
         # Settings menu
         self.menu_bar.add_lang_select_handler(self.language_change_handler)
         self.menu_bar.add_debug_select_handler(self.debug_change_handler)
+        self.menu_bar.add_preset_select_handler(self.preset_handler)
         # self.menu_bar.add_window_layout_handler(self.window_layout_handler)
 
         # Help menu
@@ -593,6 +642,20 @@ class AppController:
         create_task(self._cleanup())
         self._logger.debug("done")
 
+    async def _export_trace(self) -> None:
+        """
+        Write the spans timed this session to a Chrome trace file next to the log file.
+        :return None:
+        """
+        path = os.path.join(gettempdir(), "RSCompanion_trace_" + format_current_time(datetime.now(), save=True)
+                            + ".json")
+        try:
+            count = await get_running_loop().run_in_executor(get_executor(ExecEnum.STORAGE),
+                                                             rs_tracing.export_chrome_trace, path)
+            self._logger.info("Wrote " + str(count) + " trace spans to " + path)
+        except OSError as e:
+            self._logger.warning("Could not write trace file " + path)
+
     async def _cleanup(self) -> None:
         """
         Cleanup any code that would cause problems for shutdown and prep for app closure.
@@ -604,7 +667,10 @@ class AppController:
         await self._model.cleanup()
         if self._drive_updater_task:
             self._drive_updater_task.cancel()
+        if rs_tracing.is_enabled():
+            await self._export_trace()
         self.log_output.close()
         self.main_window.set_close_override(True)
         self._logger.debug("done")
         self.main_window.close()
+        stop_logging_queue()
@@ -25,6 +25,7 @@ https://redscientific.com/index.html
 
 from abc import ABC, abstractmethod
 from asyncio import Event, futures
+from typing import Callable
 from RSCompanionAsync.Model.app_defs import LangEnum
 from aioserial import AioSerial
 from RSCompanionAsync.Devices.AbstractDevice.View.abstract_view import AbstractView
@@ -110,6 +111,62 @@ class AbstractController(ABC):
         """
         pass
 
+    def get_presets(self) -> [str]:
+        """
+        :return [str]: The names of the presets this device can apply.
+        """
+        return list()
+
+    async def apply_preset(self, name: str) -> bool:
+        """
+        Logic for if this device has presets.
+        :param name: The preset name.
+        :return bool: Whether the device confirmed every setting in the preset.
+        """
+        return False
+
+    def set_raw_capture(self, path: str = None) -> None:
+        """
+        Logic for if this device can record its raw input for replay.
+        :param path: The dir to write the capture in, None to stop recording.
+        :return None:
+        """
+        pass
+
+    def set_link_lost_handler(self, func: classmethod) -> None:
+        """
+        Logic for if this device can tell when the link to it is lost.
+        :param func: Called with the device's port when the link is lost.
+        :return None:
+        """
+        pass
+
+    def set_stage_hook(self, func: Callable[[str, str, dict], None] = None) -> None:
+        """
+        Logic for if this device's data can be timed through the app.
+        :param func: Called with the device's name, the stage and the data's values as the data passes each stage.
+        :return None:
+        """
+        pass
+
+    def set_frame_hook(self, func: Callable[[str, int], None] = None, render_hidden: bool = False) -> None:
+        """
+        Logic for if this device has a graph whose renders can be timed.
+        :param func: Called with the device's name and the perf_counter_ns a render took its data at once it is shown.
+        :param render_hidden: Render even while the graph can't be seen.
+        :return None:
+        """
+        pass
+
+    def set_graph_render(self, mode: str) -> None:
+        """
+        Logic for if this device has a graph that can be drawn in more than one way.
+        :param mode: "blit" to draw on the event loop, "offscreen" to draw in a worker thread, "pyqtgraph" to use the
+        pyqtgraph backend if it is installed.
+        :return None:
+        """
+        pass
+
     def update_keyflag(self, flag: str) -> None:
         """
         Logic for if this device needs to know about keflag updates.
@@ -26,44 +26,103 @@ https://redscientific.com/index.html
 
 import numpy as np
 from abc import ABCMeta, ABC, abstractmethod
-from asyncio import create_task, sleep
-from logging import getLogger, StreamHandler
-from datetime import datetime
+from asyncio import create_task, get_running_loop
+from logging import getLogger
+from datetime import datetime, timezone
+from math import isclose
+from time import perf_counter_ns
+from typing import Callable
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as Canvas
+from matplotlib.backends.backend_agg import RendererAgg
 from matplotlib.figure import Figure
+from matplotlib.dates import date2num
+from PySide2.QtCore import Qt
+from PySide2.QtGui import QImage, QPainter
+from RSCompanionAsync.Model.rs_executors import ExecEnum, get_executor
+from RSCompanionAsync.Model.rs_tracing import span
 from RSCompanionAsync.Devices.AbstractDevice.Resources.abstract_strings import strings, LangEnum
+from RSCompanionAsync.Devices.AbstractDevice.View.render_scheduler import RenderScheduler
 
+x_window = 120.0       # Width of the time window shown, in seconds.
+x_margin = 10.0        # Seconds kept between the data and the window edges.
+y_headroom = .1        # Fraction of the data range added when a y axis has to grow.
+graph_capacity = 4096  # Points a graph keeps, well over a time window of either device's data.
+history_min = x_window / 8  # Narrowest window the user can zoom to, in seconds.
+history_max = x_window * 8  # Widest window the user can zoom to, in seconds.
+_epoch_date_num = date2num(datetime(1970, 1, 1, tzinfo=timezone.utc))
 
-class AbstractMeta(ABCMeta, type(Canvas)):
-    pass
 
+def to_date_num(seconds):
+    """
+    :param seconds: Epoch seconds, a float or a numpy array of them.
+    :return: The matching matplotlib date numbers.
+    """
+    return seconds / 86400 + _epoch_date_num
 
-class BaseGraph(Canvas, ABC, metaclass=AbstractMeta):
-    """ Generic device data graphing class. """
-    def __init__(self, parent=None, log_handlers: [StreamHandler] = None):
-        self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
-        self._logger.debug("Initializing")
-        super().__init__(Figure(figsize=(5, 5)))
+
+def _local_tz():
+    """
+    :return tzinfo: This machine's current time zone, for showing times on the x axes.
+    """
+    return datetime.now().astimezone().tzinfo
+
+
+def next_x_page(page: (float, float), first: float, last: float, overview: bool) -> (float, float):
+    """
+    Work out where the time window goes. The window only moves when the newest data reaches its right edge, then jumps
+    half a window past it. In overview mode the window starts at the oldest data and grows by a quarter instead.
+    :param page: (left, right) of the current window in epoch seconds, None if there is none yet.
+    :param first: The oldest x value in epoch seconds.
+    :param last: The newest x value in epoch seconds.
+    :param overview: Whether the whole session is shown.
+    :return (float, float): The new (left, right), None if the window stays.
+    """
+    if last is None or (page and last <= page[1] - x_margin):
+        return None
+    left = first - x_margin
+    width = x_window
+    if overview:
+        width = max(1.25 * (last - left) + x_margin, x_window)
+    elif page or last > left + x_window - x_margin:
+        left = last + x_window / 2 - x_window
+    return left, left + width
+
+
+def move_window(history: (float, float), page: (float, float), pages: float, zoom: float) -> (float, float):
+    """
+    Work out where the window goes when the user pans or zooms it. The window is clamped to the paged window's right
+    edge, and panning forward from there or zooming back to its width gives the graph back to paging.
+    :param history: (left, right) the user moved the window to in epoch seconds, None if it is following the data.
+    :param page: (left, right) of the paged window in epoch seconds.
+    :param pages: Window widths to pan by, negative for older data.
+    :param zoom: Factor to scale the window width by, about its centre.
+    :return (float, float): The new (left, right), None to follow the newest data again.
+    """
+    left, right = history or page
+    width = min(max((right - left) * zoom, history_min), history_max)
+    right = min((left + right) / 2 + pages * (right - left) + width / 2, page[1])
+    if right == page[1] and (pages > 0 or isclose(width, page[1] - page[0])):
+        return None
+    return right - width, right
+
+
+class GraphWindow:
+    """
+    The time window, overview mode and render scheduling shared by BaseGraph and the pyqtgraph FastGraph. Put first in
+    the bases. The graph must have render, which the RenderScheduler runs.
+    """
+    def _init_window(self) -> None:
         self._new = True
         self._plots = list()  # name, coords, active
-        self._v_lines = list()
         self._base_strings = dict()
-        self._logger.debug("Initialized")
-
-    def refresh_self(self) -> None:
-        """
-        Redraw this canvas. Good for when making changes to the graph.
-        :return None:
-        """
-        self._logger.debug("running")
-        try:
-            self.figure.canvas.draw()
-        except Exception as e:
-            self._logger.exception("issue with drawing canvas.")
-        self._logger.debug("done")
+        self._x_page = None  # (left, right) of the time window in epoch seconds.
+        self._history = None  # (left, right) the user panned or zoomed to, None while following the data.
+        self._shown_page = None  # (left, right) the x axis is set to.
+        self._overview = False
+        self._layout_changed = True
+        self._frame_hook = None
+        self._render_hidden = False
+        self._scheduler = RenderScheduler(self.render, self._can_be_seen)
 
     def set_lang(self, lang: LangEnum) -> None:
         """
@@ -84,70 +143,67 @@ class BaseGraph(Canvas, ABC, metaclass=AbstractMeta):
     def get_new(self):
         return self._new
 
-    @abstractmethod
-    async def plot_device_data(self, axes, name) -> []:
+    def set_overview(self, is_overview: bool) -> None:
         """
-        How this specific device should plot its data.
-        :param axes: The current graph.
-        :param name: A given plot_name as passed in at initialization.
-        :return list: A list of graph lines.
+        Show the whole session or the newest data.
+        :param is_overview: Whether to show the whole session.
+        :return None:
         """
-        pass
+        self._logger.debug("running")
+        self._overview = is_overview
+        self._x_page = None
+        self._history = None
+        self._scheduler.request()
+        self._logger.debug("done")
 
-    async def plot(self, new=False) -> None:
+    def get_overview(self) -> bool:
+        return self._overview
+
+    def set_history(self, window: (float, float)) -> None:
         """
-        Reset all subplots to empty then call subclass's plot function for each subplot
+        Show a time window chosen by the user instead of following the newest data.
+        :param window: (left, right) in epoch seconds, None to follow the newest data.
+        :return None:
+        """
+        self._history = window
+        self._scheduler.request()
+
+    def get_history(self) -> (float, float):
+        """
+        :return (float, float): (left, right) the user moved the window to in epoch seconds, None if following the
+        newest data.
+        """
+        return self._history
+
+    def plot(self, new=False) -> None:
+        """
+        Ask for the current data to be shown.
         :param new: Whether this graph has any data in it or not.
         :return None:
         """
-        self._logger.debug("running")
-        self.figure.clear()
-        self.figure.set_tight_layout(True)
-        num_plots = len(self._plots)
-        axes = None
-        for i in range(num_plots):
-            plot = self._plots[i]
-            name = plot[0]
-            active = plot[2]
-            if active:
-                if i == 0:
-                    axes = self.figure.add_subplot(1, 1, 1)
-                    axes.tick_params(axis='x', labelrotation=30)
-                    axes.set_ylabel(name, color='#1f77b4')
-                    await sleep(.001)
-                    if not new:
-                        await create_task(self.plot_device_data(axes, name))
-                else:
-                    alt_axes = axes.twinx()
-                    alt_axes.set_ylabel(name, color='#ff7f0e')
-                    alt_axes.tick_params(axis='y', labelcolor='#ff7f0e')
-                    alt_axes.set_yticks(np.arange(0, 6, step=1))
-                    await sleep(.001)
-                    if not new:
-                        await create_task(self.plot_device_data(alt_axes, name))
-
-        if not new:
-            self.add_vert_lines()
-        await sleep(.001)
-        self.figure.canvas.draw()
-        self._logger.debug("done")
+        if new:
+            self._x_page = None
+            self._history = None
+        self._scheduler.request()
 
-    def add_vert_lines(self, timestamp: datetime = None) -> None:
+    def get_render_stats(self) -> dict:
         """
-        Add vertical lines at given timestamp to this graph.
-        :param timestamp: The x value to add vertical lines at.
+        :return dict: The render scheduler's stats, see RenderScheduler.get_stats, with the graph's own draw counts.
+        """
+        stats = self._scheduler.get_stats()
+        stats.update(self._draw_counts)
+        return stats
+
+    def set_frame_hook(self, func: Callable[[int], None] = None, render_hidden: bool = False) -> None:
+        """
+        Set the function called once a render is on screen, for timing data to the screen.
+        :param func: Called with the perf_counter_ns the render took its data at. None to stop.
+        :param render_hidden: Render even while the graph can't be seen, for timing without a screen.
         :return None:
         """
-        self._logger.debug("running")
-        for axes in self.figure.get_axes():
-            if timestamp:
-                self._vlines.append(timestamp)
-                axes.axvline(timestamp)
-                self.refresh_self()
-            else:
-                for line in self._v_lines:
-                    axes.axvline(line)
-        self._logger.debug("done")
+        self._frame_hook = func
+        self._render_hidden = render_hidden
+        self._scheduler.request()
 
     def set_subplots(self, names: [str]) -> None:
         """
@@ -155,18 +211,372 @@ class BaseGraph(Canvas, ABC, metaclass=AbstractMeta):
         :param names: The names for the subplots. (Generally the same as the names of the y axes)
         :return None:
         """
-        self._plots = list()
         self._logger.debug("running")
-        if len(names) < 1:
+        self._plots = list()
+        self._layout_changed = True
+        for i in range(len(names)):
+            self._plots.append((names[i], (len(names), 1, i + 1), True))
+        self._logger.debug("done")
+
+    def mouseDoubleClickEvent(self, event):
+        self.set_overview(not self._overview)
+
+    def wheelEvent(self, event):
+        steps = event.angleDelta().y() / 120
+        if self._overview or not self._x_page or not steps:
             return
-        r = len(names)
-        c = 1
-        for i in range(0, r):
-            self._plots.append((names[i], (r, c, i + 1), True))
+        if event.modifiers() & Qt.ControlModifier:
+            self.set_history(move_window(self._history, self._x_page, 0, .8 ** steps))
+        else:
+            self.set_history(move_window(self._history, self._x_page, -steps / 4, 1))
+
+    def _can_be_seen(self) -> bool:
+        """
+        :return bool: Whether any of this graph is on screen, False while its window is minimized or hidden.
+        """
+        return self._render_hidden or (self.isVisible() and not self.visibleRegion().isEmpty())
+
+    def _frame_shown(self, data_ns: int) -> None:
+        """
+        Tell the frame hook a render is on screen.
+        :param data_ns: perf_counter_ns when the render took its data.
+        :return None:
+        """
+        if self._frame_hook:
+            self._frame_hook(data_ns)
+
+
+class AbstractMeta(ABCMeta, type(Canvas)):
+    pass
+
+
+class BaseGraph(GraphWindow, Canvas, ABC, metaclass=AbstractMeta):
+    """
+    Generic device data graphing class.
+    Axes and device artists are made once per layout and new data goes into the artists with set_data. The artists are
+    animated, so an update only restores the cached background, draws them and blits. The whole figure is drawn again
+    only when the layout, the language, the axis limits or the size change. The time window moves in pages so its
+    limits change about once a minute instead of with every point.
+    Times are float epoch seconds. Devices keep their points in fixed size SeriesBuffers, so memory and draw cost do not
+    grow with the session.
+    Renders are requested with plot and run by a RenderScheduler, which coalesces them and caps the frame rate.
+    In overview mode, see set_overview and a double click, the graph shows the whole session instead of a time window,
+    from OverviewSeries the devices keep along with their SeriesBuffers.
+    The mouse wheel pans the window back in time and with ctrl held zooms it, see set_history. Devices show data older
+    than their SeriesBuffers from the experiment's ScrollbackStore, loading only the shown slice.
+    In off screen mode, see set_offscreen, the whole figure is drawn by an Agg renderer on the RENDER executor instead
+    and the widget only paints the finished frame. The event loop then only updates artist data, and the figure is not
+    touched by it while a frame is being drawn.
+    """
+    def __init__(self, parent=None):
+        self._logger = getLogger(__name__)
+        self._logger.debug("Initializing")
+        super().__init__(Figure(figsize=(5, 5)))
+        self.figure.set_tight_layout(True)
+        self._init_window()
+        self._v_lines = list()
+        self._axes = list()  # One per active subplot, the first is the main axes and the rest are twins of it.
+        self._artists = list()  # Animated device artists.
+        self._background = None  # The figure without the device artists.
+        self._draw_counts = {"full_draws": 0, "blits": 0, "frames": 0, "frame_ms_max": 0.0}
+        self._offscreen = False
+        self._use_offscreen = False
+        self._frame = None  # (rgba bytes, width, height) of the last off screen frame.
+        self._frame_task = None
+        self._frame_pending = False
+        self.mpl_connect("draw_event", self._on_draw)
+        self._logger.debug("Initialized")
+
+    def refresh_self(self) -> None:
+        """
+        Redraw this canvas. Good for when making changes to the graph.
+        :return None:
+        """
+        self._logger.debug("running")
+        try:
+            self.draw()
+        except Exception as e:
+            self._logger.exception("issue with drawing canvas.")
         self._logger.debug("done")
 
+    @abstractmethod
+    def make_device_artists(self, axes, name) -> []:
+        """
+        Make this device's artists for one subplot, without data.
+        :param axes: The subplot's axes.
+        :param name: A given plot_name as passed in at initialization.
+        :return list: The artists.
+        """
+        pass
+
+    @abstractmethod
+    def update_device_artists(self) -> (float, float, bool):
+        """
+        Put the current data in this device's artists with set_data, x values as to_date_num of the epoch seconds. In
+        overview mode the data is the device's OverviewSeries instead of its SeriesBuffer, and in a history window
+        older than the SeriesBuffer it is that window's slice of the device's ScrollbackStore.
+        :return (float, float, bool): The oldest and newest x values in epoch seconds, None if there is no data, and
+        whether any y limits changed.
+        """
+        pass
+
+    def render(self) -> None:
+        """
+        Show the current data, drawing the whole figure only if more than the data changed.
+        :return None:
+        """
+        with span("graph.render"):
+            if self._frame_task:  # The figure is being drawn off screen, render again once it is done.
+                self._frame_pending = True
+            else:
+                data_ns = perf_counter_ns()
+                if self._offscreen != self._use_offscreen:
+                    self._switch_mode()
+                full = self._layout_changed
+                if self._layout_changed:
+                    self._build()
+                    self._layout_changed = False
+                first, last, rescaled = self.update_device_artists()
+                full = self._page_x(first, last) or rescaled or full
+                if self._offscreen:
+                    self._fit_figure()
+                    self._frame_task = create_task(self._draw_frame(data_ns))
+                else:
+                    if full or self._background is None:
+                        self._draw_counts["full_draws"] += 1
+                        self.refresh_self()
+                    else:
+                        self._draw_counts["blits"] += 1
+                        self._blit()
+                    self._frame_shown(data_ns)
+
+    def set_offscreen(self, is_offscreen: bool) -> None:
+        """
+        Set whether this graph is drawn off the event loop. Takes effect from the next render.
+        :param is_offscreen: Whether to draw the figure in a worker thread and only paint the result.
+        :return None:
+        """
+        self._use_offscreen = is_offscreen
+        self._scheduler.request()
+
+    def log_render_stats(self, name: str) -> None:
+        """
+        Log how this graph has been rendering.
+        :param name: The device name.
+        :return None:
+        """
+        self._logger.info("Device {} graph: {renders} renders for {requests} requests ({coalesced} coalesced, "
+                          "{hidden_skips} skipped while hidden), {full_draws} full draws, {blits} blits, {frames} off "
+                          "screen frames (max {frame_ms_max:.1f}ms), render mean {render_ms_mean:.1f}ms max "
+                          "{render_ms_max:.1f}ms".format(name, **self.get_render_stats()))
+
+    def cleanup(self) -> None:
+        """
+        Stop rendering.
+        :return None:
+        """
+        self._scheduler.cleanup()
+        if self._frame_task:
+            self._frame_task.cancel()
+
+    def add_vert_lines(self, timestamp: float = None) -> None:
+        """
+        Add vertical lines at given timestamp to this graph.
+        :param timestamp: The x value to add vertical lines at, in epoch seconds.
+        :return None:
+        """
+        self._logger.debug("running")
+        if timestamp and self._offscreen:  # Only touch the figure between frames.
+            self._v_lines.append(timestamp)
+            self._layout_changed = True
+            self._scheduler.request()
+        elif timestamp:
+            self._v_lines.append(timestamp)
+            for axes in self._axes:
+                axes.axvline(to_date_num(timestamp))
+            self.refresh_self()
+        else:
+            for axes in self._axes:
+                for line in self._v_lines:
+                    axes.axvline(to_date_num(line))
+        self._logger.debug("done")
+
+    @staticmethod
+    def fit_y(axes, low: float, high: float) -> bool:
+        """
+        Grow the y limits of axes to hold low to high.
+        :param axes: The axes.
+        :param low: The lowest y value.
+        :param high: The highest y value.
+        :return bool: Whether the limits changed.
+        """
+        bottom, top = axes.get_ylim()
+        if bottom <= low and high <= top:
+            return False
+        pad = max(high - low, 1) * y_headroom
+        axes.set_ylim(min(bottom, low - pad), max(top, high + pad))
+        return True
+
+    def draw(self):
+        if self._offscreen:  # Anything asking for a draw gets the next frame.
+            self._scheduler.request()
+        else:
+            Canvas.draw(self)
+
+    def showEvent(self, event):
+        Canvas.showEvent(self, event)
+        self._scheduler.shown()
+
     def resizeEvent(self, event):
+        if self._offscreen:  # The figure is sized to the widget before each frame.
+            self._scheduler.request()
+            return
         try:
             Canvas.resizeEvent(self, event)
         except ValueError as e:
             pass
+
+    def paintEvent(self, event):
+        if not self._offscreen:
+            Canvas.paintEvent(self, event)
+        elif self._frame:
+            with span("graph.paint_frame"):
+                data, width, height = self._frame
+                image = QImage(data, width, height, QImage.Format_RGBA8888)
+                image.setDevicePixelRatio(self.device_pixel_ratio)
+                painter = QPainter(self)
+                painter.eraseRect(self.rect())
+                painter.drawImage(0, 0, image)
+                painter.end()
+
+    def _build(self) -> None:
+        """
+        Make the axes and device artists for the current subplots.
+        :return None:
+        """
+        self._logger.debug("running")
+        self.figure.clear()
+        self._axes = list()
+        self._artists = list()
+        self._background = None
+        for name, coords, active in self._plots:
+            if not active:
+                continue
+            if not self._axes:
+                axes = self.figure.add_subplot(1, 1, 1)
+                axes.tick_params(axis='x', labelrotation=30)
+                axes.set_ylabel(name, color='#1f77b4')
+            else:
+                axes = self._axes[0].twinx()
+                axes.set_ylabel(name, color='#ff7f0e')
+                axes.tick_params(axis='y', labelcolor='#ff7f0e')
+                axes.set_yticks(np.arange(0, 6, step=1))
+            axes.xaxis_date(tz=_local_tz())
+            self._axes.append(axes)
+            for artist in self.make_device_artists(axes, name):
+                artist.set_animated(not self._offscreen)
+                self._artists.append(artist)
+        self.add_vert_lines()
+        self._shown_page = self._history or self._x_page
+        if self._shown_page and self._axes:
+            self._axes[0].set_xlim(*to_date_num(np.array(self._shown_page)))
+        self._logger.debug("done")
+
+    def _page_x(self, first: float, last: float) -> bool:
+        """
+        Move the time window if the newest data is at its right edge, or to the window the user chose.
+        :param first: The oldest x value in epoch seconds.
+        :param last: The newest x value in epoch seconds.
+        :return bool: Whether the x axis moved.
+        """
+        page = next_x_page(self._x_page, first, last, self._overview)
+        if page:
+            self._x_page = page
+        shown = self._history or self._x_page
+        if not shown or shown == self._shown_page or not self._axes:
+            return False
+        self._shown_page = shown
+        self._axes[0].set_xlim(*to_date_num(np.array(shown)))
+        return True
+
+    def _on_draw(self, event) -> None:
+        """
+        Keep the newly drawn figure as the background and draw the device artists over it.
+        :param event: The matplotlib draw event.
+        :return None:
+        """
+        if self._offscreen:  # Off screen frames already have the artists in them.
+            return
+        self._background = self.copy_from_bbox(self.figure.bbox)
+        self._draw_artists()
+
+    def _switch_mode(self) -> None:
+        """
+        Change between drawing on the event loop and off screen. Only called between frames.
+        :return None:
+        """
+        self._logger.debug("running")
+        self._offscreen = self._use_offscreen
+        self._layout_changed = True  # Off screen artists are not animated.
+        self._background = None
+        self._frame = None
+        self._fit_figure()
+        self._logger.debug("done")
+
+    def _fit_figure(self) -> None:
+        """
+        Size the figure to this widget.
+        :return None:
+        """
+        ratio = self.device_pixel_ratio
+        dpi = self.figure.dpi
+        width, height = max(self.width(), 1) * ratio / dpi, max(self.height(), 1) * ratio / dpi
+        if tuple(self.figure.get_size_inches()) != (width, height):
+            self.figure.set_size_inches(width, height, forward=False)
+
+    async def _draw_frame(self, data_ns: int) -> None:
+        """
+        Draw the figure on the RENDER executor and paint the result.
+        :param data_ns: perf_counter_ns when the render took the data drawn.
+        :return None:
+        """
+        try:
+            start = perf_counter_ns()
+            self._frame = await get_running_loop().run_in_executor(get_executor(ExecEnum.RENDER), self._rasterize)
+            ms = (perf_counter_ns() - start) / 1E6
+            self._draw_counts["frames"] += 1
+            self._draw_counts["frame_ms_max"] = max(self._draw_counts["frame_ms_max"], ms)
+            self.update()
+            self._frame_shown(data_ns)
+        except Exception as e:
+            self._logger.exception("issue with drawing frame.")
+        finally:
+            self._frame_task = None
+        if self._frame_pending:
+            self._frame_pending = False
+            self._scheduler.request()
+
+    def _rasterize(self) -> (bytes, int, int):
+        """
+        Draw the whole figure with a new Agg renderer. Runs in a worker thread.
+        :return (bytes, int, int): The RGBA pixels, width and height.
+        """
+        with span("graph.rasterize"):
+            width, height = (int(x) for x in self.figure.bbox.size)
+            renderer = RendererAgg(width, height, self.figure.dpi)
+            self.figure.draw(renderer)
+            return bytes(renderer.buffer_rgba()), width, height
+
+    def _blit(self) -> None:
+        """
+        Draw only the device artists over the cached background.
+        :return None:
+        """
+        self.restore_region(self._background)
+        self._draw_artists()
+        self.blit(self.figure.bbox)
+
+    def _draw_artists(self) -> None:
+        for artist in self._artists:
+            self.figure.draw_artist(artist)
+
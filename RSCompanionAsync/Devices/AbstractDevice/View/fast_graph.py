@@ -0,0 +1,200 @@
+"""
+Licensed under GNU GPL-3.0-or-later
+
+This file is part of RS Companion.
+
+RS Companion is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+RS Companion is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with RS Companion.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Phillip Riskin
+Date: 2020
+Project: Companion App
+Company: Red Scientific
+https://redscientific.com/index.html
+"""
+
+import pyqtgraph as pg
+from abc import ABCMeta, ABC, abstractmethod
+from logging import getLogger
+from time import perf_counter_ns
+from RSCompanionAsync.Model.rs_tracing import span
+from RSCompanionAsync.Devices.AbstractDevice.View.base_graph import GraphWindow, next_x_page, y_headroom
+
+"""
+The pyqtgraph graph backend, for the "pyqtgraph" graph/render setting. pyqtgraph is optional, import this module only
+when that backend is wanted.
+"""
+
+main_color = '#1f77b4'
+second_color = '#ff7f0e'
+
+
+class AbstractMeta(ABCMeta, type(pg.GraphicsLayoutWidget)):
+    pass
+
+
+class FastGraph(GraphWindow, pg.GraphicsLayoutWidget, ABC, metaclass=AbstractMeta):
+    """
+    Generic device data graphing class drawn with pyqtgraph, with the same interface as BaseGraph.
+    Each subplot is its own row with the x axes linked, as pyqtgraph has no twin axes. Items are made once per layout
+    and updated with setData, and Qt repaints only the items that changed. x values are epoch seconds, shown by a
+    DateAxisItem. pyqtgraph's own mouse panning and zooming is off, the wheel moves the window as in BaseGraph.
+    The time window, overview mode and render scheduling come from GraphWindow, as in BaseGraph.
+    """
+    def __init__(self, parent=None):
+        self._logger = getLogger(__name__)
+        self._logger.debug("Initializing")
+        super().__init__(parent)
+        self.setBackground('w')
+        self._init_window()
+        self._v_lines = list()
+        self._plot_items = list()  # One per active subplot, the first holds the shared x axis range.
+        self._draw_counts = {"layouts": 0, "updates": 0}
+        self._logger.debug("Initialized")
+
+    def refresh_self(self) -> None:
+        """
+        Repaint this graph.
+        :return None:
+        """
+        self.update()
+
+    def set_offscreen(self, is_offscreen: bool) -> None:
+        """ pyqtgraph items paint themselves, there is no figure to draw off screen. """
+        pass
+
+    @abstractmethod
+    def make_device_artists(self, plot_item, name) -> []:
+        """
+        Make this device's items for one subplot, without data.
+        :param plot_item: The subplot's pg.PlotItem.
+        :param name: A given plot_name as passed in at initialization.
+        :return list: The items.
+        """
+        pass
+
+    @abstractmethod
+    def update_device_artists(self) -> (float, float, bool):
+        """
+        Put the current data in this device's items with setData, x values in epoch seconds. In overview mode the data
+        is the device's OverviewSeries instead of its SeriesBuffer, and in a history window older than the SeriesBuffer
+        it is that window's slice of the device's ScrollbackStore.
+        :return (float, float, bool): The oldest and newest x values in epoch seconds, None if there is no data, and
+        whether any y limits changed.
+        """
+        pass
+
+    def render(self) -> None:
+        """
+        Show the current data.
+        :return None:
+        """
+        with span("graph.render"):
+            data_ns = perf_counter_ns()
+            if self._layout_changed:
+                self._build()
+                self._layout_changed = False
+                self._draw_counts["layouts"] += 1
+            first, last, rescaled = self.update_device_artists()
+            page = next_x_page(self._x_page, first, last, self._overview)
+            if page:
+                self._x_page = page
+            shown = self._history or self._x_page
+            if shown and shown != self._shown_page and self._plot_items:
+                self._shown_page = shown
+                self._plot_items[0].setXRange(*shown, padding=0)
+            self._draw_counts["updates"] += 1
+            self._frame_shown(data_ns)
+
+    def log_render_stats(self, name: str) -> None:
+        """
+        Log how this graph has been rendering.
+        :param name: The device name.
+        :return None:
+        """
+        self._logger.info("Device {} graph: {renders} renders for {requests} requests ({coalesced} coalesced, "
+                          "{hidden_skips} skipped while hidden), {layouts} layouts, render mean {render_ms_mean:.1f}ms "
+                          "max {render_ms_max:.1f}ms".format(name, **self.get_render_stats()))
+
+    def cleanup(self) -> None:
+        """
+        Stop rendering.
+        :return None:
+        """
+        self._scheduler.cleanup()
+
+    def add_vert_lines(self, timestamp: float = None) -> None:
+        """
+        Add vertical lines at given timestamp to this graph.
+        :param timestamp: The x value to add vertical lines at, in epoch seconds.
+        :return None:
+        """
+        self._logger.debug("running")
+        if timestamp:
+            self._v_lines.append(timestamp)
+            lines = [timestamp]
+        else:
+            lines = self._v_lines
+        for plot_item in self._plot_items:
+            for line in lines:
+                plot_item.addItem(pg.InfiniteLine(line, angle=90, pen=pg.mkPen(main_color)))
+        self._logger.debug("done")
+
+    @staticmethod
+    def fit_y(plot_item, low: float, high: float) -> bool:
+        """
+        Grow the y range of plot_item to hold low to high.
+        :param plot_item: The subplot.
+        :param low: The lowest y value.
+        :param high: The highest y value.
+        :return bool: Whether the range changed.
+        """
+        bottom, top = plot_item.getViewBox().viewRange()[1]
+        if bottom <= low and high <= top:
+            return False
+        pad = max(high - low, 1) * y_headroom
+        plot_item.setYRange(min(bottom, low - pad), max(top, high + pad), padding=0)
+        return True
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._scheduler.shown()
+
+    def _build(self) -> None:
+        """
+        Make the subplots and device items for the current subplots.
+        :return None:
+        """
+        self._logger.debug("running")
+        self.clear()
+        self._plot_items = list()
+        for name, coords, active in self._plots:
+            if not active:
+                continue
+            plot_item = self.addPlot(row=len(self._plot_items), col=0,
+                                     axisItems={'bottom': pg.DateAxisItem(orientation='bottom')})
+            plot_item.setMouseEnabled(x=False, y=False)
+            plot_item.hideButtons()
+            plot_item.disableAutoRange()
+            plot_item.setYRange(0, 1, padding=0)
+            color = main_color if not self._plot_items else second_color
+            plot_item.setLabel('left', name, color=color)
+            if self._plot_items:
+                plot_item.setXLink(self._plot_items[0])
+            self._plot_items.append(plot_item)
+            self.make_device_artists(plot_item, name)
+        self.add_vert_lines()
+        self._shown_page = self._history or self._x_page
+        if self._shown_page and self._plot_items:
+            self._plot_items[0].setXRange(*self._shown_page, padding=0)
+        self._logger.debug("done")
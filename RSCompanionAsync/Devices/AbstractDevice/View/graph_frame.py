@@ -23,18 +23,15 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
-from logging import getLogger, StreamHandler
+from logging import getLogger
 from RSCompanionAsync.Devices.AbstractDevice.View.base_graph import BaseGraph
 from PySide2.QtWidgets import QFrame, QVBoxLayout, QSizePolicy
 
 
 class GraphFrame(QFrame):
     """ This code is to contain and properly size graph widgets. """
-    def __init__(self, parent=None, graph: BaseGraph = None, log_handlers: [StreamHandler] = None):
+    def __init__(self, parent=None, graph: BaseGraph = None):
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
         super().__init__(parent)
         size_policy = QSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.Fixed)
@@ -62,3 +59,17 @@ class GraphFrame(QFrame):
 
     def get_graph(self):
         return self._graph
+
+    def set_graph(self, graph) -> None:
+        """
+        Show a different graph in place of the current one.
+        :param graph: The new graph, a BaseGraph or FastGraph.
+        :return None:
+        """
+        self._logger.debug("running")
+        if self._graph:
+            self.layout().removeWidget(self._graph)
+            self._graph.deleteLater()
+        self._graph = graph
+        self.layout().addWidget(self._graph)
+        self._logger.debug("done")
@@ -0,0 +1,165 @@
+"""
+Licensed under GNU GPL-3.0-or-later
+
+This file is part of RS Companion.
+
+RS Companion is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+RS Companion is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with RS Companion.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Phillip Riskin
+Date: 2020
+Project: Companion App
+Company: Red Scientific
+https://redscientific.com/index.html
+"""
+
+import numpy as np
+from math import isnan
+
+overview_points = 1000  # Most points an overview keeps for its drawn level.
+overview_chunk = 64     # Points a level gives the next level per 2 * overview_chunk points it gets.
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n: int) -> (np.ndarray, np.ndarray):
+    """
+    Largest Triangle Three Buckets downsampling. Keeps the first and last points and from each bucket between them
+    the point making the largest triangle with the previous kept point and the mean of the next bucket, which keeps
+    the peaks and dips a plain decimation would drop.
+    :param x: The x values, ascending.
+    :param y: The y values.
+    :param n: How many points to keep.
+    :return (np.ndarray, np.ndarray): The kept x and y values.
+    """
+    size = len(x)
+    if n >= size or n < 3:
+        return x, y
+    every = (size - 2) / (n - 2)
+    keep = np.empty(n, dtype=np.intp)
+    keep[0], keep[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, size)
+        mean_x, mean_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[a] - mean_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (mean_y - y[a]))
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+
+class OverviewSeries:
+    """
+    A whole session of one series at a bounded number of points, for overview graphs.
+    Points are kept in levels. Level 0 gets every point and each full chunk of a level is reduced with lttb to half as
+    many points in the next level, so level k holds the session at 1/2^k of its resolution. The finest level still
+    holding the whole session in at most max_points is drawn, along with the newest points not yet reduced out of the
+    finer levels. Finer levels only keep those newest points, so memory stays bounded and each point is reduced about
+    once per level.
+    """
+    def __init__(self, max_points: int = overview_points, chunk: int = overview_chunk):
+        """
+        :param max_points: Most points kept for the drawn level.
+        :param chunk: Points a level gives the next one at a time.
+        """
+        self._max_points = max_points
+        self._chunk = chunk
+        self._levels = list()
+        self._first = None
+        self._last = None
+        self.clear()
+
+    def __len__(self) -> int:
+        return sum(len(level[0]) for level in self._levels[:self._shown_level() + 1])
+
+    def clear(self) -> None:
+        self._levels = [self._new_level()]
+        self._first = None
+        self._last = None
+
+    def append(self, x: float, y: float) -> None:
+        """
+        Add a point. Points without a value are skipped.
+        :param x: Epoch seconds, not older than the last point.
+        :param y: The value, None or NaN for none.
+        :return None:
+        """
+        if y is None or isnan(y):
+            return
+        if self._first is None:
+            self._first = x
+        self._last = x
+        level_x, level_y, done, whole = self._levels[0]
+        level_x.append(x)
+        level_y.append(y)
+        i = 0
+        while len(self._levels[i][0]) - self._levels[i][2] >= 2 * self._chunk:
+            self._reduce(i)
+            i += 1
+
+    def get(self) -> (np.ndarray, np.ndarray):
+        """
+        :return (np.ndarray, np.ndarray): The x and y values to draw, oldest first.
+        """
+        shown = self._shown_level()
+        xs, ys = list(), list()
+        for i in range(shown, -1, -1):  # Coarse to fine is oldest to newest.
+            level_x, level_y, done, whole = self._levels[i]
+            start = 0 if i == shown else done
+            xs.extend(level_x[start:])
+            ys.extend(level_y[start:])
+        return np.array(xs, dtype=float), np.array(ys, dtype=float)
+
+    def first_x(self) -> float:
+        return self._first
+
+    def last_x(self) -> float:
+        return self._last
+
+    def _reduce(self, i: int) -> None:
+        """
+        Move the oldest unreduced chunk of level i into level i + 1, and drop what level i no longer needs.
+        :param i: The level.
+        :return None:
+        """
+        level = self._levels[i]
+        level_x, level_y, done, whole = level
+        end = done + 2 * self._chunk
+        x, y = lttb(np.array(level_x[done:end]), np.array(level_y[done:end]), self._chunk)
+        if i + 1 == len(self._levels):
+            self._levels.append(self._new_level())
+        self._levels[i + 1][0].extend(x.tolist())
+        self._levels[i + 1][1].extend(y.tolist())
+        level[2] = end
+        if whole and len(level_x) > self._max_points:  # Too big to be drawn again, the next level takes over.
+            level[3] = False
+        if not level[3]:
+            del level_x[:end], level_y[:end]
+            level[2] = 0
+
+    def _shown_level(self) -> int:
+        """
+        :return int: The finest level still holding the whole session.
+        """
+        for i, level in enumerate(self._levels):
+            if level[3]:
+                return i
+        return len(self._levels) - 1
+
+    @staticmethod
+    def _new_level() -> list:
+        """
+        :return list: x values, y values, how many have been reduced into the next level and whether it still holds
+        the whole session.
+        """
+        return [list(), list(), 0, True]
@@ -0,0 +1,124 @@
+"""
+Licensed under GNU GPL-3.0-or-later
+
+This file is part of RS Companion.
+
+RS Companion is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+RS Companion is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with RS Companion.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Phillip Riskin
+Date: 2020
+Project: Companion App
+Company: Red Scientific
+https://redscientific.com/index.html
+"""
+
+from logging import getLogger
+from asyncio import create_task, sleep
+from time import perf_counter_ns
+from typing import Callable
+
+default_fps = 20  # Most renders per second per graph.
+
+
+class RenderScheduler:
+    """
+    Coalesce render requests for one graph.
+    A request only marks the graph dirty. One task renders the latest state at most max_fps times a second, so a burst
+    of data is drawn once, and nothing is drawn while the graph can't be seen. Call shown when it can be seen again.
+    """
+    def __init__(self, render: Callable[[], None], is_visible: Callable[[], bool], max_fps: float = default_fps):
+        """
+        :param render: Draws the graph.
+        :param is_visible: Whether the graph can be seen.
+        :param max_fps: Most renders per second.
+        """
+        self._logger = getLogger(__name__)
+        self._logger.debug("Initializing")
+        self._render = render
+        self._is_visible = is_visible
+        self._period_ns = int(1E9 / max_fps)
+        self._max_fps = max_fps
+        self._dirty = False
+        self._task = None
+        self._last_render = 0
+        self._stats = {"requests": 0, "renders": 0, "hidden_skips": 0, "errors": 0, "render_ms_total": 0.0,
+                       "render_ms_max": 0.0}
+        self._logger.debug("Initialized")
+
+    def request(self) -> None:
+        """
+        Mark the graph as needing a render.
+        :return None:
+        """
+        self._stats["requests"] += 1
+        self._dirty = True
+        if not self._task:
+            self._task = create_task(self._run())
+
+    def shown(self) -> None:
+        """
+        Render anything missed while the graph could not be seen.
+        :return None:
+        """
+        if self._dirty and not self._task:
+            self._task = create_task(self._run())
+
+    def get_stats(self) -> dict:
+        """
+        :return dict: Requests, renders, requests folded into another render, renders skipped while hidden, render
+        errors and the mean and max render time in ms.
+        """
+        stats = dict(self._stats)
+        renders = stats.pop("renders")
+        total = stats.pop("render_ms_total")
+        stats.update({"renders": renders, "coalesced": max(0, stats["requests"] - renders),
+                      "render_ms_mean": total / renders if renders else 0.0, "max_fps": self._max_fps})
+        return stats
+
+    def cleanup(self) -> None:
+        """
+        Stop rendering.
+        :return None:
+        """
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        """
+        Render while there are requests, no more often than the frame rate cap.
+        :return None:
+        """
+        try:
+            while self._dirty:
+                wait = self._last_render + self._period_ns - perf_counter_ns()
+                if wait > 0:
+                    await sleep(wait / 1E9)
+                if not self._is_visible():
+                    self._stats["hidden_skips"] += 1
+                    return  # Stays dirty until shown.
+                self._dirty = False
+                start = perf_counter_ns()
+                try:
+                    self._render()
+                except Exception as e:
+                    self._stats["errors"] += 1
+                    self._logger.exception("Render failed")
+                self._last_render = perf_counter_ns()
+                ms = (self._last_render - start) / 1E6
+                self._stats["renders"] += 1
+                self._stats["render_ms_total"] += ms
+                self._stats["render_ms_max"] = max(self._stats["render_ms_max"], ms)
+        finally:
+            self._task = None
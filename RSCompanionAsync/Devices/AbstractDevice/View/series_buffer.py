@@ -0,0 +1,99 @@
+"""
+Licensed under GNU GPL-3.0-or-later
+
+This file is part of RS Companion.
+
+RS Companion is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+RS Companion is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with RS Companion.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Phillip Riskin
+Date: 2020
+Project: Companion App
+Company: Red Scientific
+https://redscientific.com/index.html
+"""
+
+import numpy as np
+
+
+class SeriesBuffer:
+    """
+    Fixed capacity ring of graph points: x as float64 epoch seconds and one or more float64 y columns, NaN for no value.
+    Every point is written twice, capacity apart, so the newest points are always one contiguous slice and reading
+    them never copies.
+    """
+    def __init__(self, capacity: int, columns: int = 1):
+        """
+        :param capacity: Most points kept, older points are dropped.
+        :param columns: Number of y values per point.
+        """
+        self._capacity = capacity
+        self._x = np.full(2 * capacity, np.nan)
+        self._y = np.full((columns, 2 * capacity), np.nan)
+        self._start = 0
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def append(self, x: float, *ys: float) -> None:
+        """
+        Add a point, dropping the oldest if full.
+        :param x: Epoch seconds.
+        :param ys: One value per column, None or left off for no value.
+        :return None:
+        """
+        if self._len < self._capacity:
+            pos = self._start + self._len
+            self._len += 1
+        else:
+            pos = self._start
+            self._start = (self._start + 1) % self._capacity
+        pos %= self._capacity
+        self._x[pos] = self._x[pos + self._capacity] = x
+        for i in range(len(self._y)):
+            y = ys[i] if i < len(ys) and ys[i] is not None else np.nan
+            self._y[i, pos] = self._y[i, pos + self._capacity] = y
+
+    def clear(self) -> None:
+        self._start = 0
+        self._len = 0
+
+    def x(self) -> np.ndarray:
+        """
+        :return np.ndarray: The x values, oldest first. A view, only valid until the next append.
+        """
+        return self._x[self._start:self._start + self._len]
+
+    def y(self, column: int = 0) -> np.ndarray:
+        """
+        :param column: Which y column.
+        :return np.ndarray: The column's values, oldest first. A view, only valid until the next append.
+        """
+        return self._y[column, self._start:self._start + self._len]
+
+    def first_x(self) -> float:
+        """
+        :return float: The oldest x value, None if empty.
+        """
+        return float(self._x[self._start]) if self._len else None
+
+    def last_x(self) -> float:
+        """
+        :return float: The newest x value, None if empty.
+        """
+        return float(self._x[self._start + self._len - 1]) if self._len else None
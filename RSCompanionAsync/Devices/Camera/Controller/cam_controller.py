@@ -23,7 +23,7 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
-from logging import getLogger, StreamHandler
+from logging import getLogger
 from concurrent.futures import ThreadPoolExecutor
 from asyncio import create_task, sleep, Event, futures, get_running_loop
 from threading import Event as TEvent
@@ -33,6 +33,7 @@ from numpy import ndarray
 from PySide2.QtGui import QPixmap, QImage
 from cv2 import cvtColor, COLOR_BGR2RGB
 from RSCompanionAsync.Model.app_helpers import await_event
+from RSCompanionAsync.Model.rs_tracing import span
 from RSCompanionAsync.Devices.AbstractDevice.Controller.abstract_controller import AbstractController
 from RSCompanionAsync.Devices.Camera.View.cam_view import CamView
 from RSCompanionAsync.Devices.Camera.Model.cam_model import CamModel
@@ -41,15 +42,12 @@ from RSCompanionAsync.Devices.Camera.Resources.cam_strings import LangEnum
 
 
 class Controller(AbstractController):
-    def __init__(self, cam_index: int = 0, lang: LangEnum = LangEnum.ENG, log_handlers: [StreamHandler] = None):
+    def __init__(self, cam_index: int = 0, lang: LangEnum = LangEnum.ENG):
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
         self.cam_index = cam_index
         cam_name = "CAM_" + str(self.cam_index)
-        view = CamView(cam_name, log_handlers)
+        view = CamView(cam_name)
         super().__init__(view)
         self.view.show_initialization()
         self.view.set_config_active(False)
@@ -356,8 +354,9 @@ class Controller(AbstractController):
                 while self._model_image_pipe.poll():
                     next_image = self._model_image_pipe.recv()
                 if next_image is not None and self._update_feed_flag.isSet():
-                    converted_image = self.convert_image_to_qt_format(next_image)
-                    self._loop.call_soon_threadsafe(self.view.update_image, converted_image)
+                    with span("cam.frame_handoff"):
+                        converted_image = self.convert_image_to_qt_format(next_image)
+                        self._loop.call_soon_threadsafe(self.view.update_image, converted_image)
                 sleep(.008)
         except BrokenPipeError as bpe:
             pass
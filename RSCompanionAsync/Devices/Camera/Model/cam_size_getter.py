@@ -23,18 +23,15 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
-from logging import getLogger, StreamHandler
+from logging import getLogger
 from asyncio import sleep, Event
 from RSCompanionAsync.Devices.Camera.Model.cam_stream_reader import StreamReader
 from RSCompanionAsync.Devices.Camera.Model.cam_defs import common_resolutions
 
 
 class SizeGetter:
-    def __init__(self, stream: StreamReader, log_handlers: [StreamHandler] = None):
+    def __init__(self, stream: StreamReader):
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._stream = stream
         self._done_flag = Event()
         self._cancel_bool = False
@@ -23,7 +23,7 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
-from logging import getLogger, StreamHandler
+from logging import getLogger
 from datetime import datetime
 from cv2 import VideoCapture, CAP_PROP_FOURCC, CAP_PROP_FRAME_WIDTH, CAP_PROP_FRAME_HEIGHT
 from numpy import ndarray
@@ -32,6 +32,7 @@ from asyncio import futures, Event, get_event_loop, sleep as asyncsleep
 from threading import Event as TEvent, Lock
 from RSCompanionAsync.Devices.Camera.Model import cam_defs as defs
 from RSCompanionAsync.Model.app_helpers import await_event
+from RSCompanionAsync.Model.rs_executors import get_executor, ExecEnum
 from RSCompanionAsync.Devices.Camera.Model.fps_tracker import FPSTracker
 
 
@@ -57,11 +58,8 @@ class InternalFrameQueue:
 
 
 class StreamReader:
-    def __init__(self, index: int = 0, log_handlers: [StreamHandler] = None):
+    def __init__(self, index: int = 0):
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
         self.index = index
         self._tracker = FPSTracker()
@@ -112,7 +110,7 @@ class StreamReader:
 
     def _finalize(self) -> None:
         self._calc_timeout()
-        self._loop.run_in_executor(None, self._read_cam)
+        self._loop.run_in_executor(get_executor(ExecEnum.DEVICE_IO), self._read_cam)
         self._finalized = True
 
     def start_reading(self) -> None:
@@ -28,6 +28,7 @@ from queue import SimpleQueue
 from asyncio import get_event_loop, create_task, Event
 from threading import Event as TEvent
 from time import sleep as tsleep
+from RSCompanionAsync.Model.rs_executors import get_executor, ExecEnum
 from RSCompanionAsync.Devices.Camera.Model import cam_defs as defs
 
 
@@ -62,7 +63,7 @@ class StreamWriter:
         self._stop_flag.clear()
         self._frame_queue = q
         self._writer = VideoWriter(filename, defs.cap_codec, fps, size)
-        self._tasks.append(self._loop.run_in_executor(None, self._update))
+        self._tasks.append(self._loop.run_in_executor(get_executor(ExecEnum.STORAGE), self._update))
 
     def stop(self, discard: bool) -> None:
         """
@@ -24,7 +24,7 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
-from logging import getLogger, StreamHandler
+from logging import getLogger
 from PySide2.QtWidgets import QVBoxLayout, QLabel, QProgressBar, QCheckBox, QComboBox, QSizePolicy, QSpacerItem, \
     QGridLayout
 from PySide2.QtGui import QPixmap, QHideEvent, QShowEvent
@@ -33,14 +33,12 @@ from RSCompanionAsync.Devices.AbstractDevice.View.abstract_view import AbstractV
 from RSCompanionAsync.Devices.AbstractDevice.View.config_pop_up import ConfigPopUp
 from RSCompanionAsync.Devices.Camera.Resources.cam_strings import strings, StringsEnum, LangEnum
 from RSCompanionAsync.Model.app_helpers import EasyFrame, ClickAnimationButton
+from RSCompanionAsync.Model.rs_tracing import span
 
 
 class CamView(AbstractView):
-    def __init__(self, name: str = "CAM_NONE", log_handlers: [StreamHandler] = None):
+    def __init__(self, name: str = "CAM_NONE"):
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
         super().__init__(name)
 
@@ -427,8 +425,9 @@ class CamView(AbstractView):
         :param msg: The text to show if no image.
         :return None:
         """
-        self._logger.debug("running")
-        if not self._window_changing:
+        if self._window_changing:
+            return
+        with span("cam.show_frame"):
             if image is not None:
                 temp_image_w = image.scaledToWidth(self.width() - 15)
                 temp_image_h = image.scaledToHeight(self.height() - 35)
@@ -438,7 +437,6 @@ class CamView(AbstractView):
                     self._image_display.setPixmap(temp_image_w)
             elif msg is not None:
                 self._image_display.setText(msg)
-        self._logger.debug("done")
 
     def show_images(self) -> None:
         """
@@ -24,10 +24,17 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
-from logging import getLogger, StreamHandler
-from datetime import datetime
+import os
+from os.path import basename
+from logging import getLogger
 from asyncio import create_task
+from functools import partial
+from typing import Callable
 from aioserial import AioSerial
+from serial.serialutil import SerialException
+from RSCompanionAsync.Model.rs_clock import to_wall_ns, wall_ns_now
+from RSCompanionAsync.Model.rs_scrollback import ScrollbackStore, scrollback_dir
+from RSCompanionAsync.Model.rs_tracing import span
 from RSCompanionAsync.Devices.AbstractDevice.Controller.abstract_controller import AbstractController
 from RSCompanionAsync.Devices.AbstractDevice.View.graph_frame import GraphFrame
 from RSCompanionAsync.Devices.DRT.View.drt_view import DRTView
@@ -38,26 +45,28 @@ from RSCompanionAsync.Devices.DRT.Resources.drt_strings import strings, StringsE
 
 
 class Controller(AbstractController):
-    def __init__(self, conn: AioSerial = AioSerial(), lang: LangEnum = LangEnum.ENG,
-                 log_handlers: [StreamHandler] = None):
+    def __init__(self, conn: AioSerial = AioSerial(), lang: LangEnum = LangEnum.ENG):
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
         try:
-            device_name = "DRT_" + conn.port.strip("COM")
+            device_name = "DRT_" + basename(conn.port).strip("COM")  # COM3 on Windows, /dev/ttyACM0 elsewhere.
         except:
             device_name = "DRT_NONE"
-        view = DRTView(device_name, log_handlers)
+        view = DRTView(device_name)
         super().__init__(view)
-        self._model = DRTModel(device_name, conn, log_handlers)
-        self._graph = DRTGraph(view, log_handlers)
-        self.view.add_graph(GraphFrame(view, self._graph, log_handlers))
+        self._model = DRTModel(device_name, conn)
+        self._graph = DRTGraph(view)
+        self._fast_graph = False
+        self._scrollback = None
+        self._graph_frame = GraphFrame(view, self._graph)
+        self.view.add_graph(self._graph_frame)
         self._exp = False
         self._updating_config = False
         self._setup_handlers()
         self._init_values()
+        self._link_lost_handler = None
+        self._stage_hook = None
+        self._frame_hook = (None, False)  # The graph's frame hook and whether it renders hidden.
         self._msg_handler_task = create_task(self.msg_handler())
         self._strings = dict()
         self.set_lang(lang)
@@ -73,6 +82,8 @@ class Controller(AbstractController):
         if self._exp:
             self.stop_exp()
         self._msg_handler_task.cancel()
+        self._graph.cleanup()
+        self._close_scrollback()
         self._model.cleanup()
         self.view.save_window_state()
         self._logger.debug("done")
@@ -98,18 +109,27 @@ class Controller(AbstractController):
 
     async def msg_handler(self) -> None:
         """
-        Handle messages sent from device.
+        Handle messages sent from device until the link to it is lost.
         :return: None.
         """
         self._logger.debug("running")
-        while True:
-            msg, timestamp = await self._model.get_msg()
-            msg_type = msg['type']
-            if msg_type == "data":
-                self._update_view_data(msg['values'], timestamp)
-                self._model.save_data(msg['values'], timestamp)
-            elif msg_type == "settings":
-                self._update_view_config(msg['values'])
+        try:
+            while True:
+                for msg, timestamp in await self._model.get_msgs():
+                    msg_type = msg.get('type')
+                    if msg_type == "data":
+                        if self._stage_hook:
+                            self._stage_hook(self.view.get_name(), "handler", msg['values'])
+                        self._update_view_data(msg['values'], timestamp)
+                        if self._stage_hook:
+                            self._stage_hook(self.view.get_name(), "view_queued", msg['values'])
+                        self._model.save_data(msg['values'], timestamp)
+                    elif msg_type == "settings":
+                        self._update_view_config(msg['values'])
+        except SerialException as e:
+            self._logger.warning("Lost the link to " + self.view.get_name() + ": " + str(e))
+            if self._link_lost_handler:
+                self._link_lost_handler(self.get_conn().port)
 
     def create_exp(self, path: str, cond_name: str) -> None:
         """
@@ -120,10 +140,130 @@ class Controller(AbstractController):
         """
         self._logger.debug("running")
         self._graph.clear_graph()
+        self._scrollback = ScrollbackStore(os.path.join(path, scrollback_dir, self.view.get_name()), 2)
+        self._graph.set_scrollback(self._scrollback)
         self._model.update_save_info(path)
         self._model.add_save_hdr()
         self._logger.debug("done")
 
+    def end_exp(self) -> None:
+        """
+        Notify this device of experiment end.
+        :return None:
+        """
+        self._logger.debug("running")
+        self._model.end_save()
+        self._close_scrollback()
+        self._logger.debug("done")
+
+    def get_presets(self) -> [str]:
+        """
+        :return [str]: The names of the presets this device can apply.
+        """
+        return ["iso"]
+
+    async def apply_preset(self, name: str) -> bool:
+        """
+        Set the device to a preset and wait for it to confirm the new values.
+        :param name: The preset name.
+        :return bool: Whether the device confirmed every setting in the preset.
+        """
+        self._logger.debug("running")
+        if name != "iso":
+            self._logger.warning("Unknown preset: " + name)
+            return False
+        self.view.config_text = self._strings[StringsEnum.ISO_LABEL]
+        self.view.set_upload_button(False)
+        ret = await self._model.send_iso()
+        self._logger.debug("done")
+        return ret
+
+    def set_raw_capture(self, path: str = None) -> None:
+        """
+        Record this device's raw serial input for replay, or stop recording.
+        :param path: The dir to write the capture in, None to stop.
+        :return None:
+        """
+        self._logger.debug("running")
+        self._model.set_raw_capture(path)
+        self._logger.debug("done")
+
+    def set_link_lost_handler(self, func: classmethod) -> None:
+        """
+        Set the function called with this device's port when the link to it is lost.
+        :param func: The function.
+        :return None:
+        """
+        self._link_lost_handler = func
+
+    def set_stage_hook(self, func: Callable[[str, str, dict], None] = None) -> None:
+        """
+        Set the function called as each data line passes a stage, for timing the data path. The stages are "handler"
+        when the line reaches the message handler, "view_queued" once it is queued for the graph and "disk" once its
+        row is written.
+        :param func: Called with this device's name, the stage and the line's values. None to stop.
+        :return None:
+        """
+        self._stage_hook = func
+        self._model.set_save_hook(partial(func, self.view.get_name(), "disk") if func else None)
+
+    def set_frame_hook(self, func: Callable[[str, int], None] = None, render_hidden: bool = False) -> None:
+        """
+        Set the function called once a render of this device's graph is on screen, see GraphWindow.set_frame_hook.
+        :param func: Called with this device's name and the perf_counter_ns the render took its data at. None to stop.
+        :param render_hidden: Render even while the graph can't be seen, for timing without a screen.
+        :return None:
+        """
+        self._frame_hook = (partial(func, self.view.get_name()) if func else None, render_hidden)
+        self._graph.set_frame_hook(*self._frame_hook)
+
+    def set_graph_render(self, mode: str) -> None:
+        """
+        Set how this device's graph is drawn. Changing to or from pyqtgraph starts a new, empty graph.
+        :param mode: "blit" to draw on the event loop, "offscreen" to draw in a worker thread, "pyqtgraph" to use the
+        pyqtgraph backend if it is installed.
+        :return None:
+        """
+        self._logger.debug("running")
+        if (mode == "pyqtgraph") != self._fast_graph:
+            self._swap_graph(mode == "pyqtgraph")
+        self._graph.set_offscreen(mode == "offscreen")
+        self._logger.debug("done")
+
+    def _swap_graph(self, fast: bool) -> None:
+        """
+        Replace the graph with one from the other backend.
+        :param fast: Whether to use pyqtgraph.
+        :return None:
+        """
+        self._logger.debug("running")
+        if fast:
+            try:
+                from RSCompanionAsync.Devices.DRT.View.drt_fast_graph import DRTFastGraph as Graph
+            except ImportError as e:
+                self._logger.warning("pyqtgraph is not installed, keeping the matplotlib graph")
+                return
+        else:
+            Graph = DRTGraph
+        self._graph.cleanup()
+        self._graph = Graph(self.view)
+        self._fast_graph = fast
+        self._graph_frame.set_graph(self._graph)
+        self._graph.set_scrollback(self._scrollback)
+        self._graph.set_lang(self.view.language)
+        self._graph.set_frame_hook(*self._frame_hook)
+        self._logger.debug("done")
+
+    def _close_scrollback(self) -> None:
+        """
+        Stop keeping graph points on disk.
+        :return None:
+        """
+        if self._scrollback is not None:
+            self._graph.set_scrollback(None)
+            self._scrollback.close()
+            self._scrollback = None
+
     def start_exp(self, block_num: int, cond_name: str) -> None:
         """
         Start this device.
@@ -133,7 +273,9 @@ class Controller(AbstractController):
         """
         self._logger.debug("running")
         self._model.send_start()
-        self._graph.add_empty_point(datetime.now())
+        block_start = wall_ns_now() / 1E9
+        self._graph.add_empty_point(block_start)
+        self._graph.add_vert_lines(block_start)
         self._exp = True
         self._logger.debug("done")
 
@@ -145,6 +287,10 @@ class Controller(AbstractController):
         self._logger.debug("running")
         self._model.send_stop()
         self._exp = False
+        stats = self._model.get_clock_stats()
+        self._logger.info("Device {} clock over {} trials: skew {:.1f}ppm, drift {:.2f}ms, jitter {:.2f}ms".format(
+            self.view.get_name(), stats["points"], stats["skew_ppm"], stats["drift_ms"], stats["jitter_ms"]))
+        self._graph.log_render_stats(self.view.get_name())
         self._logger.debug("done")
 
     def _setup_handlers(self) -> None:
@@ -162,6 +308,7 @@ class Controller(AbstractController):
         self.view.set_stim_intens_entry_changed_handler(self._stim_int_entry_changed_handler)
         self.view.set_upper_isi_entry_changed_handler(self._isi_entry_changed_handler)
         self.view.set_lower_isi_entry_changed_handler(self._isi_entry_changed_handler)
+        self._model.set_link_health_handler(self._update_view_health)
         self._logger.debug("done")
 
     def _init_values(self):
@@ -198,18 +345,26 @@ class Controller(AbstractController):
         self._check_for_upload()
         self._logger.debug("done")
 
-    def _update_view_data(self, values: dict, timestamp: datetime) -> None:
+    def _update_view_data(self, values: dict, timestamp: int) -> None:
         """
         Display data from device on view.
         :param values: The data to display.
-        :param timestamp: When the data was received.
+        :param timestamp: perf_counter_ns when the data was received.
         :return: None.
         """
-        self._logger.debug("running")
-        data1 = [self._strings[StringsEnum.PLOT_NAME_RT], timestamp, values[defs.output_fields[3]]]
-        data2 = [self._strings[StringsEnum.PLOT_NAME_CLICKS], timestamp, values[defs.output_fields[2]]]
-        self._graph.add_data([data1, data2])
-        self._logger.debug("done")
+        with span("drt.plot"):
+            timestamp = to_wall_ns(timestamp) / 1E9
+            data1 = [self._strings[StringsEnum.PLOT_NAME_RT], timestamp, values[defs.output_fields[3]]]
+            data2 = [self._strings[StringsEnum.PLOT_NAME_CLICKS], timestamp, values[defs.output_fields[2]]]
+            self._graph.add_data([data1, data2])
+
+    def _update_view_health(self, health: dict) -> None:
+        """
+        Show the serial link health on the view.
+        :param health: The latest link health values.
+        :return: None.
+        """
+        self.view.link_health_text = self._strings[StringsEnum.LINK_HEALTH].format(**health)
 
     def _update_view_config(self, msg: dict) -> None:
         """
@@ -303,7 +458,5 @@ class Controller(AbstractController):
         :return: None.
         """
         self._logger.debug("running")
-        self.view.config_text = self._strings[StringsEnum.ISO_LABEL]
-        self._model.send_iso()
-        self.view.set_upload_button(False)
+        create_task(self.apply_preset("iso"))
         self._logger.debug("done")
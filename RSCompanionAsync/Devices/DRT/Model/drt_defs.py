@@ -29,8 +29,31 @@ profile = {"DRT": {"vid": 9114, "pid": 32798}}
 config_fields = ['lowerISI', 'upperISI', 'stimDur', 'intensity']
 output_fields = ['startMillis', 'trial', 'clicks', 'rt']
 save_fields = ['trial', 'clicks', 'startMillis', 'rt']
+aligned_field = 'alignedTime'  # Trial start on the host timeline from the device clock fit, saved after save_fields.
 ui_fields = ['Mills from block start', 'probe #', 'clicks', 'response time']
 
+# Commands the device answers and the settings value in its answer. set_ commands are echoed with the new value.
+acks = {"get_config": "lowerISI"}
+acks.update({cmd + x: x for x in config_fields for cmd in ("get_", "set_")})
+
+# Settings query sent to measure round trip time, see RSCompanionAsync/Model/rs_link_health.py
+probe_cmd = "get_lowerISI"
+
+# Wire protocol, see RSCompanionAsync/Model/rs_protocol.py
+protocol = {"messages": [{"match": "prefix", "key": b"cfg>", "type": "settings", "kind": "keyval", "sep": b", ",
+                          "kv_sep": b":", "fields": {x: int for x in config_fields}},
+                         {"match": "prefix", "key": b"trl>", "type": "data", "kind": "positional", "sep": b", ",
+                          "fields": [(x, int) for x in output_fields]}],
+            "cmd_fmt": "{cmd} {arg}\n",
+            "cmd_fmt_no_arg": "{cmd}\n",
+            "save_fields": save_fields + [aligned_field],
+            "acks": acks}
+
+# USB serial settings applied when the port is opened, see RSCompanionAsync/Model/rs_port_tuning.py
+profile["DRT"]["tuning"] = {"latency_timer_ms": 1, "low_latency": True, "read_buffer": 1 << 16,
+                          "probe": protocol["cmd_fmt_no_arg"].format(cmd=probe_cmd).encode(),
+                          "probe_answer": acks[probe_cmd].encode()}
+
 iso_standards = {'upperISI': 5000, 'lowerISI': 3000, 'intensity': 255, 'stimDur': 1000}
 
 # drt v1.0 uses uint16_t for drt value storage
@@ -23,26 +23,48 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
-from logging import getLogger, StreamHandler
-from asyncio import create_task, get_running_loop
-from aioserial import AioSerial, SerialException
+import os
+from logging import getLogger
+from asyncio import create_task, get_running_loop, gather, Future
+from typing import Awaitable, Callable
+from aioserial import AioSerial
 from math import trunc, ceil
-from datetime import datetime
-from RSCompanionAsync.Model.app_helpers import write_line_to_file, format_current_time
+from RSCompanionAsync.Model.rs_serial_reader import SerialLineReader
+from RSCompanionAsync.Model.rs_command_queue import CommandQueue
+from RSCompanionAsync.Model.rs_link_health import LinkHealth, probe_tag
+from RSCompanionAsync.Model.rs_capture import capture_ext
+from RSCompanionAsync.Model.rs_io_process import RemoteSerial
+from RSCompanionAsync.Model.rs_clock import to_wall_ns, DeviceClockFit
+from RSCompanionAsync.Model.rs_tracing import span
+from RSCompanionAsync.Model.rs_protocol import compile_parser, compile_row_encoder, compile_cmd_encoder
+from RSCompanionAsync.Model.app_helpers import write_line_to_file
 from RSCompanionAsync.Devices.DRT.Model import drt_defs as defs
 from RSCompanionAsync.Devices.DRT.Resources.drt_strings import strings, StringsEnum, LangEnum
 
+_parse_msg = compile_parser(defs.protocol)
+_format_save_row = compile_row_encoder(defs.protocol["save_fields"])
+_encode_cmd = compile_cmd_encoder(defs.protocol)
+
 
 class DRTModel:
-    def __init__(self, dev_name: str = "DRT_NONE", conn: AioSerial = AioSerial(), log_handlers: [StreamHandler] = None):
+    def __init__(self, dev_name: str = "DRT_NONE", conn: AioSerial = AioSerial()):
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
         self._dev_name = dev_name
         self._conn = conn
+        if isinstance(conn, RemoteSerial):  # Read and parsed in the io process.
+            conn.open(defs.protocol)
+            self._reader = conn
+        else:
+            self._reader = SerialLineReader(conn)
+        self._cmds = CommandQueue(conn, dev_name)
+        self._health = LinkHealth(dev_name, self._probe, write_line_to_file, defs.output_fields[1])
+        self._health.start(self._cmds.get_stats)
+        self._clock_fit = DeviceClockFit()
+        self._last_start_ms = 0
+        self._fit_stale = False  # The device counter restarted and no trial has been fit since.
         self._save_filename = str()
+        self._save_hook = None
         self._save_dir = str()
         self._strings = dict()
         self._current_vals = [0] * 4  # dur, int, upper, lower
@@ -66,6 +88,7 @@ class DRTModel:
         self._save_dir = path
         # self._save_filename = self._dev_name + "_" + format_current_time(datetime.now(), save=True) + ".csv"
         self._save_filename = self._dev_name + ".csv"
+        self._health.start_log(path)
 
     def set_current_vals(self, duration: int = None, intensity: int = None, upper_isi: int = None,
                          lower_isi: int = None) -> None:
@@ -117,35 +140,86 @@ class DRTModel:
         self._strings = strings[lang]
         self._logger.debug("done")
 
-    def send_iso(self) -> None:
+    async def send_iso(self) -> bool:
         """
         Reset device to ISO standards
-        :return None:
+        :return bool: Whether the device confirmed every value.
         """
         self._logger.debug("running")
-        self.send_stim_dur(str(defs.iso_standards["stimDur"]))
-        self.send_stim_intensity(100)
-        self.send_upper_isi(str(defs.iso_standards["upperISI"]))
-        self.send_lower_isi(str(defs.iso_standards["lowerISI"]))
+        results = await gather(self.send_stim_dur(str(defs.iso_standards["stimDur"])),
+                               self.send_stim_intensity(100),
+                               self.send_upper_isi(str(defs.iso_standards["upperISI"])),
+                               self.send_lower_isi(str(defs.iso_standards["lowerISI"])))
         self._logger.debug("done")
+        return all(results)
+
+    async def get_msgs(self) -> [(dict, int)]:
+        """
+        Get all messages that have arrived from device since the last call, waiting for at least one.
+        :return: [(A message from device, perf_counter_ns when the message arrived.)]
+        """
+        msgs, num_bytes = await self._reader.get_msgs(_parse_msg)
+        with span("drt.msgs"):
+            self._health.add_counts(len(msgs), num_bytes)
+            ret = list()
+            for msg, timestamp in msgs:
+                self._health.add_msg(msg)
+                msg_type = msg.get('type')
+                if msg_type == "data":
+                    self._align(msg['values'], timestamp)
+                elif msg_type == "settings":
+                    if self._cmds.handle_response(msg['values']) == probe_tag:
+                        continue  # The probe's answer is for the link health, not the view.
+                ret.append((msg, timestamp))
+        return ret
 
-    async def get_msg(self) -> (dict, datetime):
+    def get_link_health(self) -> dict:
         """
-        Get next message from device.
-        :return: (The next message from device, when the message was received.)
+        :return dict: The latest link health values, see rs_link_health.
         """
-        self._logger.debug("running")
-        msg = await self._loop.run_in_executor(None, self.readline_threaded)
-        self._logger.debug("done")
-        return msg
+        return self._health.get_snapshot()
+
+    def set_link_health_handler(self, func: classmethod) -> None:
+        """
+        :param func: Called with the latest link health values after each probe.
+        :return None:
+        """
+        self._health.set_update_handler(func)
+
+    def set_save_hook(self, func: Callable[[dict], None] = None) -> None:
+        """
+        Set the function called once each data row is written, for timing data to the disk.
+        :param func: Called with the row's values. None to stop.
+        :return None:
+        """
+        self._save_hook = func
+
+    def end_save(self) -> None:
+        """
+        Stop writing experiment files that are written as the device runs.
+        :return None:
+        """
+        self._health.stop_log()
 
-    def readline_threaded(self) -> (dict, datetime):
+    def set_raw_capture(self, path: str = None) -> None:
+        """
+        Record everything read from the device to a raw capture file for replay, or stop recording.
+        :param path: The dir to write the capture in, None to stop.
+        :return None:
+        """
         self._logger.debug("running")
-        line = self._conn.readline()
-        timestamp = datetime.now()
-        msg = self._parse_msg(line.decode("utf-8"))
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._reader.open_capture(os.path.join(path, self._dev_name + capture_ext), self._dev_name)
+        else:
+            self._reader.stop_capture()
         self._logger.debug("done")
-        return msg, timestamp
+
+    def get_clock_stats(self) -> dict:
+        """
+        :return dict: How the device clock compares to the host clock, see DeviceClockFit.get_stats.
+        """
+        return self._clock_fit.get_stats()
 
     def cleanup(self) -> None:
         """
@@ -153,6 +227,9 @@ class DRTModel:
         :return: None.
         """
         self._logger.debug("running")
+        self._health.cleanup()
+        self._cmds.cleanup()
+        self._reader.cleanup()
         self._conn.close()
         self._logger.debug("done")
 
@@ -180,108 +257,119 @@ class DRTModel:
         """
         return self._changed[3]
 
-    def query_config(self) -> None:
+    def query_config(self) -> Future:
         """
         Ask device for all current configurations.
-        :return: None.
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("get_config"))
+        ret = self._send_cmd("get_config")
         self._logger.debug("done")
+        return ret
 
-    def query_stim_dur(self) -> None:
+    def query_stim_dur(self) -> Future:
         """
         Ask device for current stim duration value.
-        :return: None.
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("get_stimDur"))
+        ret = self._send_cmd("get_stimDur")
         self._logger.debug("done")
+        return ret
 
-    def send_stim_dur(self, val: str) -> None:
+    def send_stim_dur(self, val: str) -> Future:
         """
         Send new value to device.
         :param val: The new value.
-        :return: None.
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("set_stimDur", str(val)))
+        ret = self._send_cmd("set_stimDur", str(val))
         self._logger.debug("done")
+        return ret
 
-    def query_stim_intesity(self) -> None:
+    def query_stim_intesity(self) -> Future:
         """
         Ask device for current stim intensity value.
-        :return: None.
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("get_intensity"))
+        ret = self._send_cmd("get_intensity")
         self._logger.debug("done")
+        return ret
 
-    def send_stim_intensity(self, val: int) -> None:
+    def send_stim_intensity(self, val: int) -> Future:
         """
         Send new value to device.
         :param val: The new value.
-        :return: None.
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("set_intensity", str(self.calc_percent_to_val(val))))
+        ret = self._send_cmd("set_intensity", str(self.calc_percent_to_val(val)))
         self._logger.debug("done")
+        return ret
 
-    def query_upper_isi(self) -> None:
+    def query_upper_isi(self) -> Future:
         """
         Ask device for current upper isi value.
-        :return: None.
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("get_upperISI"))
+        ret = self._send_cmd("get_upperISI")
         self._logger.debug("done")
+        return ret
 
-    def send_upper_isi(self, val: str) -> None:
+    def send_upper_isi(self, val: str) -> Future:
         """
         Send new value to device.
         :param val: The new value.
-        :return: None.
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("set_upperISI", str(val)))
+        ret = self._send_cmd("set_upperISI", str(val))
         self._logger.debug("done")
+        return ret
 
-    def query_lower_isi(self) -> None:
+    def query_lower_isi(self) -> Future:
         """
         Ask device for current lower isi value.
-        :return: None.
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("get_lowerISI"))
+        ret = self._send_cmd("get_lowerISI")
         self._logger.debug("done")
+        return ret
 
-    def send_lower_isi(self, val: str) -> None:
+    def send_lower_isi(self, val: str) -> Future:
         """
         Send new value to device.
         :param val: The new value.
-        :return: None.
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("set_lowerISI", str(val)))
+        ret = self._send_cmd("set_lowerISI", str(val))
         self._logger.debug("done")
+        return ret
 
-    def send_start(self) -> None:
+    def send_start(self) -> Future:
         """
         Tell device to start running experiment.
-        :return: None.
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("exp_start"))
+        ret = self._send_cmd("exp_start")
         self._logger.debug("done")
+        return ret
 
-    def send_stop(self) -> None:
+    def send_stop(self) -> Future:
         """
         Tel device to stop running experiment.
-        :return: None.
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("exp_stop"))
+        ret = self._send_cmd("exp_stop")
         self._logger.debug("done")
+        return ret
 
     def check_stim_dur_entry(self, entry: str) -> bool:
         """
@@ -369,93 +457,89 @@ class DRTModel:
                 ret = False
         return ret
 
-    def save_data(self, data: dict, timestamp: datetime) -> None:
+    def save_data(self, data: dict, timestamp: int) -> None:
         """
         Save data to output file.
+        :param data: The values to save.
+        :param timestamp: perf_counter_ns when the data arrived, saved as wall clock nanoseconds.
         :return: None
         """
-        self._logger.debug("running")
-        self._output_save_data(self._format_save_data(data, timestamp))
-        self._logger.debug("done")
+        with span("drt.save"):
+            self._output_save_data(_format_save_row(data, to_wall_ns(timestamp)), data)
 
-    def _send_msg(self, msg) -> None:
+    def _align(self, values: dict, timestamp: int) -> None:
         """
-        Encode and send a message over serial port
-        :param msg: message to be sent
+        Add a trial to the device clock fit and give it its trial start time on the host timeline.
+        The device sends a trial line when the participant responds, so responded trials are fit at start plus response
+        time. Missed trials are sent at some later point and are only mapped, not fit, using their arrival time while
+        the fit is from before a device restart.
+        :param values: The trial values, the aligned time is added to them.
+        :param timestamp: perf_counter_ns when the trial line arrived.
         :return None:
         """
-        try:
-            if self._conn.is_open:
-                self._conn.write(msg.encode())
-        except PermissionError as pe:
-            self._logger.exception("Device " + self._dev_name + " connection failed")
-        except SerialException as se:
-            self._logger.exception("Device " + self._dev_name + " connection failed")
-        except Exception as ge:
-            self._logger.exception("Device " + self._dev_name + " connection failed")
+        start_ms = values[defs.output_fields[0]]
+        rt = values[defs.output_fields[3]]
+        if start_ms < self._last_start_ms:  # Device counter restarted with the block, the fit resets on its next add.
+            self._fit_stale = True
+        self._last_start_ms = start_ms
+        if rt >= 0:
+            self._clock_fit.add(start_ms + rt, timestamp)
+            self._fit_stale = False
+        if self._clock_fit.ready and not self._fit_stale:
+            values[defs.aligned_field] = to_wall_ns(self._clock_fit.to_host_ns(start_ms))
+        else:
+            values[defs.aligned_field] = to_wall_ns(timestamp)
+
+    def _send_cmd(self, cmd: str, arg: str = None) -> Future:
+        """
+        Queue a command for the device, expecting the answer listed for it in the protocol acks.
+        :param cmd: The command.
+        :param arg: The optional argument.
+        :return Future: Resolves to whether the device got and confirmed the command.
+        """
+        key = defs.protocol["acks"].get(cmd)
+        expect = {key: arg} if key else None  # get_ commands have no arg and match any value.
+        return self._cmds.send(self._prepare_msg(cmd, arg), expect)
+
+    async def _probe(self) -> (float, int):
+        """
+        Send the link health probe, tagged so only the probe takes its answer.
+        :return (float, int): The round trip in ms, None if the device did not answer, and the number of resends.
+        """
+        expect = {defs.protocol["acks"][defs.probe_cmd]: None}
+        return await self._cmds.send_timed(self._prepare_msg(defs.probe_cmd), expect, probe_tag)
 
-    def _output_save_data(self, line: str) -> None:
+    def _output_save_data(self, line: str, values: dict = None) -> None:
         """
         Write data to save file.
         :param line: The data to write.
+        :param values: The values of a data row, given to the save hook once it is written.
         :return: None.
         """
-        create_task(write_line_to_file(self._save_dir + self._save_filename, line))
+        write = write_line_to_file(self._save_dir + self._save_filename, line)
+        if values is not None and self._save_hook:
+            write = self._report_saved(write, values)
+        create_task(write)
 
-    @staticmethod
-    def _parse_msg(msg_string: str) -> dict:
-        """
-        Parse message from device into useful keyval pairs.
-        :param msg_string: The string to parse.
-        :return: dictionary containing result of parsing.
-        """
-        ret = dict()
-        ret['values'] = {}
-        if msg_string[0:4] == "cfg>":
-            ret['type'] = "settings"
-            # Check if this is a response to get_config
-            if len(msg_string) > 90:
-                # Get relevant values from msg and insert into ret
-                for i in defs.config_fields:
-                    index = msg_string.find(i + ":")
-                    index_len = len(i) + 1
-                    val_len = msg_string.find(', ', index + index_len)
-                    if val_len < 0:
-                        val_len = None
-                    ret['values'][msg_string[index:index+index_len-1]] = int(msg_string[index+index_len:val_len])
-            else:
-                # Single value update, find which value it is and insert into ret
-                for i in defs.config_fields:
-                    index = msg_string.find(i + ":")
-                    if index > 0:
-                        index_len = len(i)
-                        val_ind = index + index_len + 1
-                        ret['values'][msg_string[index:index + index_len]] = int(msg_string[val_ind:])
-        elif msg_string[0:4] == "trl>":
-            ret['type'] = "data"
-            val_ind_start = 4
-            for i in defs.output_fields:
-                val_ind_end = msg_string.find(', ', val_ind_start + 1)
-                if val_ind_end < 0:
-                    val_ind_end = None
-                ret['values'][i] = int(msg_string[val_ind_start:val_ind_end])
-                if val_ind_end:
-                    val_ind_start = val_ind_end + 2
-        return ret
+    async def _report_saved(self, write: Awaitable, values: dict) -> None:
+        """
+        Call the save hook once a row is written.
+        :param write: The row's write.
+        :param values: The row's values.
+        :return None:
+        """
+        await write
+        self._save_hook(values)
 
     @staticmethod
-    def _prepare_msg(cmd: str, arg: str = None) -> str:
+    def _prepare_msg(cmd: str, arg: str = None) -> bytes:
         """
-        Create string using drt syntax.
+        Create message using drt syntax.
         :param cmd: The cmd to send.
         :param arg: The option parameter of the command.
-        :return str: The message in the correct syntax.
+        :return bytes: The message in the correct syntax.
         """
-        if arg:
-            msg_to_send = cmd + " " + arg + "\n"
-        else:
-            msg_to_send = cmd + "\n"
-        return msg_to_send
+        return _encode_cmd(cmd, arg)
 
     @staticmethod
     def calc_val_to_percent(val: int) -> int:
@@ -474,18 +558,3 @@ class DRTModel:
         :return int: The converted value.
         """
         return ceil(val / 100 * defs.intensity_max)
-
-    @staticmethod
-    def _format_save_data(values: dict, timestamp: datetime) -> str:
-        """
-        Format values from device into readable output for saving.
-        :param values: The values from the device.
-        :param timestamp: The timestamp the values were received.
-        :return: The formatted output.
-        """
-        # line = format_current_time(timestamp, date=True, time=True, micro=True)
-        line = str(timestamp.timestamp())
-        for i in defs.save_fields:
-            line += ", " + str(values[i])
-        line = line.rstrip("\r\n")
-        return line
@@ -53,6 +53,7 @@ class StringsEnum(Enum):
     PLOT_NAME_RT = auto()
     PLOT_NAME_CLICKS = auto()
     GRAPH_TS = auto()
+    LINK_HEALTH = auto()
 
 
 # English strings
@@ -78,10 +79,13 @@ english = {StringsEnum.CUSTOM_LABEL: "Custom",
            StringsEnum.INTENSITY_TOOLTIP: "Intensity of the stimulus",
            StringsEnum.UPPER_ISI_TOOLTIP: "Milliseconds. Range: " + lower_isi_eng + "-" + str(defs.ISI_max),
            StringsEnum.LOWER_ISI_TOOLTIP: "Milliseconds. Range: " + str(defs.ISI_min) + "-" + upper_isi_eng,
-           StringsEnum.SAVE_HDR: "timestamp, probe #, clicks, milliseconds from experiment start, response time",
+           StringsEnum.SAVE_HDR: "timestamp, probe #, clicks, milliseconds from experiment start, response time, "
+                                 "corrected timestamp",
            StringsEnum.PLOT_NAME_RT: "Response time",
            StringsEnum.PLOT_NAME_CLICKS: "Clicks",
            StringsEnum.GRAPH_TS: "Timestamp",
+           StringsEnum.LINK_HEALTH: "Link: {lines_per_s} lines/s, round trip {rtt_ms} ms,"
+                                    " lost {lost_lines}, errors {parse_errors}",
            }
 
 # TODO: Verify translations
@@ -108,10 +112,12 @@ dutch = {StringsEnum.CUSTOM_LABEL: "Op maat",
          StringsEnum.UPPER_ISI_TOOLTIP: "Milliseconden. Bereik: " + lower_isi_dut + "-" + str(defs.ISI_max),
          StringsEnum.LOWER_ISI_TOOLTIP: "Milliseconden. Bereik: " + str(defs.ISI_min) + "-" + upper_isi_dut,
          StringsEnum.SAVE_HDR: "tijdstempel, onderzoek #, klikken, milliseconden vanaf het begin van het experiment,"
-                               " reactietijd",
+                               " reactietijd, gecorrigeerde tijdstempel",
          StringsEnum.PLOT_NAME_RT: "Reactietijd",
          StringsEnum.PLOT_NAME_CLICKS: "klikken",
          StringsEnum.GRAPH_TS: "tijdstempel",
+         StringsEnum.LINK_HEALTH: "Verbinding: {lines_per_s} regels/s, retourtijd {rtt_ms} ms,"
+                                  " verloren {lost_lines}, fouten {parse_errors}",
          }
 
 # French strings
@@ -137,10 +143,12 @@ french = {StringsEnum.CUSTOM_LABEL: "Douane",
           StringsEnum.UPPER_ISI_TOOLTIP: "Millisecondes. Intervalle: " + lower_isi_fre + "-" + str(defs.ISI_max),
           StringsEnum.LOWER_ISI_TOOLTIP: "Millisecondes. Intervalle: " + str(defs.ISI_min) + "-" + upper_isi_fre,
           StringsEnum.SAVE_HDR: "horodatage, sonde #, clics, millisecondes depuis le début de l'expérience, "
-                                "temp de réponse",
+                                "temp de réponse, horodatage corrigé",
           StringsEnum.PLOT_NAME_RT: "Temp de réponse",
           StringsEnum.PLOT_NAME_CLICKS: "Clics",
           StringsEnum.GRAPH_TS: "Horodatage",
+          StringsEnum.LINK_HEALTH: "Liaison : {lines_per_s} lignes/s, aller-retour {rtt_ms} ms,"
+                                   " perdues {lost_lines}, erreurs {parse_errors}",
           }
 
 # German strings
@@ -166,10 +174,12 @@ german = {StringsEnum.CUSTOM_LABEL: "Benutzerdefiniert",
           StringsEnum.UPPER_ISI_TOOLTIP: "Millisekunden. Angebot: " + lower_isi_ger + "-" + str(defs.ISI_max),
           StringsEnum.LOWER_ISI_TOOLTIP: "Millisekunden. Angebot: " + str(defs.ISI_min) + "-" + upper_isi_ger,
           StringsEnum.SAVE_HDR: "zeitstempel, sonde #, klicks, millisekunden nach beginn des experiments,"
-                                " reaktionszeit",
+                                " reaktionszeit, korrigierter zeitstempel",
           StringsEnum.PLOT_NAME_RT: "Reaktionszeit",
           StringsEnum.PLOT_NAME_CLICKS: "Klicks",
           StringsEnum.GRAPH_TS: "Zeitstempel",
+          StringsEnum.LINK_HEALTH: "Verbindung: {lines_per_s} Zeilen/s, Umlaufzeit {rtt_ms} ms,"
+                                   " verloren {lost_lines}, Fehler {parse_errors}",
           }
 
 # Russian strings
@@ -194,10 +204,13 @@ russian = {StringsEnum.CUSTOM_LABEL: "изготовленный на заказ
            StringsEnum.INTENSITY_TOOLTIP: "Intensity of the stimulus",
            StringsEnum.UPPER_ISI_TOOLTIP: "миллисекунды. Спектр: " + lower_isi_rus + "-" + str(defs.ISI_max),
            StringsEnum.LOWER_ISI_TOOLTIP: "миллисекунды. Спектр: " + str(defs.ISI_min) + "-" + upper_isi_rus,
-           StringsEnum.SAVE_HDR: "отметка времени, проба #, щелчки, миллисекунды с начала эксперимента, время отклика",
+           StringsEnum.SAVE_HDR: "отметка времени, проба #, щелчки, миллисекунды с начала эксперимента, время отклика, "
+                                 "исправленная отметка времени",
            StringsEnum.PLOT_NAME_RT: "время отклика",
            StringsEnum.PLOT_NAME_CLICKS: "щелчки",
            StringsEnum.GRAPH_TS: "отметка времени",
+           StringsEnum.LINK_HEALTH: "Связь: {lines_per_s} строк/с, круговая задержка {rtt_ms} мс,"
+                                    " потеряно {lost_lines}, ошибки {parse_errors}",
            }
 
 # Spanish strings
@@ -223,10 +236,13 @@ spanish = {StringsEnum.CUSTOM_LABEL: "Personalizado",
            StringsEnum.UPPER_ISI_TOOLTIP: "Milisegundos. Alcance: " + lower_isi_spa + "-" + str(defs.ISI_max),
            StringsEnum.LOWER_ISI_TOOLTIP: "Milisegundos. Alcance: " + str(defs.ISI_min) + "-" + upper_isi_spa,
            StringsEnum.SAVE_HDR: "marca de tiempo, investigacion #, clics,"
-                                 " milisegundos desde el inicio del experimento, tiempo de respuesta",
+                                 " milisegundos desde el inicio del experimento, tiempo de respuesta,"
+                                 " marca de tiempo corregida",
            StringsEnum.PLOT_NAME_RT: "Tiempo de respuesta",
            StringsEnum.PLOT_NAME_CLICKS: "Clics",
            StringsEnum.GRAPH_TS: "marca de tiempo",
+           StringsEnum.LINK_HEALTH: "Enlace: {lines_per_s} líneas/s, ida y vuelta {rtt_ms} ms,"
+                                    " perdidas {lost_lines}, errores {parse_errors}",
            }
 
 # Chinese (simplified) strings
@@ -251,10 +267,11 @@ chinese = {StringsEnum.CUSTOM_LABEL: "自订",
            StringsEnum.INTENSITY_TOOLTIP: "刺激强度",
            StringsEnum.UPPER_ISI_TOOLTIP: "毫秒。 范围: " + lower_isi_chi + "-" + str(defs.ISI_max),
            StringsEnum.LOWER_ISI_TOOLTIP: "毫秒。 范围: " + str(defs.ISI_min) + "-" + upper_isi_chi,
-           StringsEnum.SAVE_HDR: "时间戳记, 探测 #, 点击次数, 从实验开始算起的毫秒数, 响应时间",
+           StringsEnum.SAVE_HDR: "时间戳记, 探测 #, 点击次数, 从实验开始算起的毫秒数, 响应时间, 校正时间戳记",
            StringsEnum.PLOT_NAME_RT: "响应时间",
            StringsEnum.PLOT_NAME_CLICKS: "点击次数",
            StringsEnum.GRAPH_TS: "时间戳记",
+           StringsEnum.LINK_HEALTH: "连接: {lines_per_s} 行/秒, 往返 {rtt_ms} 毫秒, 丢失 {lost_lines}, 错误 {parse_errors}",
            }
 
 # Japanese strings
@@ -279,10 +296,11 @@ japanese = {StringsEnum.CUSTOM_LABEL: "カスタム",
             StringsEnum.INTENSITY_TOOLTIP: "刺激の強さ",
             StringsEnum.UPPER_ISI_TOOLTIP: "ミリ秒。 範囲: " + lower_isi_jpn + "-" + str(defs.ISI_max),
             StringsEnum.LOWER_ISI_TOOLTIP: "ミリ秒。 範囲: " + str(defs.ISI_min) + "-" + upper_isi_jpn,
-            StringsEnum.SAVE_HDR: "タイムスタンプ, 調査 #, クリック, 実験開始からミリ秒, 反応時間",
+            StringsEnum.SAVE_HDR: "タイムスタンプ, 調査 #, クリック, 実験開始からミリ秒, 反応時間, 補正タイムスタンプ",
             StringsEnum.PLOT_NAME_RT: "反応時間",
             StringsEnum.PLOT_NAME_CLICKS: "クリック",
             StringsEnum.GRAPH_TS: "タイムスタンプ",
+            StringsEnum.LINK_HEALTH: "リンク: {lines_per_s} 行/秒, 往復 {rtt_ms} ミリ秒, 損失 {lost_lines}, エラー {parse_errors}",
             }
 
 strings = {LangEnum.ENG: english,
@@ -0,0 +1,75 @@
+"""
+Licensed under GNU GPL-3.0-or-later
+
+This file is part of RS Companion.
+
+RS Companion is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+RS Companion is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with RS Companion.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Phillip Riskin
+Date: 2020
+Project: Companion App
+Company: Red Scientific
+https://redscientific.com/index.html
+"""
+
+import pyqtgraph as pg
+from logging import getLogger
+from RSCompanionAsync.Devices.AbstractDevice.View.fast_graph import FastGraph, main_color, second_color
+from RSCompanionAsync.Devices.DRT.View.drt_graph import DRTSeries
+from RSCompanionAsync.Devices.DRT.Resources.drt_strings import StringsEnum
+
+
+class DRTFastGraph(DRTSeries, FastGraph):
+    """ DRTGraph drawn with pyqtgraph. """
+    def __init__(self, parent=None):
+        self._logger = getLogger(__name__)
+        self._logger.debug("Initializing")
+        super().__init__(parent)
+        self._init_series()
+        self._rt_plot = None
+        self._clicks_plot = None
+        self._rt_line = None
+        self._miss_markers = None
+        self._clicks_line = None
+        self._logger.debug("Initialized")
+
+    def make_device_artists(self, plot_item, name) -> []:
+        self._logger.debug("running")
+        if name == self._strings[StringsEnum.PLOT_NAME_CLICKS]:
+            self._clicks_plot = plot_item
+            self._clicks_line = plot_item.plot([], [], pen=pg.mkPen(second_color), symbol='s', symbolSize=6,
+                                               symbolBrush=second_color, symbolPen=None, connect='finite')
+            ret = [self._clicks_line]
+        else:
+            self._rt_plot = plot_item
+            self._rt_line = plot_item.plot([], [], pen=pg.mkPen(main_color), symbol='o', symbolSize=6,
+                                           symbolBrush=main_color, symbolPen=None, connect='finite')
+            self._miss_markers = pg.ScatterPlotItem(size=8, brush='#FF0000', pen=None)
+            plot_item.addItem(self._miss_markers)
+            ret = [self._rt_line, self._miss_markers]
+        self._logger.debug("done")
+        return ret
+
+    def update_device_artists(self) -> (float, float, bool):
+        rescaled = False
+        rt_x, rt, clicks_x, clicks, first, last = self.get_series()
+        if self._rt_line:
+            self._rt_line.setData(rt_x, rt)
+            misses = rt == -1
+            self._miss_markers.setData(rt_x[misses], rt[misses])
+            rescaled = self.fit_y(self._rt_plot, *self._rt_range) if len(rt_x) else False
+        if self._clicks_line:
+            self._clicks_line.setData(clicks_x, clicks)
+            rescaled = self.fit_y(self._clicks_plot, 0, self._clicks_peak + 1) or rescaled
+        return first, last, rescaled
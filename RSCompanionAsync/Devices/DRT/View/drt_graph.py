@@ -25,40 +25,50 @@ https://redscientific.com/index.html
 """
 
 import numpy as np
-from logging import getLogger, StreamHandler
-from asyncio import create_task, sleep
-from datetime import datetime, timedelta
-from RSCompanionAsync.Devices.AbstractDevice.View.base_graph import BaseGraph
+from logging import getLogger
+from RSCompanionAsync.Devices.AbstractDevice.View.base_graph import BaseGraph, graph_capacity, to_date_num
+from RSCompanionAsync.Devices.AbstractDevice.View.series_buffer import SeriesBuffer
+from RSCompanionAsync.Devices.AbstractDevice.View.overview_series import OverviewSeries
+from RSCompanionAsync.Model.rs_scrollback import ScrollbackStore
+from RSCompanionAsync.Model.rs_tracing import span
 from RSCompanionAsync.Devices.DRT.Resources.drt_strings import strings, StringsEnum, LangEnum
 
 
-class DRTGraph(BaseGraph):
-    def __init__(self, parent=None, log_handlers: [StreamHandler] = None):
-        self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
-        self._logger.debug("Initializing")
-        super().__init__(parent, log_handlers)
-        self._data = list()
+class DRTSeries:
+    """ The DRT graph data, shared by DRTGraph and the pyqtgraph DRTFastGraph. Put first in the bases. """
+    def _init_series(self) -> None:
+        self._names = list()  # Plot names, in the order of the series columns.
+        self._series = SeriesBuffer(graph_capacity, 2)  # Response time and clicks.
+        self._overviews = [OverviewSeries(), OverviewSeries()]
+        self._scrollback = None
+        self._rt_range = [0, 0]
+        self._clicks_peak = 0
         self._strings = dict()
-        self._click_max = 6
-        self._logger.debug("Initialized")
 
-    async def show(self) -> None:
-        self.set_subplots([x[0] for x in self._data])
-        await create_task(self.plot(self.get_new()))
+    def show(self) -> None:
+        self.set_subplots(list(self._names))
+        self.plot(self.get_new())
 
     def clear_graph(self) -> None:
         """
         Clear this graph of any device data.
         :return None:
         """
-        for i in range(len(self._data)):
-            self._data[i] = [self._data[i][0], [], []]
+        self._series.clear()
+        for overview in self._overviews:
+            overview.clear()
+        self._rt_range = [0, 0]
+        self._clicks_peak = 0
         self.set_new(True)
-        self._click_max = 6
-        create_task(self.show())
+        self.show()
+
+    def set_scrollback(self, store: ScrollbackStore) -> None:
+        """
+        Keep every point in store as well, and show data older than this graph's SeriesBuffer from it.
+        :param store: The experiment's store for this device, None for none.
+        :return None:
+        """
+        self._scrollback = store
 
     def set_lang(self, lang: LangEnum) -> None:
         """
@@ -67,75 +77,118 @@ class DRTGraph(BaseGraph):
         :return None:
         """
         self._logger.debug("running")
-        super(DRTGraph, self).set_lang(lang)
+        super().set_lang(lang)
         self._strings = strings[lang]
-        self._change_plot_names([self._strings[StringsEnum.PLOT_NAME_RT], self._strings[StringsEnum.PLOT_NAME_CLICKS]])
-        create_task(self.show())
+        self._names = [self._strings[StringsEnum.PLOT_NAME_RT], self._strings[StringsEnum.PLOT_NAME_CLICKS]]
+        self.show()
         self._logger.debug("done")
 
-    async def plot_device_data(self, axes, name) -> []:
+    def add_data(self, data: []) -> None:
+        """ Ensure data comes in as type, x, y with x in epoch seconds """
+        with span("graph.add_data"):
+            self.set_new(False)
+            timestamp = None
+            values = [None] * len(self._names)
+            for item in data:
+                if item[0] in self._names:
+                    timestamp = item[1]
+                    values[self._names.index(item[0])] = item[2]
+            if timestamp is not None:
+                self._series.append(timestamp, *values)
+                if self._scrollback is not None:
+                    self._scrollback.append(timestamp, *values)
+                for overview, value in zip(self._overviews, values):
+                    overview.append(timestamp, value)
+                if values[0] is not None:
+                    self._rt_range = [min(self._rt_range[0], values[0]), max(self._rt_range[1], values[0])]
+                if values[1] is not None:
+                    self._clicks_peak = max(self._clicks_peak, values[1])
+            self.plot()
+
+    def add_empty_point(self, timestamp: float) -> None:
+        """
+        Break the lines between blocks.
+        :param timestamp: Epoch seconds.
+        :return None:
+        """
+        if self.get_new():
+            return
+        self._series.append(timestamp)
+        if self._scrollback is not None:
+            self._scrollback.append(timestamp)
+        self.plot()
+
+    def get_series(self) -> (np.ndarray, np.ndarray, np.ndarray, np.ndarray, float, float):
+        """
+        :return: Response time x and y, clicks x and y, and the oldest and newest x, of the window or the overview.
+        The oldest and newest x are always the SeriesBuffer's in a history window.
+        """
+        history = self.get_history()
+        first = self._series.first_x()
+        if history and self._scrollback is not None and first is not None and history[0] < first:
+            x, (rt, clicks) = self._scrollback.load(*history, graph_capacity)
+            return x, rt, x, clicks, first, self._series.last_x()
+        if self.get_overview():
+            (rt_x, rt), (clicks_x, clicks) = [overview.get() for overview in self._overviews]
+            return rt_x, rt, clicks_x, clicks, self._overviews[0].first_x(), self._overviews[0].last_x()
+        x = self._series.x()
+        return x, self._series.y(0), x, self._series.y(1), self._series.first_x(), self._series.last_x()
+
+
+class DRTGraph(DRTSeries, BaseGraph):
+    def __init__(self, parent=None):
+        self._logger = getLogger(__name__)
+        self._logger.debug("Initializing")
+        super().__init__(parent)
+        self._init_series()
+        self._click_max = 6
+        self._rt_axes = None
+        self._clicks_axes = None
+        self._rt_line = None
+        self._miss_markers = None
+        self._clicks_line = None
+        self._logger.debug("Initialized")
+
+    def clear_graph(self) -> None:
+        self._click_max = 6
+        super().clear_graph()
+
+    def make_device_artists(self, axes, name) -> []:
         self._logger.debug("running")
-        data = list()
-        for x in self._data:
-            if x[0] == name:
-                data = x
-        left = datetime.now()
-        right = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        await sleep(.001)
         if name == self._strings[StringsEnum.PLOT_NAME_CLICKS]:
-            axes.plot(data[1], data[2], marker='s', color='#ff7f0e')
-            if data[2][-1] >= self._click_max:
-                self._click_max = data[2][-1] + 2
-            if self._click_max < 10:
-                axes.set_yticks(np.arange(0, self._click_max, step=1))
-            else:
-                axes.set_yticks(np.arange(0, self._click_max, step=2))
-
-            # print(data)
+            self._clicks_axes = axes
+            self._set_click_ticks()
+            self._clicks_line, = axes.plot([], [], marker='s', color='#ff7f0e')
+            ret = [self._clicks_line]
         else:
-            axes.plot(data[1], data[2], marker='o')
-            for i in range(len(data[2])):
-                if data[2][i] == -1:
-                    axes.plot(data[1][i], data[2][i], marker='o', color='#FF0000')
-        await sleep(.001)
-        if len(data[1]) > 0:
-            if right < data[1][-1]:
-                right = data[1][-1]
-            if left > data[1][0]:
-                left = data[1][0]
-        temp_left = right - timedelta(minutes=2)
-        if left < temp_left:
-            left = temp_left
-        await sleep(.001)
-        axes.set_xlim(left=left - timedelta(seconds=10), right=right + timedelta(seconds=10))
-        await sleep(.001)
-        self._logger.debug("done")
-
-    def add_data(self, data: []) -> None:
-        """ Ensure data comes in as type, x, y """
-        self._logger.debug("running")
-        self.set_new(False)
-        for item in data:
-            for i in range(len(self._data)):
-                if item[0] == self._data[i][0]:
-                    self._data[i][1].append(item[1])
-                    self._data[i][2].append(item[2])
-                    break
-        create_task(self.plot())
+            self._rt_axes = axes
+            self._rt_line, = axes.plot([], [], marker='o')
+            self._miss_markers = axes.scatter([], [], color='#FF0000', zorder=3)
+            ret = [self._rt_line, self._miss_markers]
         self._logger.debug("done")
-
-    def add_empty_point(self, timestamp):
-        if self.get_new():
-            return
-        for data in self._data:
-            data[1].append(timestamp)
-            data[2].append(None)
-        self.refresh_self()
-
-    def _change_plot_names(self, names) -> None:
-        if len(self._data) == 0:
-            for name in names:
-                self._data.append([name, [], []])
+        return ret
+
+    def update_device_artists(self) -> (float, float, bool):
+        rescaled = False
+        rt_x, rt, clicks_x, clicks, first, last = self.get_series()
+        # Lines keep the arrays they are given and read them when drawn, which may be on the RENDER thread after more
+        # appends, so they get copies and not views into the SeriesBuffer.
+        if self._rt_line:
+            rt_x = to_date_num(rt_x)
+            rt = rt.copy()
+            self._rt_line.set_data(rt_x, rt)
+            self._miss_markers.set_offsets(np.ma.column_stack([rt_x, np.ma.masked_where(rt != -1, rt)]))
+            rescaled = self.fit_y(self._rt_axes, *self._rt_range) if len(rt_x) else False
+        if self._clicks_line:
+            self._clicks_line.set_data(to_date_num(clicks_x), clicks.copy())
+            if self._clicks_peak >= self._click_max:
+                self._click_max = self._clicks_peak + 2
+                self._set_click_ticks()
+                rescaled = True
+        return first, last, rescaled
+
+    def _set_click_ticks(self) -> None:
+        if self._click_max < 10:
+            self._clicks_axes.set_yticks(np.arange(0, self._click_max, step=1))
         else:
-            for i in range(len(names)):
-                self._data[i][0] = names[i]
+            self._clicks_axes.set_yticks(np.arange(0, self._click_max, step=2))
@@ -24,7 +24,7 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
-from logging import getLogger, StreamHandler
+from logging import getLogger
 from PySide2.QtWidgets import QHBoxLayout, QLabel, QSlider, QGridLayout, QLineEdit, QVBoxLayout
 from PySide2.QtCore import Qt, QSize
 from RSCompanionAsync.Model.app_helpers import ClickAnimationButton, EasyFrame
@@ -35,11 +35,8 @@ from RSCompanionAsync.Devices.AbstractDevice.View.config_pop_up import ConfigPop
 
 
 class DRTView(AbstractView):
-    def __init__(self, name: str = "DRT_NONE", log_handlers: [StreamHandler] = None):
+    def __init__(self, name: str = "DRT_NONE"):
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
         super().__init__(name)
 
@@ -48,8 +45,8 @@ class DRTView(AbstractView):
         self._subwindow_width = 518
 
         """ min and max sizes for the configuration popup """
-        self._popup_min = (168, 313)
-        self._popup_max = (300, 313)
+        self._popup_min = (168, 353)
+        self._popup_max = (300, 353)
 
         """ Set configuration value display area """
         self._config_frame = EasyFrame()
@@ -118,6 +115,11 @@ class DRTView(AbstractView):
         self._upload_settings_button = ClickAnimationButton()
         self._upload_settings_button.setEnabled(False)
 
+        """ Serial link health display """
+        self._link_health_label = QLabel()
+        self._link_health_label.setAlignment(Qt.AlignCenter)
+        self._link_health_label.setWordWrap(True)
+
         """ device settings display """
         self._dev_sets_frame = EasyFrame()
         self._dev_sets_layout = QVBoxLayout(self._dev_sets_frame)
@@ -141,6 +143,7 @@ class DRTView(AbstractView):
         self._dev_sets_layout.addWidget(EasyFrame(line=True))
         self._dev_sets_layout.addWidget(self._iso_button)
         self._dev_sets_layout.addWidget(self._upload_settings_button)
+        self._dev_sets_layout.addWidget(self._link_health_label)
 
         self.layout().setMargin(0)
 
@@ -248,6 +251,23 @@ class DRTView(AbstractView):
         self._config_val.setText(val)
         self._logger.debug("done")
 
+    @property
+    def link_health_text(self) -> str:
+        """
+        Get the serial link health text.
+        :return str: The text.
+        """
+        return self._link_health_label.text()
+
+    @link_health_text.setter
+    def link_health_text(self, val: str) -> None:
+        """
+        Set the serial link health text.
+        :param val: The text.
+        :return None:
+        """
+        self._link_health_label.setText(val)
+
     @property
     def stim_duration(self) -> str:
         """
@@ -24,42 +24,53 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
-from logging import getLogger, StreamHandler
-from datetime import datetime
+import os
+from os.path import basename
+from logging import getLogger
 from asyncio import create_task
+from functools import partial
+from typing import Callable
 from aioserial import AioSerial
+from serial.serialutil import SerialException
+from RSCompanionAsync.Model.rs_clock import to_wall_ns, wall_ns_now
+from RSCompanionAsync.Model.rs_scrollback import ScrollbackStore, scrollback_dir
+from RSCompanionAsync.Model.rs_tracing import span
 from RSCompanionAsync.Devices.AbstractDevice.Controller.abstract_controller import AbstractController
 from RSCompanionAsync.Devices.AbstractDevice.View.graph_frame import GraphFrame
 from RSCompanionAsync.Devices.VOG.View.vog_view import VOGView
 from RSCompanionAsync.Devices.VOG.View.vog_graph import VOGGraph
 from RSCompanionAsync.Devices.VOG.Model.vog_model import VOGModel
 from RSCompanionAsync.Devices.VOG.Model import vog_defs as defs
-from RSCompanionAsync.Devices.VOG.Resources.vog_strings import strings, LangEnum
+from RSCompanionAsync.Devices.VOG.Resources.vog_strings import strings, StringsEnum, LangEnum
 
 
 class Controller(AbstractController):
-    def __init__(self, conn: AioSerial = AioSerial(), lang: LangEnum = LangEnum.ENG,
-                 log_handlers: [StreamHandler] = None):
+    def __init__(self, conn: AioSerial = AioSerial(), lang: LangEnum = LangEnum.ENG):
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
         try:
-            device_name = "VOG_" + conn.port.strip("COM")
+            device_name = "VOG_" + basename(conn.port).strip("COM")  # COM3 on Windows, /dev/ttyACM0 elsewhere.
         except:
             device_name = "VOG_NONE"
-        view = VOGView(device_name, log_handlers)
+        view = VOGView(device_name)
         super().__init__(view)
-        self._model = VOGModel(device_name, conn, log_handlers)
-        self._graph = VOGGraph(view, log_handlers)
-        self.view.add_graph(GraphFrame(view, self._graph, log_handlers))
+        self._model = VOGModel(device_name, conn)
+        self._presets = {"nhtsa": self._model.send_nhtsa, "eblind": self._model.send_eblind,
+                         "direct_control": self._model.send_direct_control}
+        self._graph = VOGGraph(view)
+        self._fast_graph = False
+        self._scrollback = None
+        self._graph_frame = GraphFrame(view, self._graph)
+        self.view.add_graph(self._graph_frame)
         self._exp_created = False
         self._exp_running = False
         self._updating_config = False
         self._prev_vals = ["0", "0"]  # open_dur, close_dur
         self._setup_handlers()
         self._init_values()
+        self._link_lost_handler = None
+        self._stage_hook = None
+        self._frame_hook = (None, False)  # The graph's frame hook and whether it renders hidden.
         self._msg_handler_task = create_task(self.msg_handler())
         self._strings = dict()
         self.set_lang(lang)
@@ -77,6 +88,8 @@ class Controller(AbstractController):
         if self._exp_created:
             self.end_exp()
         self._msg_handler_task.cancel()
+        self._graph.cleanup()
+        self._close_scrollback()
         self._model.cleanup()
         self.view.save_window_state()
         self._logger.debug("done")
@@ -102,21 +115,30 @@ class Controller(AbstractController):
 
     async def msg_handler(self) -> None:
         """
-        Handle messages sent from device.
+        Handle messages sent from device until the link to it is lost.
         :return: None.
         """
         self._logger.debug("running")
-        while True:
-            msg, timestamp = await self._model.get_msg()
-            if 'type' in msg.keys():
-                msg_type = msg['type']
-                if msg_type == "data":
-                    self._update_view_data(msg['values'], timestamp)
-                    self._model.save_data(msg['values'], timestamp)
-                elif msg_type == "settings":
-                    self._update_view_config(msg['values'])
-                elif msg_type == "action":
-                    pass  # TODO: handle action message?
+        try:
+            while True:
+                for msg, timestamp in await self._model.get_msgs():
+                    if 'type' in msg.keys():
+                        msg_type = msg['type']
+                        if msg_type == "data":
+                            if self._stage_hook:
+                                self._stage_hook(self.view.get_name(), "handler", msg['values'])
+                            self._update_view_data(msg['values'], timestamp)
+                            if self._stage_hook:
+                                self._stage_hook(self.view.get_name(), "view_queued", msg['values'])
+                            self._model.save_data(msg['values'], timestamp)
+                        elif msg_type == "settings":
+                            self._update_view_config(msg['values'])
+                        elif msg_type == "action":
+                            pass  # TODO: handle action message?
+        except SerialException as e:
+            self._logger.warning("Lost the link to " + self.view.get_name() + ": " + str(e))
+            if self._link_lost_handler:
+                self._link_lost_handler(self.get_conn().port)
 
     def create_exp(self, path: str, cond_name: str) -> None:
         """
@@ -127,6 +149,8 @@ class Controller(AbstractController):
         """
         self._logger.debug("running")
         self._graph.clear_graph()
+        self._scrollback = ScrollbackStore(os.path.join(path, scrollback_dir, self.view.get_name()), 2)
+        self._graph.set_scrollback(self._scrollback)
         self._model.update_save_info(path)
         self._model.add_save_hdr()
         self._model.send_create()
@@ -140,9 +164,120 @@ class Controller(AbstractController):
         """
         self._logger.debug("running")
         self._model.send_end()
+        self._model.end_save()
+        self._close_scrollback()
         self._exp_created = False
         self._logger.debug("done")
 
+    def get_presets(self) -> [str]:
+        """
+        :return [str]: The names of the presets this device can apply.
+        """
+        return list(self._presets.keys())
+
+    async def apply_preset(self, name: str) -> bool:
+        """
+        Set the device to a preset and wait for it to confirm the new values.
+        :param name: The preset name.
+        :return bool: Whether the device confirmed every setting in the preset.
+        """
+        self._logger.debug("running")
+        if name not in self._presets:
+            self._logger.warning("Unknown preset: " + name)
+            return False
+        result = self._presets[name]()
+        self._model.reset_changed()
+        self._check_for_upload()
+        ret = await result
+        self._logger.debug("done")
+        return ret
+
+    def set_raw_capture(self, path: str = None) -> None:
+        """
+        Record this device's raw serial input for replay, or stop recording.
+        :param path: The dir to write the capture in, None to stop.
+        :return None:
+        """
+        self._logger.debug("running")
+        self._model.set_raw_capture(path)
+        self._logger.debug("done")
+
+    def set_link_lost_handler(self, func: classmethod) -> None:
+        """
+        Set the function called with this device's port when the link to it is lost.
+        :param func: The function.
+        :return None:
+        """
+        self._link_lost_handler = func
+
+    def set_stage_hook(self, func: Callable[[str, str, dict], None] = None) -> None:
+        """
+        Set the function called as each data line passes a stage, for timing the data path. The stages are "handler"
+        when the line reaches the message handler, "view_queued" once it is queued for the graph and "disk" once its
+        row is written.
+        :param func: Called with this device's name, the stage and the line's values. None to stop.
+        :return None:
+        """
+        self._stage_hook = func
+        self._model.set_save_hook(partial(func, self.view.get_name(), "disk") if func else None)
+
+    def set_frame_hook(self, func: Callable[[str, int], None] = None, render_hidden: bool = False) -> None:
+        """
+        Set the function called once a render of this device's graph is on screen, see GraphWindow.set_frame_hook.
+        :param func: Called with this device's name and the perf_counter_ns the render took its data at. None to stop.
+        :param render_hidden: Render even while the graph can't be seen, for timing without a screen.
+        :return None:
+        """
+        self._frame_hook = (partial(func, self.view.get_name()) if func else None, render_hidden)
+        self._graph.set_frame_hook(*self._frame_hook)
+
+    def set_graph_render(self, mode: str) -> None:
+        """
+        Set how this device's graph is drawn. Changing to or from pyqtgraph starts a new, empty graph.
+        :param mode: "blit" to draw on the event loop, "offscreen" to draw in a worker thread, "pyqtgraph" to use the
+        pyqtgraph backend if it is installed.
+        :return None:
+        """
+        self._logger.debug("running")
+        if (mode == "pyqtgraph") != self._fast_graph:
+            self._swap_graph(mode == "pyqtgraph")
+        self._graph.set_offscreen(mode == "offscreen")
+        self._logger.debug("done")
+
+    def _swap_graph(self, fast: bool) -> None:
+        """
+        Replace the graph with one from the other backend.
+        :param fast: Whether to use pyqtgraph.
+        :return None:
+        """
+        self._logger.debug("running")
+        if fast:
+            try:
+                from RSCompanionAsync.Devices.VOG.View.vog_fast_graph import VOGFastGraph as Graph
+            except ImportError as e:
+                self._logger.warning("pyqtgraph is not installed, keeping the matplotlib graph")
+                return
+        else:
+            Graph = VOGGraph
+        self._graph.cleanup()
+        self._graph = Graph(self.view)
+        self._fast_graph = fast
+        self._graph_frame.set_graph(self._graph)
+        self._graph.set_scrollback(self._scrollback)
+        self._graph.set_lang(self.view.language)
+        self._graph.set_frame_hook(*self._frame_hook)
+        self._logger.debug("done")
+
+    def _close_scrollback(self) -> None:
+        """
+        Stop keeping graph points on disk.
+        :return None:
+        """
+        if self._scrollback is not None:
+            self._graph.set_scrollback(None)
+            self._scrollback.close()
+            self._scrollback = None
+
     def start_exp(self, block_num: int, cond_name: str) -> None:
         """
         Notify this device of experiment start.
@@ -152,6 +287,7 @@ class Controller(AbstractController):
         """
         self._logger.debug("running")
         self._model.send_start()
+        self._graph.add_vert_lines(wall_ns_now() / 1E9)
         self._exp_running = True
         self._logger.debug("done")
 
@@ -163,6 +299,7 @@ class Controller(AbstractController):
         self._logger.debug("running")
         self._model.send_stop()
         self._exp_running = False
+        self._graph.log_render_stats(self.view.get_name())
         self._logger.debug("done")
 
     def _setup_handlers(self) -> None:
@@ -181,6 +318,7 @@ class Controller(AbstractController):
         self.view.set_upload_settings_button_handler(self._update_device)
         self.view.set_manual_control_open_button_handler(self._manual_open_handler)
         self.view.set_manual_control_close_button_handler(self._manual_close_handler)
+        self._model.set_link_health_handler(self._update_view_health)
         self._logger.debug("done")
 
     def _init_values(self) -> None:
@@ -338,9 +476,7 @@ class Controller(AbstractController):
         :return None:
         """
         self._logger.debug("running")
-        self._model.send_nhtsa()
-        self._model.reset_changed()
-        self._check_for_upload()
+        create_task(self.apply_preset("nhtsa"))
         self._logger.debug("done")
 
     def _eblind_handler(self) -> None:
@@ -349,9 +485,7 @@ class Controller(AbstractController):
         :return None:
         """
         self._logger.debug("running")
-        self._model.send_eblind()
-        self._model.reset_changed()
-        self._check_for_upload()
+        create_task(self.apply_preset("eblind"))
         self._logger.debug("done")
 
     def _direct_control_handler(self) -> None:
@@ -360,9 +494,7 @@ class Controller(AbstractController):
         :return None:
         """
         self._logger.debug("running")
-        self._model.send_direct_control()
-        self._model.reset_changed()
-        self._check_for_upload()
+        create_task(self.apply_preset("direct_control"))
         self._logger.debug("done")
 
     def _update_view_config(self, msg: dict) -> None:
@@ -437,14 +569,21 @@ class Controller(AbstractController):
         self.view.set_upload_button(self._model.check_current_input())
         self._logger.debug("done")
 
-    def _update_view_data(self, values: dict, timestamp: datetime) -> None:
+    def _update_view_health(self, health: dict) -> None:
+        """
+        Show the serial link health on the view.
+        :param health: The latest link health values.
+        :return: None.
+        """
+        self.view.link_health_text = self._strings[StringsEnum.LINK_HEALTH].format(**health)
+
+    def _update_view_data(self, values: dict, timestamp: int) -> None:
         """
         Display data from device on view.
         :param values: The data to display.
-        :param timestamp: When the data was received.
+        :param timestamp: perf_counter_ns when the data was received.
         :return: None.
         """
-        self._logger.debug("running")
-        data = [timestamp, int(values[defs.output_field[1]]), int(values[defs.output_field[2]])]
-        self._graph.add_data(data)
-        self._logger.debug("done")
+        with span("vog.plot"):
+            data = [to_wall_ns(timestamp) / 1E9, int(values[defs.output_field[1]]), int(values[defs.output_field[2]])]
+            self._graph.add_data(data)
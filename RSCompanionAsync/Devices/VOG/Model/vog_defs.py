@@ -29,6 +29,38 @@ output_field = ['trialCounter', 'millis_openElapsed', 'millis_closeElapsed']
 save_fields = ['trialCounter', 'millis_openElapsed', 'millis_closeElapsed']
 ui_fields = ['block #', 'Total millis open', 'Total millis closed']
 
+config_fields = ['Name', 'MaxOpen', 'MaxClose', 'Debounce', 'ClickMode']
+
+# Commands the device answers and the settings value in its answer. set_ commands are echoed with the new value
+# except button control, which has to be asked for.
+acks = {cmd + "config" + x: x for x in config_fields for cmd in ("get_", "set_")}
+acks["get_configButtonControl"] = "buttonControl"
+
+# Settings query sent to measure round trip time, see RSCompanionAsync/Model/rs_link_health.py
+probe_cmd = "get_configMaxOpen"
+
+# Wire protocol, see RSCompanionAsync/Model/rs_protocol.py
+# Only data lines are matched on prefix, the rest are matched anywhere in the line in this order.
+protocol = {"messages": [{"match": "prefix", "key": b"data|", "type": "data", "kind": "positional", "sep": b",",
+                          "fields": [(x, str) for x in output_field]},
+                         {"match": "contains", "key": b"config", "type": "settings", "kind": "keyed", "kv_sep": b"|",
+                          "fields": {x: str for x in config_fields}},
+                         {"match": "contains", "key": b"Click", "type": "action", "kind": "action",
+                          "action": "Click"},
+                         {"match": "contains", "key": b"buttonControl", "type": "settings", "kind": "tail",
+                          "kv_sep": b"|", "fields": [("buttonControl", str)]},
+                         {"match": "contains", "key": b"peek", "type": "settings", "kind": "line",
+                          "fields": [("lensState", str)]}],
+            "cmd_fmt": ">{cmd}|{arg}<<\n",
+            "cmd_fmt_no_arg": ">{cmd}|<<\n",
+            "save_fields": save_fields,
+            "acks": acks}
+
+# USB serial settings applied when the port is opened, see RSCompanionAsync/Model/rs_port_tuning.py
+profile["VOG"]["tuning"] = {"latency_timer_ms": 1, "low_latency": True, "read_buffer": 1 << 16,
+                          "probe": protocol["cmd_fmt_no_arg"].format(cmd=probe_cmd).encode(),
+                          "probe_answer": acks[probe_cmd].encode()}
+
 max_val = 2147483647
 
 max_open_close = max_val
@@ -23,25 +23,44 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
-from logging import getLogger, StreamHandler
-from asyncio import create_task, get_running_loop
-from aioserial import AioSerial, SerialException
-from datetime import datetime
+import os
+from logging import getLogger
+from asyncio import create_task, get_running_loop, gather, Future
+from typing import Awaitable, Callable
+from aioserial import AioSerial
+from RSCompanionAsync.Model.rs_serial_reader import SerialLineReader
+from RSCompanionAsync.Model.rs_command_queue import CommandQueue
+from RSCompanionAsync.Model.rs_link_health import LinkHealth, probe_tag
+from RSCompanionAsync.Model.rs_capture import capture_ext
+from RSCompanionAsync.Model.rs_io_process import RemoteSerial
+from RSCompanionAsync.Model.rs_clock import to_wall_ns
+from RSCompanionAsync.Model.rs_tracing import span
+from RSCompanionAsync.Model.rs_protocol import compile_parser, compile_row_encoder, compile_cmd_encoder
 from RSCompanionAsync.Model.app_helpers import write_line_to_file
 from RSCompanionAsync.Devices.VOG.Model import vog_defs as defs
 from RSCompanionAsync.Devices.VOG.Resources.vog_strings import strings, StringsEnum, LangEnum
 
+_parse_msg = compile_parser(defs.protocol)
+_format_save_row = compile_row_encoder(defs.protocol["save_fields"])
+_encode_cmd = compile_cmd_encoder(defs.protocol)
+
 
 class VOGModel:
-    def __init__(self, dev_name: str = "VOG_NONE", conn: AioSerial = AioSerial(), log_handlers: [StreamHandler] = None):
+    def __init__(self, dev_name: str = "VOG_NONE", conn: AioSerial = AioSerial()):
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
         self._dev_name = dev_name
         self._conn = conn
+        if isinstance(conn, RemoteSerial):  # Read and parsed in the io process.
+            conn.open(defs.protocol)
+            self._reader = conn
+        else:
+            self._reader = SerialLineReader(conn)
+        self._cmds = CommandQueue(conn, dev_name)
+        self._health = LinkHealth(dev_name, self._probe, write_line_to_file, defs.output_field[0])
+        self._health.start(self._cmds.get_stats)
         self._save_filename = str()
+        self._save_hook = None
         self._save_dir = str()
         self._strings = dict()
         self._current_vals = [""]
@@ -69,6 +88,7 @@ class VOGModel:
         self._save_dir = path
         # self._save_filename = self._dev_name + "_" + format_current_time(datetime.now(), save=True) + ".csv"
         self._save_filename = self._dev_name + ".csv"
+        self._health.start_log(path)
 
     def set_current_vals(self, name: str = None, max_open: int = None, max_close: int = None, debounce: int = None,
                          button_mode: int = None, control_mode: int = None) -> None:
@@ -124,23 +144,64 @@ class VOGModel:
         self._strings = strings[lang]
         self._logger.debug("done")
 
-    async def get_msg(self) -> (dict, datetime):
+    async def get_msgs(self) -> [(dict, int)]:
         """
-        Get next message from device.
-        :return: (The next message from device, when the message was received.)
+        Get all messages that have arrived from device since the last call, waiting for at least one.
+        :return: [(A message from device, perf_counter_ns when the message arrived.)]
         """
-        self._logger.debug("running")
-        msg = await self._loop.run_in_executor(None, self.readline_threaded)
-        self._logger.debug("done")
-        return msg
+        msgs, num_bytes = await self._reader.get_msgs(_parse_msg)
+        with span("vog.msgs"):
+            self._health.add_counts(len(msgs), num_bytes)
+            ret = list()
+            for msg, timestamp in msgs:
+                self._health.add_msg(msg)
+                if msg.get('type') == "settings":
+                    if self._cmds.handle_response(msg['values']) == probe_tag:
+                        continue  # The probe's answer is for the link health, not the view.
+                ret.append((msg, timestamp))
+        return ret
+
+    def get_link_health(self) -> dict:
+        """
+        :return dict: The latest link health values, see rs_link_health.
+        """
+        return self._health.get_snapshot()
+
+    def set_link_health_handler(self, func: classmethod) -> None:
+        """
+        :param func: Called with the latest link health values after each probe.
+        :return None:
+        """
+        self._health.set_update_handler(func)
+
+    def set_save_hook(self, func: Callable[[dict], None] = None) -> None:
+        """
+        Set the function called once each data row is written, for timing data to the disk.
+        :param func: Called with the row's values. None to stop.
+        :return None:
+        """
+        self._save_hook = func
+
+    def end_save(self) -> None:
+        """
+        Stop writing experiment files that are written as the device runs.
+        :return None:
+        """
+        self._health.stop_log()
 
-    def readline_threaded(self) -> (dict, datetime):
+    def set_raw_capture(self, path: str = None) -> None:
+        """
+        Record everything read from the device to a raw capture file for replay, or stop recording.
+        :param path: The dir to write the capture in, None to stop.
+        :return None:
+        """
         self._logger.debug("running")
-        line = self._conn.readline()
-        timestamp = datetime.now()
-        msg = self._parse_msg(line.decode("utf-8"))
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._reader.open_capture(os.path.join(path, self._dev_name + capture_ext), self._dev_name)
+        else:
+            self._reader.stop_capture()
         self._logger.debug("done")
-        return msg, timestamp
 
     def cleanup(self) -> None:
         """
@@ -148,6 +209,9 @@ class VOGModel:
         :return None:
         """
         self._logger.debug("running")
+        self._health.cleanup()
+        self._cmds.cleanup()
+        self._reader.cleanup()
         self._conn.close()
         self._logger.debug("done")
 
@@ -288,41 +352,45 @@ class VOGModel:
         self._logger.debug("done")
         return ret
 
-    def send_create(self) -> None:
+    def send_create(self) -> Future:
         """
         Notify this device of exp creation.
-        :return None:
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("do_expStart"))
+        ret = self._send_cmd("do_expStart")
         self._logger.debug("done")
+        return ret
 
-    def send_end(self) -> None:
+    def send_end(self) -> Future:
         """
         Notify this device of exp end.
-        :return None:
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("do_expStop"))
+        ret = self._send_cmd("do_expStop")
         self._logger.debug("done")
+        return ret
 
-    def send_start(self) -> None:
+    def send_start(self) -> Future:
         """
         Notify this device of exp start.
-        :return None:
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("do_trialStart"))
+        ret = self._send_cmd("do_trialStart")
         self._logger.debug("done")
+        return ret
 
-    def send_stop(self) -> None:
+    def send_stop(self) -> Future:
         """
         Notify this device of exp stop.
-        :return None:
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("do_trialStop"))
+        ret = self._send_cmd("do_trialStop")
         self._logger.debug("done")
+        return ret
 
     def query_config(self) -> None:
         """
@@ -338,284 +406,251 @@ class VOGModel:
         self.query_button_control()
         self._logger.debug("done")
 
-    def query_name(self) -> None:
+    def query_name(self) -> Future:
         """
         Ask device for current name.
-        :return None:
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("get_configName"))
+        ret = self._send_cmd("get_configName")
         self._logger.debug("done")
+        return ret
 
-    def query_open(self) -> None:
+    def query_open(self) -> Future:
         """
         Ask device for current max open.
-        :return None:
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("get_configMaxOpen"))
+        ret = self._send_cmd("get_configMaxOpen")
         self._logger.debug("done")
+        return ret
 
-    def query_close(self) -> None:
+    def query_close(self) -> Future:
         """
         Ask device for current max close.
-        :return None:
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("get_configMaxClose"))
+        ret = self._send_cmd("get_configMaxClose")
         self._logger.debug("done")
+        return ret
 
-    def query_debounce(self) -> None:
+    def query_debounce(self) -> Future:
         """
         Ask device for current debounce value.
-        :return None:
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("get_configDebounce"))
+        ret = self._send_cmd("get_configDebounce")
         self._logger.debug("done")
+        return ret
 
-    def query_click(self) -> None:
+    def query_click(self) -> Future:
         """
         Ask device for current mode.
-        :return None:
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("get_configClickMode"))
+        ret = self._send_cmd("get_configClickMode")
         self._logger.debug("done")
+        return ret
 
-    def query_button_control(self) -> None:
+    def query_button_control(self) -> Future:
         """
         Ask device for current config button type.
-        :return None:
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("get_configButtonControl"))
+        ret = self._send_cmd("get_configButtonControl")
         self._logger.debug("done")
+        return ret
 
-    def send_name(self, val: str) -> None:
+    def send_name(self, val: str) -> Future:
         """
         Ask device for current name.
-        :return None:
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("set_configName", str(val)))
+        ret = self._send_cmd("set_configName", str(val))
         self._logger.debug("done")
+        return ret
 
-    def send_open(self, val: str) -> None:
+    def send_open(self, val: str) -> Future:
         """
         Ask device for current max open.
-        :return None:
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("set_configMaxOpen", str(val)))
+        ret = self._send_cmd("set_configMaxOpen", str(val))
         self._logger.debug("done")
+        return ret
 
-    def send_close(self, val: str) -> None:
+    def send_close(self, val: str) -> Future:
         """
         Ask device for current max close.
-        :return None:
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("set_configMaxClose", str(val)))
+        ret = self._send_cmd("set_configMaxClose", str(val))
         self._logger.debug("done")
+        return ret
 
-    def send_debounce(self, val: str) -> None:
+    def send_debounce(self, val: str) -> Future:
         """
         Ask device for current debounce value.
-        :return None:
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("set_configDebounce", str(val)))
+        ret = self._send_cmd("set_configDebounce", str(val))
         self._logger.debug("done")
+        return ret
 
-    def send_click(self, val: int) -> None:
+    def send_click(self, val: int) -> Future:
         """
         Ask device for current mode.
-        :return None:
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("set_configClickMode", str(val)))
+        ret = self._send_cmd("set_configClickMode", str(val))
         self._logger.debug("done")
+        return ret
 
-    def send_button_control(self, val: str) -> None:
+    def send_button_control(self, val: str) -> Future:
         """
         Ask device for current config button type.
-        :return None:
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("set_configButtonControl", str(val)))
-        self._send_msg(self._prepare_msg("get_configButtonControl"))
-        # Device does not send button control update automatically so we must ask for it explicitly.
+        # Device does not send button control update automatically so we must ask for it explicitly. Both go as one
+        # command so a retry sets it again.
+        msg = self._prepare_msg("set_configButtonControl", str(val)) + self._prepare_msg("get_configButtonControl")
+        ret = self._cmds.send(msg, {defs.acks["get_configButtonControl"]: str(val)})
         self._logger.debug("done")
+        return ret
 
-    def save_data(self, data: dict, timestamp: datetime) -> None:
+    def save_data(self, data: dict, timestamp: int) -> None:
         """
         Save data to output file.
+        :param data: The values to save.
+        :param timestamp: perf_counter_ns when the data arrived, saved as wall clock nanoseconds.
         :return: None
         """
-        self._logger.debug("running")
-        self._output_save_data(self._format_save_data(data, timestamp))
-        self._logger.debug("done")
+        with span("vog.save"):
+            self._output_save_data(_format_save_row(data, to_wall_ns(timestamp)), data)
 
-    def _output_save_data(self, line: str) -> None:
+    def _output_save_data(self, line: str, values: dict = None) -> None:
         """
         Write data to save file.
         :param line: The data to write.
+        :param values: The values of a data row, given to the save hook once it is written.
         :return None:
         """
-        self._logger.debug("running")
-        create_task(write_line_to_file(self._save_dir + self._save_filename, line))
-        self._logger.debug("done")
+        write = write_line_to_file(self._save_dir + self._save_filename, line)
+        if values is not None and self._save_hook:
+            write = self._report_saved(write, values)
+        create_task(write)
 
-    def _send_msg(self, msg) -> None:
+    async def _report_saved(self, write: Awaitable, values: dict) -> None:
         """
-        Encode and send a message over serial port
-        :param msg: message to be sent
+        Call the save hook once a row is written.
+        :param write: The row's write.
+        :param values: The row's values.
         :return None:
         """
-        self._logger.debug("running")
-        if self._conn.is_open:
-            try:
-                self._conn.write(msg.encode())
-            except PermissionError as pe:
-                self._logger.exception("Device " + self._dev_name + " connection failed")
-            except SerialException as se:
-                self._logger.exception("Device " + self._dev_name + " connection failed")
-            except Exception as ge:
-                self._logger.exception("Device " + self._dev_name + " connection failed")
-        self._logger.debug("done")
+        await write
+        self._save_hook(values)
+
+    def _send_cmd(self, cmd: str, arg: str = None) -> Future:
+        """
+        Queue a command for the device, expecting the answer listed for it in the protocol acks.
+        :param cmd: The command.
+        :param arg: The optional argument.
+        :return Future: Resolves to whether the device got and confirmed the command.
+        """
+        key = defs.protocol["acks"].get(cmd)
+        expect = {key: arg} if key else None  # get_ commands have no arg and match any value.
+        return self._cmds.send(self._prepare_msg(cmd, arg), expect)
 
-    def send_nhtsa(self):
+    async def _probe(self) -> (float, int):
+        """
+        Send the link health probe, tagged so only the probe takes its answer.
+        :return (float, int): The round trip in ms, None if the device did not answer, and the number of resends.
+        """
+        expect = {defs.protocol["acks"][defs.probe_cmd]: None}
+        return await self._cmds.send_timed(self._prepare_msg(defs.probe_cmd), expect, probe_tag)
+
+    async def send_nhtsa(self) -> bool:
         """
         Set device and display to nhtsa defaults.
-        :return None:
+        :return bool: Whether the device confirmed every value.
         """
         self._logger.debug("running")
-        self.send_name("NHTSA")
-        self.send_open("1500")
-        self.send_close("1500")
-        self.send_debounce("20")
-        self.send_click(1)
-        self.send_button_control("0")
+        results = await gather(self.send_name("NHTSA"),
+                               self.send_open("1500"),
+                               self.send_close("1500"),
+                               self.send_debounce("20"),
+                               self.send_click(1),
+                               self.send_button_control("0"))
         self._logger.debug("done")
+        return all(results)
 
-    def send_eblind(self):
+    async def send_eblind(self) -> bool:
         """
         Set device and display to eblind mode.
-        :return None:
+        :return bool: Whether the device confirmed every value.
         """
         self._logger.debug("running")
-        self.send_name("eBlindfold")
-        self.send_open(defs.max_open_close)
-        self.send_close("0")
-        self.send_debounce("100")
-        self.send_click(1)
-        self.send_button_control("0")
+        results = await gather(self.send_name("eBlindfold"),
+                               self.send_open(defs.max_open_close),
+                               self.send_close("0"),
+                               self.send_debounce("100"),
+                               self.send_click(1),
+                               self.send_button_control("0"))
         self._logger.debug("done")
+        return all(results)
 
-    def send_direct_control(self):
+    async def send_direct_control(self) -> bool:
         """
         Set device and display to direct control mode.
-        :return None:
+        :return bool: Whether the device confirmed every value.
         """
         self._logger.debug("running")
-        self.send_name("DIRECT CONTROL")
-        self.send_open(defs.max_open_close)
-        self.send_close("0")
-        self.send_debounce("100")
-        self.send_click(0)
-        self.send_button_control("1")
+        results = await gather(self.send_name("DIRECT CONTROL"),
+                               self.send_open(defs.max_open_close),
+                               self.send_close("0"),
+                               self.send_debounce("100"),
+                               self.send_click(0),
+                               self.send_button_control("1"))
         self._logger.debug("done")
+        return all(results)
 
-    def send_lens_open(self) -> None:
+    def send_lens_open(self) -> Future:
         """
         Tell device to open lens.
-        :return None:
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("do_peekOpen"))
+        ret = self._send_cmd("do_peekOpen")
         self._logger.debug("done")
+        return ret
 
-    def send_lens_close(self) -> None:
+    def send_lens_close(self) -> Future:
         """
         Tell device to close lens.
-        :return None:
+        :return Future: Resolves to whether the device got and confirmed the command.
         """
         self._logger.debug("running")
-        self._send_msg(self._prepare_msg("do_peekClose"))
+        ret = self._send_cmd("do_peekClose")
         self._logger.debug("done")
-
-    @staticmethod
-    def _parse_msg(msg_string) -> dict:
-        """
-        Parse the message from the device into key-value pairs and return as dictionary.
-        :param msg_string: The message from the device.
-        :return dict: The parsed message as key-value pairs.
-        """
-        ret = dict()
-        ret['values'] = {}
-        if msg_string[0:5] == "data|":
-            ret['type'] = "data"
-            val_ind_start = 5
-            for i in range(len(defs.output_field)):
-                val_ind_end = msg_string.find(',', val_ind_start + 1)
-                if val_ind_end < 0:
-                    val_ind_end = None
-                ret['values'][defs.output_field[i]] = msg_string[val_ind_start:val_ind_end].rstrip("\r\n")
-                if val_ind_end:
-                    val_ind_start = val_ind_end + 1
-        elif "config" in msg_string:
-            ret['type'] = "settings"
-            bar_ind = msg_string.find('|', 6)
-            if msg_string[6:bar_ind] == "Name":
-                ret['values']['Name'] = msg_string[bar_ind + 1: len(msg_string)].rstrip("\r\n")
-            elif msg_string[6:bar_ind] == "MaxOpen":
-                ret['values']['MaxOpen'] = msg_string[bar_ind + 1: len(msg_string)].rstrip("\r\n")
-            elif msg_string[6:bar_ind] == "MaxClose":
-                ret['values']['MaxClose'] = msg_string[bar_ind + 1: len(msg_string)].rstrip("\r\n")
-            elif msg_string[6:bar_ind] == "Debounce":
-                ret['values']['Debounce'] = msg_string[bar_ind + 1: len(msg_string)].rstrip("\r\n")
-            elif msg_string[6:bar_ind] == "ClickMode":
-                ret['values']['ClickMode'] = msg_string[bar_ind + 1: len(msg_string)].rstrip("\r\n")
-        elif "Click" in msg_string:
-            ret['type'] = "action"
-            ret['action'] = "Click"
-        elif "buttonControl" in msg_string:
-            ret['type'] = "settings"
-            bar_ind = msg_string.find('|')
-            ret['values'] = {}
-            ret['values']['buttonControl'] = msg_string[bar_ind + 1: len(msg_string)].rstrip("\r\n")
-        elif "peek" in msg_string:
-            ret['type'] = "settings"
-            ret['values'] = {}
-            ret['values']['lensState'] = msg_string.rstrip("\r\n")
         return ret
 
     @staticmethod
-    def _prepare_msg(cmd, arg=None) -> None:
+    def _prepare_msg(cmd, arg=None) -> bytes:
         """
-        Create string using VOG syntax.
+        Create message using VOG syntax.
         :param cmd: The command to use.
         :param arg: The optional argument to use.
-        :return None:
+        :return bytes: The message in the correct syntax.
         """
-        if arg:
-            msg_to_send = ">" + cmd + "|" + arg + "<<\n"
-        else:
-            msg_to_send = ">" + cmd + "|" + "<<\n"
-        return msg_to_send
-
-    @staticmethod
-    def _format_save_data(values: dict, timestamp: datetime) -> str:
-        """
-        Format values from device into readable output for saving.
-        :param values: The values from the device.
-        :param timestamp: The timestamp the values were received.
-        :return: The formatted output.
-        """
-        # line = format_current_time(timestamp, date=True, time=True, micro=True)
-        line = str(timestamp.timestamp())
-        for i in defs.save_fields:
-            line += ", " + str(values[i])
-        line = line.rstrip("\r\n")
-        return line
+        return _encode_cmd(cmd, arg)
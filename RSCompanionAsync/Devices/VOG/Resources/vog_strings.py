@@ -66,6 +66,7 @@ class StringsEnum(Enum):
     SAVE_HDR = auto()
     PLOT_NAME_OPEN_CLOSE = auto()
     GRAPH_TS = auto()
+    LINK_HEALTH = auto()
 
 
 nhtsa = "nhtsa"
@@ -107,6 +108,8 @@ english = {StringsEnum.CUSTOM_LABEL: "Custom",
            StringsEnum.SAVE_HDR: "timestamp, trial, open, close",
            StringsEnum.PLOT_NAME_OPEN_CLOSE: "Milliseconds",
            StringsEnum.GRAPH_TS: "Timestamp",
+           StringsEnum.LINK_HEALTH: "Link: {lines_per_s} lines/s, round trip {rtt_ms} ms,"
+                                    " lost {lost_lines}, errors {parse_errors}",
            }
 
 # TODO: Verify translations
@@ -147,6 +150,8 @@ dutch = {StringsEnum.CUSTOM_LABEL: "Op maat",
          StringsEnum.SAVE_HDR: "tijdstempel, proef, open, sluiten",
          StringsEnum.PLOT_NAME_OPEN_CLOSE: "Milliseconden",
          StringsEnum.GRAPH_TS: "tijdstempel",
+         StringsEnum.LINK_HEALTH: "Verbinding: {lines_per_s} regels/s, retourtijd {rtt_ms} ms,"
+                                  " verloren {lost_lines}, fouten {parse_errors}",
          }
 
 # French strings
@@ -186,6 +191,8 @@ french = {StringsEnum.CUSTOM_LABEL: "Douane",
           StringsEnum.SAVE_HDR: "horodatage, procès, ouvert, Fermer",
           StringsEnum.PLOT_NAME_OPEN_CLOSE: "Millisecondes",
           StringsEnum.GRAPH_TS: "Horodatage",
+          StringsEnum.LINK_HEALTH: "Liaison : {lines_per_s} lignes/s, aller-retour {rtt_ms} ms,"
+                                   " perdues {lost_lines}, erreurs {parse_errors}",
           }
 
 # German strings
@@ -225,6 +232,8 @@ german = {StringsEnum.CUSTOM_LABEL: "Benutzerdefiniert",
           StringsEnum.SAVE_HDR: "zeitstempel, versuch, öffnen, schließen",
           StringsEnum.PLOT_NAME_OPEN_CLOSE: "Millisekunden",
           StringsEnum.GRAPH_TS: "Zeitstempel",
+          StringsEnum.LINK_HEALTH: "Verbindung: {lines_per_s} Zeilen/s, Umlaufzeit {rtt_ms} ms,"
+                                   " verloren {lost_lines}, Fehler {parse_errors}",
           }
 
 # Russian strings
@@ -264,6 +273,8 @@ russian = {StringsEnum.CUSTOM_LABEL: "изготовленный на заказ
            StringsEnum.SAVE_HDR: "отметка времени, пробный, открытый, закрывать",
            StringsEnum.PLOT_NAME_OPEN_CLOSE: "миллисекунды",
            StringsEnum.GRAPH_TS: "отметка времени",
+           StringsEnum.LINK_HEALTH: "Связь: {lines_per_s} строк/с, круговая задержка {rtt_ms} мс,"
+                                    " потеряно {lost_lines}, ошибки {parse_errors}",
            }
 
 # Spanish strings
@@ -303,6 +314,8 @@ spanish = {StringsEnum.CUSTOM_LABEL: "Personalizado",
            StringsEnum.SAVE_HDR: "marca de tiempo, juicio, abierto, cerca",
            StringsEnum.PLOT_NAME_OPEN_CLOSE: "Milisegundos",
            StringsEnum.GRAPH_TS: "marca de tiempo",
+           StringsEnum.LINK_HEALTH: "Enlace: {lines_per_s} líneas/s, ida y vuelta {rtt_ms} ms,"
+                                    " perdidas {lost_lines}, errores {parse_errors}",
            }
 
 # Chinese strings
@@ -342,6 +355,7 @@ chinese = {StringsEnum.CUSTOM_LABEL: "自订",
            StringsEnum.SAVE_HDR: "时间戳记, 试用版, 打开, 关",
            StringsEnum.PLOT_NAME_OPEN_CLOSE: "毫秒",
            StringsEnum.GRAPH_TS: "时间戳记",
+           StringsEnum.LINK_HEALTH: "连接: {lines_per_s} 行/秒, 往返 {rtt_ms} 毫秒, 丢失 {lost_lines}, 错误 {parse_errors}",
            }
 
 # Japanese strings
@@ -381,6 +395,7 @@ japanese = {StringsEnum.CUSTOM_LABEL: "カスタム",
             StringsEnum.SAVE_HDR: "タイムスタンプ, トライアル, 開いた, 閉じる",
             StringsEnum.PLOT_NAME_OPEN_CLOSE: "ミリ秒",
             StringsEnum.GRAPH_TS: "タイムスタンプ",
+            StringsEnum.LINK_HEALTH: "リンク: {lines_per_s} 行/秒, 往復 {rtt_ms} ミリ秒, 損失 {lost_lines}, エラー {parse_errors}",
             }
 
 # Add defined languages to strings dictionary.
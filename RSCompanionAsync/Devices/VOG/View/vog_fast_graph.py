@@ -0,0 +1,61 @@
+"""
+Licensed under GNU GPL-3.0-or-later
+
+This file is part of RS Companion.
+
+RS Companion is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+RS Companion is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with RS Companion.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Phillip Riskin
+Date: 2020
+Project: Companion App
+Company: Red Scientific
+https://redscientific.com/index.html
+"""
+
+from logging import getLogger
+from RSCompanionAsync.Devices.AbstractDevice.View.fast_graph import FastGraph, main_color, second_color
+from RSCompanionAsync.Devices.VOG.View.vog_graph import VOGSeries
+
+
+class VOGFastGraph(VOGSeries, FastGraph):
+    """ VOGGraph drawn with pyqtgraph. """
+    def __init__(self, parent=None):
+        self._logger = getLogger(__name__)
+        self._logger.debug("Initializing")
+        super().__init__(parent)
+        self._init_series()
+        self._plot_used = None
+        self._open_line = None
+        self._close_line = None
+        self._logger.debug("Initialized")
+
+    def make_device_artists(self, plot_item, name) -> []:
+        self._logger.debug("running")
+        self._plot_used = plot_item
+        self._open_line = plot_item.plot([], [], pen=None, symbol='o', symbolSize=6, symbolBrush=main_color,
+                                         symbolPen=None)
+        self._close_line = plot_item.plot([], [], pen=None, symbol='s', symbolSize=6, symbolBrush=second_color,
+                                          symbolPen=None)
+        self._logger.debug("done")
+        return [self._open_line, self._close_line]
+
+    def update_device_artists(self) -> (float, float, bool):
+        rescaled = False
+        open_x, open_y, close_x, close_y, first, last = self.get_series()
+        if self._open_line:
+            self._open_line.setData(open_x, open_y)
+            self._close_line.setData(close_x, close_y)
+            if len(open_x):
+                rescaled = self.fit_y(self._plot_used, *self._y_range)
+        return first, last, rescaled
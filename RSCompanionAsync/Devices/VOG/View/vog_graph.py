@@ -24,37 +24,49 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
-from logging import getLogger, StreamHandler
-from asyncio import create_task, sleep
-from datetime import datetime, timedelta
-from RSCompanionAsync.Devices.AbstractDevice.View.base_graph import BaseGraph
+import numpy as np
+from logging import getLogger
+from RSCompanionAsync.Devices.AbstractDevice.View.base_graph import BaseGraph, graph_capacity, to_date_num
+from RSCompanionAsync.Devices.AbstractDevice.View.series_buffer import SeriesBuffer
+from RSCompanionAsync.Devices.AbstractDevice.View.overview_series import OverviewSeries
+from RSCompanionAsync.Model.rs_scrollback import ScrollbackStore
+from RSCompanionAsync.Model.rs_tracing import span
 from RSCompanionAsync.Devices.VOG.Resources.vog_strings import strings, StringsEnum, LangEnum
 
 
-class VOGGraph(BaseGraph):
-    def __init__(self, parent=None, log_handlers: [StreamHandler] = None):
-        self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
-        self._logger.debug("Initializing")
-        super().__init__(parent, log_handlers)
-        self._data = list()
+class VOGSeries:
+    """ The VOG graph data, shared by VOGGraph and the pyqtgraph VOGFastGraph. Put first in the bases. """
+    def _init_series(self) -> None:
+        self._name = str()
+        self._series = SeriesBuffer(graph_capacity, 2)  # Open and close times.
+        self._overviews = [OverviewSeries(), OverviewSeries()]
+        self._scrollback = None
+        self._y_range = [0, 0]
         self._strings = dict()
-        self._logger.debug("Initialized")
 
-    async def show(self) -> None:
-        self.set_subplots([self._data[0]])
-        await create_task(self.plot(self.get_new()))
+    def show(self) -> None:
+        self.set_subplots([self._name])
+        self.plot(self.get_new())
 
     def clear_graph(self) -> None:
         """
         Clear this graph of any device data.
         :return None:
         """
-        self._data = [self._data[0], [], [], []]
+        self._series.clear()
+        for overview in self._overviews:
+            overview.clear()
+        self._y_range = [0, 0]
         self.set_new(True)
-        create_task(self.show())
+        self.show()
+
+    def set_scrollback(self, store: ScrollbackStore) -> None:
+        """
+        Keep every point in store as well, and show data older than this graph's SeriesBuffer from it.
+        :param store: The experiment's store for this device, None for none.
+        :return None:
+        """
+        self._scrollback = store
 
     def set_lang(self, lang: LangEnum) -> None:
         """
@@ -63,53 +75,70 @@ class VOGGraph(BaseGraph):
         :return None:
         """
         self._logger.debug("running")
-        super(VOGGraph, self).set_lang(lang)
+        super().set_lang(lang)
         self._strings = strings[lang]
-        self._change_plot_name(self._strings[StringsEnum.PLOT_NAME_OPEN_CLOSE])
-        create_task(self.show())
-        self._logger.debug("done")
-
-    async def plot_device_data(self, axes, name) -> []:
-        self._logger.debug("running")
-        left = datetime.now()
-        right = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        await sleep(.001)
-        axes.plot(self._data[1], self._data[2], marker='o', linestyle='None')
-        axes.plot(self._data[1], self._data[3], marker='s', linestyle='None')
-        await sleep(.001)
-        if len(self._data[1]) > 0:
-            if right < self._data[1][-1]:
-                right = self._data[1][-1]
-            if left > self._data[1][0]:
-                left = self._data[1][0]
-        temp_left = right - timedelta(minutes=2)
-        if left < temp_left:
-            left = temp_left
-        await sleep(.001)
-        axes.set_xlim(left=left - timedelta(seconds=10), right=right + timedelta(seconds=10))
-        await sleep(.001)
+        self._name = self._strings[StringsEnum.PLOT_NAME_OPEN_CLOSE]
+        self.show()
         self._logger.debug("done")
 
     def add_data(self, data: []) -> None:
         """
-        Ensure data comes in as type: x, y, y
+        Ensure data comes in as type: x, y, y with x in epoch seconds
         :return None:
         """
-        self._logger.debug("running")
-        self.set_new(False)
-        self._data[1].append(data[0])
-        self._data[2].append(data[1])
-        self._data[3].append(data[2])
-        create_task(self.plot())
-        self._logger.debug("done")
+        with span("graph.add_data"):
+            self.set_new(False)
+            self._series.append(data[0], data[1], data[2])
+            if self._scrollback is not None:
+                self._scrollback.append(data[0], data[1], data[2])
+            self._overviews[0].append(data[0], data[1])
+            self._overviews[1].append(data[0], data[2])
+            self._y_range = [min(self._y_range[0], data[1], data[2]), max(self._y_range[1], data[1], data[2])]
+            self.plot()
 
-    def _change_plot_name(self, name: str) -> None:
+    def get_series(self) -> (np.ndarray, np.ndarray, np.ndarray, np.ndarray, float, float):
         """
-        Change the name of the plot.
-        :param name: The new plot name.
-        :return None:
+        :return: Open x and y, close x and y, and the oldest and newest x, of the window or the overview.
+        The oldest and newest x are always the SeriesBuffer's in a history window.
         """
-        if len(self._data) == 0:
-            self._data = [name, [], [], []]
-        else:
-            self._data[0] = name
+        history = self.get_history()
+        first = self._series.first_x()
+        if history and self._scrollback is not None and first is not None and history[0] < first:
+            x, (open_y, close_y) = self._scrollback.load(*history, graph_capacity)
+            return x, open_y, x, close_y, first, self._series.last_x()
+        if self.get_overview():
+            (open_x, open_y), (close_x, close_y) = [overview.get() for overview in self._overviews]
+            return open_x, open_y, close_x, close_y, self._overviews[0].first_x(), self._overviews[0].last_x()
+        x = self._series.x()
+        return x, self._series.y(0), x, self._series.y(1), self._series.first_x(), self._series.last_x()
+
+
+class VOGGraph(VOGSeries, BaseGraph):
+    def __init__(self, parent=None):
+        self._logger = getLogger(__name__)
+        self._logger.debug("Initializing")
+        super().__init__(parent)
+        self._init_series()
+        self._axes_used = None
+        self._open_line = None
+        self._close_line = None
+        self._logger.debug("Initialized")
+
+    def make_device_artists(self, axes, name) -> []:
+        self._logger.debug("running")
+        self._axes_used = axes
+        self._open_line, = axes.plot([], [], marker='o', linestyle='None')
+        self._close_line, = axes.plot([], [], marker='s', linestyle='None')
+        self._logger.debug("done")
+        return [self._open_line, self._close_line]
+
+    def update_device_artists(self) -> (float, float, bool):
+        rescaled = False
+        open_x, open_y, close_x, close_y, first, last = self.get_series()
+        if self._open_line:
+            # Copies, the lines may be drawn on the RENDER thread after the SeriesBuffer views have been written over.
+            self._open_line.set_data(to_date_num(open_x), open_y.copy())
+            self._close_line.set_data(to_date_num(close_x), close_y.copy())
+            if len(open_x):
+                rescaled = self.fit_y(self._axes_used, *self._y_range)
+        return first, last, rescaled
@@ -24,7 +24,7 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
-from logging import getLogger, StreamHandler
+from logging import getLogger
 from PySide2.QtWidgets import QHBoxLayout, QLabel, QGridLayout, QLineEdit, QVBoxLayout, QCheckBox, QComboBox
 from PySide2.QtCore import Qt
 from PySide2.QtGui import QResizeEvent
@@ -36,11 +36,8 @@ from RSCompanionAsync.Devices.AbstractDevice.View.config_pop_up import ConfigPop
 
 
 class VOGView(AbstractView):
-    def __init__(self, name: str = "VOG_NONE", log_handlers: [StreamHandler] = None):
+    def __init__(self, name: str = "VOG_NONE"):
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
         super().__init__(name)
 
@@ -49,8 +46,8 @@ class VOGView(AbstractView):
         self._subwindow_width = 518
 
         """ min and max sizes for the configuration popup (width, height) """
-        self._popup_min = (229, 409)
-        self._popup_max = (300, 409)
+        self._popup_min = (229, 449)
+        self._popup_max = (300, 449)
 
         """ Set configuration value display area"""
         self._config_frame = EasyFrame()
@@ -133,6 +130,11 @@ class VOGView(AbstractView):
         self._manual_control_button_layout.addWidget(self._manual_control_close_button)
         self._manual_control_button_layout.setMargin(0)
 
+        """ Serial link health display """
+        self._link_health_label = QLabel()
+        self._link_health_label.setAlignment(Qt.AlignCenter)
+        self._link_health_label.setWordWrap(True)
+
         """ device settings display """
         self._dev_sets_frame = EasyFrame()
 
@@ -154,6 +156,7 @@ class VOGView(AbstractView):
         self._dev_sets_layout.addWidget(self._eblindfold_button)
         self._dev_sets_layout.addWidget(self._direct_control_button)
         self._dev_sets_layout.addWidget(self._upload_settings_button)
+        self._dev_sets_layout.addWidget(self._link_health_label)
 
         self.layout().addWidget(self.config_button, 0, 0, Qt.AlignTop | Qt.AlignRight)
         self.config_button.setFixedSize(30, 25)
@@ -349,6 +352,23 @@ class VOGView(AbstractView):
         self._config_val_line_edit.setText(val)
         self._logger.debug("done")
 
+    @property
+    def link_health_text(self) -> str:
+        """
+        Get the serial link health text.
+        :return str: The text.
+        """
+        return self._link_health_label.text()
+
+    @link_health_text.setter
+    def link_health_text(self, val: str) -> None:
+        """
+        Set the serial link health text.
+        :param val: The text.
+        :return None:
+        """
+        self._link_health_label.setText(val)
+
     @property
     def open_duration(self) -> str:
         """
@@ -45,6 +45,7 @@ settings_info = (company_name, app_name + str(version_number))
 
 version_url = "https://raw.githubusercontent.com/redscientific/CompanionApp/master/Version.txt"
 log_format = '%(levelname)s - %(name)s - %(funcName)s: %(message)s'
+executor_check_interval = 2  # Seconds between worker pool starvation checks.
 if release:
     image_file_path = 'Images/'
     dev_path = dirname(argv[0]) + '/lib/RSCompanionAsync/Devices/'
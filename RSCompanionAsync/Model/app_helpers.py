@@ -24,30 +24,55 @@ https://redscientific.com/index.html
 """
 
 import os
+import gzip
 from asyncio import futures, Event
-from shutil import disk_usage
+from shutil import disk_usage, copyfileobj
 from logging import getLogger
+from logging.handlers import RotatingFileHandler
 from tempfile import gettempdir
 from datetime import datetime
 from PySide2.QtWidgets import QPushButton, QFrame
 from RSCompanionAsync.Model.app_defs import button_normal_style, button_pressed_style
+from RSCompanionAsync.Model.rs_tracing import span
 
 logger = getLogger(__name__)
 
+log_max_bytes = 10 * 1024 * 1024  # Size the save log is rotated at.
+log_backups = 5                   # Gzipped save logs kept.
 
-def setup_log_file(file_name: str, output_hdr: str) -> str:
+
+def setup_log_file(file_name: str, output_hdr: str, max_bytes: int = log_max_bytes,
+                   backups: int = log_backups) -> RotatingFileHandler:
     """
-    Create program output file to save log.
+    Create program output file to save log. Once the file reaches max_bytes it is gzipped to file_name.1.gz, older
+    ones move up a number, and a new file is started with the header.
     :param output_hdr: The header line.
     :param file_name: Name of the save log
-    :return str: full directory to the save log, including the save log name
+    :param max_bytes: Size to rotate the log at.
+    :param backups: Number of gzipped logs to keep.
+    :return RotatingFileHandler: The handler writing the save log, its baseFilename is the full path.
     """
-    logger.debug("running")
-    ret = gettempdir() + "\\" + file_name
-    with open(ret, "w") as temp:
+    path = gettempdir() + "\\" + file_name
+    with open(path, "w") as temp:
         temp.write(output_hdr)
-    logger.debug("done")
-    return ret
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+    handler.namer = lambda name: name + ".gz"
+    handler.rotator = lambda source, dest: _gzip_log(source, dest, output_hdr)
+    return handler
+
+
+def _gzip_log(source: str, dest: str, output_hdr: str) -> None:
+    """
+    Rotator for the save log: compress source to dest and start source again with the header.
+    :param source: The full log.
+    :param dest: The gzip file to write.
+    :param output_hdr: The header line.
+    :return None:
+    """
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        copyfileobj(f_in, f_out)
+    with open(source, "w") as f:
+        f.write(output_hdr)
 
 
 def get_disk_usage_stats(path: str = ''):
@@ -72,16 +97,15 @@ def get_disk_usage_stats(path: str = ''):
 
 
 async def write_line_to_file(fname, line, new=False):
-    logger.debug("running")
-    if not line.endswith("\n"):
-        line = line + "\n"
-    if new:
-        condition = 'w'
-    else:
-        condition = 'a+'
-    with open(fname, condition) as file:
-        file.write(line)
-    logger.debug("done")
+    with span("io.write_line"):
+        if not line.endswith("\n"):
+            line = line + "\n"
+        if new:
+            condition = 'w'
+        else:
+            condition = 'a+'
+        with open(fname, condition) as file:
+            file.write(line)
 
 
 def format_current_time(to_format: datetime, date=False, time=False, mil=False, micro=False, save=False):
@@ -29,10 +29,14 @@ import importlib.util
 from shutil import move
 from pathlib import Path
 import tempfile
-from logging import StreamHandler, getLogger
+from logging import getLogger
 from datetime import datetime
-from asyncio import Event, create_task, futures, get_running_loop
+from asyncio import Event, create_task, futures, get_running_loop, sleep, gather
+from statistics import median
+from time import perf_counter_ns
+from typing import Callable, List
 from aioserial import AioSerial
+from serial.tools.list_ports_common import ListPortInfo
 from RSCompanionAsync.Model.rs_device_com_scanner import RSDeviceCommScanner
 from RSCompanionAsync.Model.cam_scanner import CamScanner
 import RSCompanionAsync.Model.app_defs as defs
@@ -42,29 +46,34 @@ from RSCompanionAsync.Resources.Strings.main_window_strings import strings, Stri
 from RSCompanionAsync.Model.app_helpers import await_event, write_line_to_file, format_current_time
 from RSCompanionAsync.Model.version_checker import VersionChecker
 from RSCompanionAsync.Model.rs_file_saver import RSSaver
+from RSCompanionAsync.Model.rs_clock import reset_anchor, wall_ns_now, format_anchor, anchor_filename
+from RSCompanionAsync.Model.rs_capture import capture_dir
+from RSCompanionAsync.Model.rs_io_process import IOProcess
+from RSCompanionAsync.Model.rs_executors import get_executor, check_executors, shutdown_executors, ExecEnum
 from RSCompanionAsync.Devices.AbstractDevice.View.abstract_view import AbstractView
 
 
+straggler_factor = 2  # A device is a straggler in a bulk preset change if it takes this many times the median.
+
+
 class AppModel:
-    def __init__(self, lang: defs.LangEnum = defs.LangEnum.ENG, log_handlers: [StreamHandler] = None):
+    def __init__(self, lang: defs.LangEnum = defs.LangEnum.ENG, port_lister: Callable[[], List[ListPortInfo]] = None):
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
         self._controllers = self.get_controllers()
-        self._rs_dev_scanner = RSDeviceCommScanner(self.get_profiles(), log_handlers)
-        self._cam_scanner = CamScanner(log_handlers)
-        self._ver_check = VersionChecker(log_handlers)
-        self._log_handlers = log_handlers
+        self._profiles = self.get_profiles()
+        self._rs_dev_scanner = RSDeviceCommScanner(self._profiles, port_lister)
+        self._cam_scanner = CamScanner()
+        self._ver_check = VersionChecker()
         self._new_dev_view_flag = Event()
         self._remove_dev_view_flag = Event()
         self._done_saving_flag = Event()
         self._saving_flag = Event()
         self._current_lang = lang
-        self._saver = RSSaver(lang, log_handlers)
+        self._saver = RSSaver(lang)
         self._save_path = str()
         self._devs = dict()
+        self._dev_types = dict()  # Serial device port: device type.
         self._dev_inits = dict()
         self._new_dev_views = []
         self._remove_dev_views = []
@@ -75,6 +84,12 @@ class AppModel:
         self._cond_name = str()
         self.exp_created = False
         self.exp_running = False
+        self._raw_capture = False
+        self._use_io_process = False
+        self._io_process = None
+        self._graph_render = "blit"
+        self._stage_hook = None
+        self._frame_hook = (None, False)  # Device graphs' frame hook and whether they render hidden.
         self._flag_filename = "flags.csv"
         self._note_filename = "notes.csv"
         self._events_filename = "events.csv"
@@ -114,6 +129,13 @@ class AppModel:
         """
         return self._cam_scanner.await_err()
 
+    def await_saved(self) -> futures:
+        """
+        Signal when the last experiment ended is saved.
+        :return futures: If the flag is set.
+        """
+        return self._done_saving_flag.wait()
+
     def change_lang(self, lang: defs.LangEnum) -> None:
         """
         Change the language new devices are initialized with.
@@ -174,8 +196,7 @@ class AppModel:
                 self._first_note = False
                 create_task(write_line_to_file(self._save_path + self._note_filename,
                                                self._note_strings[NoteEnum.NOTE_HDR]))
-            timestamp = datetime.now().timestamp()
-            line = ", ".join([str(timestamp), note])
+            line = ", ".join([str(wall_ns_now()), note])
             create_task(write_line_to_file(self._save_path + self._note_filename, line))
 
     def send_keyflag_to_devs(self, flag: str) -> None:
@@ -212,16 +233,15 @@ class AppModel:
                 self._first_flag = False
                 create_task(write_line_to_file(self._save_path + self._flag_filename,
                                                self._flag_strings[FlagEnum.FLAG_HDR]))
-            line = ", ".join([str(datetime.now().timestamp()), flag])
+            line = ", ".join([str(wall_ns_now()), flag])
             create_task(write_line_to_file(self._save_path + self._flag_filename, line))
         self._logger.debug("done")
 
-    def save_exp_times(self, time: datetime, time_type: str, hdr: bool = False) -> None:
+    def save_exp_times(self, time: int, time_type: str, hdr: bool = False) -> None:
         """
         Save experiment create/end times, and experiment start/stop times.
-        :param time: formatted experiment start time used for the save file
         :param time_type: ["create", "end", "start", "stop"]
-        :param time: datetime to be recorded
+        :param time: Wall clock nanoseconds to be recorded
         :param hdr: Whether this file needs a header before writing any other line.
         :return None:
         """
@@ -229,7 +249,7 @@ class AppModel:
         if hdr:
             line = self._main_strings[StringsEnum.HDR]
             create_task(write_line_to_file(self._save_path + self._events_filename, line))
-        line = ", ".join([str(time.timestamp()), time_type, self._cond_name, str(self._block_num)])
+        line = ", ".join([str(time), time_type, self._cond_name, str(self._block_num)])
         create_task(write_line_to_file(self._save_path + self._events_filename, line))
         self._logger.debug("done")
 
@@ -246,14 +266,18 @@ class AppModel:
         self._first_flag = True
         self._first_note = True
         devices_running = list()
-        now = datetime.now()
-        exp_start_time = format_current_time(now, save=True)
+        reset_anchor()
+        now = wall_ns_now()
+        exp_start_time = format_current_time(datetime.fromtimestamp(now / 1E9), save=True)
         self._save_path = self._saver.start(path + "/experiment_" + exp_start_time)
+        create_task(write_line_to_file(self._save_path + anchor_filename, format_anchor(), True))
         self.save_exp_times(now, self._main_strings[StringsEnum.CREATE], True)
         try:
             for controller in self._devs.values():
                 controller.create_exp(self._save_path, self._cond_name)
                 devices_running.append(controller)
+                if self._raw_capture:
+                    controller.set_raw_capture(self._save_path + capture_dir)
             self._logger.debug("done")
             self.exp_created = True
             self._done_saving_flag.clear()
@@ -272,10 +296,11 @@ class AppModel:
         :return bool: If there was an error.
         """
         self._logger.debug("running")
-        self.save_exp_times(datetime.now(), self._main_strings[StringsEnum.END])
+        self.save_exp_times(wall_ns_now(), self._main_strings[StringsEnum.END])
         try:
             for controller in self._devs.values():
                 controller.end_exp()
+                controller.set_raw_capture(None)
             self._block_num = 0
             self._saving_flag.set()
             create_task(self._save_exp())
@@ -300,7 +325,7 @@ class AppModel:
                 devices.append(controller)
             self.exp_running = True
             self._block_num = next_block_num
-            self.save_exp_times(datetime.now(), self._main_strings[StringsEnum.START])
+            self.save_exp_times(wall_ns_now(), self._main_strings[StringsEnum.START])
         except Exception as e:
             self._logger.exception("Failed trying to start exp on controller.")
             for controller in devices:
@@ -313,7 +338,7 @@ class AppModel:
         :return bool: Return false if an experiment failed to stop, otherwise return true.
         """
         self._logger.debug("running")
-        self.save_exp_times(datetime.now(), self._main_strings[StringsEnum.STOP])
+        self.save_exp_times(wall_ns_now(), self._main_strings[StringsEnum.STOP])
         try:
             for controller in self._devs.values():
                 controller.stop_exp()
@@ -370,10 +395,19 @@ class AppModel:
         """
         for device in self._devs.values():
             await device.await_saved()
-        await get_running_loop().run_in_executor(None, self._saver.stop)
+        await get_running_loop().run_in_executor(get_executor(ExecEnum.STORAGE), self._saver.stop)
         self._saving_flag.clear()
         self._done_saving_flag.set()
 
+    async def _monitor_executors(self) -> None:
+        """
+        Periodically check the worker pools and warn if any of them are starved.
+        :return None:
+        """
+        while self._running:
+            check_executors()
+            await sleep(defs.executor_check_interval)
+
     def _signal_lang_change(self) -> bool:
         """
         Change language each device is using.
@@ -412,6 +446,10 @@ class AppModel:
         if dev_type not in self._controllers.keys():
             self._logger.warning("Could not recognize device type")
             return
+        if self._io_process:  # Reopen the port in the io process, as the scanner opened and tuned it.
+            settings = conn.get_settings()
+            conn.close()
+            conn = self._io_process.connect(conn.port, settings, self._profiles.get(dev_type, dict()).get("tuning"))
         ret = self._make_rs_controller(conn, dev_type)
         if not ret:
             self._logger.warning("Failed making controller for type: " + dev_type)
@@ -428,12 +466,19 @@ class AppModel:
         self._logger.debug("running")
         ret = True
         try:
-            controller = self._controllers[dev_type](conn, self._current_lang, self._log_handlers)
+            controller = self._controllers[dev_type](conn, self._current_lang)
             self._devs[conn.port] = controller
+            self._dev_types[conn.port] = dev_type
+            controller.set_graph_render(self._graph_render)
+            controller.set_stage_hook(self._stage_hook)
+            controller.set_frame_hook(*self._frame_hook)
+            controller.set_link_lost_handler(self._rs_dev_scanner.report_lost)
             self._new_dev_views.append(controller.get_view())
             self._new_dev_view_flag.set()
             if self.exp_created:
                 controller.create_exp(self._save_path, self._cond_name)
+                if self._raw_capture:
+                    controller.set_raw_capture(self._save_path + capture_dir)
             if self.exp_running:
                 controller.start_exp(self._block_num, self._cond_name)
         except Exception as e:
@@ -462,7 +507,7 @@ class AppModel:
         """
         self._logger.debug("running")
         try:
-            controller = self._controllers["Camera"](cam_index, self._current_lang, self._log_handlers)
+            controller = self._controllers["Camera"](cam_index, self._current_lang)
             self._devs[cam_index] = controller
             self._tasks.append(create_task(self._await_remove_cam(controller, cam_index)))
             self._new_dev_views.append(controller.get_view())
@@ -482,21 +527,19 @@ class AppModel:
         """
         self._logger.debug("running")
         ret, item = self._rs_dev_scanner.get_next_lost_com()
-        to_remove = []
         try:
             while ret:
-                for key in self._devs:
+                for key in list(self._devs):
                     conn = self._devs[key].get_conn()
                     if conn and conn.port == item.device:
-                        self._remove_dev_views.append(self._devs[key].get_view())
-                        await self._devs[key].cleanup(True)
-                        to_remove.append(key)
+                        # Taken out before cleanup is awaited, a new device on the same port may be added meanwhile.
+                        controller = self._devs.pop(key)
+                        self._dev_types.pop(key, None)
+                        self._remove_dev_views.append(controller.get_view())
+                        await controller.cleanup(True)
                         self._remove_dev_view_flag.set()
                         break
                 ret, item = self._rs_dev_scanner.get_next_lost_com()
-            if len(to_remove) > 0:
-                for ele in to_remove:
-                    del self._devs[ele]
         except Exception as e:
             self._logger.exception("Got an exception")
         self._logger.debug("done")
@@ -512,6 +555,105 @@ class AppModel:
         del self._devs[cam_index]
         self._logger.debug("done")
 
+    def get_presets(self) -> dict:
+        """
+        :return dict: {device type: [preset names]} for the types of the serial devices connected.
+        """
+        ret = dict()
+        for port, dev_type in self._dev_types.items():
+            if dev_type not in ret:
+                ret[dev_type] = self._devs[port].get_presets()
+        return ret
+
+    async def apply_preset(self, dev_type: str, name: str, ports: [str] = None) -> dict:
+        """
+        Apply a preset to every device of a type at once and wait for each to confirm its new settings.
+        :param dev_type: The device type, "DRT" or "VOG".
+        :param name: The preset name, see each device controller's get_presets.
+        :param ports: Optional, only apply to the devices on these ports.
+        :return dict: "total_ms" for the whole change, "devices" {port: {"ok": confirmed, "ms": time to confirm}} and
+        "stragglers", the ports that failed or took more than straggler_factor times the median time.
+        """
+        self._logger.debug("running")
+        targets = [port for port, t in self._dev_types.items() if t == dev_type and (ports is None or port in ports)]
+        start = perf_counter_ns()
+        results = dict()
+
+        async def apply(port: str) -> None:
+            try:
+                ok = await self._devs[port].apply_preset(name)
+            except Exception as e:
+                self._logger.exception("Failed applying preset " + name + " to " + port)
+                ok = False
+            results[port] = {"ok": ok, "ms": (perf_counter_ns() - start) / 1E6}
+
+        await gather(*[apply(port) for port in targets])
+        total_ms = (perf_counter_ns() - start) / 1E6
+        slow_ms = straggler_factor * median([x["ms"] for x in results.values()]) if results else 0
+        stragglers = [port for port, x in results.items() if not x["ok"] or x["ms"] > slow_ms]
+        self._logger.info("Applied {} to {} {} devices in {:.1f}ms, stragglers: {}".format(
+            name, len(targets), dev_type, total_ms, ", ".join(stragglers) if stragglers else "none"))
+        self._logger.debug("done")
+        return {"total_ms": total_ms, "devices": results, "stragglers": stragglers}
+
+    def set_raw_capture(self, is_active: bool) -> None:
+        """
+        Set whether serial devices record their raw input to the experiment for replay. Takes effect from the next
+        experiment created.
+        :param is_active: Whether to record.
+        :return None:
+        """
+        self._raw_capture = is_active
+
+    def set_io_process(self, is_active: bool) -> None:
+        """
+        Set whether serial devices are read and parsed in a dedicated io process, see rs_io_process. Must be set
+        before start.
+        :param is_active: Whether to use the io process.
+        :return None:
+        """
+        self._use_io_process = is_active
+
+    def set_graph_render(self, mode: str) -> None:
+        """
+        Set how device graphs are drawn.
+        :param mode: "blit" to draw on the event loop, "offscreen" to draw in a worker thread, "pyqtgraph" to use the
+        pyqtgraph backend if it is installed.
+        :return None:
+        """
+        self._graph_render = mode
+        for controller in self._devs.values():
+            controller.set_graph_render(mode)
+
+    def set_stage_hook(self, func: Callable[[str, str, dict], None] = None) -> None:
+        """
+        Set the function serial devices call as each data line passes a stage, see the device controllers'
+        set_stage_hook. For timing the data path, Dev_Tools/serial_load_test uses it.
+        :param func: Called with the device's name, the stage and the line's values. None to stop.
+        :return None:
+        """
+        self._stage_hook = func
+        for controller in self._devs.values():
+            controller.set_stage_hook(func)
+
+    def set_frame_hook(self, func: Callable[[str, int], None] = None, render_hidden: bool = False) -> None:
+        """
+        Set the function serial devices call once a render of their graph is on screen, see
+        GraphWindow.set_frame_hook.
+        :param func: Called with the device's name and the perf_counter_ns the render took its data at. None to stop.
+        :param render_hidden: Render even while the graphs can't be seen, for timing without a screen.
+        :return None:
+        """
+        self._frame_hook = (func, render_hidden)
+        for controller in self._devs.values():
+            controller.set_frame_hook(func, render_hidden)
+
+    def get_ready_times(self) -> dict:
+        """
+        :return dict: {port device: ms from the port being found to it being ready} for every serial device connected.
+        """
+        return self._rs_dev_scanner.get_ready_times()
+
     def set_cams_active(self, is_active: bool) -> None:
         """
         Set whether this app looks for and uses video or not.
@@ -553,6 +695,10 @@ class AppModel:
         self._tasks.append(create_task(self._await_new_devs()))
         self._tasks.append(create_task(self._await_remove_devs()))
         self._tasks.append(create_task(self._await_new_cams()))
+        self._tasks.append(create_task(self._monitor_executors()))
+        if self._use_io_process:
+            self._io_process = IOProcess()
+            self._io_process.start()
         self._rs_dev_scanner.start()
         self._cam_scanner.activate()
         self._logger.debug("done")
@@ -572,8 +718,11 @@ class AppModel:
             awaitables.append(create_task(dev.cleanup(True)))
         for awaitable in awaitables:
             await awaitable
+        if self._io_process:
+            await self._io_process.cleanup()
         if self._saving_flag.is_set():
             await self._done_saving_flag.wait()
+        shutdown_executors()
         self._logger.debug("done")
 
     # TODO add debugging
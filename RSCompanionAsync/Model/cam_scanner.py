@@ -23,19 +23,17 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
-from logging import getLogger, StreamHandler
+from logging import getLogger
 from asyncio import Event, create_task, futures, sleep, get_running_loop
 from cv2 import VideoCapture
 from RSCompanionAsync.Model.app_helpers import await_event
+from RSCompanionAsync.Model.rs_executors import get_executor, ExecEnum
 from RSCompanionAsync.Devices.Camera.Model.cam_defs import cap_backend
 
 
 class CamCounter:
-    def __init__(self, log_handlers: [StreamHandler] = None):
+    def __init__(self):
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
         self.known_indicies = list()
         self._logger.debug("Initialized")
@@ -95,13 +93,10 @@ class CamCounter:
 
 
 class CamScanner:
-    def __init__(self, log_handlers: [StreamHandler] = None):
+    def __init__(self):
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
-        self._counter = CamCounter(log_handlers)
+        self._counter = CamCounter()
         self._connect_event = Event()
         self._disconnect_event = Event()
         self._connect_err_event = Event()
@@ -130,7 +125,8 @@ class CamScanner:
         """
         self._logger.debug("running")
         while self._running:
-            ret = await self._loop.run_in_executor(None, self._check_for_cam, self._counter.get_next_index())
+            ret = await self._loop.run_in_executor(get_executor(ExecEnum.DISCOVERY), self._check_for_cam,
+                                                   self._counter.get_next_index())
             if ret[0]:
                 while ret[0]:
                     self._unhandled_cams.append(ret[1])
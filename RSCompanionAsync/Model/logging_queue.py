@@ -2,8 +2,21 @@ import asyncio
 import logging
 import logging.handlers
 from queue import SimpleQueue
+from threading import Lock
+from time import monotonic
 from typing import List
 
+"""
+The app's one logging pipeline. Loggers only put records on a queue through a handler on the root logger, and a
+QueueListener thread formats them and hands them to the real handlers, so a slow log file or log window never blocks
+the event loop or a device thread. Handlers are attached here once, not per logger or per instance.
+"""
+
+rate_limit = 50.0   # Records per second each logger may send once its burst is used up.
+rate_burst = 200.0  # Records a logger may send at once.
+
+_listener = None
+
 
 class LocalQueueHandler(logging.handlers.QueueHandler):
     def emit(self, record: logging.LogRecord) -> None:
@@ -16,26 +29,78 @@ class LocalQueueHandler(logging.handlers.QueueHandler):
             self.handleError(record)
 
 
-def setup_logging_queue() -> None:
+class RateLimitFilter(logging.Filter):
     """
-    Move log handlers to a separate thread.
-    Replace handlers on the root logger with a LocalQueueHandler,
-    and start a logging.QueueListener holding the original
-    handlers.
+    Drop records from loggers sending more than rate records a second, after a burst, so a noisy loop can not fill the
+    queue. Warnings and worse always pass. The next record a logger gets through says how many of its records were
+    dropped.
     """
-    queue = SimpleQueue()
-    root = logging.getLogger()
+    def __init__(self, rate: float = rate_limit, burst: float = rate_burst):
+        """
+        :param rate: Records per second each logger may send.
+        :param burst: Records a logger may send at once.
+        """
+        super().__init__()
+        self._rate = rate
+        self._burst = burst
+        self._buckets = dict()  # logger name: [tokens, last refill, dropped]
+        self._lock = Lock()
 
-    handlers: List[logging.Handler] = []
+    def filter(self, record: logging.LogRecord) -> bool:
+        now = monotonic()
+        with self._lock:
+            bucket = self._buckets.get(record.name)
+            if bucket is None:
+                bucket = self._buckets[record.name] = [self._burst, now, 0]
+            bucket[0] = min(self._burst, bucket[0] + (now - bucket[1]) * self._rate)
+            bucket[1] = now
+            if bucket[0] < 1 and record.levelno < logging.WARNING:
+                bucket[2] += 1
+                return False
+            bucket[0] = max(bucket[0] - 1, 0)
+            dropped, bucket[2] = bucket[2], 0
+        if dropped:
+            record.msg = str(record.msg) + " (" + str(dropped) + " earlier records from this logger dropped)"
+        return True
 
-    handler = LocalQueueHandler(queue)
-    root.addHandler(handler)
+
+def setup_logging_queue(handlers: List[logging.Handler], level: int = logging.WARNING,
+                        rate: float = rate_limit, burst: float = rate_burst) -> logging.handlers.QueueListener:
+    """
+    Send all logging through one queue to handlers.
+    Replace handlers on the root logger with a LocalQueueHandler, and start a logging.QueueListener holding handlers
+    along with any the root logger had. Calling again replaces the previous pipeline.
+    :param handlers: Where records go, each with its own level and formatter.
+    :param level: The root logger level.
+    :param rate: Records per second each logger may send, see RateLimitFilter.
+    :param burst: Records a logger may send at once.
+    :return logging.handlers.QueueListener: The running listener.
+    """
+    global _listener
+    stop_logging_queue()
+    queue = SimpleQueue()
+    root = logging.getLogger()
+    handlers = list(handlers)
     for h in root.handlers[:]:
-        if h is not handler:
-            root.removeHandler(h)
+        root.removeHandler(h)
+        if not isinstance(h, LocalQueueHandler):
             handlers.append(h)
+    handler = LocalQueueHandler(queue)
+    handler.addFilter(RateLimitFilter(rate, burst))
+    root.addHandler(handler)
+    root.setLevel(level)
+    _listener = logging.handlers.QueueListener(queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
 
-    listener = logging.handlers.QueueListener(
-        queue, *handlers, respect_handler_level=True
-    )
-    listener.start()
+def stop_logging_queue() -> None:
+    """
+    Handle the records still queued and stop the listener thread. Records logged after this wait for the next
+    setup_logging_queue.
+    :return None:
+    """
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,97 @@
+"""
+Licensed under GNU GPL-3.0-or-later
+
+This file is part of RS Companion.
+
+RS Companion is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+RS Companion is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with RS Companion.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Phillip Riskin
+Date: 2020
+Project: Companion App
+Company: Red Scientific
+https://redscientific.com/index.html
+"""
+
+from struct import Struct
+from RSCompanionAsync.Model.rs_clock import get_anchor
+
+"""
+Raw serial capture files, for replaying a session's traffic through the app.
+A capture starts with magic, the clock anchor in effect when it was made and the device name, then has one record per
+chunk read from the port: perf_counter_ns when it arrived, its length and its bytes.
+"""
+
+magic = b"RSCAP1\n"
+capture_ext = ".rscap"
+capture_dir = "raw_capture"
+_header = Struct("<qqH")  # anchor wall ns, anchor perf_counter ns, device name length
+_record = Struct("<qI")   # perf_counter ns, chunk length
+_buffer_size = 1 << 16
+
+
+class CaptureWriter:
+    """ Write a raw serial capture. """
+    def __init__(self, path: str, dev_name: str):
+        """
+        :param path: The capture file to create.
+        :param dev_name: The device name, stored so a replay knows the device type.
+        """
+        name = dev_name.encode()
+        wall_ns, mono_ns = get_anchor()
+        self._file = open(path, "wb", buffering=_buffer_size)
+        self._file.write(magic + _header.pack(wall_ns, mono_ns, len(name)) + name)
+
+    def write(self, data: bytes, timestamp: int) -> None:
+        """
+        Add a chunk.
+        :param data: The bytes read from the port.
+        :param timestamp: perf_counter_ns when they arrived.
+        :return None:
+        """
+        self._file.write(_record.pack(timestamp, len(data)))
+        self._file.write(data)
+
+    def close(self) -> None:
+        """
+        Flush and close the file.
+        :return None:
+        """
+        self._file.close()
+
+
+def read_capture(path: str) -> (dict, [(int, bytes)]):
+    """
+    Read a raw serial capture.
+    :param path: The capture file.
+    :return (dict, [(int, bytes)]): The header {"dev_name", "anchor_wall_ns", "anchor_mono_ns"} and the chunks as
+    (perf_counter_ns, bytes). A chunk cut short by the app closing is dropped.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(magic):
+        raise ValueError(path + " is not a raw serial capture")
+    pos = len(magic)
+    wall_ns, mono_ns, name_len = _header.unpack_from(data, pos)
+    pos += _header.size
+    header = {"dev_name": data[pos:pos + name_len].decode(), "anchor_wall_ns": wall_ns, "anchor_mono_ns": mono_ns}
+    pos += name_len
+    chunks = list()
+    while pos + _record.size <= len(data):
+        timestamp, length = _record.unpack_from(data, pos)
+        pos += _record.size
+        if pos + length > len(data):
+            break
+        chunks.append((timestamp, data[pos:pos + length]))
+        pos += length
+    return header, chunks
@@ -0,0 +1,225 @@
+"""
+Licensed under GNU GPL-3.0-or-later
+
+This file is part of RS Companion.
+
+RS Companion is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+RS Companion is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with RS Companion.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Phillip Riskin
+Date: 2020
+Project: Companion App
+Company: Red Scientific
+https://redscientific.com/index.html
+"""
+
+from time import perf_counter_ns, time_ns
+from datetime import datetime
+from statistics import median, pstdev
+
+"""
+One clock for every timestamp the app records.
+Data is stamped with perf_counter_ns the moment its bytes arrive, which is monotonic and unaffected by wall clock
+adjustments. Monotonic times are turned into wall times through a single anchor, a (wall, monotonic) pair taken
+together once per experiment, so every file in an experiment shares one offset. Timestamps are saved as integer
+nanoseconds since the epoch.
+"""
+
+anchor_filename = "clock_anchor.txt"
+_anchor_samples = 5  # Anchor pairs to take, the one with the least time between its two reads is kept.
+
+_anchor_wall_ns = 0
+_anchor_mono_ns = 0
+
+
+def reset_anchor() -> (int, int):
+    """
+    Take a new anchor. Call when an experiment is created so its files share one wall clock offset.
+    :return (int, int): The anchor's wall time and monotonic time in nanoseconds.
+    """
+    global _anchor_wall_ns, _anchor_mono_ns
+    best = None
+    for i in range(_anchor_samples):
+        before = perf_counter_ns()
+        wall = time_ns()
+        after = perf_counter_ns()
+        if best is None or after - before < best[0]:
+            best = (after - before, wall, before + (after - before) // 2)
+    _anchor_wall_ns, _anchor_mono_ns = best[1], best[2]
+    return _anchor_wall_ns, _anchor_mono_ns
+
+
+def get_anchor() -> (int, int):
+    """
+    :return (int, int): The current anchor's wall time and monotonic time in nanoseconds.
+    """
+    return _anchor_wall_ns, _anchor_mono_ns
+
+
+def set_anchor(wall_ns: int, mono_ns: int) -> None:
+    """
+    Use an anchor taken elsewhere, so another process saves times with the same offset as the app.
+    :param wall_ns: The anchor's wall time in nanoseconds.
+    :param mono_ns: The anchor's monotonic time in nanoseconds.
+    :return None:
+    """
+    global _anchor_wall_ns, _anchor_mono_ns
+    _anchor_wall_ns, _anchor_mono_ns = wall_ns, mono_ns
+
+
+def to_wall_ns(mono_ns: int) -> int:
+    """
+    :param mono_ns: A perf_counter_ns time.
+    :return int: The matching wall time in nanoseconds since the epoch.
+    """
+    return mono_ns - _anchor_mono_ns + _anchor_wall_ns
+
+
+def to_datetime(mono_ns: int) -> datetime:
+    """
+    :param mono_ns: A perf_counter_ns time.
+    :return datetime: The matching local wall time.
+    """
+    return datetime.fromtimestamp(to_wall_ns(mono_ns) / 1E9)
+
+
+def wall_ns_now() -> int:
+    """
+    :return int: The current wall time in nanoseconds since the epoch, through the anchor.
+    """
+    return to_wall_ns(perf_counter_ns())
+
+
+def format_anchor() -> str:
+    """
+    :return str: The current anchor as written to an experiment's anchor file.
+    """
+    return "wall_ns, perf_counter_ns\n" + str(_anchor_wall_ns) + ", " + str(_anchor_mono_ns) + "\n"
+
+
+class DeviceClockFit:
+    """
+    Online fit of a device's millisecond counter against host monotonic time, for devices that stamp their own data.
+    Host arrival time is device time plus a transport delay that is never negative but varies with usb and scheduler
+    load, so each fit is a least squares line through the recent points, refit on the points at or below the median
+    residual and then lowered onto the fastest arrivals. Points that came in late have no pull on the line.
+    The fit restarts whenever the device counter goes backwards, which happens each time the device is restarted.
+    """
+    def __init__(self, window: int = 32, min_points: int = 4):
+        """
+        :param window: Number of recent points to fit.
+        :param min_points: Points needed before the slope is fit, until then the device is assumed to keep host time.
+        """
+        self._window = window
+        self._min_points = max(3, min_points)
+        self._points = list()  # (device ms, host ns)
+        self._first_ms = None
+        self._last_ms = None
+        self._slope = 1E6  # Host ns per device ms.
+        self._intercept = 0.0  # Host ns at device ms 0, relative to _base_ns.
+        self._base_ns = 0
+        self._jitter_ns = 0.0
+        self._resets = 0
+
+    def reset(self) -> None:
+        """
+        Forget every point.
+        :return None:
+        """
+        self._points.clear()
+        self._first_ms = None
+        self._last_ms = None
+        self._slope = 1E6
+        self._intercept = 0.0
+        self._jitter_ns = 0.0
+
+    def add(self, device_ms: int, host_ns: int) -> None:
+        """
+        Add a point and refit.
+        :param device_ms: The device's counter when it sent the data.
+        :param host_ns: perf_counter_ns when the data arrived.
+        :return None:
+        """
+        if self._last_ms is not None and device_ms < self._last_ms:
+            self._resets += 1
+            self.reset()
+        if self._first_ms is None:
+            self._first_ms = device_ms
+            self._base_ns = host_ns
+        self._last_ms = device_ms
+        self._points.append((device_ms, host_ns - self._base_ns))
+        if len(self._points) > self._window:
+            del self._points[0]
+        self._fit()
+
+    @property
+    def ready(self) -> bool:
+        """
+        :return bool: Whether there are any points to map device times with.
+        """
+        return len(self._points) > 0
+
+    def to_host_ns(self, device_ms: int) -> int:
+        """
+        :param device_ms: A device counter value from the current run.
+        :return int: The matching perf_counter_ns on the host timeline.
+        """
+        return self._base_ns + int(self._intercept + self._slope * device_ms)
+
+    def get_stats(self) -> dict:
+        """
+        :return dict: points in the fit, skew_ppm of the device clock against the host, drift_ms the device has gained
+        on the host since the fit started, jitter_ms of the arrivals used in the fit and how many times the fit reset.
+        """
+        skew = self._slope / 1E6 - 1
+        span_ms = self._last_ms - self._first_ms if self._first_ms is not None else 0
+        return {"points": len(self._points), "skew_ppm": skew * 1E6, "drift_ms": -skew * span_ms,
+                "jitter_ms": self._jitter_ns / 1E6, "resets": self._resets}
+
+    def _fit(self) -> None:
+        """
+        Refit the line to the current points.
+        :return None:
+        """
+        points = self._points
+        if len(points) >= self._min_points:
+            slope, intercept = self._least_squares(points)
+            resid = [y - slope * x - intercept for x, y in points]
+            cut = median(resid)
+            fast = [p for p, r in zip(points, resid) if r <= cut]
+            if len(fast) >= 3:
+                slope, intercept = self._least_squares(fast)
+                points = fast
+            self._slope = slope
+        resid = [y - self._slope * x for x, y in points]
+        self._intercept = min(resid)
+        self._jitter_ns = pstdev(resid) if len(resid) > 1 else 0.0
+
+    @staticmethod
+    def _least_squares(points: [(int, int)]) -> (float, float):
+        """
+        :param points: (x, y) points, at least two with different x.
+        :return (float, float): Slope and intercept of the least squares line.
+        """
+        n = len(points)
+        mean_x = sum([p[0] for p in points]) / n
+        mean_y = sum([p[1] for p in points]) / n
+        sxx = sum([(p[0] - mean_x) ** 2 for p in points])
+        if sxx == 0:
+            return 1E6, mean_y - 1E6 * mean_x
+        sxy = sum([(p[0] - mean_x) * (p[1] - mean_y) for p in points])
+        slope = sxy / sxx
+        return slope, mean_y - slope * mean_x
+
+
+reset_anchor()
@@ -0,0 +1,240 @@
+"""
+Licensed under GNU GPL-3.0-or-later
+
+This file is part of RS Companion.
+
+RS Companion is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+RS Companion is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with RS Companion.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Phillip Riskin
+Date: 2020
+Project: Companion App
+Company: Red Scientific
+https://redscientific.com/index.html
+"""
+
+from logging import getLogger
+from asyncio import Event, Future, get_running_loop, create_task
+from time import perf_counter_ns
+from aioserial import AioSerial
+from RSCompanionAsync.Model.rs_executors import get_executor, ExecEnum
+
+default_timeout = 1.0  # Seconds to wait for a device to answer a command before resending it.
+default_retries = 2    # Times to resend an unanswered command before giving up.
+max_write_size = 512   # Most bytes to coalesce into one write.
+
+
+class _Command:
+    def __init__(self, msg: bytes, expect: dict, future: Future, tag: str = None):
+        self.msg = msg
+        self.expect = expect
+        self.future = future
+        self.tag = tag
+        self.tries = 0
+        self.sent_at = 0  # When the last try was written.
+        self.rtt_ms = None  # From the last try to the answer.
+        self.timer = None
+
+
+class CommandQueue:
+    """
+    Send commands to a serial device in order and match the device's answers to them.
+    Commands queued while the loop is busy or while a write is in flight go out together in one write, which runs in
+    the device io executor so the event loop never blocks on the port.
+    """
+    def __init__(self, conn: AioSerial, dev_name: str, timeout: float = default_timeout,
+                 retries: int = default_retries):
+        self._logger = getLogger(__name__)
+        self._logger.debug("Initializing")
+        self._conn = conn
+        self._dev_name = dev_name
+        self._timeout = timeout
+        self._retries = retries
+        self._pending = list()  # Commands waiting to be written.
+        self._waiting = list()  # Written commands waiting for an answer.
+        self._pending_event = Event()
+        self._loop = get_running_loop()
+        self._stats = {"sent": 0, "writes": 0, "confirmed": 0, "retries": 0, "failed": 0, "last_rtt_ms": 0.0}
+        self._write_task = create_task(self._write_loop())
+        self._logger.debug("Initialized")
+
+    def send(self, msg: bytes, expect: dict = None, tag: str = None) -> Future:
+        """
+        Queue a command.
+        :param msg: The encoded command.
+        :param expect: Settings the device answers with, {key: value}. A value of None matches any value. If not given
+        the command is done once written.
+        :param tag: Optional, returned by handle_response when this command takes an answer.
+        :return Future: Resolves to True once written and answered, False if the write failed or no answer came.
+        """
+        return self._queue(msg, expect, tag).future
+
+    async def send_timed(self, msg: bytes, expect: dict, tag: str = None) -> (float, int):
+        """
+        Queue a command and time its answer from the try that was answered, so resends do not count in the time.
+        :param msg: The encoded command.
+        :param expect: Settings the device answers with, as for send.
+        :param tag: Optional, returned by handle_response when this command takes an answer.
+        :return (float, int): The round trip in ms, None if no answer came, and the number of times it was resent.
+        """
+        cmd = self._queue(msg, expect, tag)
+        answered = await cmd.future
+        return cmd.rtt_ms if answered else None, max(cmd.tries - 1, 0)
+
+    def handle_response(self, values: dict) -> str:
+        """
+        Check a settings message from the device against the commands waiting for an answer. The device answers in
+        order, so the message only answers the oldest command it matches.
+        :param values: The parsed settings values.
+        :return str: The tag of the command answered, None if it had none or the message answered nothing.
+        """
+        for cmd in self._waiting:
+            if self._matches(cmd.expect, values):
+                self._waiting.remove(cmd)
+                cmd.timer.cancel()
+                self._stats["confirmed"] += 1
+                cmd.rtt_ms = (perf_counter_ns() - cmd.sent_at) / 1E6
+                self._stats["last_rtt_ms"] = cmd.rtt_ms
+                if not cmd.future.done():
+                    cmd.future.set_result(True)
+                return cmd.tag
+        return None
+
+    def get_stats(self) -> dict:
+        """
+        :return dict: Counts of commands sent, writes made, commands confirmed, resent and failed, and the round trip
+        time of the last confirmed command.
+        """
+        return dict(self._stats)
+
+    def cleanup(self) -> None:
+        """
+        Stop writing and fail every unfinished command.
+        :return None:
+        """
+        self._logger.debug("running")
+        self._write_task.cancel()
+        for cmd in self._pending + self._waiting:
+            if cmd.timer:
+                cmd.timer.cancel()
+            if not cmd.future.done():
+                cmd.future.set_result(False)
+        self._pending.clear()
+        self._waiting.clear()
+        self._logger.debug("done")
+
+    def _queue(self, msg: bytes, expect: dict, tag: str) -> _Command:
+        """
+        Add a command to the commands waiting to be written.
+        :param msg: The encoded command.
+        :param expect: Settings the device answers with.
+        :param tag: The command's tag.
+        :return _Command: The command.
+        """
+        cmd = _Command(msg, expect, self._loop.create_future(), tag)
+        self._pending.append(cmd)
+        self._pending_event.set()
+        return cmd
+
+    async def _write_loop(self) -> None:
+        """
+        Write queued commands, coalescing whatever has queued up since the last write.
+        :return None:
+        """
+        while True:
+            await self._pending_event.wait()
+            batch = list()
+            size = 0
+            while self._pending and (not batch or size + len(self._pending[0].msg) <= max_write_size):
+                cmd = self._pending.pop(0)
+                if cmd.future.done():  # Caller gave up on it.
+                    continue
+                batch.append(cmd)
+                size += len(cmd.msg)
+            if not self._pending:
+                self._pending_event.clear()
+            if not batch:
+                continue
+            written = await self._loop.run_in_executor(get_executor(ExecEnum.DEVICE_IO), self._write,
+                                                       b"".join([cmd.msg for cmd in batch]))
+            self._stats["writes"] += 1
+            self._stats["sent"] += len(batch)
+            sent_at = perf_counter_ns()
+            for cmd in batch:
+                if not written:
+                    self._fail(cmd)
+                elif cmd.expect:
+                    cmd.tries += 1
+                    cmd.sent_at = sent_at
+                    cmd.timer = self._loop.call_later(self._timeout, self._on_timeout, cmd)
+                    self._waiting.append(cmd)
+                elif not cmd.future.done():
+                    cmd.future.set_result(True)
+
+    def _write(self, data: bytes) -> bool:
+        """
+        Write data to the device. Runs in an executor.
+        :param data: The bytes to write.
+        :return bool: Whether the write succeeded.
+        """
+        try:
+            if self._conn.is_open:
+                self._conn.write(data)
+                return True
+        except Exception as e:
+            self._logger.exception("Device " + self._dev_name + " connection failed")
+        return False
+
+    def _on_timeout(self, cmd: _Command) -> None:
+        """
+        Resend a command that was not answered in time, or fail it if it is out of retries.
+        :param cmd: The command.
+        :return None:
+        """
+        if cmd not in self._waiting:
+            return
+        self._waiting.remove(cmd)
+        if cmd.future.done():
+            return
+        if cmd.tries <= self._retries:
+            self._logger.info("Device " + self._dev_name + " did not answer " + str(cmd.msg) + ", resending")
+            self._stats["retries"] += 1
+            self._pending.append(cmd)
+            self._pending_event.set()
+        else:
+            self._logger.warning("Device " + self._dev_name + " did not answer " + str(cmd.msg))
+            self._fail(cmd)
+
+    def _fail(self, cmd: _Command) -> None:
+        """
+        Resolve a command as failed.
+        :param cmd: The command.
+        :return None:
+        """
+        self._stats["failed"] += 1
+        if not cmd.future.done():
+            cmd.future.set_result(False)
+
+    @staticmethod
+    def _matches(expect: dict, values: dict) -> bool:
+        """
+        :param expect: The expected settings.
+        :param values: The received settings.
+        :return bool: Whether values contains every expected setting.
+        """
+        for key, val in expect.items():
+            if key not in values:
+                return False
+            if val is not None and str(values[key]) != str(val):
+                return False
+        return True
@@ -24,37 +24,53 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
-from logging import getLogger, StreamHandler
-from asyncio import Event, get_running_loop, create_task, futures, sleep
+from logging import getLogger
+from typing import Callable, List
+from asyncio import Event, get_running_loop, create_task, futures, sleep, gather
+from time import perf_counter_ns
 from serial.serialutil import SerialException
 from serial.tools.list_ports import comports
 from serial.tools.list_ports_common import ListPortInfo
 from aioserial import AioSerial
 from RSCompanionAsync.Model.app_helpers import await_event
+from RSCompanionAsync.Model.rs_executors import get_executor, ExecEnum
+from RSCompanionAsync.Model.rs_port_tuning import tune_port, format_tuning
+from RSCompanionAsync.Model.rs_hotplug import HotplugBackend, PollingBackend, make_backend, diff_ports, port_key
+
+open_first_wait = .05  # Seconds to wait before retrying a port that would not open, doubled after each failure.
+open_max_wait = 1.0    # Most seconds to wait between tries.
+open_deadline = 5.0    # Seconds to keep trying to open a port before giving up on it.
 
 
 class RSDeviceCommScanner:
-    def __init__(self, device_ids: dict = None, log_handlers: [StreamHandler] = None):
+    def __init__(self, device_ids: dict = None, port_lister: Callable[[], List[ListPortInfo]] = None,
+                 hotplug: HotplugBackend = None):
         """
         Initialize scanner and prep for run.
         :param device_ids: The list of devices to look for.
+        :param port_lister: Function listing the available ports. Defaults to the system's serial ports.
+        :param hotplug: What tells the scanner to list the ports again, see rs_hotplug. Defaults to kernel events
+        where available for the system's ports and polling for a given port_lister.
         """
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
         if device_ids:
             self._device_ids = device_ids
         else:
             self._device_ids = dict()
+        self._port_lister = port_lister if port_lister else comports
+        if hotplug:
+            self._hotplug = hotplug
+        else:
+            self._hotplug = PollingBackend() if port_lister else make_backend()
         self._connect_event = Event()
         self._disconnect_event = Event()
         self._connect_err_event = Event()
         self._new_coms = []
         self._lost_coms = []
-        self._known_ports = []
+        self._known_ports = dict()  # port_key: ListPortInfo
         self._serials = {}
+        self._ready_ms = dict()  # Port device: ms from the port being found to it being ready.
         self._tasks = []
         self._loop = get_running_loop()
         self._running = True
@@ -78,6 +94,7 @@ class RSDeviceCommScanner:
         self._running = False
         for task in self._tasks:
             task.cancel()
+        self._hotplug.close()
         self._logger.debug("done")
 
     def get_next_new_com(self) -> (bool, AioSerial):
@@ -133,50 +150,108 @@ class RSDeviceCommScanner:
         """
         self._logger.debug("running")
         while self._running:
-            ports = await self._loop.run_in_executor(None, comports)
-            if len(ports) > len(self._known_ports):
-                create_task(self._check_for_new_devices(ports))
-            elif len(ports) < len(self._known_ports):
-                create_task(self._check_for_disconnects(ports))
-            await sleep(1)
+            ports = await self._loop.run_in_executor(get_executor(ExecEnum.DISCOVERY), self._port_lister)
+            added, removed = diff_ports(self._known_ports, ports)
+            for port in removed:
+                del self._known_ports[port_key(port)]
+            for port in added:
+                self._known_ports[port_key(port)] = port
+            if removed:  # Before adding, so a device swapped in on the same path is removed then added.
+                self._check_for_disconnects(removed)
+            if added:
+                create_task(self._check_for_new_devices(added, perf_counter_ns()))
+            await self._hotplug.wait()
+
+    async def _check_for_new_devices(self, ports: [ListPortInfo], found_at: int) -> None:
+        """
+        Check plug events for supported Devices, opening every supported port at once.
+        :param ports: The newly found ports.
+        :param found_at: perf_counter_ns when the ports were found.
+        :return None:
+        """
+        self._logger.debug("running")
+        candidates = list()
+        for port in ports:
+            for device_type in self._device_ids:
+                if self._verify_port(port, self._device_ids[device_type]):
+                    candidates.append((port, device_type))
+                    break
+        if candidates:
+            ready = await gather(*[self._connect(port, device_type, found_at) for port, device_type in candidates])
+            self._logger.info("Connected {} of {} new devices in {:.0f}ms: {}".format(
+                len([x for x in ready if x is not None]), len(candidates), (perf_counter_ns() - found_at) / 1E6,
+                ", ".join([port.device + (" failed" if ms is None else " {:.0f}ms".format(ms))
+                           for (port, device_type), ms in zip(candidates, ready)])))
+        self._logger.debug("done")
+
+    async def _connect(self, port: ListPortInfo, device_type: str, found_at: int) -> float:
+        """
+        Open and tune one port and hand it on as a new device.
+        :param port: The port.
+        :param device_type: The type of device on the port.
+        :param found_at: perf_counter_ns when the port was found.
+        :return float: ms from the port being found to it being ready, None if it could not be opened.
+        """
+        self._logger.debug("running")
+        ret_val, connection = await self._try_open_port(port, found_at + int(open_deadline * 1E9))
+        if not ret_val:
+            self._logger.warning("Could not open " + port.device + " within " + str(open_deadline) + "s")
+            self._connect_err_event.set()
+            return None
+        if "tuning" in self._device_ids[device_type]:
+            await self._tune_port(connection, self._device_ids[device_type]["tuning"])
+        self._ready_ms[port.device] = (perf_counter_ns() - found_at) / 1E6
+        self._new_coms.append((device_type, connection))
+        self._connect_event.set()
+        self._logger.debug("done")
+        return self._ready_ms[port.device]
+
+    def get_ready_times(self) -> dict:
+        """
+        :return dict: {port device: ms from the port being found to it being ready} for every device connected.
+        """
+        return dict(self._ready_ms)
+
+    def report_lost(self, port: str) -> None:
+        """
+        Signal the loss of a device whose link failed while its port is still listed. The port stays known, so the
+        device is connected again once it is unplugged and plugged back in.
+        :param port: The device's port.
+        :return None:
+        """
+        self._logger.debug("running")
+        self._lost_coms.append(ListPortInfo(port, skip_link_detection=True))
+        self._disconnect_event.set()
+        self._logger.debug("done")
 
-    async def _check_for_new_devices(self, ports: [ListPortInfo]) -> None:
+    def _check_for_disconnects(self, ports: [ListPortInfo]) -> None:
         """
-        Check plug events for supported Devices.
-        :param ports: The list of ports to check.
+        Signal the loss of any supported devices among ports.
+        :param ports: The ports that are gone.
         :return None:
         """
         self._logger.debug("running")
         for port in ports:
-            if port not in self._known_ports:
-                self._known_ports.append(port)
-                for device_type in self._device_ids:
-                    if self._verify_port(port, self._device_ids[device_type]):
-                        ret_val, connection = await create_task(self._try_open_port(port))
-                        if ret_val:
-                            self._new_coms.append((device_type, connection))
-                            self._connect_event.set()
-                        else:
-                            self._connect_err_event.set()
-                        break
+            for device_type in self._device_ids:
+                if self._verify_port(port, self._device_ids[device_type]):
+                    self._lost_coms.append(port)
+                    self._disconnect_event.set()
+                    break
         self._logger.debug("done")
 
-    async def _check_for_disconnects(self, ports: [ListPortInfo]) -> None:
+    async def _tune_port(self, conn: AioSerial, tuning: dict) -> None:
         """
-        Check the list of ports against list of known ports for any ports that are no longer in use
-        and disconnect them.
-        :param ports: List of ports to check
+        Apply a device profile's low latency settings to a newly opened port and log what took.
+        :param conn: The open port.
+        :param tuning: The profile's tuning settings, see rs_port_tuning.
         :return None:
         """
         self._logger.debug("running")
-        for known_port in self._known_ports:
-            if known_port not in ports:
-                self._known_ports.remove(known_port)
-                for device_type in self._device_ids:
-                    if self._verify_port(known_port, self._device_ids[device_type]):
-                        self._lost_coms.append(known_port)
-                        self._disconnect_event.set()
-                        break
+        try:
+            result = await self._loop.run_in_executor(get_executor(ExecEnum.DEVICE_IO), tune_port, conn, tuning)
+            self._logger.info("Tuned " + str(conn.port) + ": " + format_tuning(result))
+        except Exception as e:
+            self._logger.exception("Failed tuning " + str(conn.port))
         self._logger.debug("done")
 
     @staticmethod
@@ -189,22 +264,22 @@ class RSDeviceCommScanner:
         """
         return port.vid == profile['vid'] and port.pid == profile['pid']
 
-    @staticmethod
-    async def _try_open_port(port) -> (bool, AioSerial):
+    async def _try_open_port(self, port: ListPortInfo, deadline: int) -> (bool, AioSerial):
         """
-        Try to connect to the given port.
-        :param port: The port to connect to
+        Try to connect to the given port, backing off between tries in case the device is busy.
+        :param port: The port to connect to.
+        :param deadline: perf_counter_ns after which to stop trying.
         :return: (success value, connection)
         """
         new_connection = AioSerial()
         new_connection.port = port.device
-        i = 0
-        while not new_connection.is_open and i < 5:  # Make multiple attempts in case device is busy
-            i += 1
+        wait = open_first_wait
+        while True:
             try:
-                new_connection.open()
+                await self._loop.run_in_executor(get_executor(ExecEnum.DEVICE_IO), new_connection.open)
+                return True, new_connection
             except SerialException as e:
-                await sleep(1)
-        if not new_connection.is_open:  # Failed to connect
-            return False, None
-        return True, new_connection
+                if perf_counter_ns() + wait * 1E9 > deadline:  # Failed to connect
+                    return False, None
+                await sleep(wait)
+                wait = min(wait * 2, open_max_wait)
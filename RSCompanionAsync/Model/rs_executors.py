@@ -0,0 +1,187 @@
+"""
+Licensed under GNU GPL-3.0-or-later
+
+This file is part of RS Companion.
+
+RS Companion is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+RS Companion is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with RS Companion.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Phillip Riskin
+Date: 2020
+Project: Companion App
+Company: Red Scientific
+https://redscientific.com/index.html
+"""
+
+from enum import Enum, auto
+from collections import deque
+from logging import getLogger
+from threading import Lock
+from time import perf_counter_ns
+from concurrent.futures import ThreadPoolExecutor, Future
+
+"""
+Named thread pools so blocking work from one subsystem cannot queue behind another's. Each process gets its own
+pools on first use.
+"""
+
+logger = getLogger(__name__)
+
+
+class ExecEnum(Enum):
+    DEVICE_IO = auto()  # Serial writes, opens and tuning, camera reads. Blocking serial reads get their own threads.
+    STORAGE = auto()    # File saving and moving.
+    DISCOVERY = auto()  # Port and camera scans.
+    RENDER = auto()     # Off screen graph drawing.
+
+
+executor_sizes = {ExecEnum.DEVICE_IO: 32,
+                  ExecEnum.STORAGE: 4,
+                  ExecEnum.DISCOVERY: 2,
+                  ExecEnum.RENDER: 2}
+
+# A pool is starved if every worker is busy and the oldest queued job has waited this long.
+starved_wait_ns = 500 * 1000 * 1000
+
+
+class MonitoredExecutor(ThreadPoolExecutor):
+    """ A ThreadPoolExecutor that keeps queue wait and saturation statistics. """
+    def __init__(self, name: str, max_workers: int):
+        super().__init__(max_workers, thread_name_prefix=name)
+        self.name = name
+        self.max_workers = max_workers
+        self._stats_lock = Lock()
+        self._queued = deque()  # Submit times of jobs not yet started, oldest first.
+        self._active = 0
+        self._submitted = 0
+        self._completed = 0
+        self._total_wait_ns = 0
+        self._max_wait_ns = 0
+        self._starved = False
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """
+        Submit a job, recording how long it waits for a worker.
+        :param fn: The callable to run.
+        :return Future: The job's future.
+        """
+        submit_time = perf_counter_ns()
+        with self._stats_lock:
+            self._queued.append(submit_time)
+            self._submitted += 1
+        return super().submit(self._run, submit_time, fn, *args, **kwargs)
+
+    def _run(self, submit_time: int, fn, *args, **kwargs):
+        """
+        Update statistics around running a job.
+        :param submit_time: When the job was submitted.
+        :param fn: The job.
+        :return: The job's return value.
+        """
+        wait = perf_counter_ns() - submit_time
+        with self._stats_lock:
+            self._queued.remove(submit_time)
+            self._active += 1
+            self._total_wait_ns += wait
+            if wait > self._max_wait_ns:
+                self._max_wait_ns = wait
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._stats_lock:
+                self._active -= 1
+                self._completed += 1
+
+    def get_stats(self) -> dict:
+        """
+        :return dict: Current statistics for this pool. Times are in milliseconds.
+        """
+        now = perf_counter_ns()
+        with self._stats_lock:
+            started = self._submitted - len(self._queued)
+            return {"name": self.name,
+                    "max_workers": self.max_workers,
+                    "active": self._active,
+                    "queued": len(self._queued),
+                    "submitted": self._submitted,
+                    "completed": self._completed,
+                    "saturation": self._active / self.max_workers,
+                    "mean_wait_ms": self._total_wait_ns / started / 1E6 if started else 0.0,
+                    "max_wait_ms": self._max_wait_ns / 1E6,
+                    "oldest_queued_ms": (now - self._queued[0]) / 1E6 if self._queued else 0.0}
+
+    def check_starved(self) -> bool:
+        """
+        Warn once per episode when every worker is busy and queued work has waited too long.
+        :return bool: Whether this pool is starved.
+        """
+        stats = self.get_stats()
+        starved = stats["active"] >= self.max_workers and stats["oldest_queued_ms"] * 1E6 >= starved_wait_ns
+        if starved and not self._starved:
+            logger.warning("Executor " + self.name + " is starved: " + str(stats))
+        elif self._starved and not starved:
+            logger.info("Executor " + self.name + " recovered: " + str(stats))
+        self._starved = starved
+        return starved
+
+
+_executors = dict()
+_executors_lock = Lock()
+
+
+def get_executor(exec_type: ExecEnum) -> MonitoredExecutor:
+    """
+    Get the pool for a subsystem, creating it if needed.
+    :param exec_type: The subsystem.
+    :return MonitoredExecutor: The pool.
+    """
+    with _executors_lock:
+        if exec_type not in _executors:
+            _executors[exec_type] = MonitoredExecutor(exec_type.name.lower(), executor_sizes[exec_type])
+        return _executors[exec_type]
+
+
+def get_executor_stats() -> [dict]:
+    """
+    :return [dict]: Statistics for each pool created so far.
+    """
+    with _executors_lock:
+        executors = list(_executors.values())
+    return [x.get_stats() for x in executors]
+
+
+def check_executors() -> bool:
+    """
+    Check each pool for starvation, warning on any that are starved.
+    :return bool: Whether any pool is starved.
+    """
+    with _executors_lock:
+        executors = list(_executors.values())
+    ret = False
+    for x in executors:
+        if x.check_starved():
+            ret = True
+    return ret
+
+
+def shutdown_executors(wait: bool = False) -> None:
+    """
+    Shut down every pool. Pools are recreated if used again.
+    :param wait: Whether to wait for running jobs.
+    :return None:
+    """
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for x in executors:
+        x.shutdown(wait)
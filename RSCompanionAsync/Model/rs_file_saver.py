@@ -27,10 +27,11 @@ https://redscientific.com/index.html
 import os
 import tempfile
 from io import TextIOWrapper
-from logging import getLogger, StreamHandler
+from logging import getLogger
 from operator import itemgetter
 from pathlib import Path
 from shutil import move
+from RSCompanionAsync.Model.rs_scrollback import scrollback_dir
 from RSCompanionAsync.Resources.Strings.file_saver_strings import strings, StringsEnum, LangEnum
 
 """
@@ -43,14 +44,28 @@ data_ft = ".csv"
 unsc_sep = "_"
 comma_sep = ", "
 new_line = "\n"
+ns_min = 1E12  # Timestamps below this are seconds, which stay under it until the year 33658.
+
+
+def _ts_value(timestamp: str) -> int:
+    """
+    Timestamps are integer nanoseconds. Older experiments saved float seconds, written without a fraction when it was
+    zero, so values below ns_min are taken as seconds and converted so either sorts.
+    :param timestamp: The timestamp as saved.
+    :return int: The timestamp in nanoseconds.
+    """
+    try:
+        value = int(timestamp)
+    except ValueError:
+        value = float(timestamp)
+    if abs(value) < ns_min:
+        return round(value * 1E9)
+    return int(value)
 
 
 class RSSaver:
-    def __init__(self, lang: LangEnum, log_handlers: [StreamHandler] = None):
+    def __init__(self, lang: LangEnum):
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
         self._to_dir = str()
         self._from_dir = None
@@ -111,7 +126,7 @@ class RSSaver:
         prev_dir = os.getcwd()
         os.chdir(self._from_dir.name)
         for file in os.listdir():
-            if not file.endswith(data_ft):
+            if not file.endswith(data_ft) and file != scrollback_dir:  # Scrollback goes with the temp dir.
                 move(file, self._to_dir)
         os.chdir(prev_dir)
         self._logger.debug("done")
@@ -228,7 +243,7 @@ class RSSaver:
             key_ts_index = data[key][0][self._strings[StringsEnum.TSTAMP_HDR]]
             key_array = data[key][1]
             if len(key_array) > 0:
-                if best_array[0][best_ts_index] > key_array[0][key_ts_index]:
+                if _ts_value(best_array[0][best_ts_index]) > _ts_value(key_array[0][key_ts_index]):
                     best = key
         return best
 
@@ -270,8 +285,9 @@ class RSSaver:
             if data_type in app_data_names:
                 continue
             if num_devices[data_type] > 1:
+                ts_index = data[data_type][0][self._strings[StringsEnum.TSTAMP_HDR]]
                 data[data_type][1] = sorted([row for row in data[data_type][1]],
-                                            key=itemgetter(data[data_type][0][self._strings[StringsEnum.TSTAMP_HDR]]))
+                                            key=lambda row: _ts_value(row[ts_index]))
         self._logger.debug("done")
         return data
 
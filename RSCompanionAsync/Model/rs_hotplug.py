@@ -0,0 +1,216 @@
+"""
+Licensed under GNU GPL-3.0-or-later
+
+This file is part of RS Companion.
+
+RS Companion is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+RS Companion is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with RS Companion.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Phillip Riskin
+Date: 2020
+Project: Companion App
+Company: Red Scientific
+https://redscientific.com/index.html
+"""
+
+import socket
+from abc import ABC, abstractmethod
+from asyncio import Event, get_running_loop, wait_for, sleep, TimeoutError
+from serial.tools.list_ports_common import ListPortInfo
+
+"""
+Serial port hot plug detection for RSDeviceCommScanner.
+A backend's wait returns when the ports may have changed, then the scanner lists the ports and diffs them against the
+ones it knows, keyed by device path and USB serial number so a device swapped for another on the same path is seen.
+    NetlinkBackend: Linux, wakes on kernel tty add and remove events and still polls slowly in case one is missed.
+    PollingBackend: Everywhere else, wakes on a fixed interval.
+    FakeBackend: A scriptable port list and event source for tests.
+"""
+
+poll_interval = 1.0       # Seconds between port listings without hot plug events.
+fallback_interval = 5.0   # Seconds between port listings when hot plug events are being watched.
+settle_time = .05         # Seconds to let a burst of events finish and sysfs catch up before listing ports.
+_netlink_kobject_uevent = 15
+_kernel_group = 1
+_subsystems = ("tty",)
+_actions = ("add", "remove")
+
+
+def port_key(port: ListPortInfo) -> (str, str):
+    """
+    :param port: A listed port.
+    :return (str, str): The key a port is known by, its device path and USB serial number.
+    """
+    return port.device, port.serial_number
+
+
+def diff_ports(known: dict, ports: [ListPortInfo]) -> ([ListPortInfo], [ListPortInfo]):
+    """
+    Compare a port listing with the known ports.
+    :param known: {port_key: ListPortInfo} of the known ports.
+    :param ports: The current listing.
+    :return ([ListPortInfo], [ListPortInfo]): The added and the removed ports.
+    """
+    current = {port_key(port): port for port in ports}
+    added = [port for key, port in current.items() if key not in known]
+    removed = [port for key, port in known.items() if key not in current]
+    return added, removed
+
+
+def parse_uevent(data: bytes) -> dict:
+    """
+    :param data: A kernel uevent message, "action@devpath" then NUL separated KEY=value pairs.
+    :return dict: The KEY=value pairs.
+    """
+    values = dict()
+    for item in data.split(b"\0")[1:]:
+        key, found, val = item.partition(b"=")
+        if found:
+            values[key.decode("latin-1")] = val.decode("latin-1")
+    return values
+
+
+class HotplugBackend(ABC):
+    """ Base backend, wakes the scanner when ports may have changed. """
+    @abstractmethod
+    async def wait(self) -> None:
+        """
+        Return once the ports may have changed.
+        :return None:
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Stop watching.
+        :return None:
+        """
+        pass
+
+
+class PollingBackend(HotplugBackend):
+    def __init__(self, interval: float = poll_interval):
+        """
+        :param interval: Seconds between wakes.
+        """
+        self._interval = interval
+
+    async def wait(self) -> None:
+        await sleep(self._interval)
+
+
+class NetlinkBackend(HotplugBackend):
+    def __init__(self, interval: float = fallback_interval):
+        """
+        Raises OSError or AttributeError where netlink is not available.
+        :param interval: Most seconds between wakes when there are no events.
+        """
+        self._interval = interval
+        self._event = Event()
+        self._sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, _netlink_kobject_uevent)
+        try:
+            self._sock.bind((0, _kernel_group))
+            self._sock.setblocking(False)
+            self._loop = get_running_loop()
+            self._loop.add_reader(self._sock.fileno(), self._on_readable)
+        except Exception as e:
+            self._sock.close()
+            raise
+
+    async def wait(self) -> None:
+        try:
+            await wait_for(self._event.wait(), self._interval)
+            await sleep(settle_time)
+        except TimeoutError as e:
+            pass
+        self._event.clear()
+
+    def close(self) -> None:
+        try:
+            self._loop.remove_reader(self._sock.fileno())
+        except Exception as e:
+            pass
+        self._sock.close()
+
+    def _on_readable(self) -> None:
+        """
+        Read every waiting uevent and wake if any are for a tty coming or going.
+        :return None:
+        """
+        while True:
+            try:
+                data = self._sock.recv(1 << 16)
+            except (BlockingIOError, InterruptedError) as e:
+                return
+            except OSError as e:  # Missed events on buffer overrun, list the ports to be safe.
+                self._event.set()
+                return
+            values = parse_uevent(data)
+            if values.get("SUBSYSTEM") in _subsystems and values.get("ACTION") in _actions:
+                self._event.set()
+
+
+class FakeBackend(HotplugBackend):
+    """ Scriptable ports and hot plug events. Use list_ports as the scanner's port lister. """
+    def __init__(self, ports: [ListPortInfo] = None, interval: float = None):
+        """
+        :param ports: The ports plugged in to start with.
+        :param interval: Seconds between wakes with no event, None to only wake on events.
+        """
+        self._ports = list(ports) if ports else list()
+        self._interval = interval
+        self._event = Event()
+        self.wakes = 0
+
+    def list_ports(self) -> [ListPortInfo]:
+        return list(self._ports)
+
+    def plug(self, port: ListPortInfo, notify: bool = True) -> None:
+        """
+        :param port: The port to add.
+        :param notify: Whether to send an event, False to only be found by the fallback interval.
+        """
+        self._ports.append(port)
+        if notify:
+            self.notify()
+
+    def unplug(self, port: ListPortInfo, notify: bool = True) -> None:
+        self._ports = [x for x in self._ports if port_key(x) != port_key(port)]
+        if notify:
+            self.notify()
+
+    def swap(self, old: ListPortInfo, new: ListPortInfo) -> None:
+        """ Replace a port in a single event, as when devices are swapped faster than a poll. """
+        self.unplug(old, False)
+        self.plug(new)
+
+    def notify(self) -> None:
+        self._event.set()
+
+    async def wait(self) -> None:
+        try:
+            await wait_for(self._event.wait(), self._interval)
+        except TimeoutError as e:
+            pass
+        self._event.clear()
+        self.wakes += 1
+
+
+def make_backend() -> HotplugBackend:
+    """
+    :return HotplugBackend: Netlink events where the platform has them, polling otherwise.
+    """
+    try:
+        return NetlinkBackend()
+    except (OSError, AttributeError) as e:
+        return PollingBackend()
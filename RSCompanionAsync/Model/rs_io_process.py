@@ -0,0 +1,544 @@
+"""
+Licensed under GNU GPL-3.0-or-later
+
+This file is part of RS Companion.
+
+RS Companion is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+RS Companion is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with RS Companion.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Phillip Riskin
+Date: 2020
+Project: Companion App
+Company: Red Scientific
+https://redscientific.com/index.html
+"""
+
+from logging import getLogger
+from asyncio import Event, get_running_loop, create_task, sleep, run
+from collections import deque
+from multiprocessing import Process, Pipe
+from multiprocessing.shared_memory import SharedMemory
+from pickle import dumps, loads, HIGHEST_PROTOCOL
+from struct import Struct
+from threading import Thread, Lock, Event as TEvent
+from serial import Serial
+from serial.serialutil import SerialException
+from RSCompanionAsync.Model.rs_serial_reader import SerialLineReader
+from RSCompanionAsync.Model.rs_protocol import compile_parser
+from RSCompanionAsync.Model.rs_port_tuning import tune_port, format_tuning
+from RSCompanionAsync.Model.rs_clock import get_anchor, set_anchor
+from RSCompanionAsync.Model.rs_executors import get_executor, ExecEnum
+
+"""
+Optional mode where serial devices are read in a dedicated io process.
+The io process opens each port with the settings and tuning the app would use, stamps and parses every line as it
+arrives and sends the parsed messages to the app through a ring buffer in shared memory. Commands and port changes go
+the other way over a pipe. When the app is busy the ring, and past that a backlog in the io process, holds the
+messages, so a stalled ui never holds up reading.
+perf_counter_ns is system wide so arrival times mean the same thing in both processes.
+"""
+
+ring_size = 1 << 22      # Bytes of shared memory for messages on their way to the app.
+poll_interval = .005     # Seconds between checks of the ring for new messages.
+max_backlog = 100000     # Most batches the io process holds while the ring is full before dropping the oldest.
+write_timeout = 1.0      # Seconds a command write to a device may take in the io process.
+stop_timeout = 2.0       # Seconds to wait for the io process to exit before killing it.
+
+_pos = Struct("<Q")
+_len = Struct("<I")
+_write_off = 0    # Total bytes ever written, only moved by the producer.
+_read_off = 8     # Total bytes ever read, only moved by the consumer.
+_dropped_off = 16  # Batches dropped by the producer.
+_size_off = 24    # Bytes in the data area.
+_data_off = 32
+
+
+class RecordRing:
+    """
+    Single producer, single consumer queue of byte records in shared memory.
+    The producer only moves the write position and the consumer only moves the read position, each after its copy is
+    done, so neither side needs a lock.
+    """
+    def __init__(self, name: str = None, size: int = ring_size):
+        """
+        :param name: The shared memory block of an existing ring to attach to. None to create a new ring.
+        :param size: Bytes of data in a new ring.
+        """
+        self._owner = name is None
+        if self._owner:
+            self._shm = SharedMemory(create=True, size=_data_off + size)
+            for offset, value in ((_write_off, 0), (_read_off, 0), (_dropped_off, 0), (_size_off, size)):
+                _pos.pack_into(self._shm.buf, offset, value)
+        else:
+            self._shm = SharedMemory(name)  # Child processes share the creator's resource tracker, so no leak warning.
+        self._buf = self._shm.buf
+        self._size = self._get(_size_off)
+
+    @property
+    def name(self) -> str:
+        """
+        :return str: The shared memory block name, to attach to this ring from another process.
+        """
+        return self._shm.name
+
+    def put(self, record: bytes) -> bool:
+        """
+        Add a record if there is room.
+        :param record: The record.
+        :return bool: Whether the record was added.
+        """
+        write = self._get(_write_off)
+        needed = _len.size + len(record)
+        if needed > self._size - (write - self._get(_read_off)):
+            return False
+        self._copy_in(write, _len.pack(len(record)))
+        self._copy_in(write + _len.size, record)
+        _pos.pack_into(self._buf, _write_off, write + needed)
+        return True
+
+    def get_all(self) -> [bytes]:
+        """
+        Take every record added so far.
+        :return [bytes]: The records, oldest first.
+        """
+        write = self._get(_write_off)
+        read = self._get(_read_off)
+        records = list()
+        while read < write:
+            length = _len.unpack(self._copy_out(read, _len.size))[0]
+            records.append(self._copy_out(read + _len.size, length))
+            read += _len.size + length
+        _pos.pack_into(self._buf, _read_off, read)
+        return records
+
+    def add_dropped(self, count: int) -> None:
+        """
+        Count records the producer had to throw away.
+        :param count: The number dropped.
+        :return None:
+        """
+        _pos.pack_into(self._buf, _dropped_off, self._get(_dropped_off) + count)
+
+    def get_dropped(self) -> int:
+        """
+        :return int: The number of records the producer has thrown away.
+        """
+        return self._get(_dropped_off)
+
+    def close(self) -> None:
+        """
+        Detach from the ring, and free it if this is the one that created it.
+        :return None:
+        """
+        self._buf = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def _get(self, offset: int) -> int:
+        return _pos.unpack_from(self._buf, offset)[0]
+
+    def _copy_in(self, pos: int, data: bytes) -> None:
+        start = pos % self._size
+        first = min(len(data), self._size - start)
+        self._buf[_data_off + start:_data_off + start + first] = data[:first]
+        if first < len(data):
+            self._buf[_data_off:_data_off + len(data) - first] = data[first:]
+
+    def _copy_out(self, pos: int, length: int) -> bytes:
+        start = pos % self._size
+        first = min(length, self._size - start)
+        data = bytes(self._buf[_data_off + start:_data_off + start + first])
+        if first < length:
+            data += bytes(self._buf[_data_off:_data_off + length - first])
+        return data
+
+
+class RemoteSerial:
+    """
+    Stand in for a serial connection opened in the io process. Has the parts of AioSerial and SerialLineReader the
+    device models use: writes go out over the io process's pipe and parsed messages come back through its ring.
+    """
+    def __init__(self, io_process, chan: int, port: str, settings: dict = None, tuning: dict = None):
+        """
+        :param io_process: The IOProcess serving this connection.
+        :param chan: The id the io process knows this connection by.
+        :param port: The port name.
+        :param settings: The port settings to open with, from pyserial's get_settings. None for pyserial's defaults.
+        :param tuning: The device profile's tuning to apply once open, see rs_port_tuning. None to leave the port as is.
+        """
+        self.port = port
+        self._settings = settings
+        self._tuning = tuning
+        self.is_open = True  # Until the io process says otherwise, so commands sent while it opens the port go out.
+        self._io = io_process
+        self._chan = chan
+        self._msgs = list()
+        self._num_bytes = 0
+        self._msgs_event = Event()
+        self._failed = False
+        self._closed = False
+
+    def open(self, spec: dict) -> None:
+        """
+        Have the io process open the port and parse what it reads with spec.
+        :param spec: The device protocol spec.
+        :return None:
+        """
+        self._io.send(("open", self._chan, self.port, spec, self._settings, self._tuning))
+
+    def write(self, data: bytes) -> int:
+        """
+        Send data to the device.
+        :param data: The bytes to write.
+        :return int: The number of bytes handed to the io process.
+        """
+        if not self._io.send(("write", self._chan, data)):
+            raise SerialException("The io process is not running")
+        return len(data)
+
+    async def get_msgs(self, parse=None) -> ([(dict, int)], int):
+        """
+        Wait for at least one message and return every message received so far.
+        :param parse: Not used, the io process parses with the spec given to open.
+        :return ([(dict, int)], int): (parsed message, perf_counter_ns when it arrived) for each line, and the number of
+        bytes in those lines.
+        :raises SerialException: If the io process lost the port and every message has been returned.
+        """
+        while not self._msgs:
+            if self._failed:
+                raise SerialException("The io process lost " + str(self.port))
+            self._msgs_event.clear()
+            await self._msgs_event.wait()
+        msgs, self._msgs = self._msgs, list()
+        num_bytes, self._num_bytes = self._num_bytes, 0
+        return msgs, num_bytes
+
+    def open_capture(self, path: str, dev_name: str) -> None:
+        """
+        Have the io process record everything it reads from the port to a new capture file.
+        :param path: The capture file to create.
+        :param dev_name: The device name stored in the capture.
+        :return None:
+        """
+        self._io.send(("capture", self._chan, path, dev_name, get_anchor()))
+
+    def stop_capture(self) -> None:
+        """
+        Stop recording and close the capture if there is one.
+        :return None:
+        """
+        self._io.send(("capture", self._chan, None, None, None))
+
+    def cleanup(self) -> None:
+        """
+        Stop reading.
+        :return None:
+        """
+        self.close()
+
+    def close(self) -> None:
+        """
+        Have the io process close the port.
+        :return None:
+        """
+        if not self._closed:  # Even if it failed, the io process may still hold the port.
+            self._closed = True
+            self.is_open = False
+            self._io.send(("close", self._chan))
+        self._io.forget(self._chan)
+
+    def add_msgs(self, msgs: [(dict, int)], num_bytes: int) -> None:
+        """
+        Take in messages from the io process.
+        :param msgs: The parsed messages and their arrival times.
+        :param num_bytes: The number of bytes in those lines.
+        :return None:
+        """
+        self._msgs += msgs
+        self._num_bytes += num_bytes
+        self._msgs_event.set()
+
+    def set_failed(self) -> None:
+        """
+        The io process could not open the port, stopped reading it or could not write to it. Later writes fail at once
+        and get_msgs raises once the messages already received are taken, so the device is handled as lost.
+        :return None:
+        """
+        self.is_open = False
+        self._failed = True
+        self._msgs_event.set()
+
+
+class IOProcess:
+    """ Start, feed and stop the io process from the app. """
+    def __init__(self):
+        self._logger = getLogger(__name__)
+        self._logger.debug("Initializing")
+        self._ring = None
+        self._ctrl = None
+        self._proc = None
+        self._send_lock = Lock()  # Command writes come from executor threads.
+        self._conns = dict()  # Channel: RemoteSerial
+        self._next_chan = 0
+        self._dropped = 0
+        self._task = None
+        self._loop = get_running_loop()
+        self._logger.debug("Initialized")
+
+    def start(self) -> None:
+        """
+        Start the io process.
+        :return None:
+        """
+        self._logger.debug("running")
+        self._ring = RecordRing()
+        self._ctrl, child_ctrl = Pipe()
+        self._proc = Process(target=run_io_process, args=(self._ring.name, child_ctrl), name="RSCompanionIO",
+                             daemon=True)
+        self._proc.start()
+        child_ctrl.close()
+        self._task = create_task(self._poll())
+        self._logger.debug("done")
+
+    def connect(self, port: str, settings: dict = None, tuning: dict = None) -> RemoteSerial:
+        """
+        Make a connection for a port. The port is opened once a device model calls open on it.
+        :param port: The port name.
+        :param settings: The port settings to open with, from pyserial's get_settings. None for pyserial's defaults.
+        :param tuning: The device profile's tuning to apply once open, see rs_port_tuning. None to leave the port as is.
+        :return RemoteSerial: The connection to give the device controller.
+        """
+        conn = RemoteSerial(self, self._next_chan, port, settings, tuning)
+        self._conns[self._next_chan] = conn
+        self._next_chan += 1
+        return conn
+
+    def forget(self, chan: int) -> None:
+        """
+        Drop a closed connection.
+        :param chan: The connection's channel.
+        :return None:
+        """
+        self._conns.pop(chan, None)
+
+    def send(self, msg: tuple) -> bool:
+        """
+        Send a command to the io process.
+        :param msg: The command.
+        :return bool: Whether the command was sent.
+        """
+        with self._send_lock:
+            try:
+                self._ctrl.send(msg)
+                return True
+            except (OSError, ValueError, AttributeError) as e:
+                return False
+
+    async def cleanup(self) -> None:
+        """
+        Stop the io process and free the ring.
+        :return None:
+        """
+        self._logger.debug("running")
+        if self._task:
+            self._task.cancel()
+        if self._proc:
+            self.send(("stop",))
+            await self._loop.run_in_executor(get_executor(ExecEnum.DEVICE_IO), self._proc.join, stop_timeout)
+            if self._proc.is_alive():
+                self._logger.warning("The io process did not stop, killing it")
+                self._proc.kill()
+            self._ctrl.close()
+            self._ring.close()
+            self._proc = None
+        self._logger.debug("done")
+
+    async def _poll(self) -> None:
+        """
+        Hand messages from the ring to their connections.
+        :return None:
+        """
+        while True:
+            for record in self._ring.get_all():
+                kind, chan, *rest = loads(record)
+                conn = self._conns.get(chan)
+                if kind == "msgs":
+                    if conn:
+                        conn.add_msgs(*rest)
+                elif kind == "failed":
+                    self._logger.warning(rest[0])
+                    if conn:
+                        conn.set_failed()
+                elif kind == "tuned":
+                    self._logger.info(rest[0])
+                else:
+                    self._logger.warning(rest[0])
+            dropped = self._ring.get_dropped()
+            if dropped != self._dropped:
+                self._logger.warning("The app fell behind, the io process dropped " + str(dropped - self._dropped) +
+                                     " batches of messages")
+                self._dropped = dropped
+            if not self._proc.is_alive():
+                self._logger.error("The io process stopped with exit code " + str(self._proc.exitcode))
+                for conn in self._conns.values():
+                    conn.set_failed()
+                return
+            await sleep(poll_interval)
+
+
+def run_io_process(ring_name: str, ctrl) -> None:
+    """
+    Entry point of the io process.
+    :param ring_name: The ring to send parsed messages through.
+    :param ctrl: The pipe end commands arrive on.
+    :return None:
+    """
+    run(_IOWorker(ring_name, ctrl).run())
+
+
+class _IOWorker:
+    """
+    Everything in the io process. Commands are read in their own thread, which also opens, writes to and closes ports
+    so writes stay in order with the open and a port is never closed mid write. Reading, parsing and the ring are only
+    touched from the event loop. A failed write is reported like a failed read, so the app handles the device as lost
+    instead of waiting out its commands' retries.
+    """
+    def __init__(self, ring_name: str, ctrl):
+        self._ring = RecordRing(ring_name)
+        self._ctrl = ctrl
+        self._ports = dict()  # Channel: Serial, only touched by the command thread.
+        self._chans = dict()  # Channel: [SerialLineReader, read task], only touched by the event loop.
+        self._backlog = deque()
+        self._loop = None
+        self._stopped = None
+
+    async def run(self) -> None:
+        self._loop = get_running_loop()
+        self._stopped = Event()
+        Thread(target=self._read_ctrl, name="RSCompanionIOCtrl", daemon=True).start()
+        flush_task = create_task(self._flush_backlog())
+        await self._stopped.wait()
+        flush_task.cancel()
+        for chan in list(self._chans):
+            self._stop_reading(chan)
+        for conn in self._ports.values():  # The command thread is done.
+            conn.close()
+        self._ports.clear()
+        self._ring.close()
+
+    def _read_ctrl(self) -> None:
+        while True:
+            try:
+                msg = self._ctrl.recv()
+            except (EOFError, OSError) as e:  # The app is gone.
+                msg = ("stop",)
+            kind = msg[0]
+            if kind == "stop":
+                self._loop.call_soon_threadsafe(self._stopped.set)
+                return
+            elif kind == "open":
+                self._open(*msg[1:])
+            elif kind == "write":
+                self._write(*msg[1:])
+            elif kind == "close":
+                self._close(msg[1])
+            elif kind == "capture":
+                self._loop.call_soon_threadsafe(self._capture, *msg[1:])
+
+    def _open(self, chan: int, port: str, spec: dict, settings: dict, tuning: dict) -> None:
+        conn = Serial()
+        conn.port = port
+        if settings:
+            conn.apply_settings(settings)
+        conn.write_timeout = write_timeout
+        try:
+            conn.open()
+        except SerialException as e:
+            self._loop.call_soon_threadsafe(self._push, ("failed", chan, "Could not open " + port + ": " + str(e)))
+            return
+        if tuning:
+            try:
+                result = tune_port(conn, tuning)
+                self._loop.call_soon_threadsafe(self._push, ("tuned", chan, "Tuned " + port + " in the io process: " +
+                                                             format_tuning(result)))
+            except Exception as e:
+                self._loop.call_soon_threadsafe(self._push, ("error", chan, "Failed tuning " + port + ": " + str(e)))
+        self._ports[chan] = conn
+        self._loop.call_soon_threadsafe(self._start_reading, chan, conn, compile_parser(spec))
+
+    def _write(self, chan: int, data: bytes) -> None:
+        conn = self._ports.get(chan)
+        if not conn:
+            return
+        try:
+            conn.write(data)
+        except Exception as e:
+            self._loop.call_soon_threadsafe(self._push, ("failed", chan, "Write to " + str(conn.port) + " failed: " +
+                                                         str(e)))
+
+    def _start_reading(self, chan: int, conn: Serial, parse) -> None:
+        reader = SerialLineReader(conn)
+        self._chans[chan] = [reader, create_task(self._read(chan, reader, parse))]
+
+    async def _read(self, chan: int, reader: SerialLineReader, parse) -> None:
+        try:
+            while True:
+                msgs, num_bytes = await reader.get_msgs(parse)
+                self._push(("msgs", chan, msgs, num_bytes))
+        except SerialException as e:
+            self._push(("failed", chan, str(e)))
+
+    def _close(self, chan: int) -> None:
+        conn = self._ports.pop(chan, None)
+        if not conn:
+            return
+        stopped = TEvent()  # The reader must let go of the port before it is closed.
+        self._loop.call_soon_threadsafe(self._stop_reading, chan, stopped)
+        stopped.wait()
+        conn.close()
+
+    def _stop_reading(self, chan: int, stopped: TEvent = None) -> None:
+        entry = self._chans.pop(chan, None)
+        if entry:
+            entry[1].cancel()
+            entry[0].cleanup()
+        if stopped:
+            stopped.set()
+
+    def _capture(self, chan: int, path: str, dev_name: str, anchor: (int, int)) -> None:
+        entry = self._chans.get(chan)
+        if not entry:
+            return
+        if not path:
+            entry[0].stop_capture()
+            return
+        set_anchor(*anchor)
+        try:
+            entry[0].open_capture(path, dev_name)
+        except OSError as e:
+            self._push(("error", chan, "Could not start raw capture " + path + ": " + str(e)))
+
+    def _push(self, record: tuple) -> None:
+        data = dumps(record, HIGHEST_PROTOCOL)
+        if self._backlog or not self._ring.put(data):
+            self._backlog.append(data)
+            if len(self._backlog) > max_backlog:
+                self._backlog.popleft()
+                self._ring.add_dropped(1)
+
+    async def _flush_backlog(self) -> None:
+        while True:
+            while self._backlog and self._ring.put(self._backlog[0]):
+                self._backlog.popleft()
+            await sleep(poll_interval)
@@ -0,0 +1,252 @@
+"""
+Licensed under GNU GPL-3.0-or-later
+
+This file is part of RS Companion.
+
+RS Companion is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+RS Companion is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with RS Companion.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Phillip Riskin
+Date: 2020
+Project: Companion App
+Company: Red Scientific
+https://redscientific.com/index.html
+"""
+
+import os
+from logging import getLogger
+from asyncio import create_task, sleep, CancelledError
+from bisect import bisect_left
+from time import perf_counter_ns
+from typing import Callable, Awaitable
+from RSCompanionAsync.Model.rs_clock import wall_ns_now
+
+"""
+Serial link instrumentation for a device: line and byte rates, lines the parser could not read, gaps in the
+device's trial counter and round trip times of a settings query sent every probe_interval seconds. A probe's round trip
+is timed from the try that was answered, resent probes are counted apart.
+"""
+
+probe_interval = 5.0
+probe_tag = "link_health_probe"  # Command queue tag of probe commands, so only the probe takes the probe's answer.
+health_dir = "link_health"
+rtt_bounds_ms = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]  # Round trip histogram bucket upper bounds.
+health_fields = ["timestamp", "lines_per_s", "bytes_per_s", "lines", "bytes", "parse_errors", "seq_gaps",
+                 "lost_lines", "probes", "probe_failures", "probe_retries", "rtt_ms", "rtt_p50_ms", "rtt_p95_ms",
+                 "cmd_retries", "cmd_failed"]
+
+
+class LinkHealth:
+    """ Counters and probes for one device's serial link. """
+    def __init__(self, dev_name: str, probe: Callable[[], Awaitable], write_line: Callable[[str, str, bool], Awaitable],
+                 seq_field: str = None, interval: float = probe_interval):
+        """
+        :param dev_name: The device name, used for the health file name.
+        :param probe: Sends the probe command tagged with probe_tag, resolving to its round trip in ms, None if the
+        device did not answer, and the number of times it was resent. See CommandQueue.send_timed.
+        :param write_line: Writes a line to a file, taking (file name, line, whether to start a new file).
+        :param seq_field: The data value that counts up by one per data line, if the device has one.
+        :param interval: Seconds between probes.
+        """
+        self._logger = getLogger(__name__)
+        self._logger.debug("Initializing")
+        self._dev_name = dev_name
+        self._probe = probe
+        self._write_line = write_line
+        self._seq_field = seq_field
+        self._interval = interval
+        self._last_seq = None
+        self._counts = {"lines": 0, "bytes": 0, "parse_errors": 0, "seq_gaps": 0, "lost_lines": 0, "probes": 0,
+                        "probe_failures": 0, "probe_retries": 0}
+        self._rtt_hist = [0] * (len(rtt_bounds_ms) + 1)
+        self._last_rtt_ms = 0.0
+        self._window_start = perf_counter_ns()
+        self._window_lines = 0
+        self._window_bytes = 0
+        self._cmd_stats = None
+        self._snapshot = self._make_snapshot()
+        self._log_file = None
+        self._update_handler = None
+        self._task = None
+        self._logger.debug("Initialized")
+
+    def start(self, cmd_stats: Callable[[], dict] = None) -> None:
+        """
+        Start probing.
+        :param cmd_stats: Optional, returns the device's command queue stats to include in the health rows.
+        :return None:
+        """
+        self._cmd_stats = cmd_stats
+        if self._task is None:
+            self._task = create_task(self._probe_loop())
+
+    def cleanup(self) -> None:
+        """
+        Stop probing and logging.
+        :return None:
+        """
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._log_file = None
+
+    def set_update_handler(self, func: Callable[[dict], None]) -> None:
+        """
+        :param func: Called with the latest health snapshot after each probe.
+        :return None:
+        """
+        self._update_handler = func
+
+    def start_log(self, save_dir: str) -> None:
+        """
+        Write a health row after each probe to a file for this device in the experiment's link health folder.
+        :param save_dir: The experiment save dir.
+        :return None:
+        """
+        path = os.path.join(save_dir, health_dir)
+        os.makedirs(path, exist_ok=True)
+        self._log_file = os.path.join(path, self._dev_name + ".csv")
+        create_task(self._write_line(self._log_file, ", ".join(health_fields), True))
+
+    def stop_log(self) -> None:
+        """
+        Stop writing health rows.
+        :return None:
+        """
+        self._log_file = None
+
+    def add_lines(self, lines: [(bytes, int)]) -> None:
+        """
+        Count received lines.
+        :param lines: The lines as returned by SerialLineReader.get_lines.
+        :return None:
+        """
+        self.add_counts(len(lines), sum([len(line) for line, timestamp in lines]))
+
+    def add_counts(self, num_lines: int, num_bytes: int) -> None:
+        """
+        Count received lines that were read elsewhere.
+        :param num_lines: The number of lines.
+        :param num_bytes: The number of bytes in those lines.
+        :return None:
+        """
+        self._counts["lines"] += num_lines
+        self._counts["bytes"] += num_bytes
+        self._window_lines += num_lines
+        self._window_bytes += num_bytes
+
+    def add_msg(self, msg: dict) -> None:
+        """
+        Check a parsed message for parse failure and sequence gaps. Lines that match no message are not errors, devices
+        send lines the app ignores.
+        :param msg: The parsed message.
+        :return None:
+        """
+        msg_type = msg.get('type')
+        if msg.get('error'):
+            self._counts["parse_errors"] += 1
+        elif msg_type == "data" and self._seq_field:
+            try:
+                seq = int(msg['values'][self._seq_field])
+            except (KeyError, ValueError) as e:
+                return
+            if self._last_seq is not None and seq > self._last_seq + 1:
+                self._counts["seq_gaps"] += 1
+                self._counts["lost_lines"] += seq - self._last_seq - 1
+            self._last_seq = seq  # Counters restart each block, so going back is not a gap.
+
+    def add_probe(self, rtt_ms: float = None, resends: int = 0) -> None:
+        """
+        Record a probe.
+        :param rtt_ms: The round trip time of the try that was answered, None if the device did not answer.
+        :param resends: The number of times the probe was resent.
+        :return None:
+        """
+        self._counts["probes"] += 1
+        self._counts["probe_retries"] += resends
+        if rtt_ms is None:
+            self._counts["probe_failures"] += 1
+            return
+        self._last_rtt_ms = rtt_ms
+        self._rtt_hist[bisect_left(rtt_bounds_ms, rtt_ms)] += 1
+
+    def get_snapshot(self) -> dict:
+        """
+        :return dict: The health values from the last probe, keyed by health_fields.
+        """
+        return dict(self._snapshot)
+
+    def get_rtt_histogram(self) -> [(float, int)]:
+        """
+        :return [(float, int)]: (bucket upper bound in ms, count) for each round trip bucket, the last bound is inf.
+        """
+        return list(zip(rtt_bounds_ms + [float("inf")], self._rtt_hist))
+
+    async def _probe_loop(self) -> None:
+        """
+        Probe the device, take a snapshot, show and log it, every interval.
+        :return None:
+        """
+        while True:
+            await sleep(self._interval)
+            try:
+                rtt_ms, resends = await self._probe()
+            except CancelledError:
+                raise
+            except Exception as e:
+                rtt_ms, resends = None, 0
+            self.add_probe(rtt_ms, resends)
+            self._snapshot = self._make_snapshot()
+            if self._update_handler:
+                self._update_handler(self.get_snapshot())
+            if self._log_file:
+                row = ", ".join([str(self._snapshot[x]) for x in health_fields])
+                create_task(self._write_line(self._log_file, row))
+
+    def _make_snapshot(self) -> dict:
+        """
+        Gather the current values and start a new rate window.
+        :return dict: The values keyed by health_fields.
+        """
+        now = perf_counter_ns()
+        elapsed = max(now - self._window_start, 1) / 1E9
+        snap = dict(self._counts)
+        snap["timestamp"] = wall_ns_now()
+        snap["lines_per_s"] = round(self._window_lines / elapsed, 2)
+        snap["bytes_per_s"] = round(self._window_bytes / elapsed, 1)
+        snap["rtt_ms"] = round(self._last_rtt_ms, 2)
+        snap["rtt_p50_ms"] = self._rtt_percentile(.5)
+        snap["rtt_p95_ms"] = self._rtt_percentile(.95)
+        stats = self._cmd_stats() if self._cmd_stats else dict()
+        snap["cmd_retries"] = stats.get("retries", 0)
+        snap["cmd_failed"] = stats.get("failed", 0)
+        self._window_start = now
+        self._window_lines = 0
+        self._window_bytes = 0
+        return snap
+
+    def _rtt_percentile(self, fraction: float) -> float:
+        """
+        :param fraction: The percentile as a fraction.
+        :return float: The upper bound of the histogram bucket holding that percentile, 0 if there are no round trips.
+        """
+        total = sum(self._rtt_hist)
+        if total == 0:
+            return 0
+        target = fraction * total
+        count = 0
+        for bound, num in zip(rtt_bounds_ms + [float("inf")], self._rtt_hist):
+            count += num
+            if count >= target:
+                return bound
+        return float("inf")
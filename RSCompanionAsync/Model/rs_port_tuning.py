@@ -0,0 +1,208 @@
+"""
+Licensed under GNU GPL-3.0-or-later
+
+This file is part of RS Companion.
+
+RS Companion is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+RS Companion is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with RS Companion.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Phillip Riskin
+Date: 2020
+Project: Companion App
+Company: Red Scientific
+https://redscientific.com/index.html
+"""
+
+import os
+from array import array
+from statistics import median
+from time import perf_counter_ns
+from aioserial import AioSerial
+try:
+    import fcntl
+    import termios
+except ImportError:  # Windows.
+    fcntl = None
+    termios = None
+
+"""
+Low latency settings for USB serial ports, applied per device profile when a port is opened.
+A device profile may have "tuning": {
+    "latency_timer_ms": How long a USB serial adapter holds bytes before sending a partial packet, set through sysfs.
+        FTDI style adapters default to 16ms. Ports without the setting, like native USB devices, are left alone.
+    "low_latency": Whether to set the tty's ASYNC_LOW_LATENCY flag so received bytes are pushed to readers at once.
+    "read_buffer": Driver receive buffer size in bytes, where the platform lets it be set.
+    "probe": Encoded command the device answers, for timing the round trip with measure_rtt. Optional.
+    "probe_answer": Bytes only the probe's answer line contains.
+}
+Each setting is read back after it is applied, since drivers may ignore or round what they are given.
+Round trips are not timed when the app connects a device, only by Dev_Tools/port_tuning_bench.py, since a device may
+already be sending data and a silent one would hold up connecting.
+"""
+
+sysfs_root = "/sys"  # Change to point the latency timer lookups at another tree, for testing.
+probe_count = 5      # Round trips measure_rtt times.
+probe_timeout = .5   # Seconds to wait for each probe answer.
+_low_latency_flag = 0x2000  # ASYNC_LOW_LATENCY in serial_struct.flags.
+_flags_index = 4            # serial_struct.flags as an array of ints.
+
+
+def latency_timer_path(port: str, root: str = None) -> str:
+    """
+    :param port: The port's device path, symlinks are followed.
+    :param root: The sysfs root. Defaults to sysfs_root.
+    :return str: Where the port's latency timer setting would be.
+    """
+    name = os.path.basename(os.path.realpath(port))
+    return os.path.join(root if root else sysfs_root, "class", "tty", name, "device", "latency_timer")
+
+
+def read_latency_timer(port: str, root: str = None) -> int:
+    """
+    :param port: The port's device path.
+    :param root: The sysfs root. Defaults to sysfs_root.
+    :return int: The port's latency timer in ms, None if it has none or it can't be read.
+    """
+    try:
+        with open(latency_timer_path(port, root)) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError) as e:
+        return None
+
+
+def set_latency_timer(port: str, ms: int, root: str = None) -> bool:
+    """
+    :param port: The port's device path.
+    :param ms: The new latency timer in ms.
+    :param root: The sysfs root. Defaults to sysfs_root.
+    :return bool: Whether the setting was written. Usually needs root or a udev rule.
+    """
+    path = latency_timer_path(port, root)
+    if not os.path.exists(path):
+        return False
+    try:
+        with open(path, "w") as f:
+            f.write(str(ms))
+        return True
+    except OSError as e:
+        return False
+
+
+def read_low_latency(conn: AioSerial) -> bool:
+    """
+    :param conn: The open port.
+    :return bool: Whether the port has ASYNC_LOW_LATENCY set, None if that can't be read.
+    """
+    if not fcntl or not hasattr(termios, "TIOCGSERIAL"):
+        return None
+    buf = array('i', [0] * 32)
+    try:
+        fcntl.ioctl(conn.fileno(), termios.TIOCGSERIAL, buf)
+    except Exception as e:
+        return None
+    return bool(buf[_flags_index] & _low_latency_flag)
+
+
+def set_low_latency(conn: AioSerial, is_on: bool) -> bool:
+    """
+    :param conn: The open port.
+    :param is_on: Whether to set or clear ASYNC_LOW_LATENCY.
+    :return bool: Whether the driver accepted the change.
+    """
+    if not hasattr(conn, "set_low_latency_mode"):  # Only pyserial's Linux ports have it.
+        return False
+    try:
+        conn.set_low_latency_mode(is_on)
+        return True
+    except (ValueError, OSError) as e:
+        return False
+
+
+def set_read_buffer(conn: AioSerial, size: int) -> int:
+    """
+    :param conn: The open port.
+    :param size: The receive buffer size in bytes.
+    :return int: The size set, None where the platform does not let it be set.
+    """
+    if not hasattr(conn, "set_buffer_size"):  # Only pyserial's Windows ports have it.
+        return None
+    try:
+        conn.set_buffer_size(rx_size=size)
+        return size
+    except Exception as e:
+        return None
+
+
+def measure_rtt(conn: AioSerial, probe: bytes, answer: bytes, count: int = probe_count) -> float:
+    """
+    Time how long the device takes to answer a command, reading the port directly. Only use before a reader is
+    started on the port. Lines that are not the answer, like trial data, are read past.
+    :param conn: The open port.
+    :param probe: The encoded command.
+    :param answer: Bytes only the answer line contains.
+    :param count: How many round trips to time.
+    :return float: The median round trip in ms, None if the device never answered.
+    """
+    if not probe or count < 1:
+        return None
+    timeout = conn.timeout
+    times = list()
+    try:
+        for i in range(count):
+            start = perf_counter_ns()
+            deadline = start + int(probe_timeout * 1E9)
+            conn.write(probe)
+            while perf_counter_ns() < deadline:
+                conn.timeout = max(0, deadline - perf_counter_ns()) / 1E9
+                line = conn.read_until(b"\n")
+                if answer in line and line.endswith(b"\n"):
+                    times.append((perf_counter_ns() - start) / 1E6)
+                    break
+    except Exception as e:
+        pass
+    finally:
+        conn.timeout = timeout
+    return median(times) if times else None
+
+
+def tune_port(conn: AioSerial, tuning: dict, root: str = None) -> dict:
+    """
+    Apply a profile's tuning to an open port and read back what took. Blocks, run in an executor.
+    :param conn: The open port.
+    :param tuning: The profile's tuning settings, see above.
+    :param root: The sysfs root. Defaults to sysfs_root.
+    :return dict: {"latency_timer_ms": (before, after), "low_latency": (before, after), "read_buffer": size set}.
+    Values that could not be read are None.
+    """
+    before_timer = read_latency_timer(conn.port, root)
+    if "latency_timer_ms" in tuning and before_timer is not None and before_timer != tuning["latency_timer_ms"]:
+        set_latency_timer(conn.port, tuning["latency_timer_ms"], root)
+    before_low = read_low_latency(conn)
+    if "low_latency" in tuning and before_low != tuning["low_latency"]:
+        set_low_latency(conn, tuning["low_latency"])
+    read_buffer = set_read_buffer(conn, tuning["read_buffer"]) if "read_buffer" in tuning else None
+    return {"latency_timer_ms": (before_timer, read_latency_timer(conn.port, root)),
+            "low_latency": (before_low, read_low_latency(conn)),
+            "read_buffer": read_buffer}
+
+
+def format_tuning(result: dict) -> str:
+    """
+    :param result: What tune_port returned.
+    :return str: The result in one line for the log.
+    """
+    def pair(values, fmt):
+        return " -> ".join(["n/a" if x is None else fmt.format(x) for x in values])
+    return "latency timer {}, low latency {}, read buffer {}".format(
+        pair(result["latency_timer_ms"], "{}ms"), pair(result["low_latency"], "{}"),
+        "n/a" if result["read_buffer"] is None else str(result["read_buffer"]))
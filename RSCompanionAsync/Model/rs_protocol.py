@@ -0,0 +1,234 @@
+"""
+Licensed under GNU GPL-3.0-or-later
+
+This file is part of RS Companion.
+
+RS Companion is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+RS Companion is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with RS Companion.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Phillip Riskin
+Date: 2020
+Project: Companion App
+Company: Red Scientific
+https://redscientific.com/index.html
+"""
+
+from operator import itemgetter
+
+"""
+Build parsers and formatters from the declarative protocol specs in each serial device's *_defs.py.
+
+A spec is a dict:
+    "messages": list of message specs, checked in order. Each has:
+        "match": "prefix" (line starts with "key") or "contains" (line contains "key" anywhere).
+        "key": The bytes to match.
+        "type": The message type given to the controller ("data", "settings", "action").
+        "kind": How the rest of the line is read:
+            "positional": "sep" separated values after the prefix, one per entry in "fields" [(name, type)].
+            "keyval": "sep" separated key"kv_sep"value items after the prefix. "fields" {name: type} are kept.
+            "keyed": After the key, "<name>|<value>" where | is "kv_sep". "fields" {name: type} are kept.
+            "tail": "fields" [(name, type)] with one entry, the value is everything after the first "kv_sep".
+            "line": "fields" [(name, type)] with one entry, the value is the whole line.
+            "action": No values, "action" is the action name.
+    "cmd_fmt": Format string for commands with an argument, using {cmd} and {arg}.
+    "cmd_fmt_no_arg": Format string for commands without an argument.
+    "save_fields": The value names written to the save file, in order.
+    "acks": Optional, {command: settings key the device answers that command with}. Used by rs_command_queue.
+
+Prefix matches are found with one dict lookup per prefix length, so data lines never pay for substring searches.
+"contains" matches are only tried, in spec order, for lines with no prefix match.
+"""
+
+line_ending = b"\r\n"
+
+
+def _converter(field_type):
+    """
+    Get the function that turns a raw bytes value into field_type.
+    :param field_type: int or str.
+    :return: The conversion function.
+    """
+    if field_type is int:
+        return int  # int() accepts bytes and ignores surrounding whitespace.
+    return bytes.decode  # utf-8
+
+
+def _compile_message(msg: dict):
+    """
+    Build the function that parses one message kind.
+    :param msg: The message spec.
+    :return: Function taking the full line (bytes, line ending removed) and returning the parsed dict, or None if
+    malformed.
+    """
+    msg_type = msg["type"]
+    kind = msg["kind"]
+    start = len(msg["key"]) if msg["match"] == "prefix" else 0
+
+    if kind == "positional":
+        sep = msg["sep"]
+        names = [x[0] for x in msg["fields"]]
+        convs = [_converter(x[1]) for x in msg["fields"]]
+        count = len(names)
+        if all(x[1] is str for x in msg["fields"]):  # Decode once and split the text.
+            text_sep = sep.decode()
+
+            def parse(line: bytes):
+                parts = line[start:].decode().split(text_sep)
+                if len(parts) != count:
+                    return None
+                return {'values': dict(zip(names, parts)), 'type': msg_type}
+            return parse
+        if len(set(convs)) == 1:  # One type for every field, convert with a single map.
+            conv = convs[0]
+
+            def parse(line: bytes):
+                parts = line[start:].split(sep)
+                if len(parts) != count:
+                    return None
+                return {'values': dict(zip(names, map(conv, parts))), 'type': msg_type}
+            return parse
+
+        def parse(line: bytes):
+            parts = line[start:].split(sep)
+            if len(parts) != count:
+                return None
+            return {'values': {name: conv(part) for name, conv, part in zip(names, convs, parts)}, 'type': msg_type}
+        return parse
+
+    if kind == "keyval":
+        sep = msg["sep"]
+        kv_sep = msg["kv_sep"]
+        convs = {name.encode(): (name, _converter(t)) for name, t in msg["fields"].items()}
+
+        def parse(line: bytes):
+            values = dict()
+            for item in line[start:].split(sep):
+                key, found, val = item.partition(kv_sep)
+                if found and key in convs:
+                    name, conv = convs[key]
+                    values[name] = conv(val)
+            return {'values': values, 'type': msg_type}
+        return parse
+
+    if kind == "keyed":
+        key_len = len(msg["key"])
+        kv_sep = msg["kv_sep"]
+        convs = {name.encode(): (name, _converter(t)) for name, t in msg["fields"].items()}
+
+        def parse(line: bytes):
+            values = dict()
+            bar_ind = line.find(kv_sep, key_len)
+            field = convs.get(line[key_len:bar_ind]) if bar_ind >= 0 else None
+            if field:
+                values[field[0]] = field[1](line[bar_ind + 1:])
+            return {'values': values, 'type': msg_type}
+        return parse
+
+    if kind == "tail":
+        kv_sep = msg["kv_sep"]
+        name, conv = msg["fields"][0][0], _converter(msg["fields"][0][1])
+
+        def parse(line: bytes):
+            return {'values': {name: conv(line[line.find(kv_sep) + 1:])}, 'type': msg_type}
+        return parse
+
+    if kind == "line":
+        name, conv = msg["fields"][0][0], _converter(msg["fields"][0][1])
+
+        def parse(line: bytes):
+            return {'values': {name: conv(line)}, 'type': msg_type}
+        return parse
+
+    if kind == "action":
+        action = msg["action"]
+
+        def parse(line: bytes):
+            return {'values': {}, 'type': msg_type, 'action': action}
+        return parse
+
+    raise ValueError("Unknown message kind: " + str(kind))
+
+
+def compile_parser(spec: dict):
+    """
+    Build a parser for a device protocol.
+    :param spec: The device protocol spec.
+    :return: Function taking a raw line (bytes) and returning {'values': {...}, 'type': ...}. Lines that match nothing
+    give {'values': {}} with no 'type', lines that match a message but are malformed give {'values': {}, 'error': True}.
+    Text values have the line ending removed.
+    """
+    prefix_tables = dict()  # prefix length: {prefix: parse function}
+    contains = list()  # (key, parse function)
+    for msg in spec["messages"]:
+        parse = _compile_message(msg)
+        if msg["match"] == "prefix":
+            prefix_tables.setdefault(len(msg["key"]), dict())[msg["key"]] = parse
+        else:
+            contains.append((msg["key"].decode("latin-1"), parse))
+    prefix_tables = sorted(prefix_tables.items())
+
+    def parse_line(line: bytes) -> dict:
+        line = line.rstrip(line_ending)
+        for length, table in prefix_tables:
+            parse = table.get(line[:length])
+            if parse:
+                break
+        else:
+            parse = None
+            # latin-1 maps bytes one to one so matches are the same, but str searches are much faster than bytes.
+            text = line.decode("latin-1")
+            for key, func in contains:
+                if key in text:
+                    parse = func
+                    break
+        if parse:
+            try:
+                ret = parse(line)
+            except ValueError as e:  # Includes UnicodeDecodeError.
+                ret = None
+            if ret is not None:
+                return ret
+            return {'values': {}, 'error': True}
+        return {'values': {}}
+    return parse_line
+
+
+def compile_row_encoder(save_fields: [str], sep: str = ", "):
+    """
+    Build the save file row formatter for a device.
+    :param save_fields: The value names to write, in order, after the timestamp.
+    :param sep: The column separator.
+    :return: Function taking (values dict, timestamp) and returning the row without a line ending.
+    """
+    fmt = sep.join(["%s"] * (len(save_fields) + 1))
+    if len(save_fields) == 1:
+        field = save_fields[0]
+        return lambda values, timestamp: fmt % (timestamp, values[field])
+    getter = itemgetter(*save_fields)
+    return lambda values, timestamp: fmt % (timestamp, *getter(values))
+
+
+def compile_cmd_encoder(spec: dict):
+    """
+    Build the command formatter for a device.
+    :param spec: The device protocol spec.
+    :return: Function taking (cmd, optional arg) and returning the bytes to write.
+    """
+    fmt = spec["cmd_fmt"]
+    fmt_no_arg = spec["cmd_fmt_no_arg"]
+
+    def encode(cmd: str, arg: str = None) -> bytes:
+        if arg:
+            return fmt.format(cmd=cmd, arg=arg).encode()
+        return fmt_no_arg.format(cmd=cmd).encode()
+    return encode
@@ -0,0 +1,145 @@
+"""
+Licensed under GNU GPL-3.0-or-later
+
+This file is part of RS Companion.
+
+RS Companion is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+RS Companion is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with RS Companion.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Phillip Riskin
+Date: 2020
+Project: Companion App
+Company: Red Scientific
+https://redscientific.com/index.html
+"""
+
+import os
+import numpy as np
+
+"""
+Graph scrollback kept on disk for the length of an experiment, so the graphs can show data older than their in memory
+window without holding the session in memory.
+"""
+
+scrollback_dir = "scrollback"  # In the experiment's temp folder, removed with it rather than moved to the output.
+flush_points = 256             # Points held in memory before they are written out.
+_x_file = "x.f8"
+_y_file = "y{}.f4"
+
+
+class ScrollbackStore:
+    """
+    Append only columnar store of one graph's points. x values are float64 epoch seconds in one file and each y column
+    is float32 in a file of its own, NaN for no value. Points are written in batches and the files are memory mapped
+    for reading, so loading a time slice is a binary search on x and reads only that slice's pages.
+    x values must not go backwards.
+    """
+    def __init__(self, path: str, columns: int = 1):
+        """
+        :param path: The folder for this graph's files, made if needed.
+        :param columns: Number of y values per point.
+        """
+        os.makedirs(path, exist_ok=True)
+        self._paths = [os.path.join(path, _x_file)] + [os.path.join(path, _y_file.format(i)) for i in range(columns)]
+        self._types = [np.float64] + [np.float32] * columns
+        self._files = [open(p, "wb") for p in self._paths]
+        self._pending = [list() for i in range(columns + 1)]
+        self._written = 0
+        self._maps = list()
+        self._mapped = 0
+
+    def __len__(self) -> int:
+        return self._written + len(self._pending[0])
+
+    def append(self, x: float, *ys: float) -> None:
+        """
+        Add a point.
+        :param x: Epoch seconds.
+        :param ys: One value per column, None or left off for no value.
+        :return None:
+        """
+        self._pending[0].append(x)
+        for i in range(1, len(self._pending)):
+            y = ys[i - 1] if i <= len(ys) and ys[i - 1] is not None else np.nan
+            self._pending[i].append(y)
+        if len(self._pending[0]) >= flush_points:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the points held in memory to the files.
+        :return None:
+        """
+        if not self._files or not self._pending[0]:
+            return
+        for f, pending, dtype in zip(self._files, self._pending, self._types):
+            f.write(np.array(pending, dtype=dtype).tobytes())
+            f.flush()
+            pending.clear()
+        self._written = self._files[0].tell() // 8
+
+    def first_x(self) -> float:
+        """
+        :return float: The oldest x value, None if empty.
+        """
+        if self._written:
+            return float(self._map()[0][0])
+        return self._pending[0][0] if self._pending[0] else None
+
+    def load(self, left: float, right: float, max_points: int = None) -> (np.ndarray, [np.ndarray]):
+        """
+        Get the points from left to right.
+        :param left: Oldest x value wanted, epoch seconds.
+        :param right: Newest x value wanted, epoch seconds.
+        :param max_points: If given and the slice is longer, every nth point so that at most this many are returned.
+        :return (np.ndarray, [np.ndarray]): The x values and a float64 array per y column, copies.
+        """
+        maps = self._map()
+        start = end = 0
+        if maps:
+            start = np.searchsorted(maps[0], left, side="left")
+            end = np.searchsorted(maps[0], right, side="right")
+        held_x = np.array(self._pending[0], dtype=np.float64)
+        h_start = np.searchsorted(held_x, left, side="left")
+        h_end = np.searchsorted(held_x, right, side="right")
+        step = 1
+        if max_points:
+            step = max(-(-(end - start + h_end - h_start) // max_points), 1)
+        cols = list()
+        for i in range(len(self._pending)):
+            mapped = maps[i][start:end:step] if maps else np.empty(0)
+            held = np.array(self._pending[i][h_start:h_end:step], dtype=np.float64)
+            cols.append(np.concatenate([mapped.astype(np.float64), held]))
+        return cols[0], cols[1:]
+
+    def close(self) -> None:
+        """
+        Write what is held in memory and close the files. The files are left for the experiment folder's cleanup.
+        :return None:
+        """
+        self.flush()
+        self._maps = list()
+        self._mapped = 0
+        for f in self._files:
+            f.close()
+        self._files = list()
+
+    def _map(self) -> [np.ndarray]:
+        """
+        :return [np.ndarray]: A read only memory map per file of the points written so far, empty if there are none.
+        """
+        if self._written != self._mapped:
+            self._maps = [np.memmap(p, dtype=t, mode="r", shape=(self._written,))
+                          for p, t in zip(self._paths, self._types)]
+            self._mapped = self._written
+        return self._maps
@@ -0,0 +1,239 @@
+"""
+Licensed under GNU GPL-3.0-or-later
+
+This file is part of RS Companion.
+
+RS Companion is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+RS Companion is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with RS Companion.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Phillip Riskin
+Date: 2020
+Project: Companion App
+Company: Red Scientific
+https://redscientific.com/index.html
+"""
+
+import os
+from logging import getLogger
+from asyncio import Event, get_running_loop, create_task, CancelledError
+from time import perf_counter_ns
+from aioserial import AioSerial
+from serial.serialutil import SerialException
+from RSCompanionAsync.Model.rs_executors import MonitoredExecutor
+from RSCompanionAsync.Model.rs_capture import CaptureWriter
+from RSCompanionAsync.Model.rs_tracing import span
+
+read_size = 4096
+line_end = b'\n'
+
+
+class SerialLineReader:
+    """
+    Read lines from a serial connection as bytes arrive.
+    Where the connection has a selectable file descriptor the event loop watches it directly, otherwise a thread of
+    this reader's own blocks reading each chunk, so a reader never holds a DEVICE_IO worker that writes, opens and
+    port tuning need. Either way every wake-up may produce many lines.
+    Once the connection fails or the device goes away, get_lines and get_msgs raise SerialException.
+    """
+    def __init__(self, conn: AioSerial):
+        self._logger = getLogger(__name__)
+        self._logger.debug("Initializing")
+        self._conn = conn
+        self._buf = bytearray()
+        self._lines = list()
+        self._lines_event = Event()
+        self._fd = None
+        self._task = None
+        self._read_pool = None  # This reader's own thread, when there is no file descriptor to watch.
+        self._started = False
+        self._running = False
+        self._capture = None
+        self._loop = get_running_loop()
+        self._logger.debug("Initialized")
+
+    def start(self) -> None:
+        """
+        Begin reading from the connection.
+        :return None:
+        """
+        self._logger.debug("running")
+        if self._started:
+            return
+        self._started = True
+        self._running = True
+        try:
+            fd = self._conn.fileno()
+            self._loop.add_reader(fd, self._on_readable)
+            self._fd = fd
+            self._logger.debug("done with fd reader")
+        except Exception as e:  # No fd on this platform/loop, e.g. Windows, fall back to reading chunks in a thread.
+            self._read_pool = MonitoredExecutor("serial_read_" + str(self._conn.port), 1)
+            self._task = create_task(self._read_chunks())
+            self._logger.debug("done with threaded reader")
+
+    def cleanup(self) -> None:
+        """
+        Stop reading. Must be called before the connection is closed.
+        :return None:
+        """
+        self._logger.debug("running")
+        self._stop()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._read_pool:
+            self._read_pool.shutdown(wait=False)  # A blocked read returns once the connection is closed.
+            self._read_pool = None
+        self.stop_capture()
+        self._logger.debug("done")
+
+    def start_capture(self, writer: CaptureWriter) -> None:
+        """
+        Record every chunk read from here on.
+        :param writer: The capture to record to, closed by stop_capture.
+        :return None:
+        """
+        self.stop_capture()
+        self._capture = writer
+
+    def open_capture(self, path: str, dev_name: str) -> None:
+        """
+        Record every chunk read from here on to a new capture file.
+        :param path: The capture file to create.
+        :param dev_name: The device name stored in the capture.
+        :return None:
+        """
+        self.start_capture(CaptureWriter(path, dev_name))
+
+    def stop_capture(self) -> None:
+        """
+        Stop recording chunks and close the capture if there is one.
+        :return None:
+        """
+        if self._capture:
+            self._capture.close()
+            self._capture = None
+
+    async def get_lines(self) -> [(bytes, int)]:
+        """
+        Wait for at least one complete line and return every line received so far.
+        :return [(bytes, int)]: (line including its line ending, perf_counter_ns when its last bytes arrived) for each
+        line.
+        :raises SerialException: If reading has stopped and every line has been returned.
+        """
+        if not self._started:
+            self.start()
+        while not self._lines:
+            if not self._running:
+                raise SerialException("Stopped reading " + str(self._conn.port))
+            self._lines_event.clear()
+            await self._lines_event.wait()
+        lines, self._lines = self._lines, list()
+        return lines
+
+    async def get_msgs(self, parse) -> ([(dict, int)], int):
+        """
+        Wait for at least one complete line and parse every line received so far.
+        :param parse: The device's parser, from rs_protocol.compile_parser.
+        :return ([(dict, int)], int): (parsed message, perf_counter_ns when it arrived) for each line, and the number of
+        bytes in those lines.
+        :raises SerialException: If reading has stopped and every line has been returned.
+        """
+        lines = await self.get_lines()
+        with span("serial.parse"):
+            msgs = [(parse(line), timestamp) for line, timestamp in lines]
+        return msgs, sum([len(line) for line, timestamp in lines])
+
+    def _on_readable(self) -> None:
+        """
+        Handle the connection's file descriptor becoming readable.
+        :return None:
+        """
+        try:
+            data = os.read(self._fd, read_size)
+            timestamp = perf_counter_ns()
+        except BlockingIOError as bie:  # Spurious wake-up, pyserial opens ports non-blocking.
+            return
+        except OSError as e:
+            self._logger.warning("Read failed on " + str(self._conn.port) + ", stopping reader")
+            self._stop()
+            return
+        if not data:  # EOF, device is gone.
+            self._logger.warning("Device on " + str(self._conn.port) + " is gone, stopping reader")
+            self._stop()
+            return
+        self._add_data(data, timestamp)
+
+    async def _read_chunks(self) -> None:
+        """
+        Read whatever is available on the connection in this reader's thread until stopped.
+        :return None:
+        """
+        try:
+            while self._running:
+                data, timestamp = await self._loop.run_in_executor(self._read_pool, self._read_available)
+                self._add_data(data, timestamp)
+        except CancelledError:
+            raise
+        except Exception as e:
+            self._logger.warning("Read failed on " + str(self._conn.port) + ", stopping reader")
+            self._stop()
+
+    def _read_available(self) -> (bytes, int):
+        """
+        Block until at least one byte arrives then return everything waiting.
+        :return (bytes, int): The bytes read and perf_counter_ns when they were read, taken in the reading thread so
+        executor hand off delay is not included.
+        """
+        data = self._conn.read(max(1, self._conn.in_waiting))
+        return data, perf_counter_ns()
+
+    def _add_data(self, data: bytes, timestamp: int) -> None:
+        """
+        Append data to the buffer and move any complete lines to the line list.
+        :param data: The newly received bytes.
+        :param timestamp: perf_counter_ns when the bytes arrived.
+        :return None:
+        """
+        if self._capture:
+            self._capture.write(data, timestamp)
+        self._buf += data
+        end = self._buf.rfind(line_end)
+        if end < 0:
+            return
+        chunk = bytes(self._buf[:end])
+        del self._buf[:end + 1]
+        for line in chunk.split(line_end):
+            self._lines.append((line + line_end, timestamp))
+        self._lines_event.set()
+
+    def _stop(self) -> None:
+        """
+        Stop reading and wake get_lines so it can raise once the lines already read are taken.
+        :return None:
+        """
+        self._running = False
+        self._remove_reader()
+        self._lines_event.set()
+
+    def _remove_reader(self) -> None:
+        """
+        Stop watching the file descriptor if one is being watched.
+        :return None:
+        """
+        if self._fd is not None:
+            try:
+                self._loop.remove_reader(self._fd)
+            except Exception as e:
+                pass
+            self._fd = None
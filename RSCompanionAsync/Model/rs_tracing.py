@@ -0,0 +1,149 @@
+"""
+Licensed under GNU GPL-3.0-or-later
+
+This file is part of RS Companion.
+
+RS Companion is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+RS Companion is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with RS Companion.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Phillip Riskin
+Date: 2020
+Project: Companion App
+Company: Red Scientific
+https://redscientific.com/index.html
+"""
+
+import os
+import json
+from collections import deque
+from threading import get_ident, enumerate as enumerate_threads
+from time import perf_counter_ns
+from RSCompanionAsync.Model.rs_clock import to_wall_ns
+
+"""
+Span timing for hot paths, in place of "running"/"done" debug lines.
+    with span("drt.parse"):
+        ...
+Tracing is off by default and span then returns one shared do nothing context, so a disabled span costs a function
+call and a global lookup. When enabled every sample_every'th span of each name is timed with perf_counter_ns and kept
+in a bounded ring, and export_chrome_trace writes them as Chrome trace JSON for chrome://tracing or Perfetto.
+Span names are "<category>.<what>", the category is the part before the first dot.
+"""
+
+max_spans = 200000  # Most spans kept, older ones are dropped.
+
+_enabled = False
+_sample_every = 1
+_counts = dict()
+_spans = deque(maxlen=max_spans)  # (name, start perf_counter_ns, duration ns, thread id)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+class _Span:
+    __slots__ = ("_name", "_start")
+
+    def __init__(self, name: str):
+        self._name = name
+        self._start = 0
+
+    def __enter__(self):
+        self._start = perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _spans.append((self._name, self._start, perf_counter_ns() - self._start, get_ident()))
+        return False
+
+
+_null_span = _NullSpan()
+
+
+def span(name: str):
+    """
+    Time a block of code.
+    :param name: "<category>.<what>", such as "drt.parse".
+    :return: A context manager, the shared do nothing one while tracing is off or this span is not sampled.
+    """
+    if not _enabled:
+        return _null_span
+    count = _counts.get(name, 0)
+    _counts[name] = count + 1
+    if count % _sample_every:
+        return _null_span
+    return _Span(name)
+
+
+def enable(sample_every: int = 1) -> None:
+    """
+    Start timing spans.
+    :param sample_every: Time one in this many spans of each name.
+    :return None:
+    """
+    global _enabled, _sample_every
+    _sample_every = max(int(sample_every), 1)
+    _enabled = True
+
+
+def disable() -> None:
+    """
+    Stop timing spans. Spans kept so far stay until cleared.
+    :return None:
+    """
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def clear() -> None:
+    _spans.clear()
+    _counts.clear()
+
+
+def get_spans() -> [(str, int, int, int)]:
+    """
+    :return [(str, int, int, int)]: The spans kept, oldest first: name, start perf_counter_ns, duration in
+    nanoseconds and thread id.
+    """
+    return list(_spans)
+
+
+def export_chrome_trace(path: str) -> int:
+    """
+    Write the spans kept as Chrome trace JSON, as complete events with wall clock microsecond timestamps.
+    :param path: The file to write.
+    :return int: The number of spans written.
+    """
+    spans = get_spans()
+    pid = os.getpid()
+    events = [{"name": name, "cat": name.split(".", 1)[0], "ph": "X", "ts": to_wall_ns(start) / 1000,
+               "dur": duration / 1000, "pid": pid, "tid": tid} for name, start, duration, tid in spans]
+    span_threads = set(span[3] for span in spans)
+    for thread in enumerate_threads():
+        if thread.ident in span_threads:
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": thread.ident,
+                           "args": {"name": thread.name}})
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"sample_every": _sample_every}}, f)
+    return len(spans)
@@ -25,7 +25,7 @@ https://redscientific.com/index.html
 """
 
 
-from logging import getLogger, StreamHandler
+from logging import getLogger
 from urllib3 import PoolManager
 from RSCompanionAsync.Model.app_defs import version_url, version_number
 
@@ -34,15 +34,12 @@ class VersionChecker:
     """
     Checks version number against latest version from the site
     """
-    def __init__(self, log_handlers: [StreamHandler] = None):
+    def __init__(self):
         """
         Initialize the version checker
         :return None:
         """
         self.logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self.logger.addHandler(h)
         self.logger.debug("Initializing")
         self.latest_version = self.get_latest_version()
         self.logger.debug("Initialized")
@@ -44,6 +44,8 @@ class StringsEnum(Enum):
     RESTART_PROG = auto()
     UPDATE_HDR = auto()
     UPDATE_HDR_ERR = auto()
+    PRESET_HDR = auto()
+    PRESET_STRAGGLERS = auto()
 
 
 log_out_filename = "companion_app_log.txt"
@@ -81,7 +83,9 @@ english = {StringsEnum.COMPANY_NAME: company_name,
                                          " https://redscientific.com/downloads.html manually or contact Red Scientific"
                                          " directly.",
            StringsEnum.DEV_CON_ERR: "There was a problem connecting the device, please retry connection.",
-           StringsEnum.RESTART_PROG: "This app must restart for changes to take effect."
+           StringsEnum.RESTART_PROG: "This app must restart for changes to take effect.",
+           StringsEnum.PRESET_HDR: "Preset",
+           StringsEnum.PRESET_STRAGGLERS: "These devices were slow to confirm the preset or did not confirm it: "
            }
 
 # Dutch
@@ -120,7 +124,9 @@ dutch = {StringsEnum.COMPANY_NAME: company_name,
                                        " rechtstreeks contact op met Red Scientific.",
          StringsEnum.DEV_CON_ERR: "Er is een probleem opgetreden bij het verbinden van het apparaat. Probeer het "
                                   "alstublieft opnieuw",
-         StringsEnum.RESTART_PROG: "Deze app moet opnieuw worden opgestart om de wijzigingen door te voeren."
+         StringsEnum.RESTART_PROG: "Deze app moet opnieuw worden opgestart om de wijzigingen door te voeren.",
+         StringsEnum.PRESET_HDR: "Voorinstelling",
+         StringsEnum.PRESET_STRAGGLERS: "Deze apparaten bevestigden de voorinstelling traag of niet: "
          }
 
 # French strings
@@ -161,7 +167,9 @@ french = {StringsEnum.COMPANY_NAME: company_name,
                                         " Veuillez vérifier https://redscientific.com/downloads.html manuellement"
                                         " ou contacter directement Red Scientific.",
           StringsEnum.DEV_CON_ERR: "Un problème est survenu lors de la connexion de l'appareil. Veuillez réessayer.",
-          StringsEnum.RESTART_PROG: "Cette application doit redémarrer pour que les modifications prennent effet."
+          StringsEnum.RESTART_PROG: "Cette application doit redémarrer pour que les modifications prennent effet.",
+          StringsEnum.PRESET_HDR: "Préréglage",
+          StringsEnum.PRESET_STRAGGLERS: "Ces appareils ont confirmé le préréglage lentement ou ne l'ont pas confirmé : "
           }
 
 # German strings
@@ -202,7 +210,9 @@ german = {StringsEnum.COMPANY_NAME: company_name,
                                         " manuell oder wenden Sie sich direkt an Red Scientific.",
           StringsEnum.DEV_CON_ERR: "Beim Anschließen des Geräts ist ein Problem aufgetreten. Versuchen Sie erneut,"
                                    " die Verbindung herzustellen.",
-          StringsEnum.RESTART_PROG: "Diese App muss neu gestartet werden, damit die Änderungen wirksam werden."
+          StringsEnum.RESTART_PROG: "Diese App muss neu gestartet werden, damit die Änderungen wirksam werden.",
+          StringsEnum.PRESET_HDR: "Voreinstellung",
+          StringsEnum.PRESET_STRAGGLERS: "Diese Geräte haben die Voreinstellung langsam oder nicht bestätigt: "
           }
 
 # Russian strings
@@ -240,7 +250,9 @@ russian = {StringsEnum.COMPANY_NAME: company_name,
                                          " проверьте https://redscientific.com/downloads.html вручную или свяжитесь с"
                                          " Red Scientific напрямую.",
            StringsEnum.DEV_CON_ERR: "При подключении устройства произошла ошибка. Повторите попытку подключения.",
-           StringsEnum.RESTART_PROG: "Это приложение должно быть перезапущено, чтобы изменения вступили в силу."
+           StringsEnum.RESTART_PROG: "Это приложение должно быть перезапущено, чтобы изменения вступили в силу.",
+           StringsEnum.PRESET_HDR: "Предустановка",
+           StringsEnum.PRESET_STRAGGLERS: "Эти устройства медленно подтвердили предустановку или не подтвердили её: "
            }
 
 # Spanish strings
@@ -280,7 +292,9 @@ spanish = {StringsEnum.COMPANY_NAME: company_name,
                                          " Consulte https://redscientific.com/downloads.html manualmente o comuníquese"
                                          " directamente con Red Scientific.",
            StringsEnum.DEV_CON_ERR: "Hubo un problema al conectar el dispositivo. Vuelva a intentar la conexión.",
-           StringsEnum.RESTART_PROG: "Esta aplicación debe reiniciarse para que los cambios surtan efecto."
+           StringsEnum.RESTART_PROG: "Esta aplicación debe reiniciarse para que los cambios surtan efecto.",
+           StringsEnum.PRESET_HDR: "Ajuste",
+           StringsEnum.PRESET_STRAGGLERS: "Estos dispositivos confirmaron el ajuste lentamente o no lo confirmaron: "
            }
 
 # Chinese (simplified) strings
@@ -310,7 +324,9 @@ chinese = {StringsEnum.COMPANY_NAME: company_name,
            StringsEnum.ERR_UPDATE_CHECK: "连接到存储库时发生意外错误。 请手动检查"
                                          "https://redscientific.com/downloads.html或直接联系Red Scientific。",
            StringsEnum.DEV_CON_ERR: "连接设备时出现问题，请重试连接。",
-           StringsEnum.RESTART_PROG: "此应用必须重新启动才能使更改生效。"
+           StringsEnum.RESTART_PROG: "此应用必须重新启动才能使更改生效。",
+           StringsEnum.PRESET_HDR: "预设",
+           StringsEnum.PRESET_STRAGGLERS: "这些设备确认预设较慢或未确认: "
            }
 
 # Japanese strings
@@ -344,7 +360,9 @@ japanese = {StringsEnum.COMPANY_NAME: company_name,
                                           " https://redscientific.com/downloads.htmlを手動で確認するか、Red Scientific"
                                           "に直接連絡してください。",
             StringsEnum.DEV_CON_ERR: "デバイスの接続に問題が発生しました。接続を再試行してください。",
-            StringsEnum.RESTART_PROG: "変更を有効にするには、このアプリを再起動する必要があります。"
+            StringsEnum.RESTART_PROG: "変更を有効にするには、このアプリを再起動する必要があります。",
+            StringsEnum.PRESET_HDR: "プリセット",
+            StringsEnum.PRESET_STRAGGLERS: "これらのデバイスはプリセットの確認が遅いか、確認しませんでした: "
             }
 
 strings = {LangEnum.ENG: english,
@@ -46,6 +46,7 @@ class StringsEnum(Enum):
     CASCADE = auto()
     CUSTOM = auto()
     DEBUG_MENU = auto()
+    PRESETS = auto()
     DEBUG = auto()
     WARNING = auto()
     LANG = auto()
@@ -87,6 +88,7 @@ english = {StringsEnum.FILE: "File",
            StringsEnum.CASCADE: "Cascade",
            StringsEnum.CUSTOM: "Custom",
            StringsEnum.DEBUG_MENU: "Debug level",
+           StringsEnum.PRESETS: "Apply preset to all devices",
            StringsEnum.DEBUG: "Debugging mode",
            StringsEnum.WARNING: "Normal mode",
            StringsEnum.LANG: "Language:",
@@ -120,6 +122,7 @@ dutch = {StringsEnum.FILE: "Bestand",
          StringsEnum.CASCADE: "Cascade",
          StringsEnum.CUSTOM: "Op maat",
          StringsEnum.DEBUG_MENU: "Debug-niveau",
+         StringsEnum.PRESETS: "Voorinstelling op alle apparaten toepassen",
          StringsEnum.DEBUG: "Foutopsporingsmodus",
          StringsEnum.WARNING: "Normale modus",
          StringsEnum.LANG: "Taal:",
@@ -152,6 +155,7 @@ french = {StringsEnum.FILE: "Fichier",
           StringsEnum.CASCADE: "Cascade",
           StringsEnum.CUSTOM: "sur commande",
           StringsEnum.DEBUG_MENU: "Niveau de débogage",
+          StringsEnum.PRESETS: "Appliquer un préréglage à tous les appareils",
           StringsEnum.DEBUG: "Mode de débogage",
           StringsEnum.WARNING: "Mode normal",
           StringsEnum.LANG: "Langue:",
@@ -184,6 +188,7 @@ german = {StringsEnum.FILE: "Datei",
           StringsEnum.CASCADE: "Kaskade",
           StringsEnum.CUSTOM: "maßgeschneidert",
           StringsEnum.DEBUG_MENU: "Debug-Ebene",
+          StringsEnum.PRESETS: "Voreinstellung auf alle Geräte anwenden",
           StringsEnum.DEBUG: "Debugging-Modus",
           StringsEnum.WARNING: "Normaler Modus",
           StringsEnum.LANG: "Sprache:",
@@ -216,6 +221,7 @@ russian = {StringsEnum.FILE: "файл",
            StringsEnum.CASCADE: "каскадный",
            StringsEnum.CUSTOM: "изготовленный на заказ",
            StringsEnum.DEBUG_MENU: "Уровень отладки",
+           StringsEnum.PRESETS: "Применить предустановку ко всем устройствам",
            StringsEnum.DEBUG: "Режим отладки",
            StringsEnum.WARNING: "Нормальный режим",
            StringsEnum.LANG: "язык:",
@@ -248,6 +254,7 @@ spanish = {StringsEnum.FILE: "Expediente",
            StringsEnum.CASCADE: "Cascada",
            StringsEnum.CUSTOM: "Personalizado",
            StringsEnum.DEBUG_MENU: "Nivel de depuración",
+           StringsEnum.PRESETS: "Aplicar ajuste a todos los dispositivos",
            StringsEnum.DEBUG: "Modo de depuración",
            StringsEnum.WARNING: "Modo normal",
            StringsEnum.LANG: "Idioma:",
@@ -280,6 +287,7 @@ chinese = {StringsEnum.FILE: "文件",
            StringsEnum.CASCADE: "级联",
            StringsEnum.CUSTOM: "自定义设置",
            StringsEnum.DEBUG_MENU: "调试级别",
+           StringsEnum.PRESETS: "将预设应用于所有设备",
            StringsEnum.DEBUG: "调试模式",
            StringsEnum.WARNING: "正常模式",
            StringsEnum.LANG: "语言:",
@@ -312,6 +320,7 @@ japanese = {StringsEnum.FILE: "ファイル",
             StringsEnum.CASCADE: "カスケード",
             StringsEnum.CUSTOM: "カスタム",
             StringsEnum.DEBUG_MENU: "デバッグレベル",
+            StringsEnum.PRESETS: "すべてのデバイスにプリセットを適用",
             StringsEnum.DEBUG: "デバッグモード",
             StringsEnum.WARNING: "ノーマルモード",
             StringsEnum.LANG: "言語:",
@@ -24,7 +24,7 @@ https://redscientific.com/index.html
 """
 
 
-from logging import getLogger, StreamHandler
+from logging import getLogger
 from PySide2.QtWidgets import QGroupBox, QVBoxLayout, QHBoxLayout, QLineEdit
 from PySide2.QtGui import QIcon
 from PySide2.QtCore import QSize
@@ -35,12 +35,8 @@ from RSCompanionAsync.Resources.Strings.button_box_strings import strings, Strin
 
 class ButtonBox(QGroupBox):
     """ This code is to contain the overall controls which govern running experiments. """
-    def __init__(self, parent=None, size: QSize = QSize(10, 10), lang: LangEnum = LangEnum.ENG,
-                 log_handlers: [StreamHandler] = None):
+    def __init__(self, parent=None, size: QSize = QSize(10, 10), lang: LangEnum = LangEnum.ENG):
         self.logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self.logger.addHandler(h)
         self.logger.debug("Initializing")
         super().__init__(parent)
         self.setLayout(QVBoxLayout())
@@ -24,19 +24,15 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
-from logging import getLogger, StreamHandler
+from logging import getLogger
 from PySide2.QtWidgets import QGroupBox, QVBoxLayout, QRadioButton
 from PySide2.QtCore import QSize
 from RSCompanionAsync.Resources.Strings.menu_bar_strings import strings, StringsEnum, LangEnum
 
 
 class LayoutBox(QGroupBox):
-    def __init__(self, parent=None, size: QSize = QSize(10, 10), lang: LangEnum = LangEnum.ENG,
-                 log_handlers: [StreamHandler] = None):
+    def __init__(self, parent=None, size: QSize = QSize(10, 10), lang: LangEnum = LangEnum.ENG):
         self.logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self.logger.addHandler(h)
         self.logger.debug("Initializing")
         super().__init__(parent)
         self.setLayout(QVBoxLayout())
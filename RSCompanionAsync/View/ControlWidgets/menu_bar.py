@@ -24,7 +24,7 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
-from logging import getLogger, StreamHandler, DEBUG, WARNING
+from logging import getLogger, DEBUG, WARNING
 from PySide2.QtWidgets import QMenuBar, QMenu, QAction
 from PySide2.QtCore import QRect
 from RSCompanionAsync.Resources.Strings.menu_bar_strings import strings, StringsEnum, LangEnum
@@ -32,11 +32,8 @@ from RSCompanionAsync.Resources.Strings.menu_bar_strings import strings, Strings
 
 class AppMenuBar(QMenuBar):
     """ This code is for the menu bar at the top of the main window. File, help, etc. """
-    def __init__(self, parent=None, lang: LangEnum = LangEnum.ENG, log_handlers: [StreamHandler] = None):
+    def __init__(self, parent=None, lang: LangEnum = LangEnum.ENG):
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
         super().__init__(parent)
         self.setGeometry(QRect(0, 0, 840, 22))
@@ -143,6 +140,10 @@ class AppMenuBar(QMenuBar):
         self._warning_action.triggered.connect(self._warning_clicked)
         self._debug_actions.append(self._warning_action)
 
+        """ Preset options, added as devices of each type connect """
+        self._preset_menu = QMenu(self)
+        self._preset_actions = {}
+
         """ Help options """
         self._help_menu = QMenu(self)
 
@@ -170,6 +171,7 @@ class AppMenuBar(QMenuBar):
         # Menu bar -> Settings menu options
         self._settings_menu.addMenu(self._language_menu)
         self._settings_menu.addMenu(self._debug_menu)
+        self._settings_menu.addMenu(self._preset_menu)
 
         # Menu bar -> Settings -> Language menu options
         self._language_menu.addAction(self._english_action)
@@ -194,6 +196,7 @@ class AppMenuBar(QMenuBar):
         self._debug_callback = None
         self._lang_callback = None
         self._layout_callback = None
+        self._preset_callback = None
         self._strings = dict()
         self.set_lang(lang)
         self._logger.debug("Initialized")
@@ -261,6 +264,29 @@ class AppMenuBar(QMenuBar):
         """
         self._debug_callback = func
 
+    def add_preset_select_handler(self, func: classmethod) -> None:
+        """
+        Add handler for the preset selectables. Handler must take the device type and preset name.
+        :param func: The handler.
+        :return None:
+        """
+        self._preset_callback = func
+
+    def add_preset_action(self, dev_type: str, name: str) -> None:
+        """
+        Add an action in the preset menu that applies a preset to every device of a type, if there is none yet.
+        :param dev_type: The device type.
+        :param name: The preset name.
+        :return None:
+        """
+        if (dev_type, name) in self._preset_actions:
+            return
+        new_preset_action = QAction(self)
+        new_preset_action.setText(dev_type + ": " + name)
+        new_preset_action.triggered.connect(lambda: self._preset_clicked(dev_type, name))
+        self._preset_actions[(dev_type, name)] = new_preset_action
+        self._preset_menu.addAction(new_preset_action)
+
     def set_cam_action_enabled(self, is_active: bool) -> None:
         """
         Set whether or not the camera actions can be used.
@@ -424,6 +450,18 @@ class AppMenuBar(QMenuBar):
         self._layout_callback("cascade")
         self._logger.debug("done")
 
+    def _preset_clicked(self, dev_type: str, name: str) -> None:
+        """
+        Private handler for the preset actions.
+        :param dev_type: The device type.
+        :param name: The preset name.
+        :return None:
+        """
+        self._logger.debug("running")
+        if self._preset_callback:
+            self._preset_callback(dev_type, name)
+        self._logger.debug("done")
+
     def _eng_clicked(self) -> None:
         """
         Private handler for self._english_action
@@ -537,6 +575,7 @@ class AppMenuBar(QMenuBar):
         self._exit_action.setText(self._strings[StringsEnum.EXIT])
         self._settings_menu.setTitle(self._strings[StringsEnum.SETTINGS])
         self._debug_menu.setTitle(self._strings[StringsEnum.DEBUG_MENU])
+        self._preset_menu.setTitle(self._strings[StringsEnum.PRESETS])
         self._debug_action.setText(self._strings[StringsEnum.DEBUG])
         self._warning_action.setText(self._strings[StringsEnum.WARNING])
         self._cam_list_menu.setTitle(self._strings[StringsEnum.ATTACHED_CAMS])
@@ -24,7 +24,7 @@ https://redscientific.com/index.html
 """
 
 
-from logging import getLogger, StreamHandler
+from logging import getLogger
 from PySide2.QtWidgets import QGroupBox, QGridLayout, QTextEdit
 from PySide2.QtCore import QSize
 from RSCompanionAsync.Model.app_helpers import ClickAnimationButton
@@ -33,12 +33,8 @@ from RSCompanionAsync.Resources.Strings.note_box_strings import strings, Strings
 
 class NoteBox(QGroupBox):
     """ This code is for the user to input notes as desired. """
-    def __init__(self, parent=None, size: QSize = QSize(10, 10), lang: LangEnum = LangEnum.ENG,
-                 log_handlers: [StreamHandler] = None):
+    def __init__(self, parent=None, size: QSize = QSize(10, 10), lang: LangEnum = LangEnum.ENG):
         self.logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self.logger.addHandler(h)
         self.logger.debug("Initializing")
         super().__init__(parent)
         self.setLayout(QGridLayout())
@@ -24,7 +24,7 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
-from logging import getLogger, StreamHandler
+from logging import getLogger
 from PySide2.QtWidgets import QMdiArea
 from PySide2.QtCore import QSize, Qt
 from RSCompanionAsync.Devices.AbstractDevice.View.abstract_view import AbstractView
@@ -32,11 +32,8 @@ from RSCompanionAsync.Devices.AbstractDevice.View.abstract_view import AbstractV
 
 class MDIArea(QMdiArea):
     """ The area to show device specific views. """
-    def __init__(self, parent=None, size: QSize = QSize(10, 10), log_handlers: [StreamHandler] = None):
+    def __init__(self, parent=None, size: QSize = QSize(10, 10)):
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
         super().__init__(parent)
         self.setMinimumSize(size)
@@ -23,23 +23,72 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
-from PySide2.QtWidgets import QWidget, QVBoxLayout, QTextEdit
-from PySide2.QtGui import QTextCursor
+from collections import deque
+from PySide2.QtWidgets import QWidget, QVBoxLayout, QListView, QAbstractItemView
+from PySide2.QtCore import Qt, QTimer, QAbstractListModel, QModelIndex
 from RSCompanionAsync.Resources.Strings.output_window_strings import strings, StringsEnum, LangEnum
 
+log_rows = 10000      # Most lines kept, older lines are dropped.
+flush_interval = 200  # Milliseconds between moving new lines into the view while it is shown.
+
+
+class LogListModel(QAbstractListModel):
+    """ The lines shown by OutputWindow, at most log_rows of them. """
+    def __init__(self, max_rows: int = log_rows):
+        super().__init__()
+        self._rows = deque()
+        self._max_rows = max_rows
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self._rows[index.row()]
+        return None
+
+    def add_rows(self, rows: [str]) -> None:
+        """
+        Add rows at the end, dropping the oldest ones past max_rows.
+        :param rows: The new rows.
+        :return None:
+        """
+        rows = rows[-self._max_rows:]
+        extra = len(self._rows) + len(rows) - self._max_rows
+        if extra > 0:
+            self.beginRemoveRows(QModelIndex(), 0, extra - 1)
+            for i in range(extra):
+                self._rows.popleft()
+            self.endRemoveRows()
+        self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+
 
 class OutputWindow(QWidget):
-    """ This is to display small messages to the user. """
+    """
+    This is to display small messages to the user.
+    write may be called from any thread. It only puts the message in a bounded ring, and while the window is shown a
+    timer moves what has come in to a list view in one batch. The view has uniform rows so only the visible ones are
+    laid out.
+    """
     def __init__(self, lang: LangEnum = LangEnum.ENG):
         super().__init__()
         self.resize(400, 200)
         self.move(100, 100)
         self.setLayout(QVBoxLayout())
-        self._textBox = QTextEdit()
-        self.layout().addWidget(self._textBox)
+        self._incoming = deque(maxlen=log_rows)  # Appends are atomic, so writers need no lock.
+        self._model = LogListModel()
+        self._list_view = QListView()
+        self._list_view.setModel(self._model)
+        self._list_view.setUniformItemSizes(True)
+        self._list_view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.layout().addWidget(self._list_view)
+        self._timer = QTimer(self)
+        self._timer.setInterval(flush_interval)
+        self._timer.timeout.connect(self._flush)
         self._strings = dict()
         self.set_lang(lang)
-        self._textBox.setReadOnly(True)
 
     def set_lang(self, lang: LangEnum) -> None:
         """
@@ -52,10 +101,33 @@ class OutputWindow(QWidget):
 
     def write(self, message) -> None:
         """
-        Add text to output window.
+        Add text to output window. Safe from any thread, the text shows on the next flush.
         :param message: The text to add.
         :return: None.
         """
-        self._textBox.moveCursor(QTextCursor.End)
-        self._textBox.insertPlainText(message)
-        self._textBox.moveCursor(QTextCursor.End)
+        self._incoming.append(message)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._flush()
+        self._timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self._timer.stop()
+
+    def _flush(self) -> None:
+        """
+        Move the text written since the last flush into the view, keeping it scrolled to the end if it was there.
+        :return None:
+        """
+        rows = list()
+        for i in range(len(self._incoming)):
+            rows.extend(self._incoming.popleft().rstrip("\n").split("\n"))
+        if not rows:
+            return
+        scroll_bar = self._list_view.verticalScrollBar()
+        at_end = scroll_bar.value() == scroll_bar.maximum()
+        self._model.add_rows(rows)
+        if at_end:
+            self._list_view.scrollToBottom()
@@ -24,7 +24,7 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
-from logging import getLogger, StreamHandler
+from logging import getLogger
 from PySide2.QtWidgets import QLabel, QGridLayout, QGroupBox
 from PySide2.QtCore import QSize, Qt
 from RSCompanionAsync.Resources.Strings.drive_info_strings import strings, StringsEnum, LangEnum
@@ -32,18 +32,13 @@ from RSCompanionAsync.Resources.Strings.drive_info_strings import strings, Strin
 
 class DriveInfoBox(QGroupBox):
     """ This code is for displaying information about storage usage. """
-    def __init__(self, parent=None, size: QSize = QSize(10, 10), lang: LangEnum = LangEnum.ENG,
-                 log_handlers: [StreamHandler] = None):
+    def __init__(self, parent=None, size: QSize = QSize(10, 10), lang: LangEnum = LangEnum.ENG):
         """
         Initialize this view module.
         :param parent: parent of this view module.
         :param size: size this view module should occupy
-        :param log_handlers:
         """
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
         super().__init__(parent)
         self.setFixedSize(size)
@@ -24,7 +24,7 @@ https://redscientific.com/index.html
 """
 
 
-from logging import getLogger, StreamHandler
+from logging import getLogger
 from PySide2.QtWidgets import QGroupBox, QVBoxLayout, QLabel
 from PySide2.QtGui import QFont
 from PySide2.QtCore import Qt, QSize
@@ -33,12 +33,8 @@ from RSCompanionAsync.Resources.Strings.flag_box_strings import strings, Strings
 
 class FlagBox(QGroupBox):
     """ This code is for showing and storing the keyflag which in this case is the last letter key the user pressed. """
-    def __init__(self, parent=None, size: QSize = QSize(10, 10), lang: LangEnum = LangEnum.ENG,
-                 log_handlers: [StreamHandler] = None):
+    def __init__(self, parent=None, size: QSize = QSize(10, 10), lang: LangEnum = LangEnum.ENG):
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
         super().__init__(parent)
         self.setLayout(QVBoxLayout())
@@ -25,7 +25,7 @@ https://redscientific.com/index.html
 """
 
 
-from logging import getLogger, StreamHandler
+from logging import getLogger
 from PySide2.QtWidgets import QLabel, QGridLayout, QGroupBox
 from PySide2.QtCore import Qt, QSize
 from RSCompanionAsync.Resources.Strings.info_box_strings import strings, StringsEnum, LangEnum
@@ -33,12 +33,8 @@ from RSCompanionAsync.Resources.Strings.info_box_strings import strings, Strings
 
 class InfoBox(QGroupBox):
     """ This code is for displaying information about the current experiment. """
-    def __init__(self, parent=None, size: QSize = QSize(10, 10), lang: LangEnum = LangEnum.ENG,
-                 log_handlers: [StreamHandler] = None):
+    def __init__(self, parent=None, size: QSize = QSize(10, 10), lang: LangEnum = LangEnum.ENG):
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
         super().__init__(parent)
         self.setFixedSize(size)
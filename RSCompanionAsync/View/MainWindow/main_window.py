@@ -24,7 +24,7 @@ Company: Red Scientific
 https://redscientific.com/index.html
 """
 
-from logging import getLogger, StreamHandler
+from logging import getLogger
 from PySide2.QtWidgets import QMainWindow, QHBoxLayout, QMessageBox, QMdiArea, QSplitter, QFrame
 from PySide2.QtGui import QFont, QIcon, QCloseEvent
 from PySide2.QtCore import QSize, Qt, QSettings
@@ -39,12 +39,8 @@ window_state = "mw_state"
 
 class AppMainWindow(QMainWindow):
     """ The main window the app will be displayed in. """
-    def __init__(self, min_size: QSize = QSize(10, 10), lang: LangEnum = LangEnum.ENG,
-                 log_handlers: [StreamHandler] = None):
+    def __init__(self, min_size: QSize = QSize(10, 10), lang: LangEnum = LangEnum.ENG):
         self._logger = getLogger(__name__)
-        if log_handlers:
-            for h in log_handlers:
-                self._logger.addHandler(h)
         self._logger.debug("Initializing")
         super().__init__()
 
@@ -0,0 +1,91 @@
+import pytest
+pytest.importorskip("PySide2")  # The app model loads the device views.
+pytest.importorskip("cv2")
+from asyncio import run, Event, create_task, sleep
+from RSCompanionAsync.Model.app_model import AppModel
+from RSCompanionAsync.Devices.AbstractDevice.Controller.abstract_controller import AbstractController
+
+
+"""
+Check how the app model adds and removes serial devices and applies presets, with fake device controllers.
+Run with python -m pytest Tests/app
+"""
+
+
+class FakeConn:
+    def __init__(self, port: str):
+        self.port = port
+
+    def close(self) -> None:
+        pass
+
+
+class FakeController(AbstractController):
+    def __init__(self, conn: FakeConn, lang=None):
+        super().__init__()
+        self.conn = conn
+        self.release = Event()  # cleanup waits for this.
+        self.release.set()
+        self.cleaned = False
+        self.preset_delay = .01
+        self.preset_ok = True
+
+    def get_conn(self) -> FakeConn:
+        return self.conn
+
+    def set_lang(self, lang) -> None:
+        pass
+
+    def get_presets(self) -> [str]:
+        return ["iso"]
+
+    async def apply_preset(self, name: str) -> bool:
+        await sleep(self.preset_delay)
+        return self.preset_ok
+
+    async def cleanup(self, discard: bool = False) -> None:
+        await self.release.wait()
+        self.cleaned = True
+
+
+def make_model(monkeypatch, controller=FakeController) -> AppModel:
+    monkeypatch.setattr(AppModel, "get_controllers", staticmethod(lambda: {"DRT": controller, "VOG": controller}))
+    monkeypatch.setattr(AppModel, "get_profiles", staticmethod(lambda: dict()))
+    return AppModel(port_lister=lambda: list())
+
+
+def test_device_swapped_on_same_port(monkeypatch):
+    async def main():
+        model = make_model(monkeypatch)
+        model._make_device("DRT", FakeConn("/dev/ttyACM0"))
+        old = model._devs["/dev/ttyACM0"]
+        old.release.clear()
+        model._rs_dev_scanner.report_lost("/dev/ttyACM0")
+        removing = create_task(model._remove_lost_devices())
+        await sleep(0)  # Removal is waiting on the old controller's cleanup.
+        model._make_device("DRT", FakeConn("/dev/ttyACM0"))
+        new = model._devs["/dev/ttyACM0"]
+        old.release.set()
+        await removing
+        assert old.cleaned and not new.cleaned
+        assert model._devs == {"/dev/ttyACM0": new}
+        assert model._dev_types == {"/dev/ttyACM0": "DRT"}
+
+    run(main())
+
+
+def test_apply_preset_reports_stragglers(monkeypatch):
+    async def main():
+        model = make_model(monkeypatch)
+        for port in ("/dev/ttyACM0", "/dev/ttyACM1", "/dev/ttyACM2", "/dev/ttyACM3"):
+            model._make_device("DRT", FakeConn(port))
+        model._make_device("VOG", FakeConn("/dev/ttyACM4"))
+        model._devs["/dev/ttyACM2"].preset_delay = .2
+        model._devs["/dev/ttyACM3"].preset_ok = False
+        assert model.get_presets() == {"DRT": ["iso"], "VOG": ["iso"]}
+        result = await model.apply_preset("DRT", "iso")
+        assert sorted(result["devices"]) == ["/dev/ttyACM0", "/dev/ttyACM1", "/dev/ttyACM2", "/dev/ttyACM3"]
+        assert set(result["stragglers"]) == {"/dev/ttyACM2", "/dev/ttyACM3"}
+        assert result["total_ms"] >= 200
+
+    run(main())
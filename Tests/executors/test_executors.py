@@ -0,0 +1,33 @@
+from threading import Event
+from RSCompanionAsync.Model import rs_executors
+from RSCompanionAsync.Model.rs_executors import MonitoredExecutor
+
+
+"""
+Check the pools' wait and saturation stats and starvation detection.
+Run with python -m pytest Tests/executors
+"""
+
+
+def test_starvation_detected_then_clears(monkeypatch):
+    monkeypatch.setattr(rs_executors, "starved_wait_ns", 50 * 1000 * 1000)
+    pool = MonitoredExecutor("test", 2)
+    release = Event()
+    try:
+        blockers = [pool.submit(release.wait) for i in range(2)]
+        queued = pool.submit(lambda: 1)
+        assert not pool.check_starved()  # Full, but the queued job has not waited long yet.
+        release.wait(.1)
+        stats = pool.get_stats()
+        assert stats["active"] == 2 and stats["queued"] == 1 and stats["saturation"] == 1
+        assert pool.check_starved()
+        release.set()
+        assert queued.result(5) == 1
+        assert all(x.result(5) for x in blockers)
+        assert not pool.check_starved()
+        stats = pool.get_stats()
+        assert stats["active"] == 0 and stats["queued"] == 0 and stats["completed"] == 3
+        assert stats["max_wait_ms"] >= 50
+    finally:
+        release.set()
+        pool.shutdown()
@@ -0,0 +1,35 @@
+import numpy as np
+from RSCompanionAsync.Devices.AbstractDevice.View.overview_series import OverviewSeries, lttb
+
+
+"""
+Check overview downsampling.
+Run with python -m pytest Tests/graph
+"""
+
+
+def test_lttb_keeps_ends_and_peaks():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[500] = 100
+    y[700] = -50
+    kx, ky = lttb(x, y, 50)
+    assert len(kx) == 50 and kx[0] == 0 and kx[-1] == 999
+    assert 100 in ky and -50 in ky
+    assert np.all(np.diff(kx) > 0)
+    assert len(lttb(x[:10], y[:10], 50)[0]) == 10  # Too few to reduce.
+
+
+def test_overview_stays_bounded():
+    series = OverviewSeries(max_points=200, chunk=16)
+    for i in range(100000):
+        series.append(float(i), -1000 if i == 77777 else 50 + i % 10)
+    series.append(100000.0, None)
+    x, y = series.get()
+    assert len(x) == len(series) and len(x) <= 200 + 2 * 16 * 20
+    assert np.all(np.diff(x) > 0)
+    assert x[0] == 0 and (series.first_x(), series.last_x()) == (0.0, 99999.0)
+    assert x[-1] == 99999
+    assert -1000 in y  # The lone dip survives every level.
+    series.clear()
+    assert len(series.get()[0]) == 0 and series.first_x() is None
@@ -0,0 +1,40 @@
+import numpy as np
+from RSCompanionAsync.Model import rs_scrollback
+from RSCompanionAsync.Model.rs_scrollback import ScrollbackStore
+
+
+"""
+Check the on disk graph scrollback.
+Run with python -m pytest Tests/graph
+"""
+
+
+def test_load_slices(tmp_path, monkeypatch):
+    monkeypatch.setattr(rs_scrollback, "flush_points", 8)
+    store = ScrollbackStore(str(tmp_path / "DRT_1"), 2)
+    assert len(store) == 0 and store.first_x() is None
+    assert len(store.load(0, 100)[0]) == 0
+    for i in range(20):  # Two batches written, four points held.
+        store.append(float(i), i * 10, None if i % 2 else i)
+    assert len(store) == 20 and store.first_x() == 0.0
+    x, (rt, clicks) = store.load(5, 17)
+    assert x.tolist() == list(range(5, 18))
+    assert rt.tolist() == [i * 10 for i in range(5, 18)]
+    assert np.isnan(clicks[0]) and clicks[1] == 6
+    x, ys = store.load(0, 19, max_points=5)
+    assert len(x) <= 5 and x[0] == 0
+    store.close()
+    assert (tmp_path / "DRT_1" / "x.f8").stat().st_size == 20 * 8
+    assert (tmp_path / "DRT_1" / "y0.f4").stat().st_size == 20 * 4
+
+
+def test_reads_new_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(rs_scrollback, "flush_points", 4)
+    store = ScrollbackStore(str(tmp_path / "VOG_1"), 1)
+    for i in range(4):
+        store.append(float(i), i)
+    assert store.load(0, 10)[0].tolist() == [0, 1, 2, 3]
+    for i in range(4, 9):
+        store.append(float(i), i)
+    assert store.load(3, 10)[1][0].tolist() == [3, 4, 5, 6, 7, 8]
+    store.close()
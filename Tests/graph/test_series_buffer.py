@@ -0,0 +1,31 @@
+import numpy as np
+from RSCompanionAsync.Devices.AbstractDevice.View.series_buffer import SeriesBuffer
+
+
+"""
+Check the fixed size graph point ring.
+Run with python -m pytest Tests/graph
+"""
+
+
+def test_keeps_newest():
+    buf = SeriesBuffer(4, 2)
+    assert len(buf) == 0 and buf.first_x() is None and buf.last_x() is None
+    for i in range(10):
+        buf.append(float(i), i * 10, None if i % 2 else i)
+    assert len(buf) == 4
+    assert buf.x().tolist() == [6.0, 7.0, 8.0, 9.0]
+    assert buf.y(0).tolist() == [60.0, 70.0, 80.0, 90.0]
+    assert np.isnan(buf.y(1)[1]) and buf.y(1)[2] == 8
+    assert (buf.first_x(), buf.last_x()) == (6.0, 9.0)
+    assert buf.x().base is not None  # A view, not a copy.
+
+
+def test_missing_columns_and_clear():
+    buf = SeriesBuffer(3, 2)
+    for i in range(3):
+        buf.append(float(i), 1, 2)
+    buf.append(3.0)  # Overwrites a slot that had values.
+    assert np.isnan(buf.y(0)[-1]) and np.isnan(buf.y(1)[-1])
+    buf.clear()
+    assert len(buf) == 0 and buf.x().size == 0
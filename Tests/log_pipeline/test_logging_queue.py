@@ -0,0 +1,43 @@
+import logging
+from logging.handlers import BufferingHandler
+from RSCompanionAsync.Model.logging_queue import RateLimitFilter, setup_logging_queue, stop_logging_queue
+
+
+"""
+Check the queued logging pipeline and its per logger rate limit.
+Run with python -m pytest Tests/log_pipeline
+"""
+
+
+def make_record(name: str, level: int = logging.DEBUG) -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 0, "running", None, None)
+
+
+def test_rate_limit_per_logger():
+    limit = RateLimitFilter(rate=0, burst=3)
+    assert [limit.filter(make_record("noisy")) for i in range(5)] == [True] * 3 + [False] * 2
+    assert limit.filter(make_record("quiet"))
+    warning = make_record("noisy", logging.WARNING)
+    assert limit.filter(warning)
+    assert "2 earlier records" in warning.getMessage()
+
+
+def test_handlers_attached_once_at_root():
+    root = logging.getLogger()
+    old_handlers, old_level = root.handlers[:], root.level
+    buffer = BufferingHandler(100)
+    try:
+        setup_logging_queue([buffer], logging.INFO)
+        setup_logging_queue([buffer], logging.INFO)  # Replaces the first pipeline, no duplicates.
+        assert len(root.handlers) == 1
+        logging.getLogger("Tests.a").info("one")
+        logging.getLogger("Tests.b").debug("below the level")
+        stop_logging_queue()
+        assert [r.getMessage() for r in buffer.buffer] == ["one"]
+    finally:
+        stop_logging_queue()
+        for h in root.handlers[:]:
+            root.removeHandler(h)
+        for h in old_handlers:
+            root.addHandler(h)
+        root.setLevel(old_level)
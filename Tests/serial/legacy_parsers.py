@@ -0,0 +1,110 @@
+from datetime import datetime
+from RSCompanionAsync.Devices.DRT.Model import drt_defs
+from RSCompanionAsync.Devices.VOG.Model import vog_defs
+
+
+"""
+The string based DRT and VOG parsers and formatters that rs_protocol replaced, kept to check the compiled versions
+against.
+"""
+
+
+def drt_parse_msg(msg_string: str) -> dict:
+    ret = dict()
+    ret['values'] = {}
+    if msg_string[0:4] == "cfg>":
+        ret['type'] = "settings"
+        # Check if this is a response to get_config
+        if len(msg_string) > 90:
+            # Get relevant values from msg and insert into ret
+            for i in drt_defs.config_fields:
+                index = msg_string.find(i + ":")
+                index_len = len(i) + 1
+                val_len = msg_string.find(', ', index + index_len)
+                if val_len < 0:
+                    val_len = None
+                ret['values'][msg_string[index:index+index_len-1]] = int(msg_string[index+index_len:val_len])
+        else:
+            # Single value update, find which value it is and insert into ret
+            for i in drt_defs.config_fields:
+                index = msg_string.find(i + ":")
+                if index > 0:
+                    index_len = len(i)
+                    val_ind = index + index_len + 1
+                    ret['values'][msg_string[index:index + index_len]] = int(msg_string[val_ind:])
+    elif msg_string[0:4] == "trl>":
+        ret['type'] = "data"
+        val_ind_start = 4
+        for i in drt_defs.output_fields:
+            val_ind_end = msg_string.find(', ', val_ind_start + 1)
+            if val_ind_end < 0:
+                val_ind_end = None
+            ret['values'][i] = int(msg_string[val_ind_start:val_ind_end])
+            if val_ind_end:
+                val_ind_start = val_ind_end + 2
+    return ret
+
+
+def drt_prepare_msg(cmd: str, arg: str = None) -> str:
+    if arg:
+        msg_to_send = cmd + " " + arg + "\n"
+    else:
+        msg_to_send = cmd + "\n"
+    return msg_to_send
+
+
+def vog_parse_msg(msg_string) -> dict:
+    ret = dict()
+    ret['values'] = {}
+    if msg_string[0:5] == "data|":
+        ret['type'] = "data"
+        val_ind_start = 5
+        for i in range(len(vog_defs.output_field)):
+            val_ind_end = msg_string.find(',', val_ind_start + 1)
+            if val_ind_end < 0:
+                val_ind_end = None
+            ret['values'][vog_defs.output_field[i]] = msg_string[val_ind_start:val_ind_end].rstrip("\r\n")
+            if val_ind_end:
+                val_ind_start = val_ind_end + 1
+    elif "config" in msg_string:
+        ret['type'] = "settings"
+        bar_ind = msg_string.find('|', 6)
+        if msg_string[6:bar_ind] == "Name":
+            ret['values']['Name'] = msg_string[bar_ind + 1: len(msg_string)].rstrip("\r\n")
+        elif msg_string[6:bar_ind] == "MaxOpen":
+            ret['values']['MaxOpen'] = msg_string[bar_ind + 1: len(msg_string)].rstrip("\r\n")
+        elif msg_string[6:bar_ind] == "MaxClose":
+            ret['values']['MaxClose'] = msg_string[bar_ind + 1: len(msg_string)].rstrip("\r\n")
+        elif msg_string[6:bar_ind] == "Debounce":
+            ret['values']['Debounce'] = msg_string[bar_ind + 1: len(msg_string)].rstrip("\r\n")
+        elif msg_string[6:bar_ind] == "ClickMode":
+            ret['values']['ClickMode'] = msg_string[bar_ind + 1: len(msg_string)].rstrip("\r\n")
+    elif "Click" in msg_string:
+        ret['type'] = "action"
+        ret['action'] = "Click"
+    elif "buttonControl" in msg_string:
+        ret['type'] = "settings"
+        bar_ind = msg_string.find('|')
+        ret['values'] = {}
+        ret['values']['buttonControl'] = msg_string[bar_ind + 1: len(msg_string)].rstrip("\r\n")
+    elif "peek" in msg_string:
+        ret['type'] = "settings"
+        ret['values'] = {}
+        ret['values']['lensState'] = msg_string.rstrip("\r\n")
+    return ret
+
+
+def vog_prepare_msg(cmd, arg=None) -> str:
+    if arg:
+        msg_to_send = ">" + cmd + "|" + arg + "<<\n"
+    else:
+        msg_to_send = ">" + cmd + "|" + "<<\n"
+    return msg_to_send
+
+
+def format_save_data(save_fields: [str], values: dict, timestamp: datetime) -> str:
+    line = str(timestamp.timestamp())
+    for i in save_fields:
+        line += ", " + str(values[i])
+    line = line.rstrip("\r\n")
+    return line
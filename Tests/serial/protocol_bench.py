@@ -0,0 +1,52 @@
+from timeit import timeit
+from datetime import datetime
+from RSCompanionAsync.Model.rs_protocol import compile_parser, compile_row_encoder
+from RSCompanionAsync.Devices.DRT.Model import drt_defs
+from RSCompanionAsync.Devices.VOG.Model import vog_defs
+from Tests.serial import legacy_parsers as legacy
+
+
+"""
+Time the old string parsers and formatters against the ones compiled from the protocol specs.
+Run with python -m Tests.serial.protocol_bench
+"""
+
+number = 100000  # Change to the number of calls per measurement.
+repeats = 15     # Change to the number of measurements, the fastest of each is reported.
+
+
+def compare(name: str, old_func, new_func) -> None:
+    # Alternate old and new so both see the same machine load.
+    old = new = float("inf")
+    for i in range(repeats):
+        old = min(old, timeit(old_func, number=number))
+        new = min(new, timeit(new_func, number=number))
+    print("{:<24} old {:7.3f}us  new {:7.3f}us  {:4.1f}x".format(name, old / number * 1E6, new / number * 1E6,
+                                                                 old / new))
+
+
+def main():
+    drt_parse = compile_parser(drt_defs.protocol)
+    vog_parse = compile_parser(vog_defs.protocol)
+    drt_row = compile_row_encoder(drt_defs.save_fields)
+    vog_row = compile_row_encoder(vog_defs.save_fields)
+
+    drt_data = b"trl>123456, 12, 1, 350\r\n"
+    vog_data = b"data|12,123456,7890\r\n"
+    vog_peek = b"peekOpen\r\n"
+    # The old path decoded every line before parsing so include that.
+    compare("DRT data line", lambda: legacy.drt_parse_msg(drt_data.decode("utf-8")), lambda: drt_parse(drt_data))
+    compare("VOG data line", lambda: legacy.vog_parse_msg(vog_data.decode("utf-8")), lambda: vog_parse(vog_data))
+    compare("VOG peek line", lambda: legacy.vog_parse_msg(vog_peek.decode("utf-8")), lambda: vog_parse(vog_peek))
+
+    timestamp = datetime.now()
+    drt_values = drt_parse(drt_data)['values']
+    vog_values = vog_parse(vog_data)['values']
+    compare("DRT save row", lambda: legacy.format_save_data(drt_defs.save_fields, drt_values, timestamp),
+            lambda: drt_row(drt_values, timestamp.timestamp()))
+    compare("VOG save row", lambda: legacy.format_save_data(vog_defs.save_fields, vog_values, timestamp),
+            lambda: vog_row(vog_values, timestamp.timestamp()))
+
+
+if __name__ == '__main__':
+    main()
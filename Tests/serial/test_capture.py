@@ -0,0 +1,34 @@
+from RSCompanionAsync.Model.rs_capture import CaptureWriter, read_capture
+from RSCompanionAsync.Model.rs_clock import get_anchor
+
+
+"""
+Check raw serial captures read back exactly as written.
+Run with python -m pytest Tests/serial
+"""
+
+chunks = [(1000, b"trl>100, 1, 1, 300\r\ntrl>"), (2500, b"4000, 2, 1, 250\r\n"), (2600, b""), (9000, bytes(range(256)))]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "DRT_0.rscap")
+    writer = CaptureWriter(path, "DRT_0")
+    for timestamp, data in chunks:
+        writer.write(data, timestamp)
+    writer.close()
+    header, read_chunks = read_capture(path)
+    assert header["dev_name"] == "DRT_0"
+    assert (header["anchor_wall_ns"], header["anchor_mono_ns"]) == get_anchor()
+    assert read_chunks == chunks
+
+
+def test_cut_short_capture_drops_last_chunk(tmp_path):
+    path = str(tmp_path / "VOG_0.rscap")
+    writer = CaptureWriter(path, "VOG_0")
+    for timestamp, data in chunks:
+        writer.write(data, timestamp)
+    writer.close()
+    with open(path, "r+b") as f:
+        f.truncate(len(f.read()) - 10)
+    header, read_chunks = read_capture(path)
+    assert read_chunks == chunks[:-1]
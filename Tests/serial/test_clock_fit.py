@@ -0,0 +1,47 @@
+import random
+from RSCompanionAsync.Model.rs_clock import DeviceClockFit
+
+
+"""
+Check the device clock fit finds skew and ignores late arrivals.
+Run with python -m pytest Tests/serial
+"""
+
+
+def make_points(n: int, skew_ppm: float, seed: int = 1) -> [(int, int, int)]:
+    # (device ms, true host ns, arrival host ns) with usb style delays and some very late lines.
+    rand = random.Random(seed)
+    points = list()
+    device_ms = 0
+    for i in range(n):
+        device_ms += rand.randrange(3000, 5000)
+        true_ns = 5000000000 + int(device_ms * 1E6 * (1 + skew_ppm / 1E6))
+        delay = 1000000 + int(rand.expovariate(1 / 2E6))
+        if rand.random() < .1:
+            delay += rand.randrange(50, 500) * 1000000
+        points.append((device_ms, true_ns, true_ns + delay))
+    return points
+
+
+def test_fit_finds_skew_and_beats_arrival_time():
+    fit = DeviceClockFit()
+    raw_err = list()
+    fit_err = list()
+    for device_ms, true_ns, arrival_ns in make_points(200, 150):
+        fit.add(device_ms, arrival_ns)
+        raw_err.append(abs(arrival_ns - true_ns))
+        fit_err.append(abs(fit.to_host_ns(device_ms) - true_ns))
+    stats = fit.get_stats()
+    assert abs(stats["skew_ppm"] - 150) < 50
+    assert sorted(fit_err[20:])[-1] < sorted(raw_err[20:])[-1]
+    assert sum(fit_err[20:]) < sum(raw_err[20:])
+
+
+def test_fit_resets_when_counter_goes_back():
+    fit = DeviceClockFit()
+    for device_ms, true_ns, arrival_ns in make_points(10, 0):
+        fit.add(device_ms, arrival_ns)
+    fit.add(100, 9000000000000)
+    assert fit.get_stats()["points"] == 1
+    assert fit.get_stats()["resets"] == 1
+    assert fit.to_host_ns(100) == 9000000000000
@@ -0,0 +1,98 @@
+from asyncio import run, sleep, create_task
+from threading import Lock
+from RSCompanionAsync.Model.rs_command_queue import CommandQueue
+
+
+"""
+Check CommandQueue coalescing, answer matching and retries against a fake connection.
+Run with python -m pytest Tests/serial
+"""
+
+
+class FakeConn:
+    def __init__(self):
+        self.is_open = True
+        self.port = "fake"
+        self.writes = list()
+        self._lock = Lock()
+
+    def write(self, data: bytes) -> int:
+        with self._lock:
+            self.writes.append(data)
+        return len(data)
+
+
+def test_coalesce_and_confirm():
+    async def main():
+        conn = FakeConn()
+        queue = CommandQueue(conn, "DRT_test")
+        futures = [queue.send(b"set_stimDur 1000\n", {"stimDur": "1000"}),
+                   queue.send(b"set_intensity 255\n", {"intensity": "255"}),
+                   queue.send(b"exp_start\n")]
+        await sleep(.05)
+        assert conn.writes == [b"set_stimDur 1000\nset_intensity 255\nexp_start\n"]
+        assert futures[2].result()
+        queue.handle_response({"stimDur": 1000})
+        queue.handle_response({"intensity": 128})  # Wrong value does not confirm.
+        assert futures[0].result()
+        assert not futures[1].done()
+        queue.handle_response({"intensity": 255})
+        assert futures[1].result()
+        queue.cleanup()
+    run(main())
+
+
+def test_answer_goes_to_oldest_match():
+    async def main():
+        conn = FakeConn()
+        queue = CommandQueue(conn, "VOG_test")
+        user = queue.send(b">get_configMaxOpen|<<\n", {"MaxOpen": None})
+        probe = queue.send(b">get_configMaxOpen|<<\n", {"MaxOpen": None}, "probe")
+        await sleep(.05)
+        assert queue.handle_response({"MaxOpen": 1500}) is None
+        assert user.result()
+        assert not probe.done()
+        assert queue.handle_response({"MaxOpen": 1500}) == "probe"
+        assert probe.result()
+        assert queue.handle_response({"MaxOpen": 1500}) is None
+        queue.cleanup()
+    run(main())
+
+
+def test_timed_from_answered_try():
+    async def main():
+        conn = FakeConn()
+        queue = CommandQueue(conn, "DRT_test", timeout=.1, retries=2)
+        timed = create_task(queue.send_timed(b"get_lowerISI\n", {"lowerISI": None}, "probe"))
+        await sleep(.15)  # The first try went unanswered and was resent.
+        assert conn.writes == [b"get_lowerISI\n"] * 2
+        assert queue.handle_response({"lowerISI": 3000}) == "probe"
+        rtt_ms, resends = await timed
+        assert resends == 1
+        assert rtt_ms < 100  # Not counting the first try's timeout.
+        assert not (await queue.send_timed(b"get_lowerISI\n", {"lowerISI": None}))[0]
+        queue.cleanup()
+    run(main())
+
+
+def test_retry_then_fail():
+    async def main():
+        conn = FakeConn()
+        queue = CommandQueue(conn, "VOG_test", timeout=.05, retries=2)
+        future = queue.send(b">get_configName|<<\n", {"Name": None})
+        assert not await future
+        assert conn.writes == [b">get_configName|<<\n"] * 3
+        assert queue.get_stats()["retries"] == 2
+        assert queue.get_stats()["failed"] == 1
+        queue.cleanup()
+    run(main())
+
+
+def test_closed_port_fails():
+    async def main():
+        conn = FakeConn()
+        conn.is_open = False
+        queue = CommandQueue(conn, "DRT_test")
+        assert not await queue.send(b"exp_stop\n")
+        queue.cleanup()
+    run(main())
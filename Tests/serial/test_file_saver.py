@@ -0,0 +1,20 @@
+from RSCompanionAsync.Model.rs_file_saver import _ts_value
+
+
+"""
+Check saved timestamps sort the same in nanoseconds or the older float seconds.
+Run with python -m pytest Tests/serial
+"""
+
+
+def test_nanoseconds_kept():
+    assert _ts_value("1700000000123456789") == 1700000000123456789
+
+
+def test_float_seconds_converted():
+    assert _ts_value("1700000000.5") == 1700000000500000000
+
+
+def test_whole_seconds_converted():
+    assert _ts_value("1700000000") == 1700000000000000000
+    assert _ts_value("1700000000.0") == _ts_value("1700000000")
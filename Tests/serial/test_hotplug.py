@@ -0,0 +1,44 @@
+from asyncio import run, wait_for
+from serial.tools.list_ports_common import ListPortInfo
+from RSCompanionAsync.Model.rs_hotplug import FakeBackend, diff_ports, parse_uevent, port_key
+
+
+"""
+Check hot plug diffing and the fake event source.
+Run with python -m pytest Tests/serial
+"""
+
+
+def make_port(device: str, serial_number: str) -> ListPortInfo:
+    port = ListPortInfo(device, skip_link_detection=True)
+    port.vid, port.pid, port.serial_number = 9114, 32798, serial_number
+    return port
+
+
+def test_diff_sees_swaps():
+    a, b, c = make_port("/dev/ttyACM0", "A"), make_port("/dev/ttyACM1", "B"), make_port("/dev/ttyACM0", "C")
+    known = {port_key(a): a, port_key(b): b}
+    assert diff_ports(known, [a, b]) == ([], [])
+    added, removed = diff_ports(known, [c, b])  # Same count, different device on the same path.
+    assert added == [c] and removed == [a]
+    added, removed = diff_ports(known, [make_port("/dev/ttyACM2", "A"), b])  # Same device on a new path.
+    assert [x.device for x in added] == ["/dev/ttyACM2"] and removed == [a]
+
+
+def test_parse_uevent():
+    data = b"add@/devices/usb1/1-1/1-1:1.0/tty/ttyACM0\0ACTION=add\0SUBSYSTEM=tty\0DEVNAME=ttyACM0\0SEQNUM=12\0"
+    assert parse_uevent(data) == {"ACTION": "add", "SUBSYSTEM": "tty", "DEVNAME": "ttyACM0", "SEQNUM": "12"}
+
+
+def test_fake_backend():
+    async def main():
+        a, b = make_port("/dev/ttyACM0", "A"), make_port("/dev/ttyACM0", "B")
+        backend = FakeBackend([a])
+        backend.swap(a, b)
+        await wait_for(backend.wait(), 1)
+        assert backend.wakes == 1
+        assert diff_ports({port_key(a): a}, backend.list_ports()) == ([b], [a])
+        backend.unplug(b, notify=False)
+        assert backend.list_ports() == []
+
+    run(main())
@@ -0,0 +1,116 @@
+import os
+import sys
+import pytest
+from asyncio import run, wait_for, sleep, get_running_loop
+from pickle import loads
+from serial.serialutil import SerialException
+from RSCompanionAsync.Model.rs_io_process import RecordRing, IOProcess, _IOWorker
+
+
+"""
+Check the shared memory ring, a round trip through the io process, a port it can not open and one it can not write to.
+Run with python -m pytest Tests/serial
+"""
+
+spec = {"messages": [{"match": "prefix", "key": b"trl>", "type": "data", "kind": "positional", "sep": b", ",
+                      "fields": [("start", int), ("trial", int)]}],
+        "cmd_fmt": "{cmd} {arg}\n", "cmd_fmt_no_arg": "{cmd}\n", "save_fields": ["start", "trial"]}
+
+
+def test_ring_wraps_and_fills():
+    ring = RecordRing(size=64)
+    other = RecordRing(ring.name)
+    try:
+        for i in range(20):
+            record = bytes([i]) * (i % 7 + 1)
+            assert ring.put(record)
+            assert other.get_all() == [record]
+        assert ring.put(b"x" * 30)
+        assert not ring.put(b"y" * 30)
+        ring.add_dropped(1)
+        assert other.get_dropped() == 1
+        assert other.get_all() == [b"x" * 30]
+        assert ring.put(b"y" * 30)
+    finally:
+        other.close()
+        ring.close()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Uses a pseudo terminal")
+def test_round_trip():
+    import pty
+    import tty
+    import termios
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+
+    async def main():
+        io_process = IOProcess()
+        io_process.start()
+        conn = io_process.connect(os.ttyname(slave), {"baudrate": 115200}, {"low_latency": True})
+        try:
+            conn.open(spec)
+            conn.write(b"exp_start\n")
+            assert os.read(master, 64) == b"exp_start\n"  # Commands only go out once the port is open.
+            os.write(master, b"trl>100, 1\r\ntrl>2")
+            os.write(master, b"00, 2\r\nbad\r\n")
+            msgs = list()
+            while len(msgs) < 3:
+                got, num_bytes = await wait_for(conn.get_msgs(), 5)
+                msgs += got
+            assert [msg for msg, timestamp in msgs] == [{'values': {"start": 100, "trial": 1}, 'type': "data"},
+                                                         {'values': {"start": 200, "trial": 2}, 'type': "data"},
+                                                         {'values': {}}]
+            assert msgs[0][1] <= msgs[1][1] == msgs[2][1]
+            assert termios.tcgetattr(slave)[4] == termios.B115200  # Opened with the settings given.
+            conn.close()
+        finally:
+            await io_process.cleanup()
+
+    try:
+        run(main())
+    finally:
+        os.close(master)
+        os.close(slave)
+
+
+def test_failed_port_raises():
+    async def main():
+        io_process = IOProcess()
+        io_process.start()
+        conn = io_process.connect("/dev/no_such_rs_port")
+        try:
+            conn.open(spec)
+            with pytest.raises(SerialException):
+                await wait_for(conn.get_msgs(), 5)
+            assert not conn.is_open
+            conn.close()
+        finally:
+            await io_process.cleanup()
+
+    run(main())
+
+
+class FailingPort:
+    # A port whose writes fail, like one whose device stopped taking data.
+    port = "/dev/ttyFAIL"
+
+    def write(self, data: bytes) -> int:
+        raise SerialException("Write timeout")
+
+
+def test_failed_write_is_lost():
+    async def main():
+        ring = RecordRing()
+        worker = _IOWorker(ring.name, None)
+        worker._loop = get_running_loop()
+        worker._ports[0] = FailingPort()
+        try:
+            await get_running_loop().run_in_executor(None, worker._write, 0, b"exp_start\n")  # As the command thread.
+            await sleep(.01)
+            assert [loads(x) for x in ring.get_all()] == [("failed", 0, "Write to /dev/ttyFAIL failed: Write timeout")]
+        finally:
+            worker._ring.close()
+            ring.close()
+
+    run(main())
@@ -0,0 +1,63 @@
+import asyncio
+from RSCompanionAsync.Model.rs_protocol import compile_parser
+from RSCompanionAsync.Model.rs_link_health import LinkHealth, health_dir, health_fields
+from RSCompanionAsync.Devices.DRT.Model import drt_defs
+
+
+"""
+Check link health counting and the probe loop.
+Run with python -m pytest Tests/serial
+"""
+
+
+async def write_line(fname: str, line: str, new: bool = False) -> None:
+    # app_helpers.write_line_to_file without Qt.
+    with open(fname, "w" if new else "a") as f:
+        f.write(line + "\n")
+
+
+def test_counts_gaps_and_parse_errors():
+    parse = compile_parser(drt_defs.protocol)
+    health = LinkHealth("DRT_0", None, write_line, "trial")
+    lines = [(b"trl>100, 1, 1, 300\r\n", 0), (b"trl>200, 2, 1, 300\r\n", 0), (b"trl>500, 5, 0, -1\r\n", 0),
+             (b"trl>5\r\n", 0), (b"ready\r\n", 0), (b"trl>100, 1, 1, 300\r\n", 0), (b"trl>200, 2, 1, 300\r\n", 0)]
+    health.add_lines(lines)
+    for line, timestamp in lines:
+        health.add_msg(parse(line))
+    for rtt in (3, 4, 4, 40):
+        health.add_probe(rtt)
+    health.add_probe(4, 1)  # Answered on its second try.
+    health.add_probe(None, 2)
+    snap = health._make_snapshot()
+    assert snap["lines"] == 7
+    assert snap["bytes"] == sum([len(line) for line, timestamp in lines])
+    assert snap["parse_errors"] == 1
+    assert snap["seq_gaps"] == 1
+    assert snap["lost_lines"] == 2
+    assert snap["probes"] == 6
+    assert snap["probe_failures"] == 1
+    assert snap["probe_retries"] == 3
+    assert snap["rtt_p50_ms"] == 5
+    assert snap["rtt_p95_ms"] == 50
+
+
+def test_probe_loop_writes_log(tmp_path):
+    async def run():
+        async def probe():
+            return 2.5, 0
+        updates = list()
+        health = LinkHealth("VOG_0", probe, write_line, interval=.01)
+        health.set_update_handler(updates.append)
+        health.start()
+        health.start_log(str(tmp_path))
+        await asyncio.sleep(.1)
+        health.cleanup()
+        await asyncio.sleep(.01)
+        return updates
+    updates = asyncio.run(run())
+    assert updates and updates[-1]["probes"] >= 1
+    assert updates[-1]["rtt_ms"] == 2.5 and updates[-1]["probe_failures"] == 0
+    with open(tmp_path / health_dir / "VOG_0.csv") as f:
+        rows = f.read().splitlines()
+    assert rows[0] == ", ".join(health_fields)
+    assert len(rows) > 1
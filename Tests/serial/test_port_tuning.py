@@ -0,0 +1,89 @@
+import os
+import sys
+import pytest
+from select import select
+from threading import Thread
+from RSCompanionAsync.Model.rs_port_tuning import read_latency_timer, set_latency_timer, tune_port, format_tuning, \
+    measure_rtt
+
+
+"""
+Check port tuning against a fake sysfs tree, and timing round trips past other lines.
+Run with python -m pytest Tests/serial
+"""
+
+
+def make_tree(root, name: str, timer: int) -> None:
+    dev_dir = root / "class" / "tty" / name / "device"
+    dev_dir.mkdir(parents=True)
+    (dev_dir / "latency_timer").write_text(str(timer) + "\n")
+
+
+def test_latency_timer(tmp_path):
+    make_tree(tmp_path, "ttyUSB0", 16)
+    assert read_latency_timer("/dev/ttyUSB0", str(tmp_path)) == 16
+    assert set_latency_timer("/dev/ttyUSB0", 1, str(tmp_path))
+    assert read_latency_timer("/dev/ttyUSB0", str(tmp_path)) == 1
+    assert read_latency_timer("/dev/ttyACM0", str(tmp_path)) is None  # Native USB ports have no timer.
+    assert not set_latency_timer("/dev/ttyACM0", 1, str(tmp_path))
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Uses a pseudo terminal")
+def test_tune_port(tmp_path):
+    import pty
+    import tty
+    from serial import Serial
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    name = os.ttyname(slave)
+    make_tree(tmp_path, os.path.basename(os.path.realpath(name)), 16)
+    conn = Serial(name)
+    try:
+        os.write(master, b"trl>100, 1, 1, 300\r\n")
+        result = tune_port(conn, {"latency_timer_ms": 1, "low_latency": True, "probe": b"get_lowerISI\n"},
+                           str(tmp_path))
+        assert not select([master], [], [], 0)[0]  # Nothing was sent to the device.
+        assert conn.read(conn.in_waiting) == b"trl>100, 1, 1, 300\r\n"  # What the device sent is kept.
+    finally:
+        conn.close()
+        os.close(slave)
+        os.close(master)
+    assert result["latency_timer_ms"] == (16, 1)
+    assert result["low_latency"] == (None, None)  # Pseudo terminals have no serial_struct.
+    assert result["read_buffer"] is None
+    assert "latency timer 16ms -> 1ms" in format_tuning(result)
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Uses a pseudo terminal")
+def test_measure_rtt():
+    import pty
+    import tty
+    from serial import Serial
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+
+    def answer():
+        # Send a trial line then the answer to every probe, like a device in a block would.
+        buf = b""
+        while True:
+            try:
+                data = os.read(master, 64)
+            except OSError as e:
+                return
+            buf += data
+            while b"\n" in buf:
+                line, buf = buf.split(b"\n", 1)
+                os.write(master, b"trl>100, 1, 1, 300\r\n")
+                os.write(master, b"cfg>lowerISI:3000\r\n")
+
+    conn = Serial(os.ttyname(slave))
+    try:
+        assert measure_rtt(conn, b"get_lowerISI\n", b"lowerISI", 1) is None  # Nothing answers yet.
+        Thread(target=answer, daemon=True).start()
+        rtt = measure_rtt(conn, b"get_lowerISI\n", b"lowerISI", 3)
+        assert rtt is not None and rtt > 0
+        assert measure_rtt(conn, b"get_lowerISI\n", b"upperISI", 1) is None  # Only the matching answer counts.
+    finally:
+        conn.close()
+        os.close(slave)
+        os.close(master)
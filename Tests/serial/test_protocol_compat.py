@@ -0,0 +1,94 @@
+from datetime import datetime
+from RSCompanionAsync.Model.rs_protocol import compile_parser, compile_row_encoder, compile_cmd_encoder
+from RSCompanionAsync.Devices.DRT.Model import drt_defs
+from RSCompanionAsync.Devices.VOG.Model import vog_defs
+from Tests.serial import legacy_parsers as legacy
+
+
+"""
+Check the parsers and formatters compiled from the protocol specs give exactly what the old string code gave.
+Run with python -m pytest Tests/serial
+"""
+
+drt_lines = ["trl>12345, 1, 1, 350\r\n",
+             "trl>0, 0, 0, -1\r\n",
+             "trl>4294967295, 65535, 12, 65535\r\n",
+             "cfg>lowerISI:3000\r\n",
+             "cfg>upperISI:5000\r\n",
+             "cfg>stimDur:1000\r\n",
+             "cfg>intensity:255\r\n",
+             "cfg>name:DRT1, version:1.0, lowerISI:3000, upperISI:5000, stimDur:1000, intensity:255, battery:87, "
+             "uptime:123456\r\n",
+             "cfg>lowerISI:2500, upperISI:4500, stimDur:900, intensity:128, name:Example DRT unit, build:2020.05.01, "
+             "battery:100\r\n",
+             "ready\r\n",
+             "\r\n"]
+
+vog_lines = ["data|1,1500,1500\r\n",
+             "data|12,123456789,0\r\n",
+             "data|0,0,0\n",
+             "configName|Example\r\n",
+             "configMaxOpen|1500\r\n",
+             "configMaxClose|1500\r\n",
+             "configDebounce|20\r\n",
+             "configClickMode|1\r\n",
+             "configButtonControl|0\r\n",
+             "Click\r\n",
+             "buttonControl|1\r\n",
+             "peekOpen\r\n",
+             "peekClose\r\n",
+             "unknown\r\n",
+             "\r\n"]
+
+drt_cmds = [("get_config", None), ("set_stimDur", "1000"), ("set_intensity", "255"), ("exp_start", None),
+            ("set_lowerISI", "")]
+
+vog_cmds = [("get_configName", None), ("set_configName", "Example"), ("do_trialStart", None), ("set_configClickMode",
+            "0"), ("do_peekOpen", "")]
+
+
+def test_drt_parse():
+    parse = compile_parser(drt_defs.protocol)
+    for line in drt_lines:
+        assert parse(line.encode()) == legacy.drt_parse_msg(line), line
+
+
+def test_vog_parse():
+    parse = compile_parser(vog_defs.protocol)
+    for line in vog_lines:
+        assert parse(line.encode()) == legacy.vog_parse_msg(line), line
+
+
+def test_drt_cmds():
+    encode = compile_cmd_encoder(drt_defs.protocol)
+    for cmd, arg in drt_cmds:
+        assert encode(cmd, arg) == legacy.drt_prepare_msg(cmd, arg).encode()
+
+
+def test_vog_cmds():
+    encode = compile_cmd_encoder(vog_defs.protocol)
+    for cmd, arg in vog_cmds:
+        assert encode(cmd, arg) == legacy.vog_prepare_msg(cmd, arg).encode()
+
+
+def test_save_rows():
+    timestamp = datetime(2020, 5, 1, 12, 30, 15, 123456)
+    for defs, lines, old_parse in ((drt_defs, drt_lines, legacy.drt_parse_msg),
+                                   (vog_defs, vog_lines, legacy.vog_parse_msg)):
+        encode = compile_row_encoder(defs.save_fields)  # protocol save_fields may add app computed columns.
+        for line in lines:
+            msg = old_parse(line)
+            if msg.get('type') == "data":
+                assert encode(msg['values'], timestamp.timestamp()) == \
+                       legacy.format_save_data(defs.save_fields, msg['values'], timestamp)
+
+
+def test_malformed_lines_are_dropped():
+    drt_parse = compile_parser(drt_defs.protocol)
+    vog_parse = compile_parser(vog_defs.protocol)
+    assert drt_parse(b"trl>12345, 1\r\n") == {'values': {}, 'error': True}
+    assert drt_parse(b"trl>12345, x, 1, 350\r\n") == {'values': {}, 'error': True}
+    assert vog_parse(b"data|1,2\r\n") == {'values': {}, 'error': True}
+    assert vog_parse(b"data|1,\xff,3\r\n") == {'values': {}, 'error': True}
+    assert drt_parse(b"ready\r\n") == {'values': {}}  # Lines that match no message are not errors.
+    assert vog_parse(b"unknown\r\n") == {'values': {}}
@@ -0,0 +1,92 @@
+import os
+import sys
+import pytest
+from asyncio import run, wait_for, sleep
+from queue import Queue
+from serial.serialutil import SerialException
+from RSCompanionAsync.Model.rs_executors import get_executor, ExecEnum
+from RSCompanionAsync.Model.rs_serial_reader import SerialLineReader
+
+
+"""
+Check the line reader hands over what it read and then raises once the device is gone, with and without a file
+descriptor to watch.
+Run with python -m pytest Tests/serial
+"""
+
+
+class PtyConn:
+    # The parts of AioSerial the reader uses.
+    def __init__(self, fd: int):
+        self.port = os.ttyname(fd)
+        self._fd = fd
+
+    def fileno(self) -> int:
+        return self._fd
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Uses a pseudo terminal")
+def test_raises_when_device_gone():
+    import pty
+    import tty
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+
+    async def main():
+        reader = SerialLineReader(PtyConn(slave))
+        os.write(master, b"one\r\ntwo\r\n")
+        lines = list()
+        while len(lines) < 2:
+            lines += await wait_for(reader.get_lines(), 5)
+        assert [line for line, timestamp in lines] == [b"one\r\n", b"two\r\n"]
+        os.write(master, b"three\r\n")
+        await sleep(.2)  # Read but not taken when the device goes.
+        os.close(master)
+        await sleep(.2)
+        assert [line for line, timestamp in await reader.get_lines()] == [b"three\r\n"]
+        with pytest.raises(SerialException):
+            await wait_for(reader.get_lines(), 5)
+        reader.cleanup()
+
+    try:
+        run(main())
+    finally:
+        os.close(slave)
+
+
+class BlockingConn:
+    # A connection without a file descriptor, like pyserial's Windows ports, whose reads block until data is fed.
+    def __init__(self):
+        self.port = "COM3"
+        self.in_waiting = 0
+        self._chunks = Queue()
+
+    def feed(self, data: bytes) -> None:
+        self._chunks.put(data)
+
+    def read(self, size: int) -> bytes:
+        data = self._chunks.get()
+        if data is None:
+            raise SerialException("Port closed")
+        return data
+
+
+def test_threaded_reader_leaves_device_io_free():
+    async def main():
+        conn = BlockingConn()
+        reader = SerialLineReader(conn)
+        reader.start()
+        await sleep(.05)  # The reader is now blocked in read.
+        assert get_executor(ExecEnum.DEVICE_IO).get_stats()["active"] == 0
+        conn.feed(b"one\r\ntw")
+        conn.feed(b"o\r\n")
+        lines = list()
+        while len(lines) < 2:
+            lines += await wait_for(reader.get_lines(), 5)
+        assert [line for line, timestamp in lines] == [b"one\r\n", b"two\r\n"]
+        conn.feed(None)
+        with pytest.raises(SerialException):
+            await wait_for(reader.get_lines(), 5)
+        reader.cleanup()
+
+    run(main())
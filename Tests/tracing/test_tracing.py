@@ -0,0 +1,51 @@
+import json
+from threading import Thread
+from RSCompanionAsync.Model import rs_tracing
+from RSCompanionAsync.Model.rs_tracing import span
+
+
+"""
+Check hot path span timing and the Chrome trace export.
+Run with python -m pytest Tests/tracing
+"""
+
+
+def teardown_function(function):
+    rs_tracing.disable()
+    rs_tracing.clear()
+
+
+def test_disabled_records_nothing():
+    with span("drt.parse"):
+        pass
+    assert span("drt.parse") is span("vog.save")  # The shared do nothing span.
+    assert rs_tracing.get_spans() == []
+
+
+def test_sampling_and_threads():
+    rs_tracing.enable(sample_every=3)
+    for i in range(9):
+        with span("drt.parse"):
+            pass
+    thread = Thread(target=lambda: span("graph.rasterize").__enter__().__exit__(None, None, None))
+    thread.start()
+    thread.join()
+    spans = rs_tracing.get_spans()
+    assert [x[0] for x in spans] == ["drt.parse"] * 3 + ["graph.rasterize"]
+    assert all(x[2] >= 0 for x in spans)
+    assert spans[0][3] != spans[-1][3]
+
+
+def test_chrome_trace(tmp_path):
+    rs_tracing.enable()
+    try:
+        with span("vog.save"):
+            raise ValueError("still recorded")
+    except ValueError:
+        pass
+    path = str(tmp_path / "trace.json")
+    assert rs_tracing.export_chrome_trace(path) == 1
+    with open(path) as f:
+        trace = json.load(f)
+    event = [x for x in trace["traceEvents"] if x["ph"] == "X"][0]
+    assert event["name"] == "vog.save" and event["cat"] == "vog" and event["dur"] >= 0